@@ -1,5 +1,6 @@
 """OpenPlanter agent package."""
 
+from .async_engine import AsyncRLMEngine
 from .config import AgentConfig
 from .credentials import CredentialBundle, CredentialStore
 from .engine import RLMEngine
@@ -18,6 +19,7 @@ from .tools import WorkspaceTools
 __all__ = [
     "AgentConfig",
     "AnthropicModel",
+    "AsyncRLMEngine",
     "Conversation",
     "CredentialBundle",
     "CredentialStore",
@@ -133,6 +133,16 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Censor entity names and workspace path segments in output (UI-only).",
     )
+    parser.add_argument(
+        "--replay",
+        metavar="REPLAY_JSONL",
+        help="Serve model turns from a recorded replay.jsonl instead of calling the provider.",
+    )
+    parser.add_argument(
+        "--replay-divergence",
+        choices=["fail", "ignore", "fallthrough"],
+        help="When the run diverges from --replay: stop, keep replaying, or continue with the live model.",
+    )
     return parser
 
 
@@ -316,6 +326,10 @@ def _apply_runtime_overrides(cfg: AgentConfig, args: argparse.Namespace, creds:
         cfg.acceptance_criteria = True
     if args.demo:
         cfg.demo = True
+    if args.replay:
+        cfg.replay_from = os.path.abspath(os.path.expanduser(args.replay))
+    if args.replay_divergence:
+        cfg.replay_divergence = args.replay_divergence
 
 
 def run_plain_repl(ctx: ChatContext) -> None:
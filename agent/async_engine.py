@@ -0,0 +1,388 @@
+"""Asyncio-native variant of :class:`RLMEngine`.
+
+Model calls, tool calls and sub-agent recursion are coroutines sharing one
+event loop.  Blocking provider and workspace I/O is dispatched to a single
+engine-wide thread pool behind configurable semaphores, so a deep recursion
+tree costs coroutines rather than one OS thread per delegated call.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, TypeVar
+
+from .engine import (
+    _PARALLEL_TOOLS,
+    _PendingVerdict,
+    ContentDeltaCallback,
+    EventCallback,
+    ExternalContext,
+    RLMEngine,
+    StepCallback,
+)
+from .model import BaseModel, ModelError, ToolCall, ToolResult
+from .replay_log import ReplayLogger
+from .tool_defs import ToolSet
+
+_T = TypeVar("_T")
+
+# (group_id, owner_id) of the parallel write group the running coroutine belongs to.
+# Tasks copy the context, so sibling branches never see each other's scope.
+_write_scope: contextvars.ContextVar[tuple[str, str] | None] = contextvars.ContextVar(
+    "openplanter_write_scope", default=None,
+)
+
+
+@dataclass
+class _AsyncLimits:
+    model_calls: asyncio.Semaphore
+    tool_calls: asyncio.Semaphore
+
+
+@dataclass
+class AsyncRLMEngine(RLMEngine):
+    """RLMEngine whose recursion tree runs on an asyncio event loop.
+
+    ``solve_async`` can be awaited from a running loop, so one worker process
+    can drive many investigations concurrently; they share the engine's
+    concurrency limits (``config.max_concurrent_model_calls`` and
+    ``config.max_concurrent_tool_calls``).  The synchronous ``solve`` and
+    ``solve_with_context`` entry points remain available and run their own loop.
+    """
+
+    _executor: ThreadPoolExecutor | None = field(default=None, init=False, repr=False)
+    _loop_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _AsyncLimits]" = field(
+        default_factory=weakref.WeakKeyDictionary, init=False, repr=False,
+    )
+
+    def solve_with_context(
+        self,
+        objective: str,
+        context: ExternalContext | None = None,
+        on_event: EventCallback | None = None,
+        on_step: StepCallback | None = None,
+        on_content_delta: ContentDeltaCallback | None = None,
+        replay_logger: ReplayLogger | None = None,
+    ) -> tuple[str, ExternalContext]:
+        return asyncio.run(
+            self.solve_async(
+                objective,
+                context=context,
+                on_event=on_event,
+                on_step=on_step,
+                on_content_delta=on_content_delta,
+                replay_logger=replay_logger,
+            )
+        )
+
+    async def solve_async(
+        self,
+        objective: str,
+        context: ExternalContext | None = None,
+        on_event: EventCallback | None = None,
+        on_step: StepCallback | None = None,
+        on_content_delta: ContentDeltaCallback | None = None,
+        replay_logger: ReplayLogger | None = None,
+    ) -> tuple[str, ExternalContext]:
+        if not objective.strip():
+            return "No objective provided.", context or ExternalContext()
+        with self._lock:
+            self._shell_command_counts.clear()
+        active_context = context if context is not None else ExternalContext()
+        deadline = (time.monotonic() + self.config.max_solve_seconds) if self.config.max_solve_seconds > 0 else 0
+        try:
+            result = await self._solve_recursive_async(
+                objective=objective.strip(),
+                depth=0,
+                context=active_context,
+                on_event=on_event,
+                on_step=on_step,
+                on_content_delta=on_content_delta,
+                deadline=deadline,
+                replay_logger=replay_logger,
+                branch=self._root_branch(),
+            )
+        finally:
+            cleanup = getattr(self.tools, "cleanup_bg_jobs", None)
+            if cleanup:
+                cleanup()
+        return result, active_context
+
+    def close(self) -> None:
+        """Shut down the engine's worker pool.  Safe to call more than once."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    # ------------------------------------------------------------------
+    # Concurrency plumbing
+    # ------------------------------------------------------------------
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                workers = max(1, self.config.max_concurrent_model_calls) + max(1, self.config.max_concurrent_tool_calls)
+                self._executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="openplanter-async",
+                )
+            return self._executor
+
+    def _limits(self) -> _AsyncLimits:
+        loop = asyncio.get_running_loop()
+        limits = self._loop_limits.get(loop)
+        if limits is None:
+            limits = _AsyncLimits(
+                model_calls=asyncio.Semaphore(max(1, self.config.max_concurrent_model_calls)),
+                tool_calls=asyncio.Semaphore(max(1, self.config.max_concurrent_tool_calls)),
+            )
+            self._loop_limits[loop] = limits
+        return limits
+
+    async def _to_thread(
+        self,
+        gate: asyncio.Semaphore,
+        fn: Callable[..., _T],
+        *args: Any,
+        **kwargs: Any,
+    ) -> _T:
+        """Run blocking *fn* on the worker pool once *gate* admits it."""
+        scope = _write_scope.get()
+
+        def _call() -> _T:
+            group_id, owner_id = scope if scope else (None, None)
+            with self._tool_scope(group_id, owner_id):
+                return fn(*args, **kwargs)
+
+        async with gate:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), _call)
+
+    # ------------------------------------------------------------------
+    # Recursive solve loop
+    # ------------------------------------------------------------------
+
+    async def _solve_recursive_async(
+        self,
+        objective: str,
+        depth: int,
+        context: ExternalContext,
+        on_event: EventCallback | None = None,
+        on_step: StepCallback | None = None,
+        on_content_delta: ContentDeltaCallback | None = None,
+        deadline: float = 0,
+        model_override: BaseModel | None = None,
+        replay_logger: ReplayLogger | None = None,
+        branch: str = "root",
+        tool_set: ToolSet | None = None,
+    ) -> str:
+        model = model_override or self.model
+        limits = self._limits()
+
+        self._emit(f"[depth {depth}] objective: {objective}", on_event)
+
+        initial_message = self._initial_message(objective, depth, context)
+        conversation = model.create_conversation(self.system_prompt, initial_message)
+        self._write_replay_header(model, replay_logger, tool_set)
+
+        for step in range(1, self.config.max_steps_per_call + 1):
+            if deadline and time.monotonic() > deadline:
+                self._emit(f"[d{depth}] wall-clock limit reached", on_event)
+                return "Time limit exceeded. Try a more focused objective."
+            self._emit(f"[d{depth}/s{step}] calling model...", on_event)
+            t0 = time.monotonic()
+            try:
+                turn = await self._to_thread(
+                    limits.model_calls, self._complete_turn,
+                    model, conversation, depth, on_content_delta, branch, tool_set,
+                )
+            except ModelError as exc:
+                self._emit(f"[d{depth}/s{step}] model error: {exc}", on_event)
+                return f"Model error at depth {depth}, step {step}: {exc}"
+            elapsed = time.monotonic() - t0
+
+            self._record_turn(
+                model, conversation, turn, depth, step, objective, elapsed, on_step, replay_logger,
+            )
+
+            if not turn.tool_calls and turn.text:
+                self._emit_final_answer(turn, depth, step, objective, elapsed, on_event, on_step)
+                return turn.text
+
+            if not turn.tool_calls:
+                self._nudge_empty_turn(model, conversation, depth, step, elapsed, on_event)
+                continue
+
+            tc_names = [tc.name for tc in turn.tool_calls]
+            self._emit(
+                f"[d{depth}/s{step}] model returned {len(turn.tool_calls)} tool call(s) ({elapsed:.1f}s): {', '.join(tc_names)}",
+                on_event,
+            )
+            if turn.text:
+                self._emit(f"[d{depth}/s{step}] model text: {turn.text[:200]}", on_event)
+
+            sequential, parallel = self._partition_tool_calls(turn)
+            indexed_results: dict[int, tuple[ToolResult, bool]] = {}
+            stop_early = False
+            tool_kwargs: dict[str, Any] = dict(
+                depth=depth, step=step, objective=objective, context=context,
+                on_event=on_event, on_step=on_step, deadline=deadline,
+                current_model=model, replay_logger=replay_logger,
+            )
+
+            for batch in self._tool_batches(sequential):
+                entries = await asyncio.gather(*(
+                    self._run_one_tool_async(tc, limits, branch=f"{branch}/s{step}.{idx}", **tool_kwargs)
+                    for idx, tc in batch
+                ))
+                for (idx, _tc), entry in zip(batch, entries):
+                    indexed_results[idx] = entry
+                if any(is_final_entry for _r, is_final_entry in entries):
+                    stop_early = True
+                    break
+
+            if parallel and not stop_early:
+                group_id = f"d{depth}-s{step}-{time.monotonic_ns()}"
+                judge_batch: list[_PendingVerdict] | None = [] if self._judge_batch_enabled(parallel) else None
+                begin_group = getattr(self.tools, "begin_parallel_write_group", None)
+                end_group = getattr(self.tools, "end_parallel_write_group", None)
+                if callable(begin_group):
+                    begin_group(group_id)
+                try:
+                    entries = await asyncio.gather(*(
+                        self._run_one_tool_async(
+                            tc, limits,
+                            parallel_group_id=group_id,
+                            parallel_owner=f"{tc.id or 'tc'}:{idx}",
+                            branch=f"{branch}/s{step}.{idx}",
+                            judge_batch=judge_batch,
+                            **tool_kwargs,
+                        )
+                        for idx, tc in parallel
+                    ))
+                finally:
+                    if callable(end_group):
+                        end_group(group_id)
+                for (idx, _tc), entry in zip(parallel, entries):
+                    indexed_results[idx] = entry
+                if judge_batch:
+                    await self._to_thread(
+                        limits.model_calls, self._settle_verdicts,
+                        judge_batch, indexed_results, branch, step, depth, model,
+                    )
+
+            results, final_answer = self._finalize_step_results(indexed_results, model, turn, step)
+
+            model.append_tool_results(conversation, results)
+
+            if final_answer is not None:
+                self._emit(f"[d{depth}] completed in {step} step(s)", on_event)
+                return final_answer
+
+            for r in results:
+                context.add(f"[depth {depth} step {step}]\n{r.content}")
+
+        return self._step_budget_exhausted(depth, objective)
+
+    async def _run_one_tool_async(
+        self,
+        tc: ToolCall,
+        limits: _AsyncLimits,
+        depth: int,
+        step: int,
+        objective: str,
+        context: ExternalContext,
+        on_event: EventCallback | None,
+        on_step: StepCallback | None,
+        deadline: float,
+        current_model: BaseModel,
+        replay_logger: ReplayLogger | None,
+        parallel_group_id: str | None = None,
+        parallel_owner: str | None = None,
+        branch: str = "root",
+        judge_batch: list[_PendingVerdict] | None = None,
+    ) -> tuple[ToolResult, bool]:
+        if tc.name not in _PARALLEL_TOOLS:
+            return await self._to_thread(
+                limits.tool_calls,
+                self._run_one_tool,
+                tc=tc, depth=depth, step=step, objective=objective,
+                context=context, on_event=on_event, on_step=on_step,
+                deadline=deadline, current_model=current_model,
+                replay_logger=replay_logger, branch=branch,
+            )
+
+        self._emit_tool_start(tc, depth, step, on_event)
+        t1 = time.monotonic()
+        token = None
+        if parallel_group_id and parallel_owner:
+            token = _write_scope.set((parallel_group_id, parallel_owner))
+        try:
+            observation = await self._delegate_async(
+                tc, limits, depth, step, context, on_event, on_step,
+                deadline, current_model, replay_logger, branch, judge_batch,
+            )
+        except Exception as exc:
+            observation = f"Tool {tc.name} crashed: {type(exc).__name__}: {exc}"
+        finally:
+            if token is not None:
+                _write_scope.reset(token)
+        return self._tool_result(
+            tc, depth, step, objective, observation, False,
+            time.monotonic() - t1, on_event, on_step,
+        )
+
+    async def _delegate_async(
+        self,
+        tc: ToolCall,
+        limits: _AsyncLimits,
+        depth: int,
+        step: int,
+        context: ExternalContext,
+        on_event: EventCallback | None,
+        on_step: StepCallback | None,
+        deadline: float,
+        current_model: BaseModel,
+        replay_logger: ReplayLogger | None,
+        branch: str,
+        judge_batch: list[_PendingVerdict] | None = None,
+    ) -> str:
+        plan = self._plan_delegation(tc.name, tc.arguments, depth, current_model, branch)
+        if isinstance(plan, str):
+            return plan
+        cached = self._memo_lookup(plan, current_model, on_event)
+        if cached is not None:
+            return cached
+        self._emit(f"[d{depth}] >> {plan.banner}: {plan.objective}", on_event)
+        child_logger = replay_logger.child(depth, step) if replay_logger else None
+        self._memo_begin(plan)
+        try:
+            child_result = await self._solve_recursive_async(
+                objective=plan.objective,
+                depth=depth + 1,
+                context=context,
+                on_event=on_event,
+                on_step=on_step,
+                on_content_delta=None,
+                deadline=deadline,
+                model_override=plan.model,
+                replay_logger=child_logger,
+                branch=plan.branch,
+                tool_set=plan.tool_set,
+            )
+        finally:
+            deps = self._memo_end(plan)
+        deferred = self._defer_verdict(judge_batch, plan, child_result, current_model, deps)
+        if deferred is not None:
+            return deferred
+        # Judging is a model call, so it shares the model-call limit.
+        observation = await self._to_thread(
+            limits.model_calls, self._delegation_observation, plan, child_result, current_model,
+        )
+        self._memo_store(plan, current_model, child_result, observation, deps)
+        return observation
@@ -0,0 +1,419 @@
+"""Engine and tool overhead benchmarks on synthetic workspaces.
+
+Runs without network or API keys: the engine is driven by a synthetic,
+zero-latency model (or a :class:`~agent.replay_model.ReplayModel` over a
+recorded ``replay.jsonl``), so the numbers measure our own overhead.
+
+Benchmarks (select with ``--only``):
+
+* ``engine``  - per-step engine overhead: wall time between consecutive
+  model calls on a long single-conversation run;
+* ``tools``   - latency distribution of the workspace tools on a generated
+  tree of ``--files`` files plus CSV/JSONL datasets of ``--dataset-mb``;
+* ``fanout``  - wall time for 1..64 parallel subtasks;
+* ``memory``  - Python heap high-water mark (tracemalloc) and process RSS
+  for a run that reads and searches the datasets;
+* ``session`` - cost of :class:`~agent.runtime.SessionRuntime` persistence
+  (events, state, replay log) over a bare engine run;
+* ``replay``  - a recorded session replayed offline (``--replay``).
+
+Results are written as JSON.  With ``--baseline`` every lower-is-better
+metric is compared with a previous result file; ``--fail-on-regression``
+makes the exit status non-zero when any metric is more than
+``--threshold`` slower/larger.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from .config import AgentConfig
+from .engine import RLMEngine
+from .model import Conversation, ModelTurn, ToolCall, ToolResult
+from .replay_model import ReplayModel, conversation_key
+from .runtime import SessionRuntime
+from .tools import WorkspaceTools
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None  # type: ignore[assignment]
+
+BENCHMARKS = ("engine", "tools", "fanout", "memory", "session", "replay")
+# name -> (files, dataset MB)
+SCALES = {"small": (2_000, 8), "medium": (100_000, 256), "large": (1_000_000, 4_096)}
+_NEEDLE = "needle-7f3a"
+# Metric name suffixes where a larger value is worse.
+_LOWER_IS_BETTER = ("_ms", "_sec", "_kb", "_bytes")
+
+
+# ----------------------------------------------------------------------
+# Synthetic workspace
+# ----------------------------------------------------------------------
+
+
+def make_workspace(root: Path, files: int, dataset_mb: int, seed: int = 0) -> dict[str, Any]:
+    """Populate *root* with *files* small text files and CSV/JSONL datasets.
+
+    Files are spread over directories of 1000; one in 100 contains a
+    searchable needle.  The two datasets share *dataset_mb* megabytes.
+    Returns a summary of what was written.
+    """
+    rng = random.Random(seed)
+    words = ["alpha", "beta", "gamma", "delta", "ledger", "vendor", "invoice", "transfer", "audit", "entity"]
+    for i in range(files):
+        path = root / "src" / f"d{i // 1000:04d}" / f"f{i:07d}.txt"
+        if i % 1000 == 0:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        body = " ".join(rng.choice(words) for _ in range(12))
+        if i % 100 == 0:
+            body += f"\n{_NEEDLE} {i}"
+        path.write_text(body + "\n", encoding="utf-8")
+
+    data = root / "data"
+    data.mkdir(parents=True, exist_ok=True)
+    half = dataset_mb * 1024 * 1024 // 2
+    cities = ["Austin", "Boston", "Chicago", "Denver", "Fresno", "Miami"]
+    with (data / "transactions.csv").open("w", encoding="utf-8") as fh:
+        fh.write("id,vendor,city,amount,ts\n")
+        _write_rows(fh, half, lambda n: f"{n},{rng.choice(words)}-{n % 997},{rng.choice(cities)},"
+                                       f"{rng.randint(1, 99_999) / 100:.2f},2025-01-{n % 28 + 1:02d}\n")
+    with (data / "events.jsonl").open("w", encoding="utf-8") as fh:
+        _write_rows(fh, half, lambda n: json.dumps({"id": n, "kind": rng.choice(words), "city": rng.choice(cities),
+                                                    "value": rng.random()}) + "\n")
+    return {"files": files, "dataset_mb": dataset_mb}
+
+
+def _write_rows(fh: Any, size: int, row: Callable[[int], str]) -> None:
+    written = 0
+    n = 0
+    block: list[str] = []
+    while written < size:
+        line = row(n)
+        block.append(line)
+        written += len(line)
+        n += 1
+        if len(block) >= 10_000:
+            fh.write("".join(block))
+            block.clear()
+    fh.write("".join(block))
+
+
+# ----------------------------------------------------------------------
+# Synthetic model
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class BenchModel:
+    """Thread-safe scripted model whose script depends on the conversation depth.
+
+    The root conversation either takes ``steps`` tool-call turns (``root_calls``
+    cycled) or, with ``fanout`` > 0, delegates ``fanout`` subtasks at once;
+    every subtask takes one ``think`` turn and answers.  ``latency`` sleeps
+    inside each call to emulate a provider.
+    """
+
+    steps: int = 10
+    fanout: int = 0
+    latency: float = 0.0
+    root_calls: list[tuple[str, dict[str, Any]]] = field(default_factory=lambda: [("think", {"note": "bench"})])
+    call_times: list[float] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    _next_id: int = 0
+
+    def create_conversation(self, system_prompt: str, initial_user_message: str) -> Conversation:
+        key = conversation_key(initial_user_message)
+        depth = int(key[2]) if key[0] == "objective" else 0
+        return Conversation(
+            _provider_messages=[{"role": "user", "content": initial_user_message, "depth": depth}],
+            system_prompt=system_prompt,
+        )
+
+    def complete(self, conversation: Conversation, options: Any = None) -> ModelTurn:
+        with self._lock:
+            self.call_times.append(time.perf_counter())
+        step = conversation.turn_count
+        if self.latency > 0:
+            time.sleep(self.latency)
+        depth = conversation._provider_messages[0].get("depth", 0)
+        if depth > 0:
+            return self._tools([("think", {"note": "sub"})]) if step == 0 else ModelTurn(text="sub done", stop_reason="end_turn")
+        if self.fanout > 0:
+            if step == 0:
+                return self._tools([("subtask", {"objective": f"part {i}"}) for i in range(self.fanout)])
+        elif step < self.steps:
+            return self._tools([self.root_calls[step % len(self.root_calls)]])
+        return ModelTurn(text="bench done", stop_reason="end_turn")
+
+    def _tools(self, calls: list[tuple[str, dict[str, Any]]]) -> ModelTurn:
+        with self._lock:
+            start = self._next_id
+            self._next_id += len(calls)
+        return ModelTurn(
+            tool_calls=[ToolCall(id=f"b{start + i}", name=name, arguments=args) for i, (name, args) in enumerate(calls)],
+            stop_reason="tool_use",
+        )
+
+    def append_assistant_turn(self, conversation: Conversation, turn: ModelTurn) -> None:
+        conversation.turn_count += 1
+
+    def append_tool_results(self, conversation: Conversation, results: list[ToolResult]) -> None:
+        pass
+
+
+# ----------------------------------------------------------------------
+# Benchmarks
+# ----------------------------------------------------------------------
+
+
+def _distribution(samples_sec: list[float]) -> dict[str, float]:
+    """p50/p90/p99/max/mean in milliseconds."""
+    if not samples_sec:
+        return {}
+    ms = sorted(s * 1000 for s in samples_sec)
+
+    def pct(p: float) -> float:
+        return round(ms[min(len(ms) - 1, int(p * len(ms)))], 3)
+
+    return {"p50_ms": pct(0.5), "p90_ms": pct(0.9), "p99_ms": pct(0.99), "max_ms": round(ms[-1], 3),
+            "mean_ms": round(statistics.fmean(ms), 3), "samples": len(ms)}
+
+
+def _config(root: Path, **overrides: Any) -> AgentConfig:
+    values: dict[str, Any] = {"workspace": root, "max_depth": 2, "max_steps_per_call": 10_000,
+                              "acceptance_criteria": False, "memoize_subtasks": False}
+    values.update(overrides)
+    return AgentConfig(**values)
+
+
+def bench_engine(root: Path, steps: int) -> dict[str, Any]:
+    model = BenchModel(steps=steps)
+    engine = RLMEngine(model=model, tools=WorkspaceTools(root=root), config=_config(root))
+    start = time.perf_counter()
+    engine.solve("benchmark engine overhead")
+    wall = time.perf_counter() - start
+    gaps = [b - a for a, b in zip(model.call_times, model.call_times[1:])]
+    return {"steps": steps, "wall_sec": round(wall, 4), "per_step": _distribution(gaps)}
+
+
+def bench_tools(root: Path, repeat: int) -> dict[str, Any]:
+    tools = WorkspaceTools(root=root, cache_max_entries=0)
+    ops: dict[str, Callable[[], str]] = {
+        "list_files": lambda: tools.list_files(),
+        "list_files_glob": lambda: tools.list_files("*.csv"),
+        "search_files": lambda: tools.search_files(_NEEDLE),
+        "read_file_small": lambda: tools.read_file("src/d0000/f0000000.txt"),
+        "read_file_dataset": lambda: tools.read_file("data/transactions.csv"),
+        "repo_map": lambda: tools.repo_map(),
+        "run_shell": lambda: tools.run_shell("wc -l data/events.jsonl"),
+    }
+    results: dict[str, Any] = {}
+    for name, op in ops.items():
+        samples: list[float] = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            op()
+            samples.append(time.perf_counter() - start)
+        results[name] = _distribution(samples)
+    return results
+
+
+def bench_fanout(root: Path, widths: list[int], latency: float) -> dict[str, Any]:
+    results: dict[str, Any] = {}
+    for width in widths:
+        model = BenchModel(fanout=width, latency=latency)
+        cfg = _config(root, recursive=True, max_concurrent_model_calls=max(16, width))
+        engine = RLMEngine(model=model, tools=WorkspaceTools(root=root), config=cfg)
+        start = time.perf_counter()
+        engine.solve("benchmark fan-out")
+        results[str(width)] = {"wall_sec": round(time.perf_counter() - start, 4), "model_calls": len(model.call_times)}
+    return results
+
+
+def bench_memory(root: Path) -> dict[str, Any]:
+    model = BenchModel(steps=6, root_calls=[
+        ("read_file", {"path": "data/transactions.csv"}),
+        ("search_files", {"query": _NEEDLE}),
+        ("list_files", {}),
+    ])
+    engine = RLMEngine(model=model, tools=WorkspaceTools(root=root), config=_config(root))
+    tracemalloc.start()
+    try:
+        engine.solve("benchmark memory")
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    result: dict[str, Any] = {"heap_peak_kb": peak // 1024}
+    if resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, KiB elsewhere.
+        result["rss_peak_kb"] = rss // 1024 if sys.platform == "darwin" else rss
+    return result
+
+
+def bench_session(root: Path, steps: int) -> dict[str, Any]:
+    bare = bench_engine(root, steps)["wall_sec"]
+    cfg = _config(root)
+    engine = RLMEngine(model=BenchModel(steps=steps), tools=WorkspaceTools(root=root), config=cfg)
+    runtime = SessionRuntime.bootstrap(engine=engine, config=cfg)
+    start = time.perf_counter()
+    runtime.solve("benchmark session persistence")
+    wall = time.perf_counter() - start
+    session_dir = root / cfg.session_root_dir / "sessions" / runtime.session_id
+    written = sum(p.stat().st_size for p in session_dir.rglob("*") if p.is_file())
+    return {
+        "steps": steps,
+        "wall_sec": round(wall, 4),
+        "overhead_per_step_ms": round(max(0.0, wall - bare) * 1000 / max(1, steps), 3),
+        "session_bytes": written,
+    }
+
+
+def bench_replay(root: Path, replay_path: Path) -> dict[str, Any]:
+    model = ReplayModel.from_file(replay_path, on_divergence="ignore")
+    objectives = [rec.key[1] for rec in model.recordings if rec.key[:1] == ("objective",) and rec.key[2] == "0"]
+    engine = RLMEngine(model=model, tools=WorkspaceTools(root=root), config=_config(root, recursive=True),
+                       model_factory=model.factory())
+    start = time.perf_counter()
+    for objective in objectives:
+        engine.solve(objective)
+    wall = time.perf_counter() - start
+    calls = sum(len(rec.calls) for rec in model.recordings)
+    return {"objectives": len(objectives), "model_calls": calls, "wall_sec": round(wall, 4),
+            "per_call_ms": round(wall * 1000 / max(1, calls), 3), "divergences": len(model.divergences)}
+
+
+# ----------------------------------------------------------------------
+# Baseline comparison
+# ----------------------------------------------------------------------
+
+
+def flatten_metrics(results: dict[str, Any], prefix: str = "") -> dict[str, float]:
+    """``{"tools.search_files.p50_ms": 1.2, ...}`` for every lower-is-better number."""
+    flat: dict[str, float] = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten_metrics(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and name.endswith(_LOWER_IS_BETTER):
+            flat[name] = float(value)
+    return flat
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], threshold: float = 0.10) -> list[dict[str, Any]]:
+    """Per-metric change against *baseline*; ``regression`` marks growth beyond *threshold*."""
+    now = flatten_metrics(current.get("results", {}))
+    before = flatten_metrics(baseline.get("results", {}))
+    rows = []
+    for name in sorted(now.keys() & before.keys()):
+        old, new = before[name], now[name]
+        change = (new - old) / old if old else 0.0
+        rows.append({"metric": name, "baseline": old, "current": new, "change": round(change, 4),
+                     "regression": change > threshold})
+    return rows
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    files, dataset_mb = SCALES[args.scale]
+    files = args.files if args.files is not None else files
+    dataset_mb = args.dataset_mb if args.dataset_mb is not None else dataset_mb
+    selected = [b for b in (args.only.split(",") if args.only else BENCHMARKS) if b]
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        raise SystemExit(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+    if "replay" in selected and not args.replay:
+        selected.remove("replay")
+
+    with tempfile.TemporaryDirectory(prefix="openplanter-bench-") as tmp:
+        root = Path(args.workspace).resolve() if args.workspace else Path(tmp)
+        root.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+        workspace: dict[str, Any] = {"files": files, "dataset_mb": dataset_mb, "reused": True}
+        if not (root / "data" / "transactions.csv").exists():
+            workspace = make_workspace(root, files, dataset_mb)
+        workspace["setup_sec"] = round(time.perf_counter() - start, 2)
+
+        results: dict[str, Any] = {}
+        for name in selected:
+            if name == "engine":
+                results[name] = bench_engine(root, args.steps)
+            elif name == "tools":
+                results[name] = bench_tools(root, args.repeat)
+            elif name == "fanout":
+                widths = [int(w) for w in args.fanout.split(",") if w]
+                results[name] = bench_fanout(root, widths, args.model_latency)
+            elif name == "memory":
+                results[name] = bench_memory(root)
+            elif name == "session":
+                results[name] = bench_session(root, args.steps)
+            elif name == "replay":
+                results[name] = bench_replay(root, Path(args.replay))
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "workspace": workspace,
+        },
+        "results": results,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="openplanter-bench", description="Benchmark engine and tool overhead.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small", help="Preset workspace size.")
+    parser.add_argument("--files", type=int, help="Number of synthetic files (overrides --scale).")
+    parser.add_argument("--dataset-mb", type=int, help="Total CSV+JSONL dataset size (overrides --scale).")
+    parser.add_argument("--workspace", help="Generate into (or reuse) this directory instead of a temp dir.")
+    parser.add_argument("--only", help=f"Comma-separated subset of: {','.join(BENCHMARKS)}.")
+    parser.add_argument("--steps", type=int, default=200, help="Model turns for the engine/session runs.")
+    parser.add_argument("--repeat", type=int, default=20, help="Samples per tool.")
+    parser.add_argument("--fanout", default="1,2,4,8,16,32,64", help="Parallel subtask widths.")
+    parser.add_argument("--model-latency", type=float, default=0.0, help="Simulated seconds per model call (fan-out).")
+    parser.add_argument("--replay", help="replay.jsonl to benchmark with the replay model.")
+    parser.add_argument("--output", "-o", help="Write results JSON here (default: stdout).")
+    parser.add_argument("--baseline", help="Previous results JSON to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative growth counted as a regression.")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit 1 if any metric regressed.")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    report = run(args)
+    regressions: list[dict[str, Any]] = []
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        report["comparison"] = compare(report, baseline, args.threshold)
+        regressions = [row for row in report["comparison"] if row["regression"]]
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    for row in regressions:
+        print(f"REGRESSION {row['metric']}: {row['baseline']} -> {row['current']} ({row['change']:+.1%})", file=sys.stderr)
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -9,10 +9,13 @@ from __future__ import annotations
 import re
 from pathlib import Path
 
+from . import ratelimit
+from .async_engine import AsyncRLMEngine
 from .config import PROVIDER_DEFAULT_MODELS, AgentConfig
 from .engine import RLMEngine
 from .model import (
     AnthropicModel,
+    BaseModel,
     EchoFallbackModel,
     ModelError,
     OpenAICompatibleModel,
@@ -21,6 +24,8 @@ from .model import (
     list_openrouter_models,
 )
 from .engine import ModelFactory
+from .hedging import HedgedModel
+from .replay_model import ReplayModel
 from .tools import WorkspaceTools
 
 # Patterns that unambiguously identify a provider.
@@ -112,6 +117,7 @@ def build_model_factory(cfg: AgentConfig) -> ModelFactory | None:
                 auth_token=cfg.anthropic_auth_token,
                 base_url=cfg.anthropic_base_url,
                 reasoning_effort=effort,
+                prompt_caching=cfg.prompt_caching,
             )
         if provider in ("openai", None) and cfg.openai_api_key:
             return OpenAICompatibleModel(
@@ -119,6 +125,7 @@ def build_model_factory(cfg: AgentConfig) -> ModelFactory | None:
                 api_key=cfg.openai_api_key,
                 base_url=cfg.openai_base_url,
                 reasoning_effort=effort,
+                prompt_caching=cfg.prompt_caching,
             )
         if provider == "openrouter" and cfg.openrouter_api_key:
             return OpenAICompatibleModel(
@@ -126,6 +133,7 @@ def build_model_factory(cfg: AgentConfig) -> ModelFactory | None:
                 api_key=cfg.openrouter_api_key,
                 base_url=cfg.openrouter_base_url,
                 reasoning_effort=effort,
+                prompt_caching=cfg.prompt_caching,
                 extra_headers={
                     "HTTP-Referer": "https://github.com/openplanter",
                     "X-Title": "OpenPlanter",
@@ -137,6 +145,7 @@ def build_model_factory(cfg: AgentConfig) -> ModelFactory | None:
                 api_key=cfg.cerebras_api_key,
                 base_url=cfg.cerebras_base_url,
                 reasoning_effort=effort,
+                prompt_caching=cfg.prompt_caching,
             )
         raise ModelError(f"No API key available for model '{model_name}' (provider={provider})")
 
@@ -146,6 +155,7 @@ def build_model_factory(cfg: AgentConfig) -> ModelFactory | None:
 
 
 def build_engine(cfg: AgentConfig) -> RLMEngine:
+    ratelimit.configure(cfg.rate_limit_rpm, cfg.rate_limit_tpm, cfg.http_max_retries)
     tools = WorkspaceTools(
         root=Path(cfg.workspace),
         shell=cfg.shell,
@@ -156,13 +166,21 @@ def build_engine(cfg: AgentConfig) -> RLMEngine:
         max_search_hits=cfg.max_search_hits,
         exa_api_key=cfg.exa_api_key,
         exa_base_url=cfg.exa_base_url,
+        cache_max_entries=cfg.tool_cache_entries,
+        file_index=cfg.file_index,
+        index_root=cfg.session_root_dir,
+        search_index_mb=cfg.search_index_mb,
     )
 
+    engine_cls = AsyncRLMEngine if cfg.async_engine else RLMEngine
+
     try:
         model_name = _resolve_model_name(cfg)
     except ModelError as exc:
         model = EchoFallbackModel(note=str(exc))
-        return RLMEngine(model=model, tools=tools, config=cfg)
+        if cfg.replay_from:
+            return _replay_engine(engine_cls, cfg, tools, model)
+        return engine_cls(model=model, tools=tools, config=cfg)
 
     _validate_model_provider(model_name, cfg.provider)
 
@@ -172,6 +190,7 @@ def build_engine(cfg: AgentConfig) -> RLMEngine:
             api_key=cfg.openai_api_key,
             base_url=cfg.openai_base_url,
             reasoning_effort=cfg.reasoning_effort,
+            prompt_caching=cfg.prompt_caching,
         )
     elif cfg.provider == "openrouter" and cfg.openrouter_api_key:
         model = OpenAICompatibleModel(
@@ -179,6 +198,7 @@ def build_engine(cfg: AgentConfig) -> RLMEngine:
             api_key=cfg.openrouter_api_key,
             base_url=cfg.openrouter_base_url,
             reasoning_effort=cfg.reasoning_effort,
+            prompt_caching=cfg.prompt_caching,
             extra_headers={
                 "HTTP-Referer": "https://github.com/openplanter",
                 "X-Title": "OpenPlanter",
@@ -190,6 +210,7 @@ def build_engine(cfg: AgentConfig) -> RLMEngine:
             api_key=cfg.cerebras_api_key,
             base_url=cfg.cerebras_base_url,
             reasoning_effort=cfg.reasoning_effort,
+            prompt_caching=cfg.prompt_caching,
         )
     elif cfg.provider == "anthropic" and (cfg.anthropic_api_key or cfg.anthropic_auth_token):
         model = AnthropicModel(
@@ -198,8 +219,35 @@ def build_engine(cfg: AgentConfig) -> RLMEngine:
             auth_token=cfg.anthropic_auth_token,
             base_url=cfg.anthropic_base_url,
             reasoning_effort=cfg.reasoning_effort,
+            prompt_caching=cfg.prompt_caching,
         )
     else:
         model = EchoFallbackModel()
 
-    return RLMEngine(model=model, tools=tools, config=cfg, model_factory=build_model_factory(cfg))
+    factory = build_model_factory(cfg)
+    if cfg.hedge_model and factory is not None and not isinstance(model, EchoFallbackModel):
+        model = _hedged(model, factory, cfg)
+    if cfg.replay_from:
+        return _replay_engine(engine_cls, cfg, tools, model)
+    return engine_cls(model=model, tools=tools, config=cfg, model_factory=factory)
+
+
+def _hedged(model: BaseModel, factory: ModelFactory, cfg: AgentConfig) -> BaseModel:
+    """Wrap *model* so slow calls are hedged with ``cfg.hedge_model``; unchanged if it cannot be built."""
+    try:
+        secondary = factory(cfg.hedge_model, None)
+    except ModelError:
+        return model
+    return HedgedModel(
+        primary=model,
+        secondary=secondary,
+        percentile=cfg.hedge_percentile,
+        min_delay=cfg.hedge_min_delay_sec,
+    )
+
+
+def _replay_engine(engine_cls: type[RLMEngine], cfg: AgentConfig, tools: WorkspaceTools, live: BaseModel) -> RLMEngine:
+    """Engine whose model (and every delegated model) replays ``cfg.replay_from``."""
+    fallback = live if cfg.replay_divergence == "fallthrough" else None
+    model = ReplayModel.from_file(cfg.replay_from, on_divergence=cfg.replay_divergence, fallback=fallback)
+    return engine_cls(model=model, tools=tools, config=cfg, model_factory=model.factory())
@@ -49,6 +49,31 @@ class AgentConfig:
     acceptance_criteria: bool = True
     max_plan_chars: int = 40_000
     demo: bool = False
+    async_engine: bool = False
+    max_concurrent_model_calls: int = 16
+    max_concurrent_tool_calls: int = 16
+    max_model_calls_per_provider: int = 0
+    max_model_calls_per_depth: int = 0
+    speculative_tools: bool = False
+    context_budget_fraction: float = 0.7
+    context_window_tokens: int = 0
+    memoize_subtasks: bool = True
+    subtask_memo_ttl_sec: int = 86_400
+    tool_cache_entries: int = 256
+    batch_judging: bool = True
+    local_verifier: bool = True
+    verifier_timeout_sec: int = 30
+    rate_limit_rpm: int = 0
+    rate_limit_tpm: int = 0
+    http_max_retries: int = 5
+    prompt_caching: bool = True
+    replay_from: str = ""
+    replay_divergence: str = "fail"
+    hedge_model: str = ""
+    hedge_percentile: float = 0.95
+    hedge_min_delay_sec: float = 2.0
+    file_index: bool = True
+    search_index_mb: int = 256
 
     @classmethod
     def from_env(cls, workspace: str | Path) -> "AgentConfig":
@@ -103,4 +128,29 @@ class AgentConfig:
             acceptance_criteria=os.getenv("OPENPLANTER_ACCEPTANCE_CRITERIA", "true").strip().lower() in ("1", "true", "yes"),
             max_plan_chars=int(os.getenv("OPENPLANTER_MAX_PLAN_CHARS", "40000")),
             demo=os.getenv("OPENPLANTER_DEMO", "").strip().lower() in ("1", "true", "yes"),
+            async_engine=os.getenv("OPENPLANTER_ASYNC_ENGINE", "").strip().lower() in ("1", "true", "yes"),
+            max_concurrent_model_calls=int(os.getenv("OPENPLANTER_MAX_CONCURRENT_MODEL_CALLS", "16")),
+            max_concurrent_tool_calls=int(os.getenv("OPENPLANTER_MAX_CONCURRENT_TOOL_CALLS", "16")),
+            max_model_calls_per_provider=int(os.getenv("OPENPLANTER_MAX_MODEL_CALLS_PER_PROVIDER", "0")),
+            max_model_calls_per_depth=int(os.getenv("OPENPLANTER_MAX_MODEL_CALLS_PER_DEPTH", "0")),
+            speculative_tools=os.getenv("OPENPLANTER_SPECULATIVE_TOOLS", "").strip().lower() in ("1", "true", "yes"),
+            context_budget_fraction=float(os.getenv("OPENPLANTER_CONTEXT_BUDGET_FRACTION", "0.7")),
+            context_window_tokens=int(os.getenv("OPENPLANTER_CONTEXT_WINDOW_TOKENS", "0")),
+            memoize_subtasks=os.getenv("OPENPLANTER_MEMOIZE_SUBTASKS", "true").strip().lower() in ("1", "true", "yes"),
+            subtask_memo_ttl_sec=int(os.getenv("OPENPLANTER_SUBTASK_MEMO_TTL_SEC", "86400")),
+            tool_cache_entries=int(os.getenv("OPENPLANTER_TOOL_CACHE_ENTRIES", "256")),
+            batch_judging=os.getenv("OPENPLANTER_BATCH_JUDGING", "true").strip().lower() in ("1", "true", "yes"),
+            local_verifier=os.getenv("OPENPLANTER_LOCAL_VERIFIER", "true").strip().lower() in ("1", "true", "yes"),
+            verifier_timeout_sec=int(os.getenv("OPENPLANTER_VERIFIER_TIMEOUT_SEC", "30")),
+            rate_limit_rpm=int(os.getenv("OPENPLANTER_RATE_LIMIT_RPM", "0")),
+            rate_limit_tpm=int(os.getenv("OPENPLANTER_RATE_LIMIT_TPM", "0")),
+            http_max_retries=int(os.getenv("OPENPLANTER_HTTP_MAX_RETRIES", "5")),
+            prompt_caching=os.getenv("OPENPLANTER_PROMPT_CACHING", "true").strip().lower() in ("1", "true", "yes"),
+            replay_from=os.getenv("OPENPLANTER_REPLAY_FROM", "").strip(),
+            replay_divergence=os.getenv("OPENPLANTER_REPLAY_DIVERGENCE", "fail").strip().lower() or "fail",
+            hedge_model=os.getenv("OPENPLANTER_HEDGE_MODEL", "").strip(),
+            hedge_percentile=float(os.getenv("OPENPLANTER_HEDGE_PERCENTILE", "0.95")),
+            hedge_min_delay_sec=float(os.getenv("OPENPLANTER_HEDGE_MIN_DELAY_SEC", "2.0")),
+            file_index=os.getenv("OPENPLANTER_FILE_INDEX", "true").strip().lower() in ("1", "true", "yes"),
+            search_index_mb=int(os.getenv("OPENPLANTER_SEARCH_INDEX_MB", "256")),
         )
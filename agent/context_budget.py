@@ -0,0 +1,270 @@
+"""Proactive, token-budget-aware context management.
+
+Condensation used to run only after a provider reported ``input_tokens`` above
+75% of the model's window, which meant paying for near-limit requests (and
+occasionally overflowing).  :class:`ContextBudget` estimates the size of the
+*next* request before it is sent, using an offline character-based estimator
+calibrated against provider-reported ``input_tokens``, and applies the
+cheapest condensation plan that brings the request under budget:
+
+1. drop duplicate tool outputs (the most recent copy is kept),
+2. shrink large older tool outputs to head/tail excerpts,
+3. replace older tool outputs with a placeholder,
+4. repeat 2-3 with fewer recent turns protected.
+
+Both OpenAI-style (``role: tool`` messages) and Anthropic-style
+(``tool_result`` blocks inside user messages) conversations are handled.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from .model import Conversation
+
+# Context window sizes (tokens) for known models.
+MODEL_CONTEXT_WINDOWS: dict[str, int] = {
+    "claude-opus-4-6": 200_000,
+    "claude-sonnet-4-5-20250929": 200_000,
+    "claude-haiku-4-5-20251001": 200_000,
+    "anthropic/claude-sonnet-4.6": 200_000,
+    "anthropic/claude-sonnet-4-5": 200_000,
+    "anthropic/claude-haiku-4-5-20251001": 200_000,
+    "gpt-4o": 128_000,
+    "gpt-4.1": 1_000_000,
+    "gpt-5-turbo-16k": 16_000,
+}
+DEFAULT_CONTEXT_WINDOW = 128_000
+
+CONDENSED_PLACEHOLDER = "[earlier tool output condensed]"
+DUPLICATE_PLACEHOLDER = "[duplicate tool output omitted; identical to a later result]"
+
+# Fixed per-message framing cost (role markers, separators), in tokens.
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def context_window_for(model_name: str, override: int = 0) -> int:
+    if override > 0:
+        return override
+    return MODEL_CONTEXT_WINDOWS.get(model_name, DEFAULT_CONTEXT_WINDOW)
+
+
+@dataclass
+class TokenEstimator:
+    """Offline token estimator with per-model calibration.
+
+    The raw estimate is ``chars / chars_per_token``.  Each time a provider
+    reports the true ``input_tokens`` for a request whose raw estimate is
+    known, the per-model correction factor moves toward the observed ratio
+    (exponential moving average, clamped to ``[min_factor, max_factor]``).
+    """
+
+    chars_per_token: float = 4.0
+    smoothing: float = 0.3
+    min_factor: float = 0.5
+    max_factor: float = 2.5
+    _factors: dict[str, float] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def raw_tokens(self, chars: int, messages: int = 0) -> float:
+        return chars / self.chars_per_token + messages * _MESSAGE_OVERHEAD_TOKENS
+
+    def factor(self, key: str) -> float:
+        with self._lock:
+            return self._factors.get(key, 1.0)
+
+    def calibrate(self, key: str, raw_estimate: float, reported_tokens: int) -> float:
+        """Fold one (raw estimate, reported tokens) observation into *key*'s factor."""
+        if raw_estimate <= 0 or reported_tokens <= 0:
+            return self.factor(key)
+        observed = min(self.max_factor, max(self.min_factor, reported_tokens / raw_estimate))
+        with self._lock:
+            current = self._factors.get(key)
+            updated = observed if current is None else current + self.smoothing * (observed - current)
+            self._factors[key] = updated
+        return updated
+
+
+@dataclass
+class BudgetPlan:
+    """What :meth:`ContextBudget.fit` did to a conversation."""
+
+    budget: int
+    estimated_before: int
+    estimated_after: int
+    raw_after: float
+    deduplicated: int = 0
+    excerpted: int = 0
+    condensed: int = 0
+
+    @property
+    def changed(self) -> int:
+        return self.deduplicated + self.excerpted + self.condensed
+
+
+@dataclass
+class _Slot:
+    """One tool output inside the provider message list."""
+
+    turn: int
+    holder: dict[str, Any]
+
+    @property
+    def text(self) -> str:
+        content = self.holder.get("content")
+        return content if isinstance(content, str) else ""
+
+
+def _tool_output_slots(messages: list[Any]) -> list[_Slot]:
+    """Locate string tool outputs, tagged with the assistant turn they answer."""
+    slots: list[_Slot] = []
+    turn = -1
+    for msg in messages:
+        if not isinstance(msg, dict):
+            continue
+        role = msg.get("role")
+        if role == "assistant":
+            turn += 1
+        elif role == "tool" and isinstance(msg.get("content"), str):
+            slots.append(_Slot(turn, msg))
+        elif role == "user" and isinstance(msg.get("content"), list):
+            for block in msg["content"]:
+                if (
+                    isinstance(block, dict)
+                    and block.get("type") == "tool_result"
+                    and isinstance(block.get("content"), str)
+                ):
+                    slots.append(_Slot(turn, block))
+    return slots
+
+
+def _iter_strings(value: Any) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield key
+            yield from _iter_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _iter_strings(item)
+
+
+def _message_chars(msg: Any) -> int:
+    return sum(len(s) for s in _iter_strings(msg))
+
+
+def excerpt(text: str, max_chars: int) -> str:
+    """Head/tail excerpt of *text* in roughly *max_chars* characters."""
+    if len(text) <= max_chars:
+        return text
+    head = max_chars * 2 // 3
+    tail = max_chars - head
+    elided = len(text) - head - tail
+    return f"{text[:head]}\n...[{elided} chars elided to fit context budget]...\n{text[-tail:]}"
+
+
+@dataclass
+class ContextBudget:
+    """Keep each request under ``budget_fraction`` of the model's context window."""
+
+    budget_fraction: float = 0.7
+    keep_recent_turns: int = 4
+    excerpt_chars: int = 2000
+    window_override: int = 0
+    estimator: TokenEstimator = field(default_factory=TokenEstimator)
+
+    def budget_for(self, model_name: str) -> int:
+        return int(context_window_for(model_name, self.window_override) * self.budget_fraction)
+
+    def measure(
+        self,
+        model_name: str,
+        conversation: Conversation,
+        tool_defs: list[dict[str, Any]] | None = None,
+    ) -> tuple[int, float]:
+        """Return (calibrated estimate, raw estimate) for sending *conversation*."""
+        chars = self._fixed_chars(conversation, tool_defs)
+        msgs = conversation._provider_messages
+        chars += sum(_message_chars(m) for m in msgs)
+        raw = self.estimator.raw_tokens(chars, len(msgs))
+        return int(raw * self.estimator.factor(model_name)), raw
+
+    def fit(
+        self,
+        model_name: str,
+        conversation: Conversation,
+        tool_defs: list[dict[str, Any]] | None = None,
+    ) -> BudgetPlan:
+        """Condense *conversation* in place until its estimated size fits the budget."""
+        budget = self.budget_for(model_name)
+        msgs = conversation._provider_messages
+        fixed = self._fixed_chars(conversation, tool_defs)
+        factor = self.estimator.factor(model_name)
+        chars = fixed + sum(_message_chars(m) for m in msgs)
+
+        def _tokens() -> int:
+            return int(self.estimator.raw_tokens(chars, len(msgs)) * factor)
+
+        plan = BudgetPlan(budget=budget, estimated_before=_tokens(), estimated_after=0, raw_after=0.0)
+        if plan.estimated_before > budget:
+            slots = _tool_output_slots(msgs)
+            last_turn = max((s.turn for s in slots), default=-1)
+
+            def _replace(slot: _Slot, text: str) -> None:
+                nonlocal chars
+                chars += len(text) - len(slot.text)
+                slot.holder["content"] = text
+
+            # 1. Duplicates: keep the newest copy of each identical output.
+            seen: set[str] = set()
+            for slot in reversed(slots):
+                text = slot.text
+                if len(text) < 200 or text in (CONDENSED_PLACEHOLDER, DUPLICATE_PLACEHOLDER):
+                    continue
+                if text in seen:
+                    _replace(slot, DUPLICATE_PLACEHOLDER)
+                    plan.deduplicated += 1
+                else:
+                    seen.add(text)
+
+            # 2-4. Excerpt, then condense, older turns; widen the window as needed.
+            keep = self.keep_recent_turns
+            while _tokens() > budget:
+                cutoff = last_turn - keep
+                for slot in slots:
+                    if _tokens() <= budget:
+                        break
+                    if slot.turn <= cutoff and len(slot.text) > self.excerpt_chars + 200:
+                        _replace(slot, excerpt(slot.text, self.excerpt_chars))
+                        plan.excerpted += 1
+                for slot in slots:
+                    if _tokens() <= budget:
+                        break
+                    if slot.turn <= cutoff and slot.text not in (CONDENSED_PLACEHOLDER, DUPLICATE_PLACEHOLDER):
+                        _replace(slot, CONDENSED_PLACEHOLDER)
+                        plan.condensed += 1
+                # The newest turn's outputs are never condensed.
+                if keep <= 1:
+                    break
+                keep //= 2
+
+        plan.raw_after = self.estimator.raw_tokens(chars, len(msgs))
+        plan.estimated_after = _tokens()
+        return plan
+
+    def calibrate(self, model_name: str, raw_estimate: float, reported_tokens: int) -> float:
+        return self.estimator.calibrate(model_name, raw_estimate, reported_tokens)
+
+    @staticmethod
+    def _fixed_chars(conversation: Conversation, tool_defs: list[dict[str, Any]] | None) -> int:
+        msgs = conversation._provider_messages
+        # OpenAI conversations already carry the system prompt as a message.
+        inline_system = bool(msgs) and isinstance(msgs[0], dict) and msgs[0].get("role") == "system"
+        chars = 0 if inline_system else len(conversation.system_prompt or "")
+        if tool_defs:
+            chars += len(json.dumps(tool_defs))
+        return chars
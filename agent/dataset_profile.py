@@ -0,0 +1,323 @@
+"""Streaming, bounded-memory profiles of CSV/TSV/JSONL datasets.
+
+:func:`profile_file` makes one pass over a file and reports, per column,
+inferred type, null rate, min/max, an approximate distinct count
+(:class:`HyperLogLog`) and approximate top values (:class:`SpaceSaving`),
+plus the row count and a few sample rows.  Memory is bounded by the number
+of columns, never the number of rows.
+
+Encoding is sniffed from a BOM or by trial-decoding a sample as UTF-8
+(falling back to Latin-1); the CSV dialect comes from ``csv.Sniffer``.
+Profiles are plain dicts so they can be cached as JSON and returned from
+worker processes; :func:`render_profile` formats one for the model.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import math
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+_SNIFF_BYTES = 64 * 1024
+_NULLS = frozenset({"", "na", "n/a", "nan", "null", "none", "nil", "-"})
+_INT_RE = re.compile(r"^[+-]?\d+$")
+_FLOAT_RE = re.compile(r"^[+-]?(\d+\.\d*|\.\d+|\d+)([eE][+-]?\d+)?$")
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:?\d{2})?)?$|^\d{1,2}/\d{1,2}/\d{2,4}$")
+_BOOLS = frozenset({"true", "false", "yes", "no", "t", "f", "y", "n"})
+# Longest value kept verbatim in top values, min/max and samples.
+_MAX_VALUE_CHARS = 80
+# Wide files: only this many columns are profiled.
+_MAX_COLUMNS = 200
+JSONL_SUFFIXES = frozenset({".jsonl", ".ndjson"})
+DATASET_SUFFIXES = frozenset({".csv", ".tsv", ".tab", ".txt", ".psv"}) | JSONL_SUFFIXES
+
+
+class HyperLogLog:
+    """HyperLogLog cardinality sketch (2**p one-byte registers, ~1.6% error at p=12)."""
+
+    def __init__(self, p: int = 12) -> None:
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, value: str) -> None:
+        h = int.from_bytes(hashlib.blake2b(value.encode("utf-8", "surrogateescape"), digest_size=8).digest(), "big")
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+
+class SpaceSaving:
+    """Space-Saving heavy hitters: approximate top-k with ``capacity`` counters.
+
+    Each counter remembers how much it may over-count (the count of the
+    entry it evicted); :meth:`top` only reports values seen at least twice
+    for certain, so unique-valued columns report no top values.
+    """
+
+    def __init__(self, capacity: int = 64) -> None:
+        self.capacity = capacity
+        self.counts: dict[str, list[int]] = {}
+
+    def add(self, value: str) -> None:
+        counts = self.counts
+        entry = counts.get(value)
+        if entry is not None:
+            entry[0] += 1
+        elif len(counts) < self.capacity:
+            counts[value] = [1, 0]
+        else:
+            victim = min(counts, key=lambda key: counts[key][0])
+            floor = counts.pop(victim)[0]
+            counts[value] = [floor + 1, floor]
+
+    def top(self, k: int) -> list[tuple[str, int]]:
+        certain = [(value, n) for value, (n, err) in self.counts.items() if n - err >= 2]
+        return sorted(certain, key=lambda item: (-item[1], item[0]))[:k]
+
+
+def _clip(value: str) -> str:
+    return value if len(value) <= _MAX_VALUE_CHARS else value[: _MAX_VALUE_CHARS - 3] + "..."
+
+
+def value_kind(value: str) -> str:
+    """"int", "float", "bool", "date" or "string" for a non-null stripped value."""
+    if _INT_RE.match(value):
+        return "int"
+    if _FLOAT_RE.match(value):
+        return "float"
+    if value.lower() in _BOOLS:
+        return "bool"
+    if _DATE_RE.match(value):
+        return "date"
+    return "string"
+
+
+@dataclass
+class ColumnStats:
+    name: str
+    count: int = 0
+    nulls: int = 0
+    kinds: dict[str, int] = field(default_factory=dict)
+    num_min: float | None = None
+    num_max: float | None = None
+    str_min: str | None = None
+    str_max: str | None = None
+    max_length: int = 0
+    distinct: HyperLogLog = field(default_factory=HyperLogLog)
+    top: SpaceSaving = field(default_factory=SpaceSaving)
+
+    def add(self, raw: Any) -> None:
+        self.count += 1
+        if raw is None:
+            self.nulls += 1
+            return
+        value = raw if isinstance(raw, str) else json.dumps(raw, ensure_ascii=False, sort_keys=True)
+        value = value.strip()
+        if value.lower() in _NULLS:
+            self.nulls += 1
+            return
+        kind = value_kind(value)
+        self.kinds[kind] = self.kinds.get(kind, 0) + 1
+        self.max_length = max(self.max_length, len(value))
+        if kind in ("int", "float"):
+            number = float(value)
+            self.num_min = number if self.num_min is None else min(self.num_min, number)
+            self.num_max = number if self.num_max is None else max(self.num_max, number)
+        else:
+            clipped = _clip(value)
+            if self.str_min is None or clipped < self.str_min:
+                self.str_min = clipped
+            if self.str_max is None or clipped > self.str_max:
+                self.str_max = clipped
+        self.distinct.add(value)
+        self.top.add(_clip(value))
+
+    def inferred_type(self) -> str:
+        if not self.kinds:
+            return "empty"
+        kinds = set(self.kinds)
+        if kinds <= {"int"}:
+            return "int"
+        if kinds <= {"int", "float"}:
+            return "float"
+        if len(kinds) == 1:
+            return kinds.pop()
+        dominant, hits = max(self.kinds.items(), key=lambda item: item[1])
+        share = hits / sum(self.kinds.values())
+        return f"mixed ({dominant} {share:.0%})"
+
+    def summary(self, top_k: int) -> dict[str, Any]:
+        present = self.count - self.nulls
+        numeric = self.num_min is not None and self.inferred_type() in ("int", "float")
+        return {
+            "name": self.name,
+            "type": self.inferred_type(),
+            "null_rate": round(self.nulls / self.count, 4) if self.count else 0.0,
+            "distinct_approx": min(self.distinct.estimate(), present),
+            "min": (self.num_min if numeric else self.str_min),
+            "max": (self.num_max if numeric else self.str_max),
+            "max_length": self.max_length,
+            "top": [[value, n] for value, n in self.top.top(top_k)],
+        }
+
+
+def sniff_encoding(sample: bytes) -> str:
+    if sample.startswith(b"\xef\xbb\xbf"):
+        return "utf-8-sig"
+    if sample.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return "utf-16"
+    try:
+        sample.decode("utf-8")
+    except UnicodeDecodeError as exc:
+        # A multi-byte character cut off by the end of the sample is fine.
+        if exc.start < len(sample) - 3:
+            return "latin-1"
+    return "utf-8"
+
+
+def sniff_format(path: Path, text_sample: str) -> tuple[str, str | None]:
+    """("jsonl", None) or ("csv", delimiter) for *path*."""
+    suffix = path.suffix.lower()
+    if suffix in JSONL_SUFFIXES:
+        return "jsonl", None
+    first = text_sample.lstrip()[:1]
+    if first == "{" and suffix not in (".csv", ".tsv"):
+        return "jsonl", None
+    if suffix in (".tsv", ".tab"):
+        return "csv", "\t"
+    lines = text_sample.splitlines()
+    sample = "\n".join(lines[:-1] if len(lines) > 1 else lines)
+    try:
+        return "csv", csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return "csv", "|" if suffix == ".psv" else ","
+
+
+def profile_file(path: str | Path, sample_rows: int = 5, top_k: int = 5, max_rows: int | None = None) -> dict[str, Any]:
+    """Profile one dataset file in a single streaming pass."""
+    path = Path(path)
+    with open(path, "rb") as raw:
+        sample = raw.read(_SNIFF_BYTES)
+    encoding = sniff_encoding(sample)
+    fmt, delimiter = sniff_format(path, sample.decode(encoding, errors="replace"))
+    columns: dict[str, ColumnStats] = {}
+    samples: list[Any] = []
+    rows = 0
+    bad_rows = 0
+    # Large CSV fields are legitimate in dumps; the default 128 KiB limit is not.
+    csv.field_size_limit(1 << 30)
+    with open(path, "r", encoding=encoding, errors="replace", newline="") as fh:
+        if fmt == "jsonl":
+            for line in fh:
+                if max_rows is not None and rows >= max_rows:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    bad_rows += 1
+                    continue
+                if not isinstance(record, dict):
+                    record = {"value": record}
+                rows += 1
+                if len(samples) < sample_rows:
+                    samples.append(record)
+                seen = set()
+                for key, value in record.items():
+                    stats = columns.get(key)
+                    if stats is None:
+                        if len(columns) >= _MAX_COLUMNS:
+                            continue
+                        # Rows before this key appeared count as nulls.
+                        stats = columns[key] = ColumnStats(key, count=rows - 1, nulls=rows - 1)
+                    stats.add(value)
+                    seen.add(key)
+                for key, stats in columns.items():
+                    if key not in seen:
+                        stats.add(None)
+        else:
+            reader = csv.reader(fh, delimiter=delimiter or ",")
+            header = next(reader, None) or []
+            names = [name.strip() or f"column_{i + 1}" for i, name in enumerate(header[:_MAX_COLUMNS])]
+            stats_list = [ColumnStats(name) for name in names]
+            columns = {stats.name: stats for stats in stats_list}
+            width = len(header)
+            for row in reader:
+                if max_rows is not None and rows >= max_rows:
+                    break
+                if not row:
+                    continue
+                rows += 1
+                if len(row) != width:
+                    bad_rows += 1
+                if len(samples) < sample_rows:
+                    samples.append(row)
+                for i, stats in enumerate(stats_list):
+                    stats.add(row[i] if i < len(row) else None)
+    return {
+        "path": str(path),
+        "format": fmt,
+        "delimiter": delimiter,
+        "encoding": encoding,
+        "size_bytes": path.stat().st_size,
+        "rows": rows,
+        "malformed_rows": bad_rows,
+        "truncated_at": max_rows if max_rows is not None and rows >= max_rows else None,
+        "columns": [stats.summary(top_k) for stats in columns.values()],
+        "sample_rows": samples,
+    }
+
+
+def _fmt(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:g}"
+    return json.dumps(value, ensure_ascii=False) if not isinstance(value, str) else repr(value)
+
+
+def render_profile(profile: dict[str, Any], name: str | None = None) -> str:
+    """Compact text form of a :func:`profile_file` result."""
+    fmt = profile["format"]
+    if fmt == "csv":
+        fmt = f"csv, delimiter={profile['delimiter']!r}"
+    head = (
+        f"# {name or profile['path']}  ({fmt}, {profile['encoding']}, "
+        f"{profile['size_bytes']} bytes, {profile['rows']} rows"
+    )
+    if profile.get("malformed_rows"):
+        head += f", {profile['malformed_rows']} malformed"
+    if profile.get("truncated_at"):
+        head += f", stopped after {profile['truncated_at']} rows"
+    lines = [head + ")"]
+    for col in profile["columns"]:
+        parts = [f"{col['type']}", f"nulls {col['null_rate']:.1%}", f"~{col['distinct_approx']} distinct"]
+        if col["min"] is not None:
+            parts.append(f"min {_fmt(col['min'])} max {_fmt(col['max'])}")
+        top = ", ".join(f"{_fmt(value)}x{n}" for value, n in col["top"])
+        if top:
+            parts.append(f"top: {top}")
+        lines.append(f"- {col['name']}: " + "; ".join(parts))
+    if profile["sample_rows"]:
+        lines.append("sample rows:")
+        for row in profile["sample_rows"]:
+            text = " | ".join(row) if isinstance(row, list) else json.dumps(row, ensure_ascii=False)
+            lines.append("  " + _clip(text))
+    return "\n".join(lines)
@@ -0,0 +1,438 @@
+"""Workspace datasets as SQLite tables, for the ``query_dataset`` tool.
+
+:class:`DatasetStore` keeps CSV/TSV/JSONL files loaded in one SQLite
+database (``.openplanter/index/datasets.db``).  A file is loaded the first
+time a query names its table and reloaded only when its size or mtime
+changes, so repeated joins reuse the same tables instead of re-parsing the
+files.  Before each query, columns compared in joins and filters
+(``a.x = b.y``, ``x IN (...)``, ``x < 5``) are indexed; the indexes are
+built once and live as long as the loaded table.
+
+Table names come from file names (``data/contracts.csv`` is ``contracts``;
+see :func:`table_names`).  Queries run under ``PRAGMA query_only`` with an
+authorizer that refuses ATTACH and pragmas, a progress-handler deadline
+and a row limit.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .dataset_profile import JSONL_SUFFIXES, sniff_encoding, sniff_format, value_kind
+
+_SNIFF_BYTES = 64 * 1024
+# Rows used to pick each column's type affinity.
+_TYPE_SAMPLE_ROWS = 1000
+_INSERT_BATCH = 10_000
+_MAX_COLUMNS = 500
+# Files modified this recently may change again within the same mtime tick.
+_RACY_WINDOW_SEC = 2.0
+# VM instructions between deadline checks.
+_PROGRESS_STEPS = 10_000
+_MAX_VALUE_CHARS = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS _datasets (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    columns TEXT NOT NULL
+);
+"""
+
+_IDENT = r"[A-Za-z_]\w*"
+_COLUMN_REF = rf"(?:({_IDENT})\s*\.\s*)?({_IDENT})"
+_COMPARE = r"(?:<=|>=|==|=|<|>)"
+_LEFT_RE = re.compile(rf"{_COLUMN_REF}\s*(?:{_COMPARE}|\b(?:IN|BETWEEN|IS)\b)", re.IGNORECASE)
+_RIGHT_RE = re.compile(rf"{_COMPARE}\s*{_COLUMN_REF}", re.IGNORECASE)
+_USING_RE = re.compile(r"\bUSING\s*\(([^)]*)\)", re.IGNORECASE)
+_SOURCE_RE = re.compile(rf"\b(?:FROM|JOIN)\s+({_IDENT})(?:\s+(?:AS\s+)?({_IDENT}))?", re.IGNORECASE)
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|--[^\n]*|/\*.*?\*/", re.DOTALL)
+_KEYWORDS = frozenset({
+    "where", "join", "inner", "left", "right", "full", "outer", "cross", "natural", "on", "using",
+    "group", "order", "limit", "having", "union", "except", "intersect", "window", "as", "select",
+})
+
+
+class DatasetQueryTimeout(RuntimeError):
+    pass
+
+
+@dataclass
+class QueryResult:
+    columns: list[str]
+    rows: list[tuple[Any, ...]]
+    truncated: bool
+    elapsed_sec: float
+    # Tables loaded and indexes built for this query, for the caller to report.
+    notes: list[str] = field(default_factory=list)
+
+
+def _sanitize(text: str) -> str:
+    name = re.sub(r"\W+", "_", text).strip("_").lower()
+    if not name:
+        return "t"
+    return f"t_{name}" if name[0].isdigit() else name
+
+
+def table_names(paths: list[str]) -> dict[str, str]:
+    """Table name -> relative path for dataset files.
+
+    A file is named after its stem; stems shared by several files fall back
+    to the whole path without suffix (``2023/contracts.csv`` is
+    ``2023_contracts``).
+    """
+    by_stem: dict[str, list[str]] = {}
+    for rel in sorted(paths):
+        by_stem.setdefault(_sanitize(Path(rel).stem), []).append(rel)
+    names: dict[str, str] = {}
+    for stem, rels in by_stem.items():
+        if len(rels) == 1:
+            names[stem] = rels[0]
+            continue
+        for rel in rels:
+            names[_sanitize(str(Path(rel).with_suffix("")))] = rel
+    return names
+
+
+def _unique(base: str, seen: set[str]) -> str:
+    name = base
+    n = 2
+    while name in seen:
+        name = f"{base}_{n}"
+        n += 1
+    seen.add(name)
+    return name
+
+
+def _column_names(header: list[str]) -> list[str]:
+    seen: set[str] = set()
+    return [
+        _unique(_sanitize(raw) if raw.strip() else f"column_{i + 1}", seen)
+        for i, raw in enumerate(header[:_MAX_COLUMNS])
+    ]
+
+
+def _affinity(values: list[str]) -> str:
+    kinds: dict[str, int] = {}
+    for value in values:
+        value = value.strip()
+        if not value:
+            continue
+        if len(value) > 1 and value[0] == "0" and value[1].isdigit():
+            # Zero-padded codes (zip codes, ids) must stay text.
+            return "TEXT"
+        kind = value_kind(value)
+        kinds[kind] = kinds.get(kind, 0) + 1
+    if not kinds:
+        return "TEXT"
+    if set(kinds) <= {"int"}:
+        return "INTEGER"
+    if set(kinds) <= {"int", "float"}:
+        return "REAL"
+    numeric = kinds.get("int", 0) + kinds.get("float", 0)
+    return "NUMERIC" if numeric >= 0.9 * sum(kinds.values()) else "TEXT"
+
+
+def _json_affinity(value: Any) -> str:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return "TEXT"
+    return "INTEGER" if isinstance(value, int) else "REAL"
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _cell(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float)):
+        return value if value != "" else None
+    return json.dumps(value, ensure_ascii=False, sort_keys=True)
+
+
+def _deny_side_effects(action: int, *_: Any) -> int:
+    if action in (sqlite3.SQLITE_ATTACH, sqlite3.SQLITE_DETACH, sqlite3.SQLITE_PRAGMA):
+        return sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_OK
+
+
+class DatasetStore:
+    """Dataset files loaded into SQLite on demand; ``db_path=None`` keeps them in memory."""
+
+    def __init__(self, root: Path, db_path: Path | None) -> None:
+        self.root = root
+        if db_path is not None:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(db_path) if db_path is not None else ":memory:", check_same_thread=False, isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def query(
+        self, sql: str, datasets: dict[str, str], max_rows: int = 200, timeout_sec: float = 30.0,
+    ) -> QueryResult:
+        """Run read-only *sql*, loading the *datasets* (table name -> path) it names."""
+        scrubbed = _LITERAL_RE.sub("''", sql)
+        words = {w.lower() for w in re.findall(_IDENT, scrubbed)}
+        referenced = {name: rel for name, rel in datasets.items() if name in words}
+        with self._lock:
+            notes: list[str] = []
+            tables: dict[str, str] = {}
+            columns: dict[str, list[str]] = {}
+            for name, rel in referenced.items():
+                table, cols, loaded = self._ensure_loaded(rel)
+                tables[name] = table
+                columns[name] = cols
+                if loaded:
+                    notes.append(f"loaded {name} <- {rel}: {loaded}")
+                self._conn.execute(f"DROP VIEW IF EXISTS temp.{_quote(name)}")
+                self._conn.execute(f"CREATE TEMP VIEW {_quote(name)} AS SELECT * FROM main.{_quote(table)}")
+            for name, column in sorted(self._indexable(scrubbed, columns)):
+                if self._ensure_index(tables[name], column):
+                    notes.append(f"indexed {name}.{column}")
+            return self._run(sql, max_rows, timeout_sec, notes)
+
+    def _run(self, sql: str, max_rows: int, timeout_sec: float, notes: list[str]) -> QueryResult:
+        conn = self._conn
+        deadline = time.monotonic() + timeout_sec
+        started = time.monotonic()
+        timed_out = False
+
+        def check_deadline() -> int:
+            nonlocal timed_out
+            timed_out = time.monotonic() > deadline
+            return 1 if timed_out else 0
+
+        conn.execute("PRAGMA query_only=ON")
+        conn.set_authorizer(_deny_side_effects)
+        conn.set_progress_handler(check_deadline, _PROGRESS_STEPS)
+        try:
+            cursor = conn.execute(sql)
+            rows = cursor.fetchmany(max_rows + 1) if cursor.description else []
+            names = [d[0] for d in cursor.description or ()]
+            cursor.close()
+        except sqlite3.OperationalError:
+            if timed_out:
+                raise DatasetQueryTimeout(f"query exceeded {timeout_sec:g}s") from None
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+            conn.set_authorizer(None)
+            conn.execute("PRAGMA query_only=OFF")
+        return QueryResult(names, rows[:max_rows], len(rows) > max_rows, time.monotonic() - started, notes)
+
+    def describe(self, datasets: dict[str, str]) -> list[str]:
+        """``name(col, ...)`` for loaded tables, ``name <- path`` for the rest."""
+        with self._lock:
+            loaded = {
+                path: json.loads(cols)
+                for path, cols in self._conn.execute("SELECT path, columns FROM _datasets")
+            }
+        return [
+            f"{name}({', '.join(loaded[rel])})" if rel in loaded else f"{name} <- {rel}"
+            for name, rel in sorted(datasets.items())
+        ]
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _ensure_loaded(self, rel: str) -> tuple[str, list[str], str | None]:
+        """(table, columns, load summary or None if it was already current) for *rel*."""
+        path = self.root / rel
+        st = path.stat()
+        row = self._conn.execute(
+            "SELECT name, size, mtime_ns, columns FROM _datasets WHERE path = ?", (rel,),
+        ).fetchone()
+        if row is not None and (row[1], row[2]) == (st.st_size, st.st_mtime_ns):
+            return row[0], json.loads(row[3]), None
+        table = "ds_" + hashlib.blake2b(rel.encode("utf-8", "surrogateescape"), digest_size=8).hexdigest()
+        started = time.monotonic()
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            conn.execute(f"DROP TABLE IF EXISTS {_quote(table)}")
+            if path.suffix.lower() in JSONL_SUFFIXES:
+                cols, rows = self._load_jsonl(path, table)
+            else:
+                cols, rows = self._load_delimited(path, table)
+            # A file changed within the mtime tick may change again unnoticed; reload it next time.
+            mtime_ns = st.st_mtime_ns if time.time() - st.st_mtime_ns / 1e9 >= _RACY_WINDOW_SEC else -1
+            conn.execute(
+                "INSERT OR REPLACE INTO _datasets(path, name, size, mtime_ns, rows, columns) VALUES (?, ?, ?, ?, ?, ?)",
+                (rel, table, st.st_size, mtime_ns, rows, json.dumps(cols)),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return table, cols, f"{rows} rows, {time.monotonic() - started:.1f}s"
+
+    def _open_text(self, path: Path) -> tuple[Any, str, str | None]:
+        with open(path, "rb") as raw:
+            sample = raw.read(_SNIFF_BYTES)
+        encoding = sniff_encoding(sample)
+        fmt, delimiter = sniff_format(path, sample.decode(encoding, errors="replace"))
+        return open(path, "r", encoding=encoding, errors="replace", newline=""), fmt, delimiter
+
+    def _load_delimited(self, path: Path, table: str) -> tuple[list[str], int]:
+        fh, _, delimiter = self._open_text(path)
+        csv.field_size_limit(1 << 30)
+        with fh:
+            reader = csv.reader(fh, delimiter=delimiter or ",")
+            cols = _column_names(next(reader, None) or [])
+            width = len(cols)
+            head: list[list[str]] = []
+            for row in reader:
+                if row:
+                    head.append(row)
+                if len(head) >= _TYPE_SAMPLE_ROWS:
+                    break
+            types = [_affinity([r[i] for r in head if i < len(r)]) for i in range(width)]
+            self._conn.execute(
+                f"CREATE TABLE {_quote(table)} ("
+                + ", ".join(f"{_quote(c)} {t}" for c, t in zip(cols, types)) + ")"
+            )
+            insert = f"INSERT INTO {_quote(table)} VALUES ({', '.join('?' * width)})"
+            pad = [None] * width
+            total = 0
+
+            def shaped(rows: Any) -> Any:
+                for row in rows:
+                    if row:
+                        yield [v if v != "" else None for v in row[:width]] + pad[len(row):]
+
+            self._conn.executemany(insert, shaped(head))
+            total += len(head)
+            batch: list[list[str]] = []
+            for row in reader:
+                if not row:
+                    continue
+                batch.append(row)
+                if len(batch) >= _INSERT_BATCH:
+                    self._conn.executemany(insert, shaped(batch))
+                    total += len(batch)
+                    batch = []
+            self._conn.executemany(insert, shaped(batch))
+            total += len(batch)
+        return cols, total
+
+    def _load_jsonl(self, path: Path, table: str) -> tuple[list[str], int]:
+        """Load JSON lines; keys become columns as they appear, plus ``_line`` (the line number)."""
+        fh, _, _ = self._open_text(path)
+        cols = ["_line"]
+        seen = set(cols)
+        key_to_col: dict[str, str] = {}
+        batch: list[dict[str, Any]] = []
+        total = 0
+        self._conn.execute(f"CREATE TABLE {_quote(table)} (_line INTEGER)")
+
+        def flush() -> None:
+            insert = (
+                f"INSERT INTO {_quote(table)} ({', '.join(_quote(c) for c in cols)}) "
+                f"VALUES ({', '.join('?' * len(cols))})"
+            )
+            self._conn.executemany(insert, ([_cell(rec.get(c)) for c in cols] for rec in batch))
+            batch.clear()
+
+        with fh:
+            for line_no, line in enumerate(fh, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if not isinstance(record, dict):
+                    record = {"value": record}
+                mapped: dict[str, Any] = {"_line": line_no}
+                for key, value in record.items():
+                    col = key_to_col.get(key)
+                    if col is None:
+                        if len(cols) > _MAX_COLUMNS:
+                            continue
+                        # Rows already batched were shaped for the old column list.
+                        flush()
+                        col = key_to_col[key] = _unique(_sanitize(key), seen)
+                        self._conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(col)} {_json_affinity(value)}")
+                        cols.append(col)
+                    mapped[col] = value
+                batch.append(mapped)
+                total += 1
+                if len(batch) >= _INSERT_BATCH:
+                    flush()
+            flush()
+        return cols, total
+
+    # ------------------------------------------------------------------
+    # Automatic indexes
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _indexable(sql: str, columns: dict[str, list[str]]) -> set[tuple[str, str]]:
+        """(table name, column) pairs compared in joins or filters of *sql*."""
+        aliases = {name: name for name in columns}
+        for match in _SOURCE_RE.finditer(sql):
+            table, alias = match.group(1).lower(), (match.group(2) or "").lower()
+            if table in columns and alias and alias not in _KEYWORDS:
+                aliases[alias] = table
+        refs: list[tuple[str | None, str]] = []
+        for pattern in (_LEFT_RE, _RIGHT_RE):
+            refs.extend((q.lower() if q else None, c.lower()) for q, c in pattern.findall(sql))
+        for match in _USING_RE.finditer(sql):
+            refs.extend((None, c.strip().lower()) for c in match.group(1).split(","))
+        found: set[tuple[str, str]] = set()
+        for qualifier, column in refs:
+            if qualifier is not None:
+                table = aliases.get(qualifier)
+                if table is not None and column in columns[table]:
+                    found.add((table, column))
+                continue
+            found.update((table, column) for table, cols in columns.items() if column in cols)
+        return found
+
+    def _ensure_index(self, table: str, column: str) -> bool:
+        """Index *column* of *table*; ``True`` if the index was created just now."""
+        name = f"ix_{table}_{column}"
+        if self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone():
+            return False
+        self._conn.execute(f"CREATE INDEX {_quote(name)} ON {_quote(table)} ({_quote(column)})")
+        return True
+
+
+def _clip(value: Any) -> str:
+    text = "NULL" if value is None else f"{value:g}" if isinstance(value, float) else str(value)
+    text = text.replace("\n", "\\n")
+    return text if len(text) <= _MAX_VALUE_CHARS else text[: _MAX_VALUE_CHARS - 3] + "..."
+
+
+def render_result(result: QueryResult) -> str:
+    """Pipe-separated table with a one-line footer."""
+    lines = [f"[{note}]" for note in result.notes]
+    if result.columns:
+        lines.append(" | ".join(result.columns))
+        lines.extend(" | ".join(_clip(v) for v in row) for row in result.rows)
+    footer = f"({len(result.rows)} rows"
+    if result.truncated:
+        footer += "; more rows not shown, raise max_rows or add LIMIT/aggregation"
+    lines.append(footer + f"; {result.elapsed_sec:.2f}s)")
+    return "\n".join(lines)
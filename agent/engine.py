@@ -1,22 +1,46 @@
 from __future__ import annotations
 
+import functools
+import inspect
+import itertools
 import json
 import re
 import time
 import threading
+import urllib.parse
 from datetime import datetime, timezone
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import nullcontext
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Callable
 
+from . import http_pool
 from .config import AgentConfig
-from .model import BaseModel, ModelError, ModelTurn, ToolCall, ToolResult
+from .context_budget import (
+    DEFAULT_CONTEXT_WINDOW,
+    MODEL_CONTEXT_WINDOWS,
+    BudgetPlan,
+    ContextBudget,
+    context_window_for,
+)
+from .memo import MemoDeps, SubtaskMemo, is_cacheable_result
+from .model import BaseModel, CallOptions, Conversation, ModelError, ModelTurn, ToolCall, ToolResult
 from .prompts import build_system_prompt
 from .replay_log import ReplayLogger
-from .tool_defs import get_tool_definitions
+from .replay_model import encode_turn
+from .retrieval import BM25Index
+from .scheduler import FanoutScheduler
+from .tool_defs import (
+    PROCESS,
+    READ_ONLY,
+    WORKSPACE_WRITE,
+    ToolSet,
+    is_concurrency_safe,
+    tool_side_effect,
+)
 from .tools import WorkspaceTools
+from .verifier import VerifierReport, verify_criteria
 
 EventCallback = Callable[[str], None]
 StepCallback = Callable[[dict[str, Any]], None]
@@ -52,21 +76,16 @@ def _summarize_observation(text: str, max_len: int = 200) -> str:
 # Legacy alias for tests and external code that reference SYSTEM_PROMPT directly.
 SYSTEM_PROMPT = build_system_prompt(recursive=True)
 
-# Context window sizes (tokens) for condensation heuristic.
-_MODEL_CONTEXT_WINDOWS: dict[str, int] = {
-    "claude-opus-4-6": 200_000,
-    "claude-sonnet-4-5-20250929": 200_000,
-    "claude-haiku-4-5-20251001": 200_000,
-    "anthropic/claude-sonnet-4.6": 200_000,
-    "anthropic/claude-sonnet-4-5": 200_000,
-    "anthropic/claude-haiku-4-5-20251001": 200_000,
-    "gpt-4o": 128_000,
-    "gpt-4.1": 1_000_000,
-    "gpt-5-turbo-16k": 16_000,
-}
-_DEFAULT_CONTEXT_WINDOW = 128_000
+# Context window sizes (tokens); kept under the old names for existing importers.
+_MODEL_CONTEXT_WINDOWS = MODEL_CONTEXT_WINDOWS
+_DEFAULT_CONTEXT_WINDOW = DEFAULT_CONTEXT_WINDOW
+# Reactive fallback: condense after a turn if the provider still reports more
+# than this fraction of the window (e.g. the estimator was badly calibrated).
 _CONDENSATION_THRESHOLD = 0.75
 
+# Delegation tools fan out concurrently within a single model turn.
+_PARALLEL_TOOLS = frozenset({"subtask", "execute"})
+
 
 def _model_tier(model_name: str, reasoning_effort: str | None = None) -> int:
     """Determine capability tier for a model.  Lower number = higher capability.
@@ -107,26 +126,236 @@ def _lowest_tier_model(model_name: str) -> tuple[str, str | None]:
     return (model_name, None)
 
 
+def _evidence_block(evidence: list[str]) -> str:
+    if not evidence:
+        return ""
+    lines = "\n".join(f"- {line}" for line in evidence)
+    return f"Checks already verified by running them (all passed):\n{lines}\n\n"
+
+
+def _verdict_suffix(verdict: str) -> str:
+    tag = "PASS" if verdict.startswith("PASS") else "FAIL"
+    return f"\n\n[ACCEPTANCE CRITERIA: {tag}]\n{verdict}"
+
+
+def _parse_batch_verdicts(text: str, count: int) -> dict[int, str]:
+    """Parse a batched judge reply into ``{item_number: "PASS: reason"}``.
+
+    Accepts a bare JSON array or one wrapped in prose/code fences; entries
+    that are malformed or out of range are skipped.
+    """
+    start, end = text.find("["), text.rfind("]")
+    if start < 0 or end <= start:
+        return {}
+    try:
+        entries = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    verdicts: dict[int, str] = {}
+    if not isinstance(entries, list):
+        return verdicts
+    for pos, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict):
+            continue
+        item = entry.get("item", pos)
+        verdict = str(entry.get("verdict", "")).strip().upper()
+        if not isinstance(item, int) or not 1 <= item <= count or verdict not in ("PASS", "FAIL"):
+            continue
+        reason = str(entry.get("reason", "")).strip()
+        verdicts[item] = f"{verdict}: {reason}" if reason else verdict
+    return verdicts
+
+
+def _add_usage(bucket: dict[str, int], turn: ModelTurn) -> None:
+    """Add *turn*'s token usage to a ``session_tokens`` bucket.
+
+    Cache keys are only present once a provider has reported cache activity.
+    """
+    bucket["input"] += turn.input_tokens
+    bucket["output"] += turn.output_tokens
+    if turn.cache_read_tokens:
+        bucket["cache_read"] = bucket.get("cache_read", 0) + turn.cache_read_tokens
+    if turn.cache_write_tokens:
+        bucket["cache_write"] = bucket.get("cache_write", 0) + turn.cache_write_tokens
+
+
 ModelFactory = Callable[[str, str | None], "BaseModel"]
 
 
+def _provider_key(model: BaseModel) -> str:
+    """Scheduler key for *model*: the API host it talks to, else its class name."""
+    base_url = getattr(model, "base_url", "") or ""
+    host = urllib.parse.urlparse(base_url).netloc if base_url else ""
+    return host or type(model).__name__
+
+
+def _model_tool_definitions(model: BaseModel, tool_set: ToolSet | None = None) -> list[dict[str, Any]]:
+    """The provider-neutral tool definitions a call to *model* offers (empty if unknown)."""
+    if tool_set is not None:
+        return list(tool_set.definitions())
+    defs = getattr(model, "tool_defs", None)
+    if defs is not None:
+        return list(defs)
+    model_set = getattr(model, "tool_set", None)
+    return list(model_set.definitions()) if model_set is not None else []
+
+
+@functools.lru_cache(maxsize=None)
+def _accepts_options(complete: Callable[..., Any]) -> bool:
+    try:
+        params = inspect.signature(complete).parameters
+    except (TypeError, ValueError):
+        return False
+    return "options" in params or any(p.kind is p.VAR_KEYWORD for p in params.values())
+
+
+def _call_options_supported(model: BaseModel) -> bool:
+    """Whether *model*'s ``complete()`` takes :class:`CallOptions` (older models take only the conversation)."""
+    complete = getattr(type(model), "complete", None)
+    return complete is not None and _accepts_options(complete)
+
+
+@dataclass
+class _DelegationPlan:
+    """A validated subtask/execute call, ready to recurse into."""
+    kind: str
+    banner: str
+    objective: str
+    criteria: str
+    model: BaseModel | None
+    depth: int
+    branch: str
+    # Tools offered to the child; None keeps the child model's own.
+    tool_set: ToolSet | None = None
+
+
+@dataclass
+class _PendingVerdict:
+    """A delegation result awaiting a verdict shared with its parallel siblings."""
+    plan: _DelegationPlan
+    child_result: str
+    observation: str
+    current_model: BaseModel | None
+    deps: MemoDeps | None
+
+
+@dataclass
+class _Speculation:
+    """Read-only tool calls started while a model turn is still streaming."""
+    depth: int
+    pool: ThreadPoolExecutor | None = None
+    started: dict[str, tuple[ToolCall, Future]] = field(default_factory=dict)
+    # Set once a call with side effects has streamed: reads issued after it
+    # must observe its effects, so they are not started early.
+    barrier: bool = False
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
 @dataclass
 class ExternalContext:
+    """Observations shared across the recursion tree.
+
+    The store is bounded by ``max_observations`` and an estimated
+    ``max_tokens`` (oldest entries are evicted first; ``0`` disables a bound)
+    and keeps a BM25 index, so ``summary(objective=...)`` can hand a
+    sub-agent the observations most relevant to its objective.
+    """
+
     observations: list[str] = field(default_factory=list)
+    max_observations: int = 1000
+    max_tokens: int = 250_000
+    _index: BM25Index = field(default_factory=BM25Index, repr=False, compare=False)
+    # The list object the index was built from; ``observations`` may be
+    # reassigned or appended to directly, so the index syncs lazily.
+    _indexed: list[str] | None = field(default=None, repr=False, compare=False)
+    _indexed_count: int = field(default=0, repr=False, compare=False)
+    _base_id: int = field(default=0, repr=False, compare=False)
+    _tokens: int = field(default=0, repr=False, compare=False)
+    _lock: threading.RLock = field(default_factory=threading.RLock, repr=False, compare=False)
 
     def add(self, text: str) -> None:
-        self.observations.append(text)
+        with self._lock:
+            self._sync()
+            self.observations.append(text)
+            self._index_one(len(self.observations) - 1)
+            self._evict()
 
-    def summary(self, max_items: int = 12, max_chars: int = 8000) -> str:
-        if not self.observations:
-            return "(empty)"
-        if max_items <= 0:
-            return "(empty)"
-        recent = self.observations[-max_items:]
-        joined = "\n\n".join(recent)
-        if len(joined) <= max_chars:
-            return joined
-        return f"{joined[:max_chars]}\n...[truncated external context]..."
+    def summary(self, max_items: int = 12, max_chars: int = 8000, objective: str | None = None) -> str:
+        with self._lock:
+            if not self.observations:
+                return "(empty)"
+            if max_items <= 0:
+                return "(empty)"
+            if not objective or not objective.strip():
+                recent = self.observations[-max_items:]
+                joined = "\n\n".join(recent)
+                if len(joined) <= max_chars:
+                    return joined
+                return f"{joined[:max_chars]}\n...[truncated external context]..."
+            return self._relevant_summary(objective, max_items, max_chars)
+
+    def _relevant_summary(self, objective: str, max_items: int, max_chars: int) -> str:
+        self._sync()
+        obs = self.observations
+        ranked = [doc_id - self._base_id for doc_id, _ in self._index.search(objective, limit=max_items)]
+        # Spare slots go to the most recent observations, for continuity.
+        chosen = list(ranked)
+        for pos in range(len(obs) - 1, -1, -1):
+            if len(chosen) >= max_items:
+                break
+            if pos not in chosen:
+                chosen.append(pos)
+        picked: dict[int, str] = {}
+        remaining = max_chars
+        for pos in chosen:
+            text = obs[pos]
+            if len(text) <= remaining:
+                picked[pos] = text
+                remaining -= len(text) + 2
+                continue
+            if remaining >= 200 or not picked:
+                picked[pos] = f"{text[:max(remaining, 0)]}\n...[truncated external context]..."
+            break
+        return "\n\n".join(picked[pos] for pos in sorted(picked))
+
+    def _index_one(self, pos: int) -> None:
+        text = self.observations[pos]
+        self._index.add(self._base_id + pos, text)
+        self._tokens += _estimate_tokens(text)
+        self._indexed_count += 1
+
+    def _sync(self) -> None:
+        if self._indexed is not self.observations or self._indexed_count > len(self.observations):
+            self._index.clear()
+            self._indexed = self.observations
+            self._indexed_count = 0
+            self._base_id = 0
+            self._tokens = 0
+        while self._indexed_count < len(self.observations):
+            self._index_one(self._indexed_count)
+        self._evict()
+
+    def _evict(self) -> None:
+        obs = self.observations
+        drop = 0
+        tokens = self._tokens
+        while drop < len(obs) - 1 and (
+            (self.max_observations > 0 and len(obs) - drop > self.max_observations)
+            or (self.max_tokens > 0 and tokens > self.max_tokens)
+        ):
+            tokens -= _estimate_tokens(obs[drop])
+            drop += 1
+        if not drop:
+            return
+        for pos in range(drop):
+            self._index.remove(self._base_id + pos)
+        del obs[:drop]
+        self._base_id += drop
+        self._indexed_count -= drop
+        self._tokens = tokens
 
 
 @dataclass
@@ -142,18 +371,41 @@ class RLMEngine:
     session_dir: Path | None = None
     session_id: str | None = None
     _shell_command_counts: dict[tuple[int, str], int] = field(default_factory=dict)
+    scheduler: FanoutScheduler | None = None
+    context_budget: ContextBudget | None = None
+    _speculated: dict[str, tuple[ToolCall, Future]] = field(default_factory=dict, repr=False)
+    _subtask_memo: SubtaskMemo | None = field(default=None, repr=False)
+    # Delegation branch -> workspace inputs observed so far by that run.
+    _memo_frames: dict[str, MemoDeps] = field(default_factory=dict, repr=False)
+    # Numbers each solve's root branch, so concurrent solves never share branch names.
+    _solve_ids: Any = field(default_factory=lambda: itertools.count(1), repr=False)
 
     def __post_init__(self) -> None:
+        # Every in-flight model call (and its hedge) needs its own connection.
+        legs = 2 if self.config.hedge_model else 1
+        http_pool.ensure_capacity(self.config.max_concurrent_model_calls * legs)
+        if self.scheduler is None:
+            self.scheduler = FanoutScheduler(
+                max_in_flight=self.config.max_concurrent_model_calls,
+                max_per_provider=self.config.max_model_calls_per_provider,
+                max_per_depth=self.config.max_model_calls_per_depth,
+            )
+        if self.context_budget is None and self.config.context_budget_fraction > 0:
+            self.context_budget = ContextBudget(
+                budget_fraction=self.config.context_budget_fraction,
+                window_override=self.config.context_window_tokens,
+            )
         if not self.system_prompt:
             self.system_prompt = build_system_prompt(
                 self.config.recursive,
                 acceptance_criteria=self.config.acceptance_criteria,
                 demo=self.config.demo,
             )
-        ac = self.config.acceptance_criteria
-        tool_defs = get_tool_definitions(include_subtask=self.config.recursive, include_acceptance_criteria=ac)
-        if hasattr(self.model, "tool_defs"):
-            self.model.tool_defs = tool_defs
+        if hasattr(self.model, "tool_set"):
+            self.model.tool_set = ToolSet(
+                include_subtask=self.config.recursive,
+                include_acceptance_criteria=self.config.acceptance_criteria,
+            )
 
     def solve(self, objective: str, on_event: EventCallback | None = None) -> str:
         result, _ = self.solve_with_context(objective=objective, on_event=on_event)
@@ -184,6 +436,7 @@ class RLMEngine:
                 on_content_delta=on_content_delta,
                 deadline=deadline,
                 replay_logger=replay_logger,
+                branch=self._root_branch(),
             )
         finally:
             cleanup = getattr(self.tools, "cleanup_bg_jobs", None)
@@ -191,6 +444,11 @@ class RLMEngine:
                 cleanup()
         return result, active_context
 
+    def _root_branch(self) -> str:
+        """Branch name of a new solve's root, unique within this engine."""
+        with self._lock:
+            return f"root#{next(self._solve_ids)}"
+
     def _emit(self, msg: str, on_event: EventCallback | None) -> None:
         if on_event:
             try:
@@ -221,71 +479,160 @@ class RLMEngine:
             "at the same depth. Change strategy instead of retrying the same command."
         )
 
+    def _judge_model(self, current_model: BaseModel | None) -> BaseModel | None:
+        """Resolve (and cache) the cheap judge model for *current_model*'s family."""
+        if not self.model_factory:
+            return None
+        cur = current_model or self.model
+        judge_name, judge_effort = _lowest_tier_model(getattr(cur, "model", ""))
+        cache_key = ("_judge_" + judge_name, judge_effort)
+        with self._lock:
+            if cache_key not in self._model_cache:
+                try:
+                    self._model_cache[cache_key] = self.model_factory(judge_name, judge_effort)
+                except Exception:
+                    return None
+            return self._model_cache[cache_key]
+
+    def _ask_judge(self, judge_model: BaseModel, prompt: str, depth: int, branch: str) -> str:
+        """Send one judge request, accounting its tokens and latency under ``"<model> (judge)"``."""
+        conversation = judge_model.create_conversation("You are a concise evaluator.", prompt)
+        t0 = time.monotonic()
+        with self._model_slot(judge_model, depth, branch):
+            if _call_options_supported(judge_model):
+                turn = judge_model.complete(conversation, CallOptions(tool_defs=[]))
+            else:
+                turn = judge_model.complete(conversation)
+        elapsed_ms = int((time.monotonic() - t0) * 1000)
+        key = f"{getattr(judge_model, 'model', '(unknown)')} (judge)"
+        with self._lock:
+            bucket = self.session_tokens.setdefault(
+                key, {"input": 0, "output": 0, "calls": 0, "latency_ms": 0},
+            )
+            _add_usage(bucket, turn)
+            bucket["calls"] += 1
+            bucket["latency_ms"] += elapsed_ms
+        return (turn.text or "").strip()
+
+    def _verify_locally(self, acceptance_criteria: str) -> VerifierReport:
+        """Run the command/existence checks in *acceptance_criteria* without a model."""
+        if not self.config.local_verifier:
+            return VerifierReport(unhandled=[acceptance_criteria])
+        report = verify_criteria(acceptance_criteria, self.tools, timeout=self.config.verifier_timeout_sec)
+        if report.verdict is None and not report.evidence:
+            # Nothing was checked; hand the judge the criteria verbatim.
+            report.unhandled = [acceptance_criteria]
+        return report
+
     def _judge_result(
         self,
         objective: str,
         acceptance_criteria: str,
         result: str,
         current_model: BaseModel | None = None,
+        depth: int = 0,
+        branch: str = "root",
     ) -> str:
-        """Evaluate a subtask/execute result against acceptance criteria using a cheap judge model."""
-        if not self.model_factory:
-            return "PASS\n(no judge available)"
+        """Evaluate a subtask/execute result against acceptance criteria.
 
-        cur = current_model or self.model
-        cur_name = getattr(cur, "model", "")
-        judge_name, judge_effort = _lowest_tier_model(cur_name)
+        Checkable clauses are verified locally; only the rest go to a cheap judge model.
+        """
+        report = self._verify_locally(acceptance_criteria)
+        if report.verdict is not None:
+            return report.verdict
+        return self._llm_judge(objective, "; ".join(report.unhandled), result, report.evidence,
+                               current_model, depth, branch)
 
-        cache_key = ("_judge_" + judge_name, judge_effort)
-        with self._lock:
-            if cache_key not in self._model_cache:
-                try:
-                    self._model_cache[cache_key] = self.model_factory(judge_name, judge_effort)
-                except Exception:
-                    return "PASS\n(no judge available)"
-            judge_model = self._model_cache[cache_key]
-        if hasattr(judge_model, "tool_defs"):
-            judge_model.tool_defs = []
+    def _llm_judge(
+        self,
+        objective: str,
+        acceptance_criteria: str,
+        result: str,
+        evidence: list[str],
+        current_model: BaseModel | None,
+        depth: int,
+        branch: str,
+    ) -> str:
+        judge_model = self._judge_model(current_model)
+        if judge_model is None:
+            return "PASS\n(no judge available)"
 
         truncated = result[:4000] if len(result) > 4000 else result
         prompt = (
             "You are a judge evaluating whether a task result meets acceptance criteria.\n\n"
             f"Objective: {objective}\n\n"
             f"Acceptance criteria: {acceptance_criteria}\n\n"
+            f"{_evidence_block(evidence)}"
             f"Result:\n{truncated}\n\n"
             "Respond with exactly one line starting with PASS: or FAIL: followed by a brief explanation."
         )
 
         try:
-            conversation = judge_model.create_conversation("You are a concise evaluator.", prompt)
-            turn = judge_model.complete(conversation)
-            verdict = (turn.text or "").strip()
+            verdict = self._ask_judge(judge_model, prompt, depth, branch)
             if not verdict:
                 return "PASS\n(judge returned empty response)"
             return verdict
         except Exception as exc:
             return f"PASS\n(judge error: {exc})"
 
-    def _solve_recursive(
+    def _judge_results(
         self,
-        objective: str,
-        depth: int,
-        context: ExternalContext,
-        on_event: EventCallback | None = None,
-        on_step: StepCallback | None = None,
-        on_content_delta: ContentDeltaCallback | None = None,
-        deadline: float = 0,
-        model_override: BaseModel | None = None,
-        replay_logger: ReplayLogger | None = None,
-    ) -> str:
-        model = model_override or self.model
-
-        self._emit(f"[depth {depth}] objective: {objective}", on_event)
+        items: list[tuple[str, str, str]],
+        current_model: BaseModel | None = None,
+        depth: int = 0,
+        branch: str = "root",
+    ) -> list[str]:
+        """Judge several ``(objective, criteria, result)`` items in one request.
+
+        Items decided by local verification never reach the model.  Items
+        whose verdict is missing from the reply (or all of them, if it cannot
+        be parsed) are judged individually.
+        """
+        results: list[str | None] = []
+        open_items: list[tuple[int, str, str, str, list[str]]] = []
+        for pos, (item_objective, criteria, result) in enumerate(items):
+            report = self._verify_locally(criteria)
+            results.append(report.verdict)
+            if report.verdict is None:
+                open_items.append((pos, item_objective, "; ".join(report.unhandled), result, report.evidence))
+
+        def _single(item: tuple[int, str, str, str, list[str]]) -> str:
+            _pos, o, c, r, ev = item
+            return self._llm_judge(o, c, r, ev, current_model, depth, branch)
+
+        if len(open_items) == 1:
+            results[open_items[0][0]] = _single(open_items[0])
+        elif open_items:
+            judge_model = self._judge_model(current_model)
+            if judge_model is None:
+                return [r if r is not None else "PASS\n(no judge available)" for r in results]
+            sections = []
+            for n, (_pos, item_objective, criteria, result, evidence) in enumerate(open_items, 1):
+                truncated = result[:4000] if len(result) > 4000 else result
+                sections.append(
+                    f"## Item {n}\nObjective: {item_objective}\n"
+                    f"Acceptance criteria: {criteria}\n{_evidence_block(evidence)}Result:\n{truncated}"
+                )
+            prompt = (
+                "You are a judge evaluating whether each task result meets its acceptance criteria.\n\n"
+                + "\n\n".join(sections)
+                + "\n\nRespond with only a JSON array holding one object per item, in order: "
+                '[{"item": 1, "verdict": "PASS" or "FAIL", "reason": "brief explanation"}, ...]'
+            )
+            try:
+                verdicts = _parse_batch_verdicts(
+                    self._ask_judge(judge_model, prompt, depth, branch), len(open_items),
+                )
+            except Exception:
+                verdicts = {}
+            for n, item in enumerate(open_items, 1):
+                results[item[0]] = verdicts[n] if n in verdicts else _single(item)
+        return [r or "" for r in results]
 
+    def _initial_message(self, objective: str, depth: int, context: ExternalContext) -> str:
         now_iso = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
         if depth == 0 and not self.config.recursive:
             initial_msg_dict = {
-                "timestamp": now_iso,
                 "objective": objective,
                 "max_steps_per_call": self.config.max_steps_per_call,
                 "workspace": str(self.config.workspace),
@@ -297,138 +644,468 @@ class RLMEngine:
             else:
                 repl_hint = "Begin REPL cycle 1: parent has surveyed — READ only what this objective requires, then act."
             initial_msg_dict = {
-                "timestamp": now_iso,
                 "objective": objective,
                 "depth": depth,
                 "max_depth": self.config.max_depth,
                 "max_steps_per_call": self.config.max_steps_per_call,
                 "workspace": str(self.config.workspace),
-                "external_context_summary": context.summary(),
+                # Sub-agents see the evidence most relevant to their own objective.
+                "external_context_summary": context.summary(objective=objective if depth > 0 else None),
                 "repl_hint": repl_hint,
             }
         if self.session_dir is not None:
             initial_msg_dict["session_dir"] = str(self.session_dir)
         if self.session_id is not None:
             initial_msg_dict["session_id"] = self.session_id
-        initial_message = json.dumps(initial_msg_dict, ensure_ascii=True)
-
-        conversation = model.create_conversation(self.system_prompt, initial_message)
+        # Volatile fields go last so token-prefix caches match as far as possible.
+        initial_msg_dict["timestamp"] = now_iso
+        return json.dumps(initial_msg_dict, ensure_ascii=True)
 
+    def _write_replay_header(
+        self,
+        model: BaseModel,
+        replay_logger: ReplayLogger | None,
+        tool_set: ToolSet | None = None,
+    ) -> None:
         if replay_logger and replay_logger._seq == 0:
             replay_logger.write_header(
                 provider=type(model).__name__,
                 model=getattr(model, "model", "(unknown)"),
                 base_url=getattr(model, "base_url", ""),
                 system_prompt=self.system_prompt,
-                tool_defs=getattr(model, "tool_defs", None) or [],
+                tool_defs=_model_tool_definitions(model, tool_set),
                 reasoning_effort=getattr(model, "reasoning_effort", None),
                 temperature=getattr(model, "temperature", None),
             )
 
+    def _complete_turn(
+        self,
+        model: BaseModel,
+        conversation: Conversation,
+        depth: int,
+        on_content_delta: ContentDeltaCallback | None,
+        branch: str = "root",
+        tool_set: ToolSet | None = None,
+    ) -> ModelTurn:
+        """Run one blocking model call, wiring top-level content streaming."""
+        plan = self._fit_context(model, conversation, tool_set)
+        with self._model_slot(model, depth, branch):
+            # Stream thinking/text deltas only for top-level calls
+            sink = on_content_delta if depth == 0 else None
+            speculation = self._begin_speculation(model, depth)
+            on_tool_call = (
+                functools.partial(self._on_streamed_tool_call, speculation) if speculation is not None else None
+            )
+            turn: ModelTurn | None = None
+            try:
+                if _call_options_supported(model):
+                    options = CallOptions(on_content_delta=sink, on_tool_call=on_tool_call, tool_set=tool_set)
+                    turn = model.complete(conversation, options)
+                else:
+                    turn = self._complete_via_attributes(model, conversation, sink, on_tool_call)
+                if plan is not None and turn.input_tokens:
+                    self.context_budget.calibrate(
+                        getattr(model, "model", "(unknown)"), plan.raw_after, turn.input_tokens,
+                    )
+                return turn
+            finally:
+                if speculation is not None:
+                    self._finish_speculation(speculation, turn)
+
+    @staticmethod
+    def _complete_via_attributes(
+        model: BaseModel,
+        conversation: Conversation,
+        on_content_delta: ContentDeltaCallback | None,
+        on_tool_call: Callable[[ToolCall], None] | None,
+    ) -> ModelTurn:
+        """Fallback for models whose ``complete()`` takes no options: set the hooks for one call."""
+        hooks = {"on_content_delta": on_content_delta, "on_tool_call": on_tool_call}
+        hooks = {name: value for name, value in hooks.items() if value is not None and hasattr(model, name)}
+        for name, value in hooks.items():
+            setattr(model, name, value)
+        try:
+            return model.complete(conversation)
+        finally:
+            for name in hooks:
+                setattr(model, name, None)
+
+    def _fit_context(
+        self,
+        model: BaseModel,
+        conversation: Conversation,
+        tool_set: ToolSet | None = None,
+    ) -> BudgetPlan | None:
+        """Condense *conversation* so the next request fits the context budget.
+
+        Models with several conversations (hedged legs) get each one fitted
+        against its own model's window; the first leg's plan is returned.
+        """
+        if self.context_budget is None:
+            return None
+        legs = getattr(model, "conversation_legs", None)
+        if legs is not None:
+            plans = [self._fit_context(leg_model, leg_conv, tool_set) for leg_model, leg_conv in legs(conversation)]
+            return plans[0] if plans else None
+        return self.context_budget.fit(
+            getattr(model, "model", "(unknown)"),
+            conversation,
+            _model_tool_definitions(model, tool_set),
+        )
+
+    # ------------------------------------------------------------------
+    # Speculative tool execution
+    # ------------------------------------------------------------------
+
+    def _begin_speculation(self, model: BaseModel, depth: int) -> _Speculation | None:
+        """Start read-only tool calls as the model streams them (``config.speculative_tools``)."""
+        if not self.config.speculative_tools or not hasattr(model, "on_tool_call"):
+            return None
+        return _Speculation(depth=depth)
+
+    def _on_streamed_tool_call(self, speculation: _Speculation, tc: ToolCall) -> None:
+        if speculation.barrier:
+            return
+        if tool_side_effect(tc.name) != READ_ONLY:
+            speculation.barrier = True
+            return
+        if not tc.id or tc.id in speculation.started:
+            return
+        if speculation.pool is None:
+            limit = self.config.max_concurrent_tool_calls
+            speculation.pool = ThreadPoolExecutor(
+                max_workers=limit if limit > 0 else None,
+                thread_name_prefix="openplanter-speculative",
+            )
+        # Read-only tools never touch the context or callbacks.
+        future = speculation.pool.submit(
+            self._apply_tool_call,
+            tool_call=tc, depth=speculation.depth, context=ExternalContext(),
+            on_event=None, on_step=None,
+        )
+        speculation.started[tc.id] = (tc, future)
+
+    def _finish_speculation(self, speculation: _Speculation, turn: ModelTurn | None) -> None:
+        """Keep speculative results whose call survived unchanged into the final turn."""
+        if speculation.pool is not None:
+            speculation.pool.shutdown(wait=False)
+        if turn is None:
+            return
+        final_calls = {tc.id: tc for tc in turn.tool_calls}
+        with self._lock:
+            for call_id, (tc, future) in speculation.started.items():
+                final = final_calls.get(call_id)
+                if final is not None and final.name == tc.name and final.arguments == tc.arguments:
+                    self._speculated[call_id] = (tc, future)
+
+    def _take_speculated(self, tc: ToolCall) -> Future | None:
+        if not tc.id:
+            return None
+        with self._lock:
+            entry = self._speculated.pop(tc.id, None)
+        if entry is None or entry[0].name != tc.name or entry[0].arguments != tc.arguments:
+            return None
+        return entry[1]
+
+    def _discard_speculated(self, turn: ModelTurn) -> None:
+        with self._lock:
+            for tc in turn.tool_calls:
+                self._speculated.pop(tc.id, None)
+
+    def _model_slot(self, model: BaseModel, depth: int, branch: str):
+        """Admission through the tree-wide scheduler (a no-op without one)."""
+        if self.scheduler is None:
+            return nullcontext()
+        return self.scheduler.slot(_provider_key(model), depth, branch)
+
+    def _fanout_width(self, n: int) -> int:
+        limit = self.config.max_concurrent_model_calls
+        return max(1, min(n, limit)) if limit > 0 else max(1, n)
+
+    def _record_turn(
+        self,
+        model: BaseModel,
+        conversation: Conversation,
+        turn: ModelTurn,
+        depth: int,
+        step: int,
+        objective: str,
+        elapsed: float,
+        on_step: StepCallback | None,
+        replay_logger: ReplayLogger | None,
+    ) -> None:
+        """Log, account and append a completed model turn to the conversation."""
+        if replay_logger:
+            try:
+                replay_logger.log_call(
+                    depth=depth,
+                    step=step,
+                    messages=conversation.get_messages(),
+                    response=turn.raw_response,
+                    input_tokens=turn.input_tokens,
+                    output_tokens=turn.output_tokens,
+                    elapsed_sec=elapsed,
+                    turn=encode_turn(turn),
+                )
+            except OSError:
+                pass
+
+        # Accumulate token usage per model
+        if turn.input_tokens or turn.output_tokens:
+            model_name = getattr(model, "model", "(unknown)")
+            with self._lock:
+                bucket = self.session_tokens.setdefault(model_name, {"input": 0, "output": 0})
+                _add_usage(bucket, turn)
+
+        model.append_assistant_turn(conversation, turn)
+
+        # Context condensation
+        if turn.input_tokens:
+            model_name = getattr(model, "model", "(unknown)")
+            context_window = context_window_for(model_name, self.config.context_window_tokens)
+            if turn.input_tokens > _CONDENSATION_THRESHOLD * context_window:
+                condense_fn = getattr(model, "condense_conversation", None)
+                if condense_fn:
+                    condense_fn(conversation)
+
+        if on_step:
+            try:
+                on_step(
+                    {
+                        "depth": depth,
+                        "step": step,
+                        "objective": objective,
+                        "action": {"name": "_model_turn"},
+                        "observation": "",
+                        "model_text": turn.text or "",
+                        "tool_call_names": [tc.name for tc in turn.tool_calls],
+                        "input_tokens": turn.input_tokens,
+                        "output_tokens": turn.output_tokens,
+                        "elapsed_sec": round(elapsed, 2),
+                        "is_final": False,
+                    }
+                )
+            except Exception:
+                pass
+
+    def _emit_final_answer(
+        self,
+        turn: ModelTurn,
+        depth: int,
+        step: int,
+        objective: str,
+        elapsed: float,
+        on_event: EventCallback | None,
+        on_step: StepCallback | None,
+    ) -> None:
+        text = turn.text or ""
+        preview = text[:200] + "..." if len(text) > 200 else text
+        self._emit(
+            f"[d{depth}/s{step}] final answer ({len(text)} chars, {elapsed:.1f}s): {preview}",
+            on_event,
+        )
+        if on_step:
+            try:
+                on_step(
+                    {
+                        "depth": depth,
+                        "step": step,
+                        "objective": objective,
+                        "action": {"name": "final", "arguments": {"text": text}},
+                        "observation": text,
+                        "is_final": True,
+                    }
+                )
+            except Exception:
+                pass
+
+    def _nudge_empty_turn(
+        self,
+        model: BaseModel,
+        conversation: Conversation,
+        depth: int,
+        step: int,
+        elapsed: float,
+        on_event: EventCallback | None,
+    ) -> None:
+        self._emit(f"[d{depth}/s{step}] empty model response ({elapsed:.1f}s), nudging...", on_event)
+        empty_result = ToolResult(
+            tool_call_id="empty",
+            name="system",
+            content="No tool calls and no text in response. Please use a tool or provide a final answer.",
+        )
+        model.append_tool_results(conversation, [empty_result])
+
+    def _partition_tool_calls(
+        self, turn: ModelTurn,
+    ) -> tuple[list[tuple[int, ToolCall]], list[tuple[int, ToolCall]]]:
+        """Split a turn's tool calls into (sequential, parallel) indexed lists."""
+        sequential = [(i, tc) for i, tc in enumerate(turn.tool_calls) if tc.name not in _PARALLEL_TOOLS]
+        parallel = [(i, tc) for i, tc in enumerate(turn.tool_calls) if tc.name in _PARALLEL_TOOLS]
+
+        # If no factory and we have execute calls, fall back to sequential.
+        if not self.model_factory and any(tc.name == "execute" for _, tc in parallel):
+            sequential = list(enumerate(turn.tool_calls))
+            parallel = []
+        return sequential, parallel
+
+    @staticmethod
+    def _tool_batches(calls: list[tuple[int, ToolCall]]) -> list[list[tuple[int, ToolCall]]]:
+        """Group consecutive read-only/network calls; every other call is its own batch.
+
+        Batches run in order, so a write or process call acts as a barrier:
+        reads issued before it finish first, reads issued after it see its effects.
+        """
+        batches: list[list[tuple[int, ToolCall]]] = []
+        for entry in calls:
+            if is_concurrency_safe(entry[1].name) and batches and is_concurrency_safe(batches[-1][0][1].name):
+                batches[-1].append(entry)
+            else:
+                batches.append([entry])
+        return batches
+
+    def _tool_pool_width(self, n: int) -> int:
+        limit = self.config.max_concurrent_tool_calls
+        return max(1, min(n, limit)) if limit > 0 else max(1, n)
+
+    def _finalize_step_results(
+        self,
+        indexed_results: dict[int, tuple[ToolResult, bool]],
+        model: BaseModel,
+        turn: ModelTurn,
+        step: int,
+    ) -> tuple[list[ToolResult], str | None]:
+        """Order tool results and decorate them with budget, context and plan hints."""
+        # Drop speculative results the step never consumed (e.g. after an early final answer).
+        self._discard_speculated(turn)
+        results: list[ToolResult] = []
+        final_answer: str | None = None
+        for i in sorted(indexed_results):
+            r, is_final_entry = indexed_results[i]
+            results.append(r)
+            if is_final_entry and final_answer is None:
+                final_answer = r.content
+
+        # Timestamp + step budget + context usage awareness
+        if final_answer is None and results:
+            budget_total = self.config.max_steps_per_call
+            remaining = budget_total - step
+            ts_tag = f"[{datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}]"
+            budget_tag = f"[Step {step}/{budget_total}]"
+            _mname = getattr(model, "model", "(unknown)")
+            _ctx_window = context_window_for(_mname, self.config.context_window_tokens)
+            ctx_tag = f"[Context {turn.input_tokens}/{_ctx_window} tokens]"
+            # Trail the tool output rather than lead it, so the stable content
+            # starts the message and per-step values stay at the cache tail.
+            rl = results[-1]
+            results[-1] = ToolResult(
+                rl.tool_call_id, rl.name,
+                f"{rl.content}\n\n{ts_tag} {budget_tag} {ctx_tag}", rl.is_error,
+            )
+            if 0 < remaining <= budget_total // 4:
+                warning = (
+                    f"\n\n** BUDGET CRITICAL: {remaining} of {budget_total} steps remain. "
+                    "Stop exploring/surveying. Write your output files NOW with your best answer. "
+                    "A partial result beats no result."
+                )
+                rl = results[-1]
+                results[-1] = ToolResult(
+                    rl.tool_call_id, rl.name,
+                    rl.content + warning, rl.is_error,
+                )
+            elif remaining <= budget_total // 2:
+                warning = (
+                    f"\n\n** BUDGET WARNING: {remaining} of {budget_total} steps remain. "
+                    "Focus on completing the task directly. Do not write exploration scripts."
+                )
+                rl = results[-1]
+                results[-1] = ToolResult(
+                    rl.tool_call_id, rl.name,
+                    rl.content + warning, rl.is_error,
+                )
+
+        # Plan injection — find newest *.plan.md in session dir, append to last result
+        if self.session_dir is not None and results and final_answer is None:
+            try:
+                plan_files = sorted(
+                    self.session_dir.glob("*.plan.md"),
+                    key=lambda p: p.stat().st_mtime,
+                    reverse=True,
+                )
+                if plan_files:
+                    plan_path = plan_files[0]
+                    plan_text = plan_path.read_text(encoding="utf-8")
+                    if plan_text.strip():
+                        max_pc = self.config.max_plan_chars
+                        if len(plan_text) > max_pc:
+                            plan_text = plan_text[:max_pc] + "\n...[plan truncated]..."
+                        plan_block = (
+                            f"\n[SESSION PLAN file={plan_path.name}]\n"
+                            f"{plan_text}\n[/SESSION PLAN]\n"
+                        )
+                        rl = results[-1]
+                        results[-1] = ToolResult(
+                            rl.tool_call_id, rl.name,
+                            rl.content + plan_block, rl.is_error,
+                        )
+            except OSError:
+                pass
+
+        return results, final_answer
+
+    def _step_budget_exhausted(self, depth: int, objective: str) -> str:
+        return (
+            f"Step budget exhausted at depth {depth} for objective: {objective}\n"
+            "Please try with a more specific task, higher step budget, or deeper recursion."
+        )
+
+    def _solve_recursive(
+        self,
+        objective: str,
+        depth: int,
+        context: ExternalContext,
+        on_event: EventCallback | None = None,
+        on_step: StepCallback | None = None,
+        on_content_delta: ContentDeltaCallback | None = None,
+        deadline: float = 0,
+        model_override: BaseModel | None = None,
+        replay_logger: ReplayLogger | None = None,
+        branch: str = "root",
+        tool_set: ToolSet | None = None,
+    ) -> str:
+        model = model_override or self.model
+
+        self._emit(f"[depth {depth}] objective: {objective}", on_event)
+
+        initial_message = self._initial_message(objective, depth, context)
+        conversation = model.create_conversation(self.system_prompt, initial_message)
+        self._write_replay_header(model, replay_logger, tool_set)
+
         for step in range(1, self.config.max_steps_per_call + 1):
             if deadline and time.monotonic() > deadline:
                 self._emit(f"[d{depth}] wall-clock limit reached", on_event)
                 return "Time limit exceeded. Try a more focused objective."
             self._emit(f"[d{depth}/s{step}] calling model...", on_event)
             t0 = time.monotonic()
-            # Stream thinking/text deltas only for top-level calls
-            if on_content_delta and depth == 0 and hasattr(model, "on_content_delta"):
-                model.on_content_delta = on_content_delta
             try:
-                turn = model.complete(conversation)
+                turn = self._complete_turn(model, conversation, depth, on_content_delta, branch, tool_set)
             except ModelError as exc:
                 self._emit(f"[d{depth}/s{step}] model error: {exc}", on_event)
                 return f"Model error at depth {depth}, step {step}: {exc}"
-            finally:
-                if hasattr(model, "on_content_delta"):
-                    model.on_content_delta = None
             elapsed = time.monotonic() - t0
 
-            if replay_logger:
-                try:
-                    replay_logger.log_call(
-                        depth=depth,
-                        step=step,
-                        messages=conversation.get_messages(),
-                        response=turn.raw_response,
-                        input_tokens=turn.input_tokens,
-                        output_tokens=turn.output_tokens,
-                        elapsed_sec=elapsed,
-                    )
-                except OSError:
-                    pass
-
-            # Accumulate token usage per model
-            if turn.input_tokens or turn.output_tokens:
-                model_name = getattr(model, "model", "(unknown)")
-                with self._lock:
-                    bucket = self.session_tokens.setdefault(model_name, {"input": 0, "output": 0})
-                    bucket["input"] += turn.input_tokens
-                    bucket["output"] += turn.output_tokens
-
-            model.append_assistant_turn(conversation, turn)
-
-            # Context condensation
-            if turn.input_tokens:
-                model_name = getattr(model, "model", "(unknown)")
-                context_window = _MODEL_CONTEXT_WINDOWS.get(model_name, _DEFAULT_CONTEXT_WINDOW)
-                if turn.input_tokens > _CONDENSATION_THRESHOLD * context_window:
-                    condense_fn = getattr(model, "condense_conversation", None)
-                    if condense_fn:
-                        condense_fn(conversation)
-
-            if on_step:
-                try:
-                    on_step(
-                        {
-                            "depth": depth,
-                            "step": step,
-                            "objective": objective,
-                            "action": {"name": "_model_turn"},
-                            "observation": "",
-                            "model_text": turn.text or "",
-                            "tool_call_names": [tc.name for tc in turn.tool_calls],
-                            "input_tokens": turn.input_tokens,
-                            "output_tokens": turn.output_tokens,
-                            "elapsed_sec": round(elapsed, 2),
-                            "is_final": False,
-                        }
-                    )
-                except Exception:
-                    pass
+            self._record_turn(
+                model, conversation, turn, depth, step, objective, elapsed, on_step, replay_logger,
+            )
 
             # No tool calls + text present = final answer
             if not turn.tool_calls and turn.text:
-                preview = turn.text[:200] + "..." if len(turn.text) > 200 else turn.text
-                self._emit(
-                    f"[d{depth}/s{step}] final answer ({len(turn.text)} chars, {elapsed:.1f}s): {preview}",
-                    on_event,
-                )
-                if on_step:
-                    try:
-                        on_step(
-                            {
-                                "depth": depth,
-                                "step": step,
-                                "objective": objective,
-                                "action": {"name": "final", "arguments": {"text": turn.text}},
-                                "observation": turn.text,
-                                "is_final": True,
-                            }
-                        )
-                    except Exception:
-                        pass
+                self._emit_final_answer(turn, depth, step, objective, elapsed, on_event, on_step)
                 return turn.text
 
             # No tool calls and no text = unexpected empty response
             if not turn.tool_calls:
-                self._emit(f"[d{depth}/s{step}] empty model response ({elapsed:.1f}s), nudging...", on_event)
-                empty_result = ToolResult(
-                    tool_call_id="empty",
-                    name="system",
-                    content="No tool calls and no text in response. Please use a tool or provide a final answer.",
-                )
-                model.append_tool_results(conversation, [empty_result])
+                self._nudge_empty_turn(model, conversation, depth, step, elapsed, on_event)
                 continue
 
             # Log tool calls from model
@@ -440,42 +1117,45 @@ class RLMEngine:
             if turn.text:
                 self._emit(f"[d{depth}/s{step}] model text: {turn.text[:200]}", on_event)
 
-            # Execute all tool calls — parallel for subtask/execute, sequential for others.
-            results: list[ToolResult] = []
-            final_answer: str | None = None
-
-            _PARALLEL_TOOLS = {"subtask", "execute"}
-
-            sequential = [(i, tc) for i, tc in enumerate(turn.tool_calls) if tc.name not in _PARALLEL_TOOLS]
-            parallel = [(i, tc) for i, tc in enumerate(turn.tool_calls) if tc.name in _PARALLEL_TOOLS]
-
-            # If no factory and we have execute calls, fall back to sequential.
-            if not self.model_factory and any(tc.name == "execute" for _, tc in parallel):
-                sequential = list(enumerate(turn.tool_calls))
-                parallel = []
-
+            # Execute all tool calls — subtask/execute fan out in parallel; other
+            # calls run in order, overlapping adjacent read-only/network calls.
+            sequential, parallel = self._partition_tool_calls(turn)
             indexed_results: dict[int, tuple[ToolResult, bool]] = {}
+            stop_early = False
 
-            for idx, tc in sequential:
-                result_entry, is_final_entry = self._run_one_tool(
-                    tc=tc, depth=depth, step=step, objective=objective,
-                    context=context, on_event=on_event, on_step=on_step,
-                    deadline=deadline, current_model=model,
-                    replay_logger=replay_logger,
-                )
-                indexed_results[idx] = (result_entry, is_final_entry)
-                if is_final_entry:
-                    final_answer = result_entry.content
+            tool_kwargs: dict[str, Any] = dict(
+                depth=depth, step=step, objective=objective,
+                context=context, on_event=on_event, on_step=on_step,
+                deadline=deadline, current_model=model,
+                replay_logger=replay_logger,
+            )
+            for batch in self._tool_batches(sequential):
+                if len(batch) == 1:
+                    idx, tc = batch[0]
+                    entries = [self._run_one_tool(tc=tc, branch=f"{branch}/s{step}.{idx}", **tool_kwargs)]
+                else:
+                    with ThreadPoolExecutor(max_workers=self._tool_pool_width(len(batch))) as pool:
+                        futures = [
+                            pool.submit(self._run_one_tool, tc=tc, branch=f"{branch}/s{step}.{idx}", **tool_kwargs)
+                            for idx, tc in batch
+                        ]
+                        entries = [f.result() for f in futures]
+                for (idx, _tc), entry in zip(batch, entries):
+                    indexed_results[idx] = entry
+                if any(is_final_entry for _r, is_final_entry in entries):
+                    stop_early = True
                     break
 
-            if parallel and final_answer is None:
+            if parallel and not stop_early:
                 group_id = f"d{depth}-s{step}-{time.monotonic_ns()}"
+                # Sibling verdicts are judged together once the whole group is done.
+                judge_batch: list[_PendingVerdict] | None = [] if self._judge_batch_enabled(parallel) else None
                 begin_group = getattr(self.tools, "begin_parallel_write_group", None)
                 end_group = getattr(self.tools, "end_parallel_write_group", None)
                 if callable(begin_group):
                     begin_group(group_id)
                 try:
-                    with ThreadPoolExecutor(max_workers=len(parallel)) as pool:
+                    with ThreadPoolExecutor(max_workers=self._fanout_width(len(parallel))) as pool:
                         futures = {
                             pool.submit(
                                 self._run_one_tool,
@@ -485,6 +1165,8 @@ class RLMEngine:
                                 replay_logger=replay_logger,
                                 parallel_group_id=group_id,
                                 parallel_owner=f"{tc.id or 'tc'}:{idx}",
+                                branch=f"{branch}/s{step}.{idx}",
+                                judge_batch=judge_batch,
                             ): idx
                             for idx, tc in parallel
                         }
@@ -495,75 +1177,10 @@ class RLMEngine:
                 finally:
                     if callable(end_group):
                         end_group(group_id)
+                if judge_batch:
+                    self._settle_verdicts(judge_batch, indexed_results, branch, step, depth, model)
 
-            for i in sorted(indexed_results):
-                r, is_final_entry = indexed_results[i]
-                results.append(r)
-                if is_final_entry and final_answer is None:
-                    final_answer = r.content
-
-            # Timestamp + step budget + context usage awareness
-            if final_answer is None and results:
-                budget_total = self.config.max_steps_per_call
-                remaining = budget_total - step
-                ts_tag = f"[{datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}]"
-                budget_tag = f"[Step {step}/{budget_total}]"
-                _mname = getattr(model, "model", "(unknown)")
-                _ctx_window = _MODEL_CONTEXT_WINDOWS.get(_mname, _DEFAULT_CONTEXT_WINDOW)
-                ctx_tag = f"[Context {turn.input_tokens}/{_ctx_window} tokens]"
-                r0 = results[0]
-                results[0] = ToolResult(
-                    r0.tool_call_id, r0.name,
-                    f"{ts_tag} {budget_tag} {ctx_tag} {r0.content}", r0.is_error,
-                )
-                if 0 < remaining <= budget_total // 4:
-                    warning = (
-                        f"\n\n** BUDGET CRITICAL: {remaining} of {budget_total} steps remain. "
-                        "Stop exploring/surveying. Write your output files NOW with your best answer. "
-                        "A partial result beats no result."
-                    )
-                    rl = results[-1]
-                    results[-1] = ToolResult(
-                        rl.tool_call_id, rl.name,
-                        rl.content + warning, rl.is_error,
-                    )
-                elif remaining <= budget_total // 2:
-                    warning = (
-                        f"\n\n** BUDGET WARNING: {remaining} of {budget_total} steps remain. "
-                        "Focus on completing the task directly. Do not write exploration scripts."
-                    )
-                    rl = results[-1]
-                    results[-1] = ToolResult(
-                        rl.tool_call_id, rl.name,
-                        rl.content + warning, rl.is_error,
-                    )
-
-            # Plan injection — find newest *.plan.md in session dir, append to last result
-            if self.session_dir is not None and results and final_answer is None:
-                try:
-                    plan_files = sorted(
-                        self.session_dir.glob("*.plan.md"),
-                        key=lambda p: p.stat().st_mtime,
-                        reverse=True,
-                    )
-                    if plan_files:
-                        plan_path = plan_files[0]
-                        plan_text = plan_path.read_text(encoding="utf-8")
-                        if plan_text.strip():
-                            max_pc = self.config.max_plan_chars
-                            if len(plan_text) > max_pc:
-                                plan_text = plan_text[:max_pc] + "\n...[plan truncated]..."
-                            plan_block = (
-                                f"\n[SESSION PLAN file={plan_path.name}]\n"
-                                f"{plan_text}\n[/SESSION PLAN]\n"
-                            )
-                            rl = results[-1]
-                            results[-1] = ToolResult(
-                                rl.tool_call_id, rl.name,
-                                rl.content + plan_block, rl.is_error,
-                            )
-                except OSError:
-                    pass
+            results, final_answer = self._finalize_step_results(indexed_results, model, turn, step)
 
             model.append_tool_results(conversation, results)
 
@@ -574,10 +1191,7 @@ class RLMEngine:
             for r in results:
                 context.add(f"[depth {depth} step {step}]\n{r.content}")
 
-        return (
-            f"Step budget exhausted at depth {depth} for objective: {objective}\n"
-            "Please try with a more specific task, higher step budget, or deeper recursion."
-        )
+        return self._step_budget_exhausted(depth, objective)
 
     def _run_one_tool(
         self,
@@ -593,36 +1207,68 @@ class RLMEngine:
         replay_logger: ReplayLogger | None,
         parallel_group_id: str | None = None,
         parallel_owner: str | None = None,
+        branch: str = "root",
+        judge_batch: list[_PendingVerdict] | None = None,
     ) -> tuple[ToolResult, bool]:
         """Run a single tool call. Returns (ToolResult, is_final)."""
-        arg_summary = _summarize_args(tc.arguments)
-        self._emit(f"[d{depth}/s{step}] {tc.name}({arg_summary})", on_event)
+        self._emit_tool_start(tc, depth, step, on_event)
 
         t1 = time.monotonic()
-        scope_fn = getattr(self.tools, "execution_scope", None)
-        scope_cm = (
-            scope_fn(parallel_group_id, parallel_owner)
-            if callable(scope_fn) and parallel_group_id and parallel_owner
-            else nullcontext()
-        )
-        with scope_cm:
+        speculated = self._take_speculated(tc)
+        with self._tool_scope(parallel_group_id, parallel_owner):
             try:
-                is_final, observation = self._apply_tool_call(
-                    tool_call=tc,
-                    depth=depth,
-                    context=context,
-                    on_event=on_event,
-                    on_step=on_step,
-                    deadline=deadline,
-                    current_model=current_model,
-                    replay_logger=replay_logger,
-                    step=step,
-                )
+                if speculated is not None:
+                    is_final, observation = speculated.result()
+                else:
+                    is_final, observation = self._apply_tool_call(
+                        tool_call=tc,
+                        depth=depth,
+                        context=context,
+                        on_event=on_event,
+                        on_step=on_step,
+                        deadline=deadline,
+                        current_model=current_model,
+                        replay_logger=replay_logger,
+                        step=step,
+                        branch=branch,
+                        judge_batch=judge_batch,
+                    )
             except Exception as exc:
                 observation = f"Tool {tc.name} crashed: {type(exc).__name__}: {exc}"
                 is_final = False
+        self._memo_record(tc, branch)
+        return self._tool_result(
+            tc, depth, step, objective, observation, is_final,
+            time.monotonic() - t1, on_event, on_step,
+        )
+
+    def _emit_tool_start(
+        self, tc: ToolCall, depth: int, step: int, on_event: EventCallback | None,
+    ) -> None:
+        arg_summary = _summarize_args(tc.arguments)
+        self._emit(f"[d{depth}/s{step}] {tc.name}({arg_summary})", on_event)
+
+    def _tool_scope(self, parallel_group_id: str | None, parallel_owner: str | None):
+        """Return the parallel write-claim scope for a tool call (or a no-op)."""
+        scope_fn = getattr(self.tools, "execution_scope", None)
+        if callable(scope_fn) and parallel_group_id and parallel_owner:
+            return scope_fn(parallel_group_id, parallel_owner)
+        return nullcontext()
+
+    def _tool_result(
+        self,
+        tc: ToolCall,
+        depth: int,
+        step: int,
+        objective: str,
+        observation: str,
+        is_final: bool,
+        tool_elapsed: float,
+        on_event: EventCallback | None,
+        on_step: StepCallback | None,
+    ) -> tuple[ToolResult, bool]:
+        """Clip, report and wrap a finished tool observation."""
         observation = self._clip_observation(observation)
-        tool_elapsed = time.monotonic() - t1
 
         obs_summary = _summarize_observation(observation)
         self._emit(f"[d{depth}/s{step}]   -> {obs_summary} ({tool_elapsed:.1f}s)", on_event)
@@ -645,6 +1291,243 @@ class RLMEngine:
 
         return ToolResult(tc.id, tc.name, observation, is_error=False), is_final
 
+    def _plan_delegation(
+        self,
+        name: str,
+        args: dict[str, Any],
+        depth: int,
+        current_model: BaseModel | None,
+        branch: str = "root",
+    ) -> "_DelegationPlan | str":
+        """Validate a subtask/execute call and resolve its child model.
+
+        Returns a plan on success or an observation string explaining why the
+        delegation was rejected.
+        """
+        if name == "subtask":
+            if not self.config.recursive:
+                return "Subtask tool not available in flat mode."
+            if depth >= self.config.max_depth:
+                return "Max recursion depth reached; cannot run subtask."
+        objective = str(args.get("objective", "")).strip()
+        if not objective:
+            return f"{name} requires objective"
+        criteria = str(args.get("acceptance_criteria", "") or "").strip()
+        if self.config.acceptance_criteria and not criteria:
+            return (
+                f"{name} requires acceptance_criteria when acceptance criteria mode is enabled. "
+                "Provide specific, verifiable criteria for judging the result."
+            )
+        if name == "execute" and depth >= self.config.max_depth:
+            return "Max recursion depth reached; cannot run execute."
+
+        cur = current_model or self.model
+        cur_name = getattr(cur, "model", "")
+
+        if name == "subtask":
+            # Sub-model routing
+            requested_model_name = args.get("model")
+            requested_effort = args.get("reasoning_effort")
+            subtask_model: BaseModel | None = None
+
+            if (requested_model_name or requested_effort) and self.model_factory:
+                cur_effort = getattr(cur, "reasoning_effort", None)
+                cur_tier = _model_tier(cur_name, cur_effort)
+
+                req_name = requested_model_name or cur_name
+                req_effort = requested_effort
+                req_tier = _model_tier(req_name, req_effort or cur_effort)
+
+                if req_tier < cur_tier:
+                    return (
+                        f"Cannot delegate to higher-tier model "
+                        f"(current tier {cur_tier}, requested tier {req_tier}). "
+                        f"Use an equal or lower-tier model."
+                    )
+                subtask_model = self._cached_model(req_name, requested_effort)
+            return _DelegationPlan(
+                kind="Subtask", banner="entering subtask",
+                objective=objective, criteria=criteria, model=subtask_model,
+                depth=depth + 1, branch=branch,
+            )
+
+        # Resolve lowest-tier model for the executor.
+        exec_name, exec_effort = _lowest_tier_model(cur_name)
+        exec_model: BaseModel | None = None
+        if self.model_factory:
+            exec_model = self._cached_model(exec_name, exec_effort)
+
+        # Give executor full tools (no subtask, no execute), per call, since
+        # the cached or current model may be serving other branches.
+        return _DelegationPlan(
+            kind="Execute", banner="executing leaf",
+            objective=objective, criteria=criteria, model=exec_model or cur,
+            depth=depth + 1, branch=branch,
+            tool_set=ToolSet(include_subtask=False, include_acceptance_criteria=self.config.acceptance_criteria),
+        )
+
+    # ------------------------------------------------------------------
+    # Subtask memoization
+    # ------------------------------------------------------------------
+
+    def _memo(self) -> SubtaskMemo | None:
+        """The session's subtask memo, or ``None`` when memoization is off."""
+        if not self.config.memoize_subtasks or self.session_dir is None:
+            return None
+        directory = self.session_dir / "memo"
+        with self._lock:
+            if self._subtask_memo is None or self._subtask_memo.directory != directory:
+                self._subtask_memo = SubtaskMemo(
+                    workspace=self.tools.root,
+                    directory=directory,
+                    ttl_sec=self.config.subtask_memo_ttl_sec,
+                    file_index=getattr(self.tools, "_file_index", None),
+                )
+            return self._subtask_memo
+
+    def _memo_key(self, plan: "_DelegationPlan", current_model: BaseModel | None) -> str:
+        child = plan.model or current_model or self.model
+        tier = _model_tier(getattr(child, "model", ""), getattr(child, "reasoning_effort", None))
+        return SubtaskMemo.key(plan.kind, plan.objective, plan.criteria, tier, plan.depth)
+
+    def _memo_lookup(
+        self,
+        plan: "_DelegationPlan",
+        current_model: BaseModel | None,
+        on_event: EventCallback | None,
+    ) -> str | None:
+        memo = self._memo()
+        if memo is None:
+            return None
+        hit = memo.lookup(self._memo_key(plan, current_model))
+        if hit is None:
+            return None
+        observation, deps = hit
+        # Enclosing delegations depend on whatever the cached run read.
+        self._memo_record_deps(plan.branch, deps)
+        self._emit(f"[d{plan.depth - 1}] memo hit: {plan.objective}", on_event)
+        return f"[memoized: workspace inputs unchanged since the original run]\n{observation}"
+
+    def _memo_begin(self, plan: "_DelegationPlan") -> None:
+        if self._memo() is None:
+            return
+        with self._lock:
+            self._memo_frames[plan.branch] = MemoDeps()
+
+    def _memo_end(self, plan: "_DelegationPlan") -> MemoDeps | None:
+        with self._lock:
+            return self._memo_frames.pop(plan.branch, None)
+
+    def _memo_store(
+        self,
+        plan: "_DelegationPlan",
+        current_model: BaseModel | None,
+        child_result: str,
+        observation: str,
+        deps: MemoDeps | None,
+    ) -> None:
+        memo = self._memo()
+        if memo is None or deps is None or not is_cacheable_result(child_result):
+            return
+        if "[ACCEPTANCE CRITERIA: FAIL]" in observation:
+            return
+        memo.store(self._memo_key(plan, current_model), observation, deps)
+
+    def _memo_record(self, tc: ToolCall, branch: str) -> None:
+        """Attribute one tool call's workspace inputs to the delegations enclosing *branch*."""
+        if not self._memo_frames:
+            return
+        deps = MemoDeps()
+        side_effect = tool_side_effect(tc.name)
+        if side_effect in (WORKSPACE_WRITE, PROCESS):
+            deps.cacheable = False
+        elif tc.name == "read_file":
+            try:
+                deps.files.add(self.tools._resolve_path(str(tc.arguments.get("path", ""))))
+            except Exception:
+                deps.cacheable = False
+        elif side_effect == READ_ONLY and tc.name in ("list_files", "search_files", "repo_map", "profile_dataset", "query_dataset"):
+            deps.workspace = True
+        self._memo_record_deps(branch, deps)
+
+    def _memo_record_deps(self, branch: str, deps: MemoDeps) -> None:
+        with self._lock:
+            for frame_branch, frame in self._memo_frames.items():
+                if branch.startswith(frame_branch + "/"):
+                    frame.merge(deps)
+
+    def _cached_model(self, model_name: str, reasoning_effort: str | None) -> BaseModel:
+        assert self.model_factory is not None
+        cache_key = (model_name, reasoning_effort)
+        with self._lock:
+            if cache_key not in self._model_cache:
+                self._model_cache[cache_key] = self.model_factory(model_name, reasoning_effort)
+            return self._model_cache[cache_key]
+
+    def _delegation_observation(
+        self,
+        plan: "_DelegationPlan",
+        child_result: str,
+        current_model: BaseModel | None,
+    ) -> str:
+        observation = f"{plan.kind} result for '{plan.objective}':\n{child_result}"
+        if plan.criteria and self.config.acceptance_criteria:
+            verdict = self._judge_result(
+                plan.objective, plan.criteria, child_result, current_model,
+                depth=plan.depth, branch=plan.branch,
+            )
+            observation += _verdict_suffix(verdict)
+        return observation
+
+    def _defer_verdict(
+        self,
+        judge_batch: list[_PendingVerdict] | None,
+        plan: "_DelegationPlan",
+        child_result: str,
+        current_model: BaseModel | None,
+        deps: MemoDeps | None,
+    ) -> str | None:
+        """Queue *plan*'s verdict on *judge_batch*; returns the unjudged observation, or ``None``."""
+        if judge_batch is None or not (plan.criteria and self.config.acceptance_criteria):
+            return None
+        observation = f"{plan.kind} result for '{plan.objective}':\n{child_result}"
+        with self._lock:
+            judge_batch.append(_PendingVerdict(plan, child_result, observation, current_model, deps))
+        return observation
+
+    def _judge_batch_enabled(self, parallel: list[tuple[int, ToolCall]]) -> bool:
+        return self.config.batch_judging and self.config.acceptance_criteria and len(parallel) > 1
+
+    def _settle_verdicts(
+        self,
+        pending: list[_PendingVerdict],
+        indexed_results: dict[int, tuple[ToolResult, bool]],
+        branch: str,
+        step: int,
+        depth: int,
+        current_model: BaseModel | None,
+    ) -> None:
+        """Judge a parallel group's deferred results together and append each verdict."""
+        if not pending:
+            return
+        prefix = f"{branch}/s{step}."
+        # Present items in tool-call order, not completion order.
+        ordered = sorted(
+            ((int(p.plan.branch[len(prefix):]), p) for p in pending), key=lambda item: item[0],
+        )
+        verdicts = self._judge_results(
+            [(p.plan.objective, p.plan.criteria, p.child_result) for _idx, p in ordered],
+            current_model, depth=depth + 1, branch=f"{branch}/s{step}",
+        )
+        for (idx, p), verdict in zip(ordered, verdicts):
+            suffix = _verdict_suffix(verdict)
+            result, is_final = indexed_results[idx]
+            indexed_results[idx] = (
+                ToolResult(result.tool_call_id, result.name, result.content + suffix, result.is_error),
+                is_final,
+            )
+            self._memo_store(p.plan, p.current_model, p.child_result, p.observation + suffix, p.deps)
+
     def _apply_tool_call(
         self,
         tool_call: ToolCall,
@@ -656,6 +1539,8 @@ class RLMEngine:
         current_model: BaseModel | None = None,
         replay_logger: ReplayLogger | None = None,
         step: int = 0,
+        branch: str = "root",
+        judge_batch: list[_PendingVerdict] | None = None,
     ) -> tuple[bool, str]:
         name = tool_call.name
         args = tool_call.arguments
@@ -684,6 +1569,24 @@ class RLMEngine:
             max_files = raw_max_files if isinstance(raw_max_files, int) else 200
             return False, self.tools.repo_map(glob=str(glob) if glob else None, max_files=max_files)
 
+        if name == "profile_dataset":
+            paths = args.get("paths")
+            if isinstance(paths, str):
+                paths = [paths]
+            if not isinstance(paths, list):
+                return False, "profile_dataset requires a list of paths"
+            raw_max_rows = args.get("max_rows")
+            max_rows = raw_max_rows if isinstance(raw_max_rows, int) else None
+            return False, self.tools.profile_dataset([str(p) for p in paths if isinstance(p, str)], max_rows=max_rows)
+
+        if name == "query_dataset":
+            sql = str(args.get("sql", "")).strip()
+            if not sql:
+                return False, "query_dataset requires non-empty sql"
+            raw_max_rows = args.get("max_rows", 200)
+            max_rows = raw_max_rows if isinstance(raw_max_rows, int) else 200
+            return False, self.tools.query_dataset(sql, max_rows=max_rows)
+
         if name == "web_search":
             query = str(args.get("query", "")).strip()
             if not query:
@@ -710,7 +1613,14 @@ class RLMEngine:
                 return False, "read_file requires path"
             hashline = args.get("hashline")
             hashline = hashline if hashline is not None else True
-            return False, self.tools.read_file(path, hashline=hashline)
+            window: dict[str, int | None] = {}
+            for key in ("offset", "limit", "byte_offset", "byte_limit"):
+                raw = args.get(key)
+                try:
+                    window[key] = int(raw) if raw is not None else None
+                except (TypeError, ValueError):
+                    return False, f"read_file {key} must be an integer"
+            return False, self.tools.read_file(path, hashline=hashline, **window)
 
         if name == "write_file":
             path = str(args.get("path", "")).strip()
@@ -770,127 +1680,37 @@ class RLMEngine:
                 return False, "kill_shell_bg requires job_id"
             return False, self.tools.kill_shell_bg(int(raw_id))
 
-        if name == "subtask":
-            if not self.config.recursive:
-                return False, "Subtask tool not available in flat mode."
-            if depth >= self.config.max_depth:
-                return False, "Max recursion depth reached; cannot run subtask."
-            objective = str(args.get("objective", "")).strip()
-            if not objective:
-                return False, "subtask requires objective"
-            criteria = str(args.get("acceptance_criteria", "") or "").strip()
-            if self.config.acceptance_criteria and not criteria:
-                return False, (
-                    "subtask requires acceptance_criteria when acceptance criteria mode is enabled. "
-                    "Provide specific, verifiable criteria for judging the result."
-                )
-
-            # Sub-model routing
-            requested_model_name = args.get("model")
-            requested_effort = args.get("reasoning_effort")
-            subtask_model: BaseModel | None = None
-
-            if (requested_model_name or requested_effort) and self.model_factory:
-                cur = current_model or self.model
-                cur_name = getattr(cur, "model", "")
-                cur_effort = getattr(cur, "reasoning_effort", None)
-                cur_tier = _model_tier(cur_name, cur_effort)
-
-                req_name = requested_model_name or cur_name
-                req_effort = requested_effort
-                req_tier = _model_tier(req_name, req_effort or cur_effort)
-
-                if req_tier < cur_tier:
-                    return False, (
-                        f"Cannot delegate to higher-tier model "
-                        f"(current tier {cur_tier}, requested tier {req_tier}). "
-                        f"Use an equal or lower-tier model."
-                    )
-
-                cache_key = (req_name, requested_effort)
-                with self._lock:
-                    if cache_key not in self._model_cache:
-                        self._model_cache[cache_key] = self.model_factory(req_name, requested_effort)
-                    subtask_model = self._model_cache[cache_key]
-
-            self._emit(f"[d{depth}] >> entering subtask: {objective}", on_event)
+        if name in _PARALLEL_TOOLS:
+            plan = self._plan_delegation(name, args, depth, current_model, branch)
+            if isinstance(plan, str):
+                return False, plan
+            cached = self._memo_lookup(plan, current_model, on_event)
+            if cached is not None:
+                return False, cached
+            self._emit(f"[d{depth}] >> {plan.banner}: {plan.objective}", on_event)
             child_logger = replay_logger.child(depth, step) if replay_logger else None
-            subtask_result = self._solve_recursive(
-                objective=objective,
-                depth=depth + 1,
-                context=context,
-                on_event=on_event,
-                on_step=on_step,
-                on_content_delta=None,
-                deadline=deadline,
-                model_override=subtask_model,
-                replay_logger=child_logger,
-            )
-            observation = f"Subtask result for '{objective}':\n{subtask_result}"
-
-            if criteria and self.config.acceptance_criteria:
-                verdict = self._judge_result(objective, criteria, subtask_result, current_model)
-                tag = "PASS" if verdict.startswith("PASS") else "FAIL"
-                observation += f"\n\n[ACCEPTANCE CRITERIA: {tag}]\n{verdict}"
-
-            return False, observation
-
-        if name == "execute":
-            objective = str(args.get("objective", "")).strip()
-            if not objective:
-                return False, "execute requires objective"
-            criteria = str(args.get("acceptance_criteria", "") or "").strip()
-            if self.config.acceptance_criteria and not criteria:
-                return False, (
-                    "execute requires acceptance_criteria when acceptance criteria mode is enabled. "
-                    "Provide specific, verifiable criteria for judging the result."
+            self._memo_begin(plan)
+            try:
+                child_result = self._solve_recursive(
+                    objective=plan.objective,
+                    depth=depth + 1,
+                    context=context,
+                    on_event=on_event,
+                    on_step=on_step,
+                    on_content_delta=None,
+                    deadline=deadline,
+                    model_override=plan.model,
+                    replay_logger=child_logger,
+                    branch=plan.branch,
+                    tool_set=plan.tool_set,
                 )
-            if depth >= self.config.max_depth:
-                return False, "Max recursion depth reached; cannot run execute."
-
-            # Resolve lowest-tier model for the executor.
-            cur = current_model or self.model
-            cur_name = getattr(cur, "model", "")
-            exec_name, exec_effort = _lowest_tier_model(cur_name)
-
-            exec_model: BaseModel | None = None
-            if self.model_factory:
-                cache_key = (exec_name, exec_effort)
-                with self._lock:
-                    if cache_key not in self._model_cache:
-                        self._model_cache[cache_key] = self.model_factory(exec_name, exec_effort)
-                    exec_model = self._model_cache[cache_key]
-
-            # Give executor full tools (no subtask, no execute).
-            _saved_defs = None
-            if exec_model and hasattr(exec_model, "tool_defs"):
-                exec_model.tool_defs = get_tool_definitions(include_subtask=False, include_acceptance_criteria=self.config.acceptance_criteria)
-            elif exec_model is None and hasattr(cur, "tool_defs"):
-                _saved_defs = cur.tool_defs
-                cur.tool_defs = get_tool_definitions(include_subtask=False, include_acceptance_criteria=self.config.acceptance_criteria)
-
-            self._emit(f"[d{depth}] >> executing leaf: {objective}", on_event)
-            child_logger = replay_logger.child(depth, step) if replay_logger else None
-            exec_result = self._solve_recursive(
-                objective=objective,
-                depth=depth + 1,
-                context=context,
-                on_event=on_event,
-                on_step=on_step,
-                on_content_delta=None,
-                deadline=deadline,
-                model_override=exec_model,
-                replay_logger=child_logger,
-            )
-            if _saved_defs is not None:
-                cur.tool_defs = _saved_defs
-            observation = f"Execute result for '{objective}':\n{exec_result}"
-
-            if criteria and self.config.acceptance_criteria:
-                verdict = self._judge_result(objective, criteria, exec_result, current_model)
-                tag = "PASS" if verdict.startswith("PASS") else "FAIL"
-                observation += f"\n\n[ACCEPTANCE CRITERIA: {tag}]\n{verdict}"
-
+            finally:
+                deps = self._memo_end(plan)
+            deferred = self._defer_verdict(judge_batch, plan, child_result, current_model, deps)
+            if deferred is not None:
+                return False, deferred
+            observation = self._delegation_observation(plan, child_result, current_model)
+            self._memo_store(plan, current_model, child_result, observation, deps)
             return False, observation
 
         if name == "list_artifacts":
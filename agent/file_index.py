@@ -0,0 +1,471 @@
+"""Persistent, incrementally refreshed index of every file in a workspace.
+
+:class:`FileIndex` keeps one SQLite database (under ``.openplanter/index/``)
+with a row per file (path, size, mtime, inode and a lazily computed content
+hash) and per directory (mtime).  A refresh stats every known directory and
+rescans only those whose mtime changed: adding, removing or renaming an entry
+changes its directory's mtime, so listings stay exact without walking the
+whole tree.  In-place content edits do not touch the directory, which is why
+:meth:`FileIndex.stat` and :meth:`FileIndex.content_hash` re-check the single
+file they are asked about, and why ``refresh(restat_files=True)`` re-stats
+every indexed file once (after shell commands, which may edit anything).
+
+There is no entry cap: million-file dataset trees are indexed completely on
+the first refresh and cheaply kept current afterwards.
+
+Like ``rg --files``, the index skips what ``.ignore``/``.rgignore`` files
+ignore, plus -- inside a git repository only, as rg requires --
+``.gitignore`` files and ``.git/info/exclude``; ignored directories are
+never entered.  Ignore files are re-stat'ed on every refresh, and any
+change to them re-evaluates every directory.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+from .ignore import IGNORE_FILE_NAMES, IgnoreRule, is_ignored, parse_ignore
+
+# Directory mtimes this recent may still change within the same clock tick;
+# such directories are rescanned on the next refresh.
+_RACY_WINDOW_SEC = 2.0
+_HASH_CHUNK = 1 << 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    hash TEXT
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files(dir);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+@dataclass(frozen=True)
+class FileEntry:
+    path: str
+    size: int
+    mtime_ns: int
+    inode: int
+    hash: str | None = None
+
+
+def _join(parent: str, name: str) -> str:
+    return f"{parent}/{name}" if parent else name
+
+
+def _sql_glob(glob: str) -> tuple[str, list[str]]:
+    """(column, SQLite GLOB patterns, any of which may match) for an rg-style glob.
+
+    Globs without a slash match the file name at any depth, as with
+    ``rg -g``; others match the workspace-relative path, with a leading
+    ``**/`` allowing any (or no) directory prefix.
+    """
+    pattern = glob.strip().lstrip("/")
+    anywhere = False
+    while pattern.startswith("**/"):
+        pattern = pattern[3:]
+        anywhere = True
+    pattern = pattern.replace("**", "*").replace("[!", "[^")
+    if "/" not in pattern:
+        return "name", [pattern]
+    return "path", [pattern, "*/" + pattern] if anywhere else [pattern]
+
+
+def _glob_where(glob: str) -> tuple[str, tuple[str, ...]]:
+    column, patterns = _sql_glob(glob)
+    return " OR ".join(f"{column} GLOB ?" for _ in patterns), tuple(patterns)
+
+
+class FileIndex:
+    """SQLite-backed file index for one workspace root; safe to share between threads."""
+
+    def __init__(
+        self,
+        root: Path,
+        db_path: Path,
+        exclude: Iterable[str] = (".git",),
+        ignore_files: Iterable[str] = IGNORE_FILE_NAMES,
+    ) -> None:
+        self.root = Path(root).resolve()
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Relative paths of directories never indexed (plus the index's own directory).
+        excluded = set(exclude)
+        try:
+            excluded.add(self.db_path.parent.resolve().relative_to(self.root).as_posix())
+        except ValueError:
+            pass
+        self._exclude = frozenset(excluded)
+        self._ignore_names = tuple(ignore_files)
+        # Directory -> rules of the ignore files in it (loaded on demand).
+        self._rules: dict[str, list[IgnoreRule]] = {}
+        self._root_in_git = self._find_git()
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # A fresh epoch per database keeps generations from a deleted index from repeating.
+        self._conn.execute("INSERT OR IGNORE INTO meta(key, value) VALUES ('epoch', ?)", (os.urandom(8).hex(),))
+        self.last_refresh: dict[str, int] = {}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # -- refresh -------------------------------------------------------------
+
+    def _excluded(self, rel: str, name: str) -> bool:
+        return name in self._exclude or rel in self._exclude
+
+    def refresh(self, restat_files: bool = False) -> dict[str, int]:
+        """Bring the index up to date; returns counts of work done.
+
+        ``restat_files`` also re-stats every indexed file, catching in-place
+        edits that left their directory's mtime alone.
+        """
+        stats = {"dirs_checked": 0, "dirs_scanned": 0, "added": 0, "removed": 0, "updated": 0}
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                before = self._conn.execute("SELECT value FROM meta WHERE key = 'ignore'").fetchone()
+                fresh = self._conn.execute("SELECT 1 FROM dirs LIMIT 1").fetchone() is None
+                self._refresh_pass(stats)
+                fingerprint = self._ignore_fingerprint()
+                if before is None or before[0] != fingerprint:
+                    if not fresh:
+                        # Ignore rules changed (or predate this index): re-evaluate every directory.
+                        self._rules.clear()
+                        self._conn.execute("UPDATE dirs SET mtime_ns = -1")
+                        self._refresh_pass(stats)
+                        fingerprint = self._ignore_fingerprint()
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO meta(key, value) VALUES ('ignore', ?)", (fingerprint,),
+                    )
+                if restat_files and not fresh:
+                    self._restat_rows(stats)
+                if stats["added"] or stats["removed"] or stats["updated"]:
+                    self._bump_generation()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        self.last_refresh = stats
+        return stats
+
+    def _refresh_pass(self, stats: dict[str, int]) -> None:
+        known = {row[0]: (row[1], row[2]) for row in self._conn.execute("SELECT path, parent, mtime_ns FROM dirs")}
+        children: dict[str, list[str]] = {}
+        for path, (parent, _) in known.items():
+            if parent is not None:
+                children.setdefault(parent, []).append(path)
+        stack = [""]
+        while stack:
+            rel = stack.pop()
+            stats["dirs_checked"] += 1
+            try:
+                st = os.stat(self.root / rel if rel else self.root)
+            except OSError:
+                self._drop_dir(rel, stats)
+                continue
+            previous = known.get(rel)
+            if previous is not None and previous[1] == st.st_mtime_ns:
+                stack.extend(children.get(rel, ()))
+                continue
+            stats["dirs_scanned"] += 1
+            subdirs = self._scan_dir(rel, st.st_mtime_ns, stats)
+            for gone in set(children.get(rel, ())) - set(subdirs):
+                self._drop_dir(gone, stats)
+            stack.extend(subdirs)
+
+    def _restat_rows(self, stats: dict[str, int]) -> None:
+        updates = []
+        removed = []
+        for path, size, mtime_ns, inode in self._conn.execute("SELECT path, size, mtime_ns, inode FROM files").fetchall():
+            try:
+                st = os.stat(self.root / path, follow_symlinks=False)
+            except OSError:
+                removed.append((path,))
+                continue
+            current = (st.st_size, st.st_mtime_ns, st.st_ino)
+            if current != (size, mtime_ns, inode):
+                updates.append((*current, path))
+        self._conn.executemany("UPDATE files SET size = ?, mtime_ns = ?, inode = ?, hash = NULL WHERE path = ?", updates)
+        self._conn.executemany("DELETE FROM files WHERE path = ?", removed)
+        stats["updated"] += len(updates)
+        stats["removed"] += len(removed)
+
+    def _bump_generation(self) -> None:
+        self._conn.execute(
+            "INSERT INTO meta(key, value) VALUES ('generation', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def generation(self) -> str:
+        """Token that changes whenever a refresh or :meth:`update_paths` changes any row.
+
+        In-place edits that no refresh has seen (see the module docstring)
+        do not change it; use :meth:`stat`/:meth:`content_hash` for those.
+        """
+        with self._lock:
+            rows = dict(self._conn.execute("SELECT key, value FROM meta WHERE key IN ('epoch', 'generation')"))
+        return f"{rows.get('epoch', '')}:{rows.get('generation', '0')}"
+
+    # -- ignore rules --------------------------------------------------------
+
+    def _in_git(self, rel: str) -> bool:
+        """Whether directory *rel* is inside a git repository (rg only reads ``.gitignore`` there)."""
+        if self._root_in_git:
+            return True
+        parts = rel.split("/") if rel else []
+        return any((self.root.joinpath(*parts[:i]) / ".git").exists() for i in range(1, len(parts) + 1))
+
+    def _ignore_sources(self, rel: str) -> list[Path]:
+        base = self.root / rel if rel else self.root
+        names = self._ignore_names
+        if ".gitignore" in names and not self._in_git(rel):
+            names = tuple(name for name in names if name != ".gitignore")
+        sources = [base / name for name in names]
+        if not rel and self._ignore_names and (self.root / ".git").is_dir():
+            # Lowest precedence, as in git.
+            sources.insert(0, self.root / ".git" / "info" / "exclude")
+        return sources
+
+    def _dir_rules(self, rel: str) -> list[IgnoreRule]:
+        rules = self._rules.get(rel)
+        if rules is None:
+            rules = []
+            for source in self._ignore_sources(rel):
+                try:
+                    rules.extend(parse_ignore(source.read_text(encoding="utf-8", errors="replace")))
+                except OSError:
+                    continue
+            self._rules[rel] = rules
+        return rules
+
+    def _chain(self, rel: str) -> list[tuple[str, list[IgnoreRule]]]:
+        """Rules applying inside directory *rel*, outermost directory first."""
+        parts = rel.split("/") if rel else []
+        chain = []
+        for i in range(len(parts) + 1):
+            base = "/".join(parts[:i])
+            rules = self._dir_rules(base)
+            if rules:
+                chain.append((base, rules))
+        return chain
+
+    def _ignored(self, chain: list[tuple[str, list[IgnoreRule]]], rel: str, name: str, is_dir: bool) -> bool:
+        # Ignore files themselves stay indexed so that edits to them are noticed.
+        return bool(chain) and name not in self._ignore_names and is_ignored(chain, rel, is_dir)
+
+    def _find_git(self) -> bool:
+        return any((directory / ".git").exists() for directory in (self.root, *self.root.parents))
+
+    def _ignore_fingerprint(self) -> str:
+        """Signature of every ignore file in effect (size and mtime) and of the git layout."""
+        if not self._ignore_names:
+            return ""
+        self._root_in_git = self._find_git()
+        marks = ",".join("?" * len(self._ignore_names))
+        rows = self._conn.execute(f"SELECT path FROM files WHERE name IN ({marks})", self._ignore_names)
+        records = []
+        for path in sorted([row[0] for row in rows] + [".git/info/exclude"]):
+            try:
+                st = os.stat(self.root / path)
+            except OSError:
+                continue
+            records.append(f"{path}\0{st.st_size}\0{st.st_mtime_ns}")
+        records.append(f"git\0{self._root_in_git}")
+        return hashlib.blake2b("\n".join(records).encode("utf-8", "surrogateescape"), digest_size=16).hexdigest()
+
+    def _scan_dir(self, rel: str, mtime_ns: int, stats: dict[str, int]) -> list[str]:
+        """Diff one directory's files against the index; returns its subdirectories."""
+        base = self.root / rel if rel else self.root
+        subdirs: list[str] = []
+        seen: dict[str, os.stat_result] = {}
+        # The directory changed, so its own ignore files may have too.
+        self._rules.pop(rel, None)
+        chain = self._chain(rel)
+        try:
+            with os.scandir(base) as it:
+                for entry in it:
+                    child = _join(rel, entry.name)
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        if self._ignored(chain, child, entry.name, is_dir):
+                            continue
+                        if is_dir:
+                            if not self._excluded(child, entry.name):
+                                subdirs.append(child)
+                            continue
+                        seen[entry.name] = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+        except OSError:
+            return []
+        indexed = {
+            row[0]: (row[1], row[2], row[3])
+            for row in self._conn.execute("SELECT name, size, mtime_ns, inode FROM files WHERE dir = ?", (rel,))
+        }
+        upserts = []
+        for name, st in seen.items():
+            current = (st.st_size, st.st_mtime_ns, st.st_ino)
+            before = indexed.get(name)
+            if before == current:
+                continue
+            stats["added" if before is None else "updated"] += 1
+            upserts.append((_join(rel, name), rel, name, *current))
+        removed = [(_join(rel, name),) for name in indexed.keys() - seen.keys()]
+        stats["removed"] += len(removed)
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO files(path, dir, name, size, mtime_ns, inode, hash) VALUES (?, ?, ?, ?, ?, ?, NULL)",
+            upserts,
+        )
+        self._conn.executemany("DELETE FROM files WHERE path = ?", removed)
+        # A directory modified just now may change again within the same tick.
+        recorded = mtime_ns if time.time() - mtime_ns / 1e9 >= _RACY_WINDOW_SEC else -1
+        parent = None if not rel else (rel.rsplit("/", 1)[0] if "/" in rel else "")
+        self._conn.execute(
+            "INSERT OR REPLACE INTO dirs(path, parent, mtime_ns) VALUES (?, ?, ?)", (rel, parent, recorded),
+        )
+        return subdirs
+
+    def _drop_dir(self, rel: str, stats: dict[str, int]) -> None:
+        like = _escape_like(rel) + "/%"
+        cur = self._conn.execute("DELETE FROM files WHERE dir = ? OR dir LIKE ? ESCAPE '\\'", (rel, like))
+        stats["removed"] += max(cur.rowcount, 0)
+        self._conn.execute("DELETE FROM dirs WHERE path = ? OR path LIKE ? ESCAPE '\\'", (rel, like))
+
+    def update_paths(self, paths: Iterable[Path | str]) -> None:
+        """Re-stat specific files (e.g. just written by a tool) without a refresh."""
+        with self._lock:
+            for raw in paths:
+                rel = self._relative(raw)
+                if rel is None:
+                    continue
+                self._restat(rel)
+
+    def _relative(self, raw: Path | str) -> str | None:
+        path = Path(raw)
+        if path.is_absolute():
+            try:
+                path = path.relative_to(self.root)
+            except ValueError:
+                return None
+        rel = path.as_posix()
+        return None if rel in ("", ".") else rel
+
+    def _restat(self, rel: str) -> FileEntry | None:
+        """Sync one file's row with the filesystem; returns the current entry."""
+        try:
+            st = os.stat(self.root / rel, follow_symlinks=False)
+        except OSError:
+            if self._conn.execute("DELETE FROM files WHERE path = ?", (rel,)).rowcount > 0:
+                self._bump_generation()
+            return None
+        row = self._conn.execute("SELECT size, mtime_ns, inode, hash FROM files WHERE path = ?", (rel,)).fetchone()
+        current = (st.st_size, st.st_mtime_ns, st.st_ino)
+        if row is not None and tuple(row[:3]) == current:
+            return FileEntry(rel, *current, hash=row[3])
+        directory, _, name = rel.rpartition("/")
+        parts = rel.split("/")[:-1]
+        if any(p in self._exclude or "/".join(parts[: i + 1]) in self._exclude for i, p in enumerate(parts)):
+            return None
+        for i, part in enumerate(rel.split("/")):
+            prefix = "/".join(parts[:i])
+            if self._ignored(self._chain(prefix), _join(prefix, part), part, i < len(parts)):
+                return None
+        self._conn.execute(
+            "INSERT OR REPLACE INTO files(path, dir, name, size, mtime_ns, inode, hash) VALUES (?, ?, ?, ?, ?, ?, NULL)",
+            (rel, directory, name, *current),
+        )
+        self._bump_generation()
+        return FileEntry(rel, *current)
+
+    # -- queries -------------------------------------------------------------
+
+    def paths(self, glob: str | None = None) -> list[str]:
+        """Sorted workspace-relative paths, optionally filtered by an rg-style glob."""
+        with self._lock:
+            if not glob:
+                rows = self._conn.execute("SELECT path FROM files ORDER BY path")
+            else:
+                where, args = _glob_where(glob)
+                rows = self._conn.execute(f"SELECT path FROM files WHERE {where} ORDER BY path", args)
+            return [row[0] for row in rows]
+
+    def entries(self, glob: str | None = None) -> list[FileEntry]:
+        with self._lock:
+            sql = "SELECT path, size, mtime_ns, inode, hash FROM files"
+            args: tuple[str, ...] = ()
+            if glob:
+                where, args = _glob_where(glob)
+                sql += f" WHERE {where}"
+            return [FileEntry(*row) for row in self._conn.execute(sql + " ORDER BY path", args)]
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0])
+
+    def stat(self, path: Path | str) -> FileEntry | None:
+        """Current entry for *path*, re-checked against the filesystem."""
+        rel = self._relative(path)
+        if rel is None:
+            return None
+        with self._lock:
+            return self._restat(rel)
+
+    def content_hash(self, path: Path | str) -> str | None:
+        """BLAKE2b of the file's content, computed on first use and kept until it changes."""
+        entry = self.stat(path)
+        if entry is None:
+            return None
+        if entry.hash:
+            return entry.hash
+        digest = hashlib.blake2b(digest_size=16)
+        try:
+            with open(self.root / entry.path, "rb") as fh:
+                for chunk in iter(lambda: fh.read(_HASH_CHUNK), b""):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        value = digest.hexdigest()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE files SET hash = ? WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ?",
+                (value, entry.path, entry.size, entry.mtime_ns, entry.inode),
+            )
+        return value
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def glob_matches(path: str, glob: str) -> bool:
+    """Python equivalent of the index's glob filter, for paths not from the index."""
+    column, patterns = _sql_glob(glob)
+    target = path if column == "path" else path.rsplit("/", 1)[-1]
+    return any(fnmatch.fnmatchcase(target, p.replace("[^", "[!")) for p in patterns)
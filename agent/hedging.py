@@ -0,0 +1,275 @@
+"""Hedged model calls: race a secondary model when the primary runs late.
+
+:class:`HedgedModel` wraps a primary and a secondary ``BaseModel``.  Each
+``complete()`` starts on the primary; if no response byte has arrived once
+the primary provider's recent time-to-first-byte percentile has elapsed
+(clamped to ``[min_delay, max_delay]``, ``initial_delay`` until enough
+samples exist), the same conversation is sent to the secondary as well.
+Whichever finishes first wins and the other is cancelled through
+``CallOptions.cancel``.  A primary that fails outright fails over to the
+secondary at once.
+
+Both conversations are kept in step: the winning turn is appended to each,
+re-encoded when the two models use different wire formats.  Streaming
+callbacks are forwarded from whichever leg starts streaming first only.
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import json
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from .model import (
+    AnthropicModel,
+    BaseModel,
+    CallOptions,
+    Conversation,
+    ModelCancelled,
+    ModelError,
+    ModelTurn,
+    OpenAICompatibleModel,
+    ToolResult,
+)
+from .ratelimit import LatencyTracker, latency_for
+from .tool_defs import ToolSet
+
+_PRIMARY, _SECONDARY = 0, 1
+# Anthropic rejects assistant messages with no content blocks.
+_EMPTY_TURN_TEXT = "(no content)"
+
+
+@dataclass
+class _HedgedConversation(Conversation):
+    legs: list[Conversation] = field(default_factory=list)
+    # Leg whose turn was returned last; its raw response needs no re-encoding.
+    winner: int = _PRIMARY
+
+
+class _Race:
+    """Shared state of one hedged ``complete()`` call."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.results: queue.Queue[tuple[int, ModelTurn | None, Exception | None]] = queue.Queue()
+        self.progress = threading.Event()
+        self.cancels = [threading.Event(), threading.Event()]
+        self.streamer: int | None = None
+
+    def claims(self, leg: int) -> bool:
+        """True if *leg* may forward streaming callbacks (the first leg to stream wins)."""
+        with self.lock:
+            if self.streamer is None:
+                self.streamer = leg
+            return self.streamer == leg
+
+
+def _gated(race: _Race, leg: int, callback: Callable[..., None] | None) -> Callable[..., None] | None:
+    if callback is None:
+        return None
+
+    def forward(*args: Any) -> None:
+        if race.claims(leg):
+            callback(*args)
+
+    return forward
+
+
+def _wire_format(model: Any) -> str:
+    if isinstance(model, AnthropicModel):
+        return "anthropic"
+    if isinstance(model, OpenAICompatibleModel):
+        return "openai"
+    return type(model).__name__
+
+
+def _reencode(turn: ModelTurn, target: Any) -> ModelTurn:
+    """*turn* with ``raw_response`` rebuilt for *target*'s wire format (text and tool calls only)."""
+    fmt = _wire_format(target)
+    if fmt == "anthropic":
+        blocks: list[dict[str, Any]] = [{"type": "text", "text": turn.text}] if turn.text else []
+        blocks += [{"type": "tool_use", "id": tc.id, "name": tc.name, "input": tc.arguments} for tc in turn.tool_calls]
+        if not blocks:
+            blocks = [{"type": "text", "text": _EMPTY_TURN_TEXT}]
+        return dataclasses.replace(turn, raw_response=blocks)
+    if fmt == "openai":
+        message: dict[str, Any] = {"role": "assistant", "content": turn.text}
+        if turn.tool_calls:
+            message["tool_calls"] = [
+                {"id": tc.id, "type": "function", "function": {"name": tc.name, "arguments": json.dumps(tc.arguments)}}
+                for tc in turn.tool_calls
+            ]
+        return dataclasses.replace(turn, raw_response=message)
+    return turn
+
+
+@dataclass
+class HedgedModel:
+    """``BaseModel`` that hedges slow primary calls with a secondary model."""
+
+    primary: BaseModel
+    secondary: BaseModel
+    percentile: float = 0.95
+    min_delay: float = 2.0
+    max_delay: float = 30.0
+    # Hedge delay used until the primary provider has ``min_samples`` latency samples.
+    initial_delay: float = 10.0
+    min_samples: int = 10
+    calls: int = 0
+    hedged: int = 0
+    failovers: int = 0
+    wins: list[int] = field(default_factory=lambda: [0, 0])
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __getattr__(self, name: str) -> Any:
+        # Model metadata (model name, base_url, reasoning_effort, ...) comes from the primary.
+        if name.startswith("_") or name in ("primary", "secondary"):
+            raise AttributeError(name)
+        return getattr(self.primary, name)
+
+    @property
+    def tool_set(self) -> ToolSet | None:
+        return getattr(self.primary, "tool_set", None)
+
+    @tool_set.setter
+    def tool_set(self, value: ToolSet | None) -> None:
+        # Both legs must offer the same tools, or a secondary win could call a tool the root may not use.
+        for leg in self._legs():
+            if hasattr(leg, "tool_set"):
+                leg.tool_set = value
+
+    def _legs(self) -> tuple[BaseModel, BaseModel]:
+        return self.primary, self.secondary
+
+    def _tracker(self) -> LatencyTracker:
+        return latency_for(str(getattr(self.primary, "base_url", "") or type(self.primary).__name__))
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the primary's first byte before hedging."""
+        tracker = self._tracker()
+        if tracker.samples() < self.min_samples:
+            return self.initial_delay
+        observed = tracker.percentile(self.percentile) or self.initial_delay
+        return min(self.max_delay, max(self.min_delay, observed))
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            result: dict[str, Any] = {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "failovers": self.failovers,
+                "primary_wins": self.wins[_PRIMARY],
+                "secondary_wins": self.wins[_SECONDARY],
+            }
+        result["primary_latency"] = self._tracker().stats()
+        return result
+
+    def create_conversation(self, system_prompt: str, initial_user_message: str) -> Conversation:
+        legs = [model.create_conversation(system_prompt, initial_user_message) for model in self._legs()]
+        return _HedgedConversation(
+            _provider_messages=legs[_PRIMARY]._provider_messages,
+            system_prompt=system_prompt,
+            legs=legs,
+        )
+
+    def complete(self, conversation: Conversation, options: CallOptions | None = None) -> ModelTurn:
+        assert isinstance(conversation, _HedgedConversation)
+        options = options or CallOptions()
+        for leg in conversation.legs:
+            leg.stop_sequences = conversation.stop_sequences
+        race = _Race()
+        with self._lock:
+            self.calls += 1
+        self._start(race, _PRIMARY, conversation, options)
+        started = 1
+        if not race.progress.wait(self.hedge_delay()):
+            self._start(race, _SECONDARY, conversation, options)
+            started = 2
+            with self._lock:
+                self.hedged += 1
+
+        error: Exception | None = None
+        finished = 0
+        while finished < started:
+            leg, turn, exc = race.results.get()
+            finished += 1
+            if turn is not None:
+                race.cancels[1 - leg].set()
+                conversation.winner = leg
+                with self._lock:
+                    self.wins[leg] += 1
+                return turn
+            error = error or exc
+            if started == 1:
+                # Primary failed before the hedge fired: fail over immediately.
+                self._start(race, _SECONDARY, conversation, options)
+                started = 2
+                with self._lock:
+                    self.failovers += 1
+        assert error is not None
+        raise error
+
+    def _start(self, race: _Race, leg: int, conversation: _HedgedConversation, options: CallOptions) -> None:
+        model = self._legs()[leg]
+
+        def first_byte() -> None:
+            if leg == _PRIMARY:
+                race.progress.set()
+            if options.on_first_byte is not None and race.claims(leg):
+                options.on_first_byte()
+
+        leg_options = dataclasses.replace(
+            options,
+            on_content_delta=_gated(race, leg, options.on_content_delta),
+            on_tool_call=_gated(race, leg, options.on_tool_call),
+            on_first_byte=first_byte,
+            cancel=race.cancels[leg],
+        )
+
+        def run() -> None:
+            try:
+                turn = model.complete(conversation.legs[leg], leg_options)
+            except ModelCancelled as exc:
+                race.results.put((leg, None, exc))
+            except Exception as exc:  # noqa: BLE001 - surfaced by complete()
+                race.results.put((leg, None, exc if isinstance(exc, ModelError) else ModelError(str(exc))))
+            else:
+                race.results.put((leg, turn, None))
+            finally:
+                if leg == _PRIMARY:
+                    race.progress.set()
+
+        # Daemon threads: a stalled loser must not keep the process alive.
+        threading.Thread(target=run, name=f"openplanter-hedge-{leg}", daemon=True).start()
+
+    def append_assistant_turn(self, conversation: Conversation, turn: ModelTurn) -> None:
+        assert isinstance(conversation, _HedgedConversation)
+        winner = conversation.winner
+        source = self._legs()[winner]
+        for leg, model in enumerate(self._legs()):
+            same_format = leg == winner or _wire_format(model) == _wire_format(source)
+            model.append_assistant_turn(conversation.legs[leg], turn if same_format else _reencode(turn, model))
+        conversation.turn_count += 1
+
+    def append_tool_results(self, conversation: Conversation, results: list[ToolResult]) -> None:
+        assert isinstance(conversation, _HedgedConversation)
+        for leg, model in enumerate(self._legs()):
+            model.append_tool_results(conversation.legs[leg], results)
+
+    def conversation_legs(self, conversation: Conversation) -> list[tuple[BaseModel, Conversation]]:
+        """(model, conversation) per leg, for context management that must keep every leg in budget."""
+        assert isinstance(conversation, _HedgedConversation)
+        return list(zip(self._legs(), conversation.legs))
+
+    def condense_conversation(self, conversation: Conversation, keep_recent_turns: int = 4) -> int:
+        assert isinstance(conversation, _HedgedConversation)
+        condensed = 0
+        for leg, model in enumerate(self._legs()):
+            condense = getattr(model, "condense_conversation", None)
+            if condense is not None:
+                count = condense(conversation.legs[leg], keep_recent_turns)
+                condensed = count if leg == _PRIMARY else condensed
+        return condensed
@@ -0,0 +1,401 @@
+"""Keep-alive HTTP(S) connection pooling on top of :mod:`http.client`.
+
+``urllib.request.urlopen`` opens a new TCP (and TLS) connection for every
+request.  Model providers are called hundreds of times per investigation,
+so :class:`ConnectionPool` keeps idle connections to each origin open and
+hands them back out.  Pools are shared process-wide through
+:func:`pool_for`, one per ``scheme://host:port``.
+
+* At most ``max_per_host`` connections per origin are open at once; further
+  requests wait for one to be released (without limit unless a
+  ``pool_timeout`` is given; the request ``timeout`` only covers the
+  network).  Engines raise the cap to their model-call concurrency with
+  :func:`ensure_capacity`.
+* Idle connections older than ``idle_timeout`` are closed instead of reused.
+* A request that fails on a *reused* connection because the server dropped
+  it while idle (reset, broken pipe, empty status line) is retried once on a
+  fresh connection.
+* ``HTTP(S)_PROXY`` / ``NO_PROXY`` from the environment are honoured, as
+  urllib did.
+* Redirects (301/302/303/307/308) are followed up to ``_MAX_REDIRECTS``
+  hops, as urllib did, but only within the same scheme; 303 (and 301/302
+  for POST) switch to a bodiless GET, and credentials are dropped when the
+  redirect leaves the origin.
+"""
+
+from __future__ import annotations
+
+import http.client
+import ssl
+import threading
+import time
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Mapping
+
+# Exceptions meaning "the idle connection was already dead when we used it".
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+)
+# Unread bytes we are willing to drain to keep a connection reusable.
+_MAX_DRAIN_BYTES = 64 * 1024
+_REDIRECT_STATUSES = frozenset({301, 302, 303, 307, 308})
+# Same limit as urllib.request.HTTPRedirectHandler.
+_MAX_REDIRECTS = 10
+_CREDENTIAL_HEADERS = frozenset({"authorization", "x-api-key", "cookie", "proxy-authorization"})
+
+
+class HTTPStatusError(Exception):
+    """Non-2xx/3xx response; the body has already been read."""
+
+    def __init__(
+        self,
+        url: str,
+        status: int,
+        reason: str,
+        body: bytes,
+        headers: Mapping[str, str] | None = None,
+    ) -> None:
+        super().__init__(f"HTTP {status} {reason} calling {url}")
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.body = body
+        self.headers: Mapping[str, str] = headers if headers is not None else {}
+
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+
+class PoolTimeout(Exception):
+    """No connection became free within ``pool_timeout``; nothing was sent."""
+
+
+class PooledResponse:
+    """A response that returns its connection to the pool when closed.
+
+    ``sent_at`` is the ``time.monotonic()`` at which the request went out, so
+    callers can time the server without the wait for a free connection.
+    """
+
+    def __init__(
+        self,
+        pool: "ConnectionPool",
+        conn: http.client.HTTPConnection,
+        resp: http.client.HTTPResponse,
+        sent_at: float,
+    ) -> None:
+        self.sent_at = sent_at
+        self._pool = pool
+        self._conn = conn
+        self._resp = resp
+        self._released = False
+        self.status = resp.status
+        self.reason = resp.reason
+        self.headers = resp.headers
+
+    def read(self, amt: int | None = None) -> bytes:
+        return self._resp.read(amt)
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            line = self._resp.readline()
+            if not line:
+                return
+            yield line
+
+    def set_timeout(self, timeout: float) -> None:
+        """Change the socket timeout, e.g. after the first byte of a stream arrives."""
+        sock = self._conn.sock
+        if sock is not None:
+            try:
+                sock.settimeout(timeout)
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        reusable = not self._resp.will_close
+        if reusable and not self._resp.isclosed():
+            try:
+                reusable = len(self._resp.read(_MAX_DRAIN_BYTES + 1)) <= _MAX_DRAIN_BYTES
+                reusable = reusable and self._resp.isclosed()
+            except (OSError, http.client.HTTPException):
+                reusable = False
+        self._pool._release(self._conn, reusable)
+
+    def abort(self) -> None:
+        """Close without draining the body; the connection is discarded, not reused."""
+        if self._released:
+            return
+        self._released = True
+        self._pool._release(self._conn, False)
+
+    def __enter__(self) -> "PooledResponse":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+@dataclass
+class ConnectionPool:
+    """Thread-safe pool of keep-alive connections to one origin."""
+
+    scheme: str
+    host: str
+    port: int
+    max_per_host: int = 8
+    idle_timeout: float = 60.0
+    _idle: list[tuple[http.client.HTTPConnection, float]] = field(default_factory=list, repr=False)
+    _open: int = 0
+    _cond: threading.Condition = field(default_factory=threading.Condition, repr=False)
+    created: int = 0
+    reused: int = 0
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: float = 90,
+        pool_timeout: float | None = None,
+    ) -> PooledResponse:
+        """Send a request; raises :class:`HTTPStatusError` for status >= 400.
+
+        *timeout* bounds connecting and waiting for the response;
+        *pool_timeout* (default: unbounded) bounds the wait for a free
+        connection and raises :class:`PoolTimeout`.  Redirects are followed
+        (see the module docstring); one that changes scheme or exceeds the
+        hop limit raises :class:`HTTPStatusError` with the 3xx status.
+        """
+        pool: ConnectionPool = self
+        for _ in range(_MAX_REDIRECTS + 1):
+            resp = pool._send(method, url, body, headers, timeout, pool_timeout)
+            location = resp.headers.get("Location")
+            if resp.status not in _REDIRECT_STATUSES or not location:
+                return resp
+            try:
+                payload = resp.read(_MAX_DRAIN_BYTES)
+            finally:
+                resp.close()
+            target = urllib.parse.urljoin(url, location)
+            parsed = urllib.parse.urlsplit(target)
+            if parsed.scheme.lower() != pool.scheme or not parsed.hostname:
+                raise HTTPStatusError(url, resp.status, resp.reason, payload, resp.headers)
+            if resp.status == 303 or (resp.status in (301, 302) and method == "POST"):
+                method, body = ("HEAD" if method == "HEAD" else "GET"), None
+                headers = {
+                    k: v for k, v in (headers or {}).items()
+                    if k.lower() not in ("content-type", "content-length")
+                }
+            port = parsed.port or (443 if pool.scheme == "https" else 80)
+            if (parsed.hostname, port) != (pool.host, pool.port):
+                headers = {
+                    k: v for k, v in (headers or {}).items()
+                    if k.lower() != "host" and k.lower() not in _CREDENTIAL_HEADERS
+                }
+                pool = pool_for(target)
+            url = target
+        raise HTTPStatusError(url, resp.status, resp.reason, payload, resp.headers)
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None,
+        headers: dict[str, str] | None,
+        timeout: float,
+        pool_timeout: float | None,
+    ) -> PooledResponse:
+        """One request/response on a pooled connection, without following redirects."""
+        parsed = urllib.parse.urlsplit(url)
+        proxy = _proxy_for(url)
+        target = url if proxy and self.scheme == "http" else (parsed.path or "/") + (
+            f"?{parsed.query}" if parsed.query else ""
+        )
+        hdrs = dict(headers or {})
+        hdrs.setdefault("Host", parsed.netloc)
+        for attempt in range(2):
+            conn, was_idle = self._acquire(timeout, pool_timeout)
+            sent_at = time.monotonic()
+            try:
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                conn.request(method, target, body=body, headers=hdrs)
+                resp = conn.getresponse()
+            except _STALE_ERRORS:
+                self._release(conn, False)
+                if was_idle and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                self._release(conn, False)
+                raise
+            pooled = PooledResponse(self, conn, resp, sent_at)
+            if resp.status >= 400:
+                try:
+                    payload = resp.read()
+                finally:
+                    pooled.close()
+                raise HTTPStatusError(url, resp.status, resp.reason, payload, resp.headers)
+            return pooled
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    def stats(self) -> dict[str, int]:
+        with self._cond:
+            return {"open": self._open, "idle": len(self._idle), "created": self.created, "reused": self.reused}
+
+    def close_idle(self) -> None:
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            conn.close()
+
+    def set_max_per_host(self, max_per_host: int) -> None:
+        with self._cond:
+            self.max_per_host = max_per_host
+            self._cond.notify_all()
+
+    def _acquire(
+        self, timeout: float, pool_timeout: float | None,
+    ) -> tuple[http.client.HTTPConnection, bool]:
+        deadline = None if pool_timeout is None else time.monotonic() + pool_timeout
+        stale: list[http.client.HTTPConnection] = []
+        try:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    while self._idle:
+                        conn, since = self._idle.pop()
+                        if now - since <= self.idle_timeout and conn.sock is not None:
+                            self.reused += 1
+                            return conn, True
+                        self._open -= 1
+                        stale.append(conn)
+                    if self._open < self.max_per_host:
+                        self._open += 1
+                        self.created += 1
+                        break
+                    if deadline is None:
+                        self._cond.wait()
+                        continue
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise PoolTimeout(f"no free connection to {self.host} within {pool_timeout}s")
+                    self._cond.wait(remaining)
+        finally:
+            for conn in stale:
+                conn.close()
+        try:
+            return self._connect(timeout), False
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def _connect(self, timeout: float) -> http.client.HTTPConnection:
+        proxy = _proxy_for(f"{self.scheme}://{self.host}:{self.port}/")
+        if self.scheme == "https":
+            context = ssl.create_default_context()
+            if proxy:
+                p = urllib.parse.urlsplit(proxy)
+                conn: http.client.HTTPConnection = http.client.HTTPSConnection(
+                    p.hostname or "", p.port or 8080, timeout=timeout, context=context,
+                )
+                conn.set_tunnel(self.host, self.port)
+            else:
+                conn = http.client.HTTPSConnection(self.host, self.port, timeout=timeout, context=context)
+        elif proxy:
+            p = urllib.parse.urlsplit(proxy)
+            conn = http.client.HTTPConnection(p.hostname or "", p.port or 8080, timeout=timeout)
+        else:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+        conn.connect()
+        return conn
+
+    def _release(self, conn: http.client.HTTPConnection, reusable: bool) -> None:
+        with self._cond:
+            if reusable and conn.sock is not None:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if not reusable:
+            conn.close()
+
+
+_POOLS: dict[tuple[str, str, int], ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+# Connection cap of shared pools; raise it with ensure_capacity().
+MAX_CONNECTIONS_PER_HOST = 8
+
+
+def pool_for(url: str) -> ConnectionPool:
+    """The shared pool for *url*'s origin."""
+    parsed = urllib.parse.urlsplit(url)
+    scheme = parsed.scheme.lower()
+    if scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError(f"unsupported URL: {url}")
+    port = parsed.port or (443 if scheme == "https" else 80)
+    key = (scheme, parsed.hostname, port)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = ConnectionPool(scheme, parsed.hostname, port, max_per_host=MAX_CONNECTIONS_PER_HOST)
+            _POOLS[key] = pool
+        return pool
+
+
+def ensure_capacity(max_per_host: int) -> None:
+    """Let every shared pool, existing or future, open at least *max_per_host* connections."""
+    global MAX_CONNECTIONS_PER_HOST
+    with _POOLS_LOCK:
+        if max_per_host <= MAX_CONNECTIONS_PER_HOST:
+            return
+        MAX_CONNECTIONS_PER_HOST = max_per_host
+        pools = list(_POOLS.values())
+    for pool in pools:
+        pool.set_max_per_host(max_per_host)
+
+
+def request(
+    method: str,
+    url: str,
+    body: bytes | None = None,
+    headers: dict[str, str] | None = None,
+    timeout: float = 90,
+    pool_timeout: float | None = None,
+) -> PooledResponse:
+    """Send a request through the shared pool for *url*'s origin."""
+    return pool_for(url).request(
+        method, url, body=body, headers=headers, timeout=timeout, pool_timeout=pool_timeout,
+    )
+
+
+def close_all() -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+    for pool in pools:
+        pool.close_idle()
+
+
+def _proxy_for(url: str) -> str | None:
+    parsed = urllib.parse.urlsplit(url)
+    proxies = urllib.request.getproxies()
+    proxy = proxies.get(parsed.scheme)
+    if not proxy or urllib.request.proxy_bypass(parsed.hostname or ""):
+        return None
+    return proxy
@@ -0,0 +1,107 @@
+"""gitignore-style ignore rules, as ripgrep applies them to file listings.
+
+:func:`parse_ignore` compiles the lines of a ``.gitignore``/``.ignore``/
+``.rgignore`` file into :class:`IgnoreRule` objects; :func:`is_ignored`
+applies the rules of a directory chain to one path.  Supported: comments,
+``!`` negation, ``\\`` escapes, trailing-``/`` directory-only patterns,
+patterns anchored by a ``/``, ``*``/``?``/``[...]`` and the ``**/``,
+``/**/`` and ``/**`` forms.  The last matching rule wins, and rules from
+deeper directories come after (override) those of their ancestors.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+# Read in this order within one directory, so later files take precedence (as in rg).
+IGNORE_FILE_NAMES = (".gitignore", ".ignore", ".rgignore")
+
+
+@dataclass(frozen=True)
+class IgnoreRule:
+    regex: re.Pattern[str]
+    negate: bool
+    dir_only: bool
+
+
+def _translate(pattern: str) -> str:
+    out: list[str] = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        ch = pattern[i]
+        if pattern.startswith("**/", i) and (i == 0 or pattern[i - 1] == "/"):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i) and i + 2 == n and (i == 0 or pattern[i - 1] == "/"):
+            out.append(".*")
+            i += 2
+        elif ch == "*":
+            out.append("[^/]*")
+            while i < n and pattern[i] == "*":
+                i += 1
+        elif ch == "?":
+            out.append("[^/]")
+            i += 1
+        elif ch == "[":
+            end = pattern.find("]", i + 2 if pattern.startswith(("[!", "[^"), i) else i + 1)
+            if end < 0:
+                out.append(re.escape(ch))
+                i += 1
+                continue
+            body = pattern[i + 1:end]
+            if body[:1] in ("!", "^"):
+                body = "^" + body[1:]
+            out.append("[" + body.replace("\\", "\\\\") + "]")
+            i = end + 1
+        elif ch == "\\" and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(ch))
+            i += 1
+    return "".join(out)
+
+
+def parse_ignore(text: str) -> list[IgnoreRule]:
+    """Compile the lines of one ignore file."""
+    rules: list[IgnoreRule] = []
+    for raw in text.splitlines():
+        line = raw.rstrip("\r")
+        # Trailing spaces are ignored unless escaped.
+        while line.endswith(" ") and not line.endswith("\\ "):
+            line = line[:-1]
+        if not line or line.startswith("#"):
+            continue
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        anchored = "/" in line
+        body = _translate(line.lstrip("/"))
+        prefix = "" if anchored else "(?:.*/)?"
+        rules.append(IgnoreRule(re.compile(f"^{prefix}{body}$", re.DOTALL), negate, dir_only))
+    return rules
+
+
+def is_ignored(chain: list[tuple[str, list[IgnoreRule]]], rel: str, is_dir: bool) -> bool:
+    """Whether *rel* is ignored by *chain*: ``(directory, rules)`` pairs, outermost first.
+
+    Only *rel* itself is tested; callers stop descending into ignored
+    directories, which is what ignores their contents.
+    """
+    ignored = False
+    for base, rules in chain:
+        if base and not rel.startswith(base + "/"):
+            continue
+        sub = rel[len(base) + 1:] if base else rel
+        for rule in rules:
+            if rule.dir_only and not is_dir:
+                continue
+            if rule.regex.match(sub):
+                ignored = not rule.negate
+    return ignored
@@ -0,0 +1,158 @@
+"""Sidecar line-offset index for paging through large files.
+
+A :class:`LineIndex` records the byte offset of every ``stride``-th line,
+built in one streaming pass (C-level ``count``/``split`` per chunk).  With
+it, the start of any line is one array lookup plus at most ``stride - 1``
+``mmap.find`` calls, so ``read_file`` can serve line 30,000,000 of a 4 GB
+CSV without reading anything before it.
+
+:class:`LineIndexCache` keeps indexes in memory and, for files above
+``min_sidecar_bytes``, persists them as sidecar files keyed by the file's
+path; an index is reused only while the file's size and mtime match.
+
+Lines are ``\\n``-terminated; a trailing ``\\r`` stays part of the line text.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from itertools import accumulate, count, islice, repeat
+from operator import add
+from pathlib import Path
+
+_STRIDE = 1024
+_CHUNK = 1 << 24
+_MAGIC = b"OPLINES1"
+_HEADER = struct.Struct("<8sQqQQ")
+# Files modified this recently may change again within the same mtime tick.
+_RACY_WINDOW_SEC = 2.0
+
+
+@dataclass(frozen=True)
+class LineIndex:
+    size: int
+    mtime_ns: int
+    stride: int
+    total_lines: int
+    # offsets[k] is the byte offset where line k * stride + 1 starts.
+    offsets: array
+
+    @classmethod
+    def build(cls, path: Path, stride: int = _STRIDE) -> LineIndex:
+        offsets = array("Q", [0])
+        line = 1
+        pos = 0
+        last = b""
+        with open(path, "rb") as fh:
+            st = os.fstat(fh.fileno())
+            while True:
+                chunk = fh.read(_CHUNK)
+                if not chunk:
+                    break
+                newlines = chunk.count(b"\n")
+                mark = len(offsets) * stride + 1
+                if line + newlines >= mark:
+                    # Offsets (within the chunk) at which lines line+1 .. line+newlines start.
+                    starts = map(add, accumulate(map(len, chunk.split(b"\n")[:-1])), count(1))
+                    offsets.extend(map(add, islice(starts, mark - line - 1, None, stride), repeat(pos)))
+                line += newlines
+                pos += len(chunk)
+                last = chunk[-1:]
+        total = line - 1 if pos == 0 or last == b"\n" else line
+        return cls(pos, st.st_mtime_ns, stride, total, offsets)
+
+    def matches(self, st: os.stat_result) -> bool:
+        return (self.size, self.mtime_ns) == (st.st_size, st.st_mtime_ns)
+
+    def line_start(self, mm: mmap.mmap | bytes, line: int) -> int:
+        """Byte offset where 1-based *line* starts (the file size past the end)."""
+        if line > self.total_lines:
+            return self.size
+        line = max(line, 1)
+        pos = self.offsets[(line - 1) // self.stride]
+        for _ in range((line - 1) % self.stride):
+            pos = mm.find(b"\n", pos) + 1
+        return pos
+
+    def line_at(self, mm: mmap.mmap | bytes, pos: int) -> int:
+        """1-based number of the line containing byte *pos*."""
+        pos = min(max(pos, 0), self.size)
+        k = bisect_right(self.offsets, pos) - 1
+        return k * self.stride + 1 + mm[self.offsets[k]:pos].count(b"\n")
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as fh:
+            fh.write(_HEADER.pack(_MAGIC, self.size, self.mtime_ns, self.stride, self.total_lines))
+            self.offsets.tofile(fh)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path) -> LineIndex | None:
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        if len(data) < _HEADER.size:
+            return None
+        magic, size, mtime_ns, stride, total = _HEADER.unpack_from(data)
+        if magic != _MAGIC or (len(data) - _HEADER.size) % 8:
+            return None
+        offsets = array("Q")
+        offsets.frombytes(data[_HEADER.size:])
+        return cls(size, mtime_ns, stride, total, offsets)
+
+
+class LineIndexCache:
+    """Line indexes by path: in memory, plus sidecar files for large files."""
+
+    def __init__(self, sidecar_dir: Path | None, min_sidecar_bytes: int = 1 << 20, max_entries: int = 64) -> None:
+        self.sidecar_dir = sidecar_dir
+        self.min_sidecar_bytes = min_sidecar_bytes
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, LineIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sidecar(self, path: Path) -> Path | None:
+        if self.sidecar_dir is None:
+            return None
+        digest = hashlib.blake2b(str(path).encode("utf-8", "surrogateescape"), digest_size=16).hexdigest()
+        return self.sidecar_dir / f"{digest}.lines"
+
+    def get(self, path: Path) -> LineIndex:
+        st = path.stat()
+        key = str(path)
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None and index.matches(st):
+                self._entries.move_to_end(key)
+                return index
+        sidecar = self._sidecar(path) if st.st_size >= self.min_sidecar_bytes else None
+        index = LineIndex.load(sidecar) if sidecar is not None else None
+        if index is None or not index.matches(st):
+            index = LineIndex.build(path)
+            if not index.matches(path.stat()):
+                # Changed while we read it; usable now, not worth keeping.
+                return index
+            if sidecar is not None and time.time() - index.mtime_ns / 1e9 >= _RACY_WINDOW_SEC:
+                try:
+                    index.save(sidecar)
+                except OSError:
+                    pass
+        if time.time() - index.mtime_ns / 1e9 >= _RACY_WINDOW_SEC:
+            with self._lock:
+                self._entries[key] = index
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return index
@@ -0,0 +1,201 @@
+"""Workspace-aware memoization of ``subtask``/``execute`` results.
+
+Recursive investigations often re-issue near-identical delegations in
+different branches or across REPL turns.  :class:`SubtaskMemo` caches the
+final observation of a delegated run under the session directory, keyed by
+the normalized objective, acceptance criteria, model tier and depth.  Each
+entry records fingerprints of the workspace inputs the run depended on
+(content hashes of files it read, plus a tree signature if it listed or
+searched the workspace) and is discarded as soon as any of them change.
+With a :class:`~agent.file_index.FileIndex` both come from the index: file
+hashes are cached there until size or mtime change, and the tree signature
+is the index generation, so neither re-reads nor re-walks the workspace.
+
+Runs that wrote files or ran processes are never cached: replaying their
+text would skip their side effects.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+from .file_index import FileIndex
+
+_HASH_CHUNK = 1 << 20
+
+# Child results that describe a failure rather than an answer.
+_FAILURE_PREFIXES = (
+    "Model error at depth",
+    "Step budget exhausted",
+    "Time limit exceeded",
+)
+
+
+def normalize_objective(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().rstrip(".!?;:").lower()
+
+
+def is_cacheable_result(child_result: str) -> bool:
+    return bool(child_result.strip()) and not child_result.startswith(_FAILURE_PREFIXES)
+
+
+@dataclass
+class MemoDeps:
+    """Workspace inputs observed during one delegated run."""
+
+    files: set[Path] = field(default_factory=set)
+    workspace: bool = False
+    cacheable: bool = True
+
+    def merge(self, other: "MemoDeps") -> None:
+        self.files |= other.files
+        self.workspace = self.workspace or other.workspace
+        self.cacheable = self.cacheable and other.cacheable
+
+
+def _file_digest(path: Path) -> str | None:
+    digest = hashlib.sha1()
+    try:
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(_HASH_CHUNK), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+@dataclass
+class SubtaskMemo:
+    workspace: Path
+    directory: Path
+    ttl_sec: int = 86_400
+    # Returns the refreshed workspace file index, or ``None`` if it is unavailable.
+    file_index: Callable[[], FileIndex | None] | None = None
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @staticmethod
+    def key(kind: str, objective: str, criteria: str, tier: int, depth: int) -> str:
+        raw = json.dumps(
+            [kind, normalize_objective(objective), normalize_objective(criteria), tier, depth],
+            ensure_ascii=True,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+    def lookup(self, key: str) -> tuple[str, MemoDeps] | None:
+        """Return ``(observation, deps)`` if a fresh, still-valid entry exists."""
+        path = self._entry_path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        deps = self._validate(entry)
+        if deps is None:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            with self._lock:
+                self.misses += 1
+                self.invalidations += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return str(entry.get("observation", "")), deps
+
+    def store(self, key: str, observation: str, deps: MemoDeps) -> bool:
+        if not deps.cacheable:
+            return False
+        files: dict[str, str] = {}
+        index = self._index()
+        for path in sorted(deps.files):
+            digest = self._digest(path, index)
+            if digest is None:
+                return False
+            files[self._rel(path)] = digest
+        entry: dict[str, Any] = {
+            "created_at": time.time(),
+            "observation": observation,
+            "files": files,
+            "tree": self.tree_signature(index) if deps.workspace else None,
+        }
+        path = self._entry_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(entry, ensure_ascii=True), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            return False
+        return True
+
+    def metrics(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations}
+
+    def _index(self) -> FileIndex | None:
+        return self.file_index() if self.file_index is not None else None
+
+    def _digest(self, path: Path, index: FileIndex | None) -> str | None:
+        if index is not None:
+            cached = index.content_hash(path)
+            if cached is not None:
+                return "index:" + cached
+        # Not indexed (e.g. ignored) or no index: hash the file directly.
+        return _file_digest(path)
+
+    def tree_signature(self, index: FileIndex | None = None) -> str:
+        """File index generation, or a hash of (path, size, mtime) for every non-hidden file."""
+        if index is not None:
+            return "index:" + index.generation()
+        digest = hashlib.sha1()
+        for dirpath, dirnames, filenames in os.walk(self.workspace):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for name in sorted(filenames):
+                if name.startswith("."):
+                    continue
+                full = Path(dirpath) / name
+                try:
+                    st = full.stat()
+                except OSError:
+                    continue
+                digest.update(f"{self._rel(full)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _validate(self, entry: dict[str, Any]) -> MemoDeps | None:
+        if self.ttl_sec > 0 and time.time() - float(entry.get("created_at", 0)) > self.ttl_sec:
+            return None
+        deps = MemoDeps()
+        index = self._index()
+        for rel, digest in (entry.get("files") or {}).items():
+            path = self.workspace / rel
+            if self._digest(path, index) != digest:
+                return None
+            deps.files.add(path)
+        tree = entry.get("tree")
+        if tree is not None:
+            if tree != self.tree_signature(index):
+                return None
+            deps.workspace = True
+        return deps
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _rel(self, path: Path) -> str:
+        try:
+            return path.relative_to(self.workspace).as_posix()
+        except ValueError:
+            return path.as_posix()
@@ -0,0 +1,394 @@
+"""Local mock of the OpenAI and Anthropic streaming APIs for load testing.
+
+:class:`MockProviderServer` is a small asyncio HTTP/1.1 server speaking the
+same SSE wire formats the model layer parses: ``POST .../chat/completions``
+(OpenAI chat completion chunks) and ``POST .../messages`` (Anthropic message
+events).  Point ``openai_base_url`` / ``anthropic_base_url`` (or a model's
+``base_url``) at :attr:`MockProviderServer.base_url` to drive the engine,
+retry logic and connection pool end to end with no network.
+
+Behaviour is set by :class:`MockProviderConfig`:
+
+* ``first_byte_latency`` - delay before the response headers are sent;
+* ``tokens_per_sec`` - pacing of streamed deltas (one delta ~ one token);
+* ``script`` - :class:`MockReply` objects served in order (text, tool calls
+  or an injected error status), then ``default_reply`` forever;
+* ``error_rate`` / ``error_status`` - random 429/5xx injection (seeded);
+* usage is reported in the provider's format, estimated at ~4 chars/token.
+
+It runs its event loop on a background thread (``start()`` / ``stop()`` or
+``with MockProviderServer(...) as server``) so synchronous tests can use it,
+or in the foreground with ``python -m agent.mock_server``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+_CHARS_PER_TOKEN = 4
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 408: "Request Timeout", 429: "Too Many Requests",
+            500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable", 529: "Overloaded"}
+
+
+@dataclass
+class MockReply:
+    """One scripted response: text and/or tool calls, or an error ``status``."""
+
+    text: str = ""
+    tool_calls: list[tuple[str, dict[str, Any]]] = field(default_factory=list)
+    status: int = 200
+    retry_after: float | None = None
+
+
+@dataclass
+class MockProviderConfig:
+    first_byte_latency: float = 0.0
+    # 0 streams as fast as the socket allows.
+    tokens_per_sec: float = 0.0
+    script: list[MockReply] = field(default_factory=list)
+    default_reply: MockReply = field(default_factory=lambda: MockReply(text="ok"))
+    # Optional hook that picks the reply from (path, request payload); overrides script.
+    responder: Callable[[str, dict[str, Any]], MockReply] | None = None
+    error_rate: float = 0.0
+    error_status: int = 429
+    retry_after: float | None = 0.0
+    seed: int | None = None
+
+
+@dataclass
+class MockProviderStats:
+    requests: int = 0
+    errors: int = 0
+    connections: int = 0
+    active: int = 0
+    max_active: int = 0
+    output_tokens: int = 0
+    paths: dict[str, int] = field(default_factory=dict)
+
+
+class MockProviderServer:
+    """Asyncio server emulating provider chat endpoints; see module docstring."""
+
+    def __init__(self, config: MockProviderConfig | None = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = config or MockProviderConfig()
+        self.host = host
+        self.port = port
+        self.stats = MockProviderStats()
+        self._script = list(self.config.script)
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._server: asyncio.AbstractServer | None = None
+        self._thread: threading.Thread | None = None
+        self._ids = 0
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def serve(self) -> asyncio.AbstractServer:
+        """Bind the listening socket on the running loop and return the server."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    def start(self) -> "MockProviderServer":
+        """Serve from a background thread; returns once the port is bound."""
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+
+        def run() -> None:
+            assert self._loop is not None
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.serve())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="mock-provider", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self) -> None:
+        loop, server = self._loop, self._server
+        if loop is None or server is None:
+            return
+
+        async def shutdown() -> None:
+            server.close()
+            for task in list(self._tasks):
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            await server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        loop.close()
+        self._loop = self._server = None
+
+    def __enter__(self) -> "MockProviderServer":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    # -- HTTP --------------------------------------------------------------
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        with self._lock:
+            self.stats.connections += 1
+        task = asyncio.current_task()
+        if task is not None:
+            self._tasks.add(task)
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                await self._handle_request(method, path, body, writer)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if task is not None:
+                self._tasks.discard(task)
+            writer.close()
+
+    async def _handle_request(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter) -> None:
+        route = path.split("?", 1)[0].rstrip("/")
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.paths[route] = self.stats.paths.get(route, 0) + 1
+            self.stats.active += 1
+            self.stats.max_active = max(self.stats.max_active, self.stats.active)
+        try:
+            if method == "GET" and route.endswith("/models"):
+                await _write_json(writer, 200, {"data": [{"id": "mock-model", "created": 0}]})
+                return
+            kind = "openai" if route.endswith("/chat/completions") else "anthropic" if route.endswith("/messages") else ""
+            if method != "POST" or not kind:
+                await _write_json(writer, 404, {"error": {"message": f"no route for {method} {path}"}})
+                return
+            try:
+                payload = json.loads(body or b"{}")
+            except json.JSONDecodeError:
+                await _write_json(writer, 400, {"error": {"message": "invalid JSON body"}})
+                return
+            reply = self._next_reply(route, payload)
+            if self.config.first_byte_latency > 0:
+                await asyncio.sleep(self.config.first_byte_latency)
+            if reply.status != 200:
+                with self._lock:
+                    self.stats.errors += 1
+                await _write_error(writer, reply.status, reply.retry_after, kind)
+                return
+            input_tokens = max(1, len(body) // _CHARS_PER_TOKEN)
+            if kind == "openai":
+                events = self._openai_events(payload, reply, input_tokens)
+            else:
+                events = self._anthropic_events(payload, reply, input_tokens)
+            await self._stream(writer, events)
+        finally:
+            with self._lock:
+                self.stats.active -= 1
+
+    def _next_reply(self, route: str, payload: dict[str, Any]) -> MockReply:
+        cfg = self.config
+        with self._lock:
+            if cfg.error_rate > 0 and self._random.random() < cfg.error_rate:
+                return MockReply(status=cfg.error_status, retry_after=cfg.retry_after)
+            if cfg.responder is None and self._script:
+                return self._script.pop(0)
+        if cfg.responder is not None:
+            return cfg.responder(route, payload)
+        return cfg.default_reply
+
+    def _next_id(self, prefix: str) -> str:
+        with self._lock:
+            self._ids += 1
+            return f"{prefix}_mock{self._ids}"
+
+    async def _stream(self, writer: asyncio.StreamWriter, events: list[tuple[str, str]]) -> None:
+        """Send SSE *events* as a chunked response, paced by ``tokens_per_sec``."""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\nTransfer-Encoding: chunked\r\n\r\n"
+        )
+        rate = self.config.tokens_per_sec
+        start = time.monotonic()
+        for sent, (event, data) in enumerate(events):
+            if rate > 0:
+                ahead = start + sent / rate - time.monotonic()
+                if ahead > 0:
+                    await asyncio.sleep(ahead)
+            frame = (f"event: {event}\n" if event else "") + f"data: {data}\n\n"
+            _write_chunk(writer, frame.encode("utf-8"))
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    # -- wire formats ------------------------------------------------------
+
+    def _openai_events(self, payload: dict[str, Any], reply: MockReply, input_tokens: int) -> list[tuple[str, str]]:
+        model = str(payload.get("model", "mock-model"))
+        chunk_id = self._next_id("chatcmpl")
+        frames: list[dict[str, Any]] = []
+
+        def chunk(delta: dict[str, Any], finish: str | None = None) -> None:
+            frames.append({"id": chunk_id, "object": "chat.completion.chunk", "model": model,
+                           "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]})
+
+        chunk({"role": "assistant"})
+        for piece in _pieces(reply.text):
+            chunk({"content": piece})
+        for idx, (name, arguments) in enumerate(reply.tool_calls):
+            chunk({"tool_calls": [{"index": idx, "id": self._next_id("call"), "type": "function",
+                                   "function": {"name": name, "arguments": ""}}]})
+            for piece in _pieces(json.dumps(arguments)):
+                chunk({"tool_calls": [{"index": idx, "function": {"arguments": piece}}]})
+        chunk({}, "tool_calls" if reply.tool_calls else "stop")
+        output_tokens = self._count_output(len(frames))
+        frames.append({"id": chunk_id, "object": "chat.completion.chunk", "model": model, "choices": [],
+                       "usage": {"prompt_tokens": input_tokens, "completion_tokens": output_tokens,
+                                 "total_tokens": input_tokens + output_tokens}})
+        events = [("", json.dumps(f)) for f in frames]
+        events.append(("", "[DONE]"))
+        return events
+
+    def _anthropic_events(self, payload: dict[str, Any], reply: MockReply, input_tokens: int) -> list[tuple[str, str]]:
+        model = str(payload.get("model", "mock-model"))
+        frames: list[tuple[str, dict[str, Any]]] = [("message_start", {
+            "type": "message_start",
+            "message": {"id": self._next_id("msg"), "type": "message", "role": "assistant", "model": model,
+                        "content": [], "usage": {"input_tokens": input_tokens, "output_tokens": 0}},
+        })]
+        index = 0
+        if reply.text:
+            frames.append(("content_block_start", {"type": "content_block_start", "index": index,
+                                                   "content_block": {"type": "text", "text": ""}}))
+            for piece in _pieces(reply.text):
+                frames.append(("content_block_delta", {"type": "content_block_delta", "index": index,
+                                                       "delta": {"type": "text_delta", "text": piece}}))
+            frames.append(("content_block_stop", {"type": "content_block_stop", "index": index}))
+            index += 1
+        for name, arguments in reply.tool_calls:
+            frames.append(("content_block_start", {"type": "content_block_start", "index": index, "content_block": {
+                "type": "tool_use", "id": self._next_id("toolu"), "name": name, "input": {}}}))
+            for piece in _pieces(json.dumps(arguments)):
+                frames.append(("content_block_delta", {"type": "content_block_delta", "index": index,
+                                                       "delta": {"type": "input_json_delta", "partial_json": piece}}))
+            frames.append(("content_block_stop", {"type": "content_block_stop", "index": index}))
+            index += 1
+        output_tokens = self._count_output(len(frames))
+        frames.append(("message_delta", {"type": "message_delta",
+                                         "delta": {"stop_reason": "tool_use" if reply.tool_calls else "end_turn"},
+                                         "usage": {"output_tokens": output_tokens}}))
+        frames.append(("message_stop", {"type": "message_stop"}))
+        return [(event, json.dumps(data)) for event, data in frames]
+
+    def _count_output(self, frames: int) -> int:
+        with self._lock:
+            self.stats.output_tokens += frames
+        return frames
+
+
+def _pieces(text: str) -> list[str]:
+    """Split *text* into ~one-token deltas."""
+    return [text[i:i + _CHARS_PER_TOKEN] for i in range(0, len(text), _CHARS_PER_TOKEN)]
+
+
+async def _read_request(reader: asyncio.StreamReader) -> tuple[str, str, dict[str, str], bytes] | None:
+    line = await reader.readline()
+    if not line:
+        return None
+    parts = line.decode("latin-1").split()
+    if len(parts) < 2:
+        return None
+    headers: dict[str, str] = {}
+    while True:
+        raw = await reader.readline()
+        if raw in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = raw.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length") or 0)
+    body = await reader.readexactly(length) if length else b""
+    return parts[0].upper(), parts[1], headers, body
+
+
+def _write_chunk(writer: asyncio.StreamWriter, data: bytes) -> None:
+    writer.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+
+async def _write_json(writer: asyncio.StreamWriter, status: int, body: dict[str, Any],
+                      extra_headers: dict[str, str] | None = None) -> None:
+    data = json.dumps(body).encode("utf-8")
+    head = f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}\r\nContent-Type: application/json\r\n"
+    for name, value in (extra_headers or {}).items():
+        head += f"{name}: {value}\r\n"
+    head += f"Content-Length: {len(data)}\r\n\r\n"
+    writer.write(head.encode("latin-1") + data)
+    await writer.drain()
+
+
+async def _write_error(writer: asyncio.StreamWriter, status: int, retry_after: float | None, kind: str) -> None:
+    message = f"mock provider injected HTTP {status}"
+    if kind == "anthropic":
+        error_type = "rate_limit_error" if status == 429 else "overloaded_error" if status == 529 else "api_error"
+        body: dict[str, Any] = {"type": "error", "error": {"type": error_type, "message": message}}
+    else:
+        body = {"error": {"type": "rate_limit_exceeded" if status == 429 else "server_error", "message": message}}
+    headers = {} if retry_after is None else {"retry-after": f"{retry_after:g}"}
+    await _write_json(writer, status, body, headers)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve a mock OpenAI/Anthropic streaming API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-byte-latency", type=float, default=0.0, help="Seconds before the first byte.")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="Streaming rate (0 = unthrottled).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail.")
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--reply", default="ok", help="Text of every reply.")
+    args = parser.parse_args(argv)
+    server = MockProviderServer(
+        MockProviderConfig(
+            first_byte_latency=args.first_byte_latency,
+            tokens_per_sec=args.tokens_per_sec,
+            error_rate=args.error_rate,
+            error_status=args.error_status,
+            default_reply=MockReply(text=args.reply),
+        ),
+        host=args.host,
+        port=args.port,
+    )
+
+    async def run() -> None:
+        srv = await server.serve()
+        print(f"mock provider listening on {server.base_url}", flush=True)
+        async with srv:
+            await srv.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
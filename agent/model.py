@@ -1,20 +1,35 @@
 from __future__ import annotations
 
+import hashlib
+import http.client
 import json
 import socket
-import urllib.error
-import urllib.request
+import threading
+import time
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Any, Callable, Protocol
 
-from .tool_defs import TOOL_DEFINITIONS, to_anthropic_tools, to_openai_tools
+from . import http_pool
+from .ratelimit import (
+    ProviderLimiter,
+    RetryPolicy,
+    default_policy,
+    latency_for,
+    limiter_for,
+    retry_after_from_headers,
+)
+from .tool_defs import ToolSchemas, ToolSet, to_anthropic_tools, to_openai_tools, tool_schemas
 
 
 class ModelError(RuntimeError):
     pass
 
 
+class ModelCancelled(ModelError):
+    """The call was cancelled through ``CallOptions.cancel`` (e.g. a lost hedge)."""
+
+
 # ---------------------------------------------------------------------------
 # Core data types
 # ---------------------------------------------------------------------------
@@ -43,8 +58,11 @@ class ModelTurn:
     text: str | None = None
     stop_reason: str = ""
     raw_response: Any = None
+    # Total prompt tokens, including any read from or written to the prompt cache.
     input_tokens: int = 0
     output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
 
 
 @dataclass
@@ -60,13 +78,59 @@ class Conversation:
         return list(self._provider_messages)
 
 
+ToolCallCallback = Callable[[ToolCall], None]
+
+
+@dataclass(frozen=True)
+class CallOptions:
+    """Settings for one ``complete()`` call, taking precedence over model attributes.
+
+    Passing sinks and tools per call lets a single model instance serve many
+    concurrent branches without swapping its attributes.
+    """
+    on_content_delta: Callable[[str, str], None] | None = None
+    # Called from the streaming thread as soon as each tool call is fully received.
+    on_tool_call: ToolCallCallback | None = None
+    tool_set: ToolSet | None = None
+    # Explicit definitions win over ``tool_set``.
+    tool_defs: list[dict[str, Any]] | None = None
+    # None keeps ``conversation.stop_sequences``.
+    stop_sequences: list[str] | None = None
+    # Called once when the provider's response headers arrive.
+    on_first_byte: Callable[[], None] | None = None
+    # When set, the request is abandoned at the next retry or streamed line.
+    cancel: threading.Event | None = None
+
+
+_NO_OPTIONS = CallOptions()
+
+
+def _resolve_tools(
+    tool_defs: list[dict[str, Any]] | None,
+    tool_set: ToolSet | None,
+    options: CallOptions,
+) -> tuple[list[dict[str, Any]] | None, ToolSet | None]:
+    """(explicit definitions, tool set) for a call; per-call options win over the model's own."""
+    if options.tool_defs is not None:
+        return options.tool_defs, None
+    if options.tool_set is not None:
+        return None, options.tool_set
+    return tool_defs, tool_set
+
+
+def _resolve_stop_sequences(conversation: Conversation, options: CallOptions) -> list[str]:
+    if options.stop_sequences is not None:
+        return options.stop_sequences
+    return conversation.stop_sequences
+
+
 # ---------------------------------------------------------------------------
 # BaseModel protocol
 # ---------------------------------------------------------------------------
 
 class BaseModel(Protocol):
     def create_conversation(self, system_prompt: str, initial_user_message: str) -> Conversation: ...
-    def complete(self, conversation: Conversation) -> ModelTurn: ...
+    def complete(self, conversation: Conversation, options: CallOptions | None = None) -> ModelTurn: ...
     def append_assistant_turn(self, conversation: Conversation, turn: ModelTurn) -> None: ...
     def append_tool_results(self, conversation: Conversation, results: list[ToolResult]) -> None: ...
 
@@ -102,21 +166,13 @@ def _http_json(
     payload: dict[str, Any] | None = None,
     timeout_sec: int = 90,
 ) -> dict[str, Any]:
-    req = urllib.request.Request(
-        url=url,
-        data=(json.dumps(payload).encode("utf-8") if payload is not None else None),
-        headers=headers,
-        method=method,
-    )
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
     try:
-        with urllib.request.urlopen(req, timeout=timeout_sec) as resp:
+        with http_pool.request(method, url, body=data, headers=headers, timeout=timeout_sec) as resp:
             raw = resp.read().decode("utf-8", errors="replace")
-    except urllib.error.HTTPError as exc:  # pragma: no cover - network path
-        body = exc.read().decode("utf-8", errors="replace")
-        raise ModelError(f"HTTP {exc.code} calling {url}: {body}") from exc
-    except urllib.error.URLError as exc:  # pragma: no cover - network path
-        raise ModelError(f"Connection error calling {url}: {exc}") from exc
-    except OSError as exc:  # pragma: no cover - bare socket.timeout, etc.
+    except http_pool.HTTPStatusError as exc:  # pragma: no cover - network path
+        raise ModelError(f"HTTP {exc.status} calling {url}: {exc.text()}") from exc
+    except (OSError, http.client.HTTPException) as exc:  # pragma: no cover - network path
         raise ModelError(f"Network error calling {url}: {exc}") from exc
 
     try:
@@ -128,19 +184,16 @@ def _http_json(
     return parsed
 
 
-def _extend_socket_timeout(resp: Any, timeout: float) -> None:
-    """Best-effort extension of the underlying socket timeout after first byte."""
-    try:
-        resp.fp.raw._sock.settimeout(timeout)
-    except (AttributeError, OSError):
-        pass
-
-
 def _read_sse_events(
     resp: Any,
     on_sse_event: "Callable[[str, dict[str, Any]], None] | None" = None,
+    keep_events: bool = True,
 ) -> list[tuple[str, dict[str, Any]]]:
-    """Read SSE lines from an HTTP response, returning (event_type, data_dict) pairs."""
+    """Read SSE lines from an HTTP response, returning (event_type, data_dict) pairs.
+
+    With ``keep_events=False`` events are only passed to *on_sse_event* and
+    the returned list is empty, so memory does not grow with the stream.
+    """
     events: list[tuple[str, dict[str, Any]]] = []
     current_event = ""
     current_data_lines: list[str] = []
@@ -172,12 +225,10 @@ def _read_sse_events(
                     if data_dict.get("type") == "error":
                         err_msg = data_dict.get("error", {}).get("message", str(data_dict))
                         raise ModelError(f"Stream error: {err_msg}")
-                    events.append((current_event, data_dict))
+                    if keep_events:
+                        events.append((current_event, data_dict))
                     if on_sse_event:
-                        try:
-                            on_sse_event(current_event, data_dict)
-                        except Exception:
-                            pass
+                        _notify_listener(on_sse_event, current_event, data_dict)
                 current_data_lines = []
                 current_event = ""
             continue
@@ -193,16 +244,44 @@ def _read_sse_events(
             if data_dict.get("type") == "error":
                 err_msg = data_dict.get("error", {}).get("message", str(data_dict))
                 raise ModelError(f"Stream error: {err_msg}")
-            events.append((current_event, data_dict))
+            if keep_events:
+                events.append((current_event, data_dict))
             if on_sse_event:
-                try:
-                    on_sse_event(current_event, data_dict)
-                except Exception:
-                    pass
+                _notify_listener(on_sse_event, current_event, data_dict)
 
     return events
 
 
+def _notify_listener(
+    listener: "Callable[[str, dict[str, Any]], None]",
+    event_type: str,
+    data: dict[str, Any],
+) -> None:
+    """Pass one event to *listener*; a failure ends the stream as a ModelError.
+
+    The listener is normally the turn's accumulator, so dropping the error
+    would silently truncate the turn.  Optional observers are isolated by
+    :func:`_chain_sse_listeners` instead.
+    """
+    try:
+        listener(event_type, data)
+    except ModelError:
+        raise
+    except Exception as exc:
+        raise ModelError(f"Failed to process stream event: {exc}") from exc
+
+
+def _encode_payload(payload: dict[str, Any], raw_fields: dict[str, str] | None = None) -> bytes:
+    """JSON-encode *payload*, splicing in already-serialized values for *raw_fields* keys."""
+    if not raw_fields:
+        return json.dumps(payload).encode("utf-8")
+    head = json.dumps({k: v for k, v in payload.items() if k not in raw_fields})
+    tail = ", ".join(f"{json.dumps(k)}: {v}" for k, v in raw_fields.items())
+    if head == "{}":
+        return ("{" + tail + "}").encode("utf-8")
+    return (head[:-1] + ", " + tail + "}").encode("utf-8")
+
+
 def _http_stream_sse(
     url: str,
     method: str,
@@ -212,201 +291,465 @@ def _http_stream_sse(
     stream_timeout: float = 120,
     max_retries: int = 3,
     on_sse_event: "Callable[[str, dict[str, Any]], None] | None" = None,
+    keep_events: bool = True,
+    retry_policy: RetryPolicy | None = None,
+    limiter: ProviderLimiter | None = None,
+    raw_fields: dict[str, str] | None = None,
+    on_first_byte: Callable[[], None] | None = None,
+    cancel: threading.Event | None = None,
 ) -> list[tuple[str, dict[str, Any]]]:
-    """Stream an SSE endpoint with first-byte timeout and retry logic."""
-    data = json.dumps(payload).encode("utf-8")
+    """Stream an SSE endpoint with first-byte timeout and retry logic.
+
+    Connection errors and first-byte timeouts are retried up to
+    *max_retries* times.  Retryable HTTP statuses (429, 5xx, ...) are retried
+    per *retry_policy* with backoff, honouring ``retry-after``; a 429 also
+    pauses *limiter* so sibling requests to the same provider wait too.
+    *raw_fields* maps payload keys to pre-serialized JSON used in their place.
+
+    Time-to-first-byte and total duration are recorded in the provider's
+    :func:`~agent.ratelimit.latency_for` tracker.  Setting *cancel* raises
+    :class:`ModelCancelled` before the next attempt or streamed line.
+    """
+    data = _encode_payload(payload, raw_fields)
+    policy = retry_policy or default_policy()
+    latency = latency_for(url)
 
     last_exc: Exception | None = None
-    for attempt in range(max_retries):
-        req = urllib.request.Request(url=url, data=data, headers=headers, method=method)
+    timeouts = 0
+    http_attempts = 0
+    # Tokens are charged once per logical request; retries only take a request slot.
+    charge = len(data) // 4
+    while timeouts < max_retries:
+        if cancel is not None and cancel.is_set():
+            raise ModelCancelled(f"Request to {url} cancelled")
+        if limiter is not None:
+            limiter.acquire(charge)
+            charge = 0
+        sent = time.monotonic()
         try:
-            resp = urllib.request.urlopen(req, timeout=first_byte_timeout)
-        except urllib.error.HTTPError as exc:
-            body = exc.read().decode("utf-8", errors="replace")
-            raise ModelError(f"HTTP {exc.code} calling {url}: {body}") from exc
-        except (socket.timeout, urllib.error.URLError, OSError) as exc:
+            resp = http_pool.request(method, url, body=data, headers=headers, timeout=first_byte_timeout)
+        except http_pool.HTTPStatusError as exc:
+            http_attempts += 1
+            retry_after = retry_after_from_headers(exc.headers)
+            if not policy.should_retry(exc.status, http_attempts, retry_after):
+                raise ModelError(f"HTTP {exc.status} calling {url}: {exc.text()}") from exc
+            if limiter is not None and exc.status == 429:
+                limiter.pause(
+                    retry_after if retry_after is not None else policy.delay(http_attempts),
+                    policy.max_delay,
+                )
+            else:
+                policy.sleep(policy.delay(http_attempts, retry_after))
+            continue
+        except (socket.timeout, OSError, http.client.HTTPException) as exc:
             # Timeout or connection error — retry
             last_exc = exc
+            timeouts += 1
+            if isinstance(exc, socket.timeout):
+                latency.timed_out()
             continue
 
+        # Time the provider, not the wait for a free pooled connection.
+        sent = getattr(resp, "sent_at", sent)
+        latency.first_byte(time.monotonic() - sent)
+        if on_first_byte is not None:
+            on_first_byte()
+        if limiter is not None:
+            limiter.observe(getattr(resp, "headers", None), policy.max_delay)
         # First byte received — extend timeout for the rest of the stream
-        _extend_socket_timeout(resp, stream_timeout)
+        resp.set_timeout(stream_timeout)
         try:
-            return _read_sse_events(resp, on_sse_event=on_sse_event)
+            lines = resp if cancel is None else _until_cancelled(resp, cancel, url)
+            events = _read_sse_events(lines, on_sse_event=on_sse_event, keep_events=keep_events)
+        except ModelCancelled:
+            # Don't wait for the rest of an abandoned stream to drain.
+            getattr(resp, "abort", resp.close)()
+            raise
         finally:
             resp.close()
+        latency.finished(time.monotonic() - sent)
+        return events
 
     raise ModelError(
         f"Timed out after {max_retries} attempts calling {url}: {last_exc}"
     )
 
 
-def _accumulate_openai_stream(
-    events: list[tuple[str, dict[str, Any]]],
-) -> dict[str, Any]:
-    """Reconstruct an OpenAI non-streaming response dict from SSE delta chunks."""
-    text_parts: list[str] = []
-    tool_calls_by_index: dict[int, dict[str, Any]] = {}
-    finish_reason = ""
-    usage: dict[str, Any] = {}
+def _until_cancelled(resp: Any, cancel: threading.Event, url: str) -> Any:
+    for line in resp:
+        if cancel.is_set():
+            raise ModelCancelled(f"Request to {url} cancelled")
+        yield line
 
-    for _event_type, chunk in events:
-        # Usage may appear in a dedicated chunk or alongside the last delta
-        if "usage" in chunk and chunk["usage"]:
-            usage = chunk["usage"]
 
-        choices = chunk.get("choices")
+def _parse_tool_arguments(raw: str) -> dict[str, Any] | None:
+    """Parse streamed tool-call argument JSON; ``None`` if it is not a complete object."""
+    if not raw.strip():
+        return {}
+    try:
+        args = json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+    return args if isinstance(args, dict) else None
+
+
+class _OpenAIToolCallWatcher:
+    """SSE listener that reports each OpenAI tool call once its arguments are complete.
+
+    A call is complete when its argument string parses as a JSON object, when
+    a later tool-call index starts, or when the choice finishes.
+    """
+
+    def __init__(self, callback: ToolCallCallback) -> None:
+        self._callback = callback
+        self._calls: dict[int, dict[str, Any]] = {}
+        self._reported: set[int] = set()
+
+    def __call__(self, _event_type: str, data: dict[str, Any]) -> None:
+        choices = data.get("choices")
         if not choices:
-            continue
+            return
         choice = choices[0]
-        fr = choice.get("finish_reason")
-        if fr:
-            finish_reason = fr
+        for tc_delta in (choice.get("delta") or {}).get("tool_calls") or []:
+            idx = tc_delta.get("index", 0)
+            for earlier in [i for i in self._calls if i < idx]:
+                self._report(earlier)
+            call = self._calls.setdefault(idx, {"id": "", "name": "", "arguments": ""})
+            if tc_delta.get("id"):
+                call["id"] = tc_delta["id"]
+            func = tc_delta.get("function") or {}
+            if func.get("name"):
+                call["name"] = func["name"]
+            chunk = func.get("arguments") or ""
+            call["arguments"] += chunk
+            if chunk.rstrip().endswith("}"):
+                self._report(idx, require_complete=True)
+        if choice.get("finish_reason"):
+            for idx in sorted(self._calls):
+                self._report(idx)
+
+    def _report(self, idx: int, require_complete: bool = False) -> None:
+        if idx in self._reported:
+            return
+        call = self._calls[idx]
+        args = _parse_tool_arguments(call["arguments"])
+        if args is None or not call["name"]:
+            if not require_complete:
+                self._reported.add(idx)
+            return
+        self._reported.add(idx)
+        self._callback(ToolCall(id=call["id"], name=call["name"], arguments=args))
+
+
+class _AnthropicToolCallWatcher:
+    """SSE listener that reports each Anthropic tool_use block at ``content_block_stop``."""
+
+    def __init__(self, callback: ToolCallCallback) -> None:
+        self._callback = callback
+        self._blocks: dict[int, dict[str, Any]] = {}
+
+    def __call__(self, event_type: str, data: dict[str, Any]) -> None:
+        msg_type = data.get("type", event_type)
+        idx = data.get("index", 0)
+        if msg_type == "content_block_start":
+            block = data.get("content_block", {})
+            if block.get("type") == "tool_use":
+                self._blocks[idx] = {"id": block.get("id", ""), "name": block.get("name", ""), "json": []}
+        elif msg_type == "content_block_delta":
+            delta = data.get("delta", {})
+            if idx in self._blocks and delta.get("type") == "input_json_delta":
+                self._blocks[idx]["json"].append(delta.get("partial_json", ""))
+        elif msg_type == "content_block_stop":
+            block = self._blocks.pop(idx, None)
+            if block is None:
+                return
+            args = _parse_tool_arguments("".join(block["json"]))
+            if args is not None and block["name"]:
+                self._callback(ToolCall(id=block["id"], name=block["name"], arguments=args))
+
+
+def _chain_sse_listeners(
+    primary: "Callable[[str, dict[str, Any]], None]",
+    *observers: "Callable[[str, dict[str, Any]], None] | None",
+) -> "Callable[[str, dict[str, Any]], None]":
+    """Dispatch each event to *primary*, then to every observer.
+
+    Errors from *primary* (the accumulator) propagate; errors from observers
+    such as UI delta callbacks are swallowed so they cannot break the turn.
+    """
+    active = [fn for fn in observers if fn is not None]
+    if not active:
+        return primary
+
+    def _dispatch(event_type: str, data: dict[str, Any]) -> None:
+        primary(event_type, data)
+        for fn in active:
+            try:
+                fn(event_type, data)
+            except Exception:
+                pass
+
+    return _dispatch
+
+
+def _usage_total(usage: dict[str, Any]) -> int:
+    """Total tokens in an OpenAI- or Anthropic-style usage dict."""
+    total = 0
+    for key in ("prompt_tokens", "completion_tokens", "input_tokens", "output_tokens"):
+        value = usage.get(key)
+        if isinstance(value, int):
+            total += value
+    return total
+
+
+_EPHEMERAL_CACHE = {"type": "ephemeral"}
+
+
+def _rolling_breakpoints(messages: list[Any]) -> list[int]:
+    """Indices to mark so consecutive requests hit the cache.
+
+    The last message is written to the cache by this request; the last
+    non-assistant message before the newest assistant turn is the breakpoint
+    the previous request wrote, so it is read back here.
+    """
+    if not messages:
+        return []
+    marks = [len(messages) - 1]
+    for i in range(len(messages) - 1, 0, -1):
+        if isinstance(messages[i], dict) and messages[i].get("role") == "assistant":
+            if i - 1 not in marks:
+                marks.append(i - 1)
+            break
+    return marks
+
+
+def _with_cache_control(message: Any) -> Any:
+    """Copy of *message* whose last content part carries a cache breakpoint."""
+    if not isinstance(message, dict) or message.get("role") == "assistant":
+        return message
+    content = message.get("content")
+    if isinstance(content, str):
+        if not content:
+            return message
+        parts: list[Any] = [{"type": "text", "text": content, "cache_control": _EPHEMERAL_CACHE}]
+    elif isinstance(content, list) and content and isinstance(content[-1], dict):
+        parts = [*content[:-1], {**content[-1], "cache_control": _EPHEMERAL_CACHE}]
+    else:
+        return message
+    return {**message, "content": parts}
 
-        delta = choice.get("delta", {})
-        if not delta:
-            continue
 
-        # Text content
+def _cache_marked_messages(messages: list[Any]) -> list[Any]:
+    """Shallow copy of *messages* with rolling cache breakpoints; the input is untouched."""
+    marked = list(messages)
+    for i in _rolling_breakpoints(messages):
+        marked[i] = _with_cache_control(marked[i])
+    return marked
+
+
+def _cache_usage(usage: dict[str, Any]) -> tuple[int, int]:
+    """(cache read, cache write) tokens from an OpenAI- or Anthropic-style usage dict."""
+    details = usage.get("prompt_tokens_details")
+    if isinstance(details, dict):
+        return int(details.get("cached_tokens") or 0), int(details.get("cache_write_tokens") or 0)
+    return int(usage.get("cache_read_input_tokens") or 0), int(usage.get("cache_creation_input_tokens") or 0)
+
+
+class _OpenAIStreamAccumulator:
+    """Incrementally rebuild an OpenAI chat completion from SSE delta chunks.
+
+    Used as an ``on_sse_event`` listener so events never need to be kept:
+    text and argument fragments go to per-call chunk lists and are joined
+    once in :meth:`result`, keeping work linear in the response length.
+    """
+
+    def __init__(self) -> None:
+        self.events_seen = 0
+        self._text: list[str] = []
+        self._calls: dict[int, dict[str, Any]] = {}
+        self._arguments: dict[int, list[str]] = {}
+        self._finish_reason = ""
+        self._usage: dict[str, Any] = {}
+
+    def __call__(self, _event_type: str, chunk: dict[str, Any]) -> None:
+        self.events_seen += 1
+        # Usage may appear in a dedicated chunk or alongside the last delta
+        if chunk.get("usage"):
+            self._usage = chunk["usage"]
+        choices = chunk.get("choices")
+        if not choices:
+            return
+        choice = choices[0]
+        if choice.get("finish_reason"):
+            self._finish_reason = choice["finish_reason"]
+        delta = choice.get("delta") or {}
         content = delta.get("content")
         if content:
-            text_parts.append(content)
-
-        # Tool calls (streamed incrementally)
-        tc_deltas = delta.get("tool_calls")
-        if tc_deltas:
-            for tc_delta in tc_deltas:
-                idx = tc_delta.get("index", 0)
-                if idx not in tool_calls_by_index:
-                    tool_calls_by_index[idx] = {
-                        "id": tc_delta.get("id", ""),
-                        "type": "function",
-                        "function": {"name": "", "arguments": ""},
-                    }
-                tc = tool_calls_by_index[idx]
-                if tc_delta.get("id"):
-                    tc["id"] = tc_delta["id"]
-                func = tc_delta.get("function", {})
-                if func.get("name"):
-                    tc["function"]["name"] = func["name"]
-                if func.get("arguments"):
-                    tc["function"]["arguments"] += func["arguments"]
-
-    # Build the final message
-    message: dict[str, Any] = {
-        "role": "assistant",
-        "content": "".join(text_parts) if text_parts else None,
-    }
-    if tool_calls_by_index:
-        message["tool_calls"] = [
-            tool_calls_by_index[i] for i in sorted(tool_calls_by_index)
-        ]
-    else:
-        message["tool_calls"] = None
-
-    result: dict[str, Any] = {
-        "choices": [{"message": message, "finish_reason": finish_reason}],
-    }
-    if usage:
-        result["usage"] = usage
-    return result
+            self._text.append(content)
+        for tc_delta in delta.get("tool_calls") or []:
+            idx = tc_delta.get("index", 0)
+            call = self._calls.get(idx)
+            if call is None:
+                call = self._calls[idx] = {
+                    "id": tc_delta.get("id", ""),
+                    "type": "function",
+                    "function": {"name": "", "arguments": ""},
+                }
+                self._arguments[idx] = []
+            if tc_delta.get("id"):
+                call["id"] = tc_delta["id"]
+            func = tc_delta.get("function") or {}
+            if func.get("name"):
+                call["function"]["name"] = func["name"]
+            if func.get("arguments"):
+                self._arguments[idx].append(func["arguments"])
+
+    def result(self) -> dict[str, Any]:
+        """The equivalent non-streaming response dict."""
+        message: dict[str, Any] = {
+            "role": "assistant",
+            "content": "".join(self._text) if self._text else None,
+            "tool_calls": None,
+        }
+        if self._calls:
+            calls = []
+            for idx in sorted(self._calls):
+                call = self._calls[idx]
+                call["function"]["arguments"] = "".join(self._arguments[idx])
+                calls.append(call)
+            message["tool_calls"] = calls
+        result: dict[str, Any] = {
+            "choices": [{"message": message, "finish_reason": self._finish_reason}],
+        }
+        if self._usage:
+            result["usage"] = self._usage
+        return result
 
 
-def _accumulate_anthropic_stream(
+def _accumulate_openai_stream(
     events: list[tuple[str, dict[str, Any]]],
 ) -> dict[str, Any]:
-    """Reconstruct an Anthropic non-streaming response dict from SSE events."""
-    content_blocks: list[dict[str, Any]] = []
-    # Track in-progress blocks by index
-    blocks_by_index: dict[int, dict[str, Any]] = {}
-    stop_reason = ""
-    usage: dict[str, Any] = {}
+    """Reconstruct an OpenAI non-streaming response dict from SSE delta chunks."""
+    acc = _OpenAIStreamAccumulator()
+    for event_type, chunk in events:
+        acc(event_type, chunk)
+    return acc.result()
 
-    for event_type, data in events:
+
+# Anthropic block type -> the field its streamed deltas extend.
+_ANTHROPIC_DELTA_FIELDS = {
+    "text_delta": ("text", "text"),
+    "thinking_delta": ("thinking", "thinking"),
+    "input_json_delta": ("partial_json", "_input_json"),
+}
+
+
+class _AnthropicStreamAccumulator:
+    """Incrementally rebuild an Anthropic message from SSE events.
+
+    Text, thinking and tool-input JSON fragments are appended to per-block
+    chunk lists and joined once when the block stops (tool input is parsed
+    at that point), so cost grows linearly with output length.
+    """
+
+    def __init__(self) -> None:
+        self.events_seen = 0
+        self._blocks: dict[int, dict[str, Any]] = {}
+        self._chunks: dict[int, dict[str, list[str]]] = {}
+        self._stop_reason = ""
+        self._usage: dict[str, Any] = {}
+
+    def __call__(self, event_type: str, data: dict[str, Any]) -> None:
+        self.events_seen += 1
         msg_type = data.get("type", event_type)
 
         if msg_type == "message_start":
-            msg = data.get("message", {})
-            msg_usage = msg.get("usage", {})
-            if msg_usage:
-                usage.update(msg_usage)
+            msg_usage = (data.get("message") or {}).get("usage") or {}
+            self._usage.update(msg_usage)
 
         elif msg_type == "content_block_start":
-            idx = data.get("index", len(blocks_by_index))
+            idx = data.get("index", len(self._blocks))
             block = data.get("content_block", {})
             btype = block.get("type", "text")
+            chunks: dict[str, list[str]] = {}
             if btype == "text":
-                blocks_by_index[idx] = {"type": "text", "text": block.get("text", "")}
+                self._blocks[idx] = {"type": "text"}
+                chunks["text"] = [block.get("text", "")]
             elif btype == "tool_use":
-                blocks_by_index[idx] = {
+                self._blocks[idx] = {
                     "type": "tool_use",
                     "id": block.get("id", ""),
                     "name": block.get("name", ""),
                     "input": {},
-                    "_input_json": "",
                 }
+                chunks["_input_json"] = []
             elif btype == "thinking":
-                blocks_by_index[idx] = {
-                    "type": "thinking",
-                    "thinking": block.get("thinking", ""),
-                }
+                self._blocks[idx] = {"type": "thinking"}
+                chunks["thinking"] = [block.get("thinking", "")]
             else:
-                blocks_by_index[idx] = dict(block)
+                self._blocks[idx] = dict(block)
+            self._chunks[idx] = chunks
 
         elif msg_type == "content_block_delta":
             idx = data.get("index", 0)
             delta = data.get("delta", {})
             delta_type = delta.get("type", "")
-            block = blocks_by_index.get(idx)
+            block = self._blocks.get(idx)
             if block is None:
-                continue
-            if delta_type == "text_delta":
-                block["text"] = block.get("text", "") + delta.get("text", "")
-            elif delta_type == "input_json_delta":
-                block["_input_json"] = block.get("_input_json", "") + delta.get(
-                    "partial_json", ""
-                )
-            elif delta_type == "thinking_delta":
-                block["thinking"] = block.get("thinking", "") + delta.get(
-                    "thinking", ""
-                )
-            elif delta_type == "signature_delta":
+                return
+            if delta_type == "signature_delta":
                 block["signature"] = delta.get("signature", "")
+                return
+            spec = _ANTHROPIC_DELTA_FIELDS.get(delta_type)
+            if spec is not None:
+                source, target = spec
+                self._chunks.setdefault(idx, {}).setdefault(target, []).append(delta.get(source, ""))
 
         elif msg_type == "content_block_stop":
-            idx = data.get("index", 0)
-            block = blocks_by_index.get(idx)
-            if block and block.get("type") == "tool_use":
-                raw_json = block.pop("_input_json", "")
-                if raw_json:
-                    try:
-                        block["input"] = json.loads(raw_json)
-                    except json.JSONDecodeError:
-                        block["input"] = {}
+            self._finalize(data.get("index", 0))
 
         elif msg_type == "message_delta":
             delta = data.get("delta", {})
             if delta.get("stop_reason"):
-                stop_reason = delta["stop_reason"]
+                self._stop_reason = delta["stop_reason"]
             delta_usage = data.get("usage", {})
             if delta_usage:
-                usage.update(delta_usage)
-
-        elif msg_type == "message_stop":
-            pass  # End of stream
+                self._usage.update(delta_usage)
+
+    def _finalize(self, idx: int) -> None:
+        block = self._blocks.get(idx)
+        chunks = self._chunks.pop(idx, None)
+        if block is None or chunks is None:
+            return
+        for field_name, parts in chunks.items():
+            joined = "".join(parts)
+            if field_name != "_input_json":
+                block[field_name] = joined
+            elif joined:
+                try:
+                    block["input"] = json.loads(joined)
+                except json.JSONDecodeError:
+                    block["input"] = {}
+
+    def result(self) -> dict[str, Any]:
+        """The equivalent non-streaming response dict."""
+        for idx in list(self._chunks):
+            self._finalize(idx)
+        return {
+            "content": [self._blocks[idx] for idx in sorted(self._blocks)],
+            "stop_reason": self._stop_reason,
+            "usage": self._usage,
+        }
 
-    # Finalize content blocks in index order
-    for idx in sorted(blocks_by_index):
-        block = blocks_by_index[idx]
-        # Clean up internal fields
-        block.pop("_input_json", None)
-        content_blocks.append(block)
 
-    return {
-        "content": content_blocks,
-        "stop_reason": stop_reason,
-        "usage": usage,
-    }
+def _accumulate_anthropic_stream(
+    events: list[tuple[str, dict[str, Any]]],
+) -> dict[str, Any]:
+    """Reconstruct an Anthropic non-streaming response dict from SSE events."""
+    acc = _AnthropicStreamAccumulator()
+    for event_type, data in events:
+        acc(event_type, data)
+    return acc.result()
 
 
 def _parse_timestamp(value: object) -> int:
@@ -576,8 +919,20 @@ class OpenAICompatibleModel:
     timeout_sec: int = 300
     extra_headers: dict[str, str] = field(default_factory=dict)
     strict_tools: bool = True
+    # Explicit definitions override ``tool_set``; both None offers every tool.
+    tool_set: ToolSet | None = None
+    # OpenAI: send a stable ``prompt_cache_key``; Claude via OpenRouter: add
+    # ``cache_control`` breakpoints.  Other providers get no hints.
+    prompt_caching: bool = True
     tool_defs: list[dict[str, Any]] | None = None
     on_content_delta: Callable[[str, str], None] | None = None
+    # Called from the streaming thread as soon as each tool call is fully received.
+    on_tool_call: ToolCallCallback | None = None
+    # Debugging aid: keep the last turn's raw SSE events in ``last_stream_events``.
+    keep_stream_events: bool = False
+    # None uses the process-wide policy from ratelimit.configure().
+    retry_policy: RetryPolicy | None = None
+    last_stream_events: list[tuple[str, dict[str, Any]]] = field(default_factory=list, repr=False)
 
     def _is_reasoning_model(self) -> bool:
         """OpenAI reasoning models (o-series, gpt-5 series) have different API constraints."""
@@ -593,6 +948,28 @@ class OpenAICompatibleModel:
             return True
         return False
 
+    def _cache_hint_kind(self) -> str | None:
+        if not self.prompt_caching:
+            return None
+        if "api.openai.com" in self.base_url:
+            return "key"
+        if "claude" in self.model.lower():
+            return "breakpoints"
+        return None
+
+    def _tool_schemas(self, options: CallOptions) -> ToolSchemas:
+        defs, tool_set = _resolve_tools(self.tool_defs, self.tool_set, options)
+        if defs is None:
+            return tool_schemas("openai", tool_set, strict=self.strict_tools)
+        tools = to_openai_tools(defs=defs, strict=self.strict_tools)
+        return ToolSchemas(tuple(d["name"] for d in defs), tuple(tools), json.dumps(tools))
+
+    def _prompt_cache_key(self, conversation: Conversation, schemas: ToolSchemas) -> str:
+        """Stable per system prompt and tool set, so requests sharing that prefix share a cache shard."""
+        names = ",".join(schemas.names)
+        digest = hashlib.sha256(f"{self.model}\0{conversation.system_prompt}\0{names}".encode("utf-8"))
+        return "openplanter-" + digest.hexdigest()[:24]
+
     def create_conversation(self, system_prompt: str, initial_user_message: str) -> Conversation:
         messages: list[Any] = [
             {"role": "system", "content": system_prompt},
@@ -600,17 +977,33 @@ class OpenAICompatibleModel:
         ]
         return Conversation(_provider_messages=messages, system_prompt=system_prompt)
 
-    def complete(self, conversation: Conversation) -> ModelTurn:
+    def complete(self, conversation: Conversation, options: CallOptions | None = None) -> ModelTurn:
+        options = options or _NO_OPTIONS
+        on_content_delta = options.on_content_delta or self.on_content_delta
+        on_tool_call = options.on_tool_call or self.on_tool_call
+        stop_sequences = _resolve_stop_sequences(conversation, options)
         is_reasoning = self._is_reasoning_model()
 
+        cache_hint = self._cache_hint_kind()
+        messages = conversation._provider_messages
+        if cache_hint == "breakpoints":
+            # The system prompt is a fixed breakpoint; the rest roll with the conversation.
+            messages = _cache_marked_messages(messages)
+            if messages and isinstance(messages[0], dict) and messages[0].get("role") == "system":
+                messages[0] = _with_cache_control(messages[0])
+
+        schemas = self._tool_schemas(options)
+
         payload: dict[str, Any] = {
             "model": self.model,
-            "messages": conversation._provider_messages,
-            "tools": to_openai_tools(defs=self.tool_defs, strict=self.strict_tools),
+            "messages": messages,
+            "tools": list(schemas.tools),
             "tool_choice": "auto",
             "stream": True,
             "stream_options": {"include_usage": True},
         }
+        if cache_hint == "key":
+            payload["prompt_cache_key"] = self._prompt_cache_key(conversation, schemas)
 
         # Set output token limit. Reasoning models use max_completion_tokens;
         # standard models use max_tokens.  This is critical for providers like
@@ -620,8 +1013,8 @@ class OpenAICompatibleModel:
         else:
             payload["max_tokens"] = self.max_tokens
 
-        if conversation.stop_sequences:
-            payload["stop"] = conversation.stop_sequences
+        if stop_sequences:
+            payload["stop"] = stop_sequences
 
         # Reasoning models (o-series) don't support temperature.
         if not is_reasoning:
@@ -642,7 +1035,7 @@ class OpenAICompatibleModel:
 
         # Build SSE event forwarder for streaming text deltas to TUI
         def _forward_delta(_event_type: str, data: dict[str, Any]) -> None:
-            cb = self.on_content_delta
+            cb = on_content_delta
             if cb is None:
                 return
             choices = data.get("choices")
@@ -655,37 +1048,50 @@ class OpenAICompatibleModel:
             if content:
                 cb("text", content)
 
-        sse_cb = _forward_delta if self.on_content_delta else None
-
-        try:
-            events = _http_stream_sse(
+        def _stream(body: dict[str, Any]) -> dict[str, Any]:
+            acc = _OpenAIStreamAccumulator()
+            limiter = limiter_for(url)
+            self.last_stream_events = _http_stream_sse(
                 url=url,
                 method="POST",
                 headers=headers,
-                payload=payload,
+                payload=body,
                 stream_timeout=self.timeout_sec,
-                on_sse_event=sse_cb,
+                on_sse_event=_chain_sse_listeners(
+                    acc,
+                    _forward_delta if on_content_delta else None,
+                    _OpenAIToolCallWatcher(on_tool_call) if on_tool_call else None,
+                ),
+                keep_events=self.keep_stream_events,
+                retry_policy=self.retry_policy,
+                limiter=limiter,
+                raw_fields={"tools": schemas.json},
+                on_first_byte=options.on_first_byte,
+                cancel=options.cancel,
             )
-            parsed = _accumulate_openai_stream(events)
+            result = acc.result()
+            usage = result.get("usage") or {}
+            limiter.settle(len(json.dumps(body)) // 4, _usage_total(usage))
+            return result
+
+        try:
+            parsed = _stream(payload)
         except ModelError as exc:
             text = str(exc).lower()
             unsupported_reasoning = effort and (
                 "reasoning_effort" in text
                 and ("unsupported_parameter" in text or "unknown" in text)
             )
-            if not unsupported_reasoning:
+            unsupported_cache_key = "prompt_cache_key" in payload and "prompt_cache_key" in text
+            if not (unsupported_reasoning or unsupported_cache_key):
                 raise
             payload = dict(payload)
-            payload.pop("reasoning_effort", None)
-            events = _http_stream_sse(
-                url=url,
-                method="POST",
-                headers=headers,
-                payload=payload,
-                stream_timeout=self.timeout_sec,
-                on_sse_event=sse_cb,
-            )
-            parsed = _accumulate_openai_stream(events)
+            if unsupported_reasoning:
+                payload.pop("reasoning_effort", None)
+            if unsupported_cache_key:
+                payload.pop("prompt_cache_key", None)
+                self.prompt_caching = False
+            parsed = _stream(payload)
 
         try:
             message = parsed["choices"][0]["message"]
@@ -718,16 +1124,19 @@ class OpenAICompatibleModel:
 
         # Extract token usage
         usage = parsed.get("usage", {})
-        input_tokens = usage.get("prompt_tokens", 0) if isinstance(usage, dict) else 0
-        output_tokens = usage.get("completion_tokens", 0) if isinstance(usage, dict) else 0
+        if not isinstance(usage, dict):
+            usage = {}
+        cache_read, cache_write = _cache_usage(usage)
 
         return ModelTurn(
             tool_calls=tool_calls,
             text=text_content,
             stop_reason=finish_reason,
             raw_response=message,
-            input_tokens=input_tokens,
-            output_tokens=output_tokens,
+            input_tokens=usage.get("prompt_tokens", 0),
+            output_tokens=usage.get("completion_tokens", 0),
+            cache_read_tokens=cache_read,
+            cache_write_tokens=cache_write,
         )
 
     def append_assistant_turn(self, conversation: Conversation, turn: ModelTurn) -> None:
@@ -781,6 +1190,17 @@ class AnthropicModel:
     timeout_sec: int = 300
     tool_defs: list[dict[str, Any]] | None = None
     on_content_delta: Callable[[str, str], None] | None = None
+    # Called from the streaming thread as soon as each tool call is fully received.
+    on_tool_call: ToolCallCallback | None = None
+    # Debugging aid: keep the last turn's raw SSE events in ``last_stream_events``.
+    keep_stream_events: bool = False
+    # None uses the process-wide policy from ratelimit.configure().
+    retry_policy: RetryPolicy | None = None
+    # Cache breakpoints on the system prompt, the tool list and the two newest user turns.
+    prompt_caching: bool = True
+    # Explicit definitions override ``tool_set``; both None offers every tool.
+    tool_set: ToolSet | None = None
+    last_stream_events: list[tuple[str, dict[str, Any]]] = field(default_factory=list, repr=False)
 
     def create_conversation(self, system_prompt: str, initial_user_message: str) -> Conversation:
         messages: list[Any] = [
@@ -788,23 +1208,41 @@ class AnthropicModel:
         ]
         return Conversation(_provider_messages=messages, system_prompt=system_prompt)
 
+    def _tool_schemas(self, options: CallOptions) -> ToolSchemas:
+        defs, tool_set = _resolve_tools(self.tool_defs, self.tool_set, options)
+        if defs is None:
+            return tool_schemas("anthropic", tool_set, cache_breakpoint=self.prompt_caching)
+        tools = to_anthropic_tools(defs=defs)
+        if self.prompt_caching and tools:
+            tools[-1] = {**tools[-1], "cache_control": _EPHEMERAL_CACHE}
+        return ToolSchemas(tuple(d["name"] for d in defs), tuple(tools), json.dumps(tools))
+
     def _is_opus_46(self) -> bool:
         return "opus-4-6" in self.model.lower() or "opus-4.6" in self.model.lower()
 
-    def complete(self, conversation: Conversation) -> ModelTurn:
+    def complete(self, conversation: Conversation, options: CallOptions | None = None) -> ModelTurn:
+        options = options or _NO_OPTIONS
+        on_content_delta = options.on_content_delta or self.on_content_delta
+        on_tool_call = options.on_tool_call or self.on_tool_call
+        stop_sequences = _resolve_stop_sequences(conversation, options)
         effort = (self.reasoning_effort or "").strip().lower()
         use_thinking = effort in {"low", "medium", "high"}
 
+        messages = conversation._provider_messages
+        if self.prompt_caching:
+            messages = _cache_marked_messages(messages)
+        schemas = self._tool_schemas(options)
+
         payload: dict[str, Any] = {
             "model": self.model,
             "max_tokens": self.max_tokens,
-            "messages": conversation._provider_messages,
-            "tools": to_anthropic_tools(defs=self.tool_defs),
+            "messages": messages,
+            "tools": list(schemas.tools),
             "stream": True,
         }
 
-        if conversation.stop_sequences:
-            payload["stop_sequences"] = conversation.stop_sequences
+        if stop_sequences:
+            payload["stop_sequences"] = stop_sequences
 
         # Thinking is incompatible with temperature — omit it entirely.
         if not use_thinking:
@@ -821,7 +1259,12 @@ class AnthropicModel:
                     payload["max_tokens"] = budget + 8192
                 payload["thinking"] = {"type": "enabled", "budget_tokens": budget}
         if conversation.system_prompt:
-            payload["system"] = conversation.system_prompt
+            if self.prompt_caching:
+                payload["system"] = [
+                    {"type": "text", "text": conversation.system_prompt, "cache_control": _EPHEMERAL_CACHE},
+                ]
+            else:
+                payload["system"] = conversation.system_prompt
 
         url = self.base_url.rstrip("/") + "/messages"
         headers: dict[str, str] = {
@@ -835,7 +1278,7 @@ class AnthropicModel:
 
         # Build SSE event forwarder for streaming deltas to TUI
         def _forward_delta(_event_type: str, data: dict[str, Any]) -> None:
-            cb = self.on_content_delta
+            cb = on_content_delta
             if cb is None:
                 return
             msg_type = data.get("type", _event_type)
@@ -852,18 +1295,34 @@ class AnthropicModel:
                 if text:
                     cb("text", text)
 
-        sse_cb = _forward_delta if self.on_content_delta else None
-
-        try:
-            events = _http_stream_sse(
+        def _stream(body: dict[str, Any]) -> dict[str, Any]:
+            acc = _AnthropicStreamAccumulator()
+            limiter = limiter_for(url)
+            self.last_stream_events = _http_stream_sse(
                 url=url,
                 method="POST",
                 headers=headers,
-                payload=payload,
+                payload=body,
                 stream_timeout=self.timeout_sec,
-                on_sse_event=sse_cb,
+                on_sse_event=_chain_sse_listeners(
+                    acc,
+                    _forward_delta if on_content_delta else None,
+                    _AnthropicToolCallWatcher(on_tool_call) if on_tool_call else None,
+                ),
+                keep_events=self.keep_stream_events,
+                retry_policy=self.retry_policy,
+                limiter=limiter,
+                raw_fields={"tools": schemas.json},
+                on_first_byte=options.on_first_byte,
+                cancel=options.cancel,
             )
-            parsed = _accumulate_anthropic_stream(events)
+            result = acc.result()
+            usage = result.get("usage") or {}
+            limiter.settle(len(json.dumps(body)) // 4, _usage_total(usage))
+            return result
+
+        try:
+            parsed = _stream(payload)
         except ModelError as exc:
             text = str(exc).lower()
             unsupported_thinking = use_thinking and (
@@ -875,15 +1334,7 @@ class AnthropicModel:
             payload = dict(payload)
             payload.pop("thinking", None)
             payload.pop("output_config", None)
-            events = _http_stream_sse(
-                url=url,
-                method="POST",
-                headers=headers,
-                payload=payload,
-                stream_timeout=self.timeout_sec,
-                on_sse_event=sse_cb,
-            )
-            parsed = _accumulate_anthropic_stream(events)
+            parsed = _stream(payload)
 
         stop_reason = parsed.get("stop_reason", "")
         content_blocks = parsed.get("content", [])
@@ -912,16 +1363,21 @@ class AnthropicModel:
 
         # Extract token usage
         usage = parsed.get("usage", {})
-        input_tokens = usage.get("input_tokens", 0) if isinstance(usage, dict) else 0
-        output_tokens = usage.get("output_tokens", 0) if isinstance(usage, dict) else 0
+        if not isinstance(usage, dict):
+            usage = {}
+        cache_read, cache_write = _cache_usage(usage)
 
+        # Anthropic's input_tokens excludes cached tokens; report the whole prompt
+        # so context-window accounting is unaffected by caching.
         return ModelTurn(
             tool_calls=tool_calls,
             text=text_content,
             stop_reason=stop_reason,
             raw_response=content_blocks,
-            input_tokens=input_tokens,
-            output_tokens=output_tokens,
+            input_tokens=usage.get("input_tokens", 0) + cache_read + cache_write,
+            output_tokens=usage.get("output_tokens", 0),
+            cache_read_tokens=cache_read,
+            cache_write_tokens=cache_write,
         )
 
     def append_assistant_turn(self, conversation: Conversation, turn: ModelTurn) -> None:
@@ -999,7 +1455,7 @@ class ScriptedModel:
             system_prompt=system_prompt,
         )
 
-    def complete(self, conversation: Conversation) -> ModelTurn:
+    def complete(self, conversation: Conversation, options: CallOptions | None = None) -> ModelTurn:
         if not self.scripted_turns:
             raise ModelError("ScriptedModel exhausted; no responses left.")
         return self.scripted_turns.pop(0)
@@ -1026,7 +1482,7 @@ class EchoFallbackModel:
             system_prompt=system_prompt,
         )
 
-    def complete(self, conversation: Conversation) -> ModelTurn:
+    def complete(self, conversation: Conversation, options: CallOptions | None = None) -> ModelTurn:
         return ModelTurn(text=self.note, stop_reason="end_turn")
 
     def append_assistant_turn(self, conversation: Conversation, turn: ModelTurn) -> None:
@@ -82,12 +82,15 @@ curses-based program.
 
 Always use non-interactive equivalents:
 - File editing: write_file(), apply_patch, sed -i, awk, python3 -c
-- Reading files: read_file(), cat, head, tail, grep
+- Reading files: read_file() (page large files with offset/limit), cat, head, tail, grep
 - Any interactive tool: find its -batch, -c, -e, --headless, or scripting mode
 
 == DATA INGESTION AND MANAGEMENT ==
-- Ingest and verify before analyzing. For any new dataset: run wc -l, head -20,
-  and sample queries to confirm format, encoding, and completeness before proceeding.
+- Ingest and verify before analyzing. For any new dataset: run profile_dataset
+  (row count, types, null rates, distinct counts, top values, samples) and sample
+  queries to confirm format, encoding, and completeness before proceeding.
+- For joins, filters and aggregations across CSV/JSONL files, use query_dataset (SQL
+  over cached, indexed tables) instead of writing one-off parsing scripts.
 - Preserve original source files; create derived versions separately. Never modify
   raw data in place.
 - When fetching APIs, paginate properly, verify completeness (compare returned count
@@ -258,6 +261,8 @@ subtask() and execute() each take TWO required parameters:
 
 Both parameters are REQUIRED. Calls missing acceptance_criteria will be REJECTED.
 A judge evaluates the child's result against your criteria and appends PASS/FAIL.
+Clauses of the form "<file> exists" or "<read-only command> outputs >= N" are
+checked by running them directly, so prefer them where possible.
 
 == VERIFICATION PRINCIPLE ==
 Implementation and verification must be UNCORRELATED. An agent that performs
@@ -0,0 +1,364 @@
+"""Retry policy and client-side rate limiting for model provider calls.
+
+:class:`RetryPolicy` decides whether a failed request is worth retrying and
+how long to wait: exponential backoff with full jitter, overridden by the
+server's ``retry-after`` (or provider-specific reset) headers when present.
+
+:class:`ProviderLimiter` throttles requests *before* the provider rejects
+them.  It holds two token buckets, requests/min and tokens/min, and is
+shared process-wide per provider origin through :func:`limiter_for`, so
+every parallel subtask draws from the same budget.  When a provider returns
+429 or advertises an exhausted quota, the limiter pauses all callers until
+the reset time; burst fan-outs then queue instead of failing.
+
+:class:`LatencyTracker` keeps rolling time-to-first-byte and total stream
+durations per provider (:func:`latency_for`, :func:`latency_stats`); hedged
+requests use its percentiles to decide when a call is running late.
+"""
+
+from __future__ import annotations
+
+import random
+import re
+import threading
+import time
+import urllib.parse
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Mapping
+
+# 529 is Anthropic's "overloaded"; 408/425 are transient by definition.
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504, 529})
+
+_DURATION_PART_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    sleep: Callable[[float], None] = field(default=time.sleep, repr=False)
+
+    def should_retry(self, status: int, attempt: int, retry_after: float | None = None) -> bool:
+        """*attempt* is the number of attempts made so far (1-based).
+
+        A server asking us to wait longer than ``max_delay`` is not retried:
+        waiting less would only be rejected again.
+        """
+        if retry_after is not None and retry_after > self.max_delay:
+            return False
+        return status in RETRYABLE_STATUSES and attempt < self.max_attempts
+
+    def delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """Seconds to wait before attempt ``attempt + 1``."""
+        if retry_after is not None:
+            return min(max(retry_after, 0.0), self.max_delay)
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+
+def _parse_duration(value: str) -> float | None:
+    """Parse ``"20"``, ``"1.5s"``, ``"250ms"`` or ``"6m0s"`` into seconds."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART_RE.findall(value)
+    if not parts or "".join(n + u for n, u in parts) != value:
+        return None
+    scale = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(n) * scale[u] for n, u in parts)
+
+
+def _seconds_until(value: str) -> float | None:
+    """Seconds from now until an HTTP-date or RFC 3339 timestamp."""
+    when: datetime | None = None
+    try:
+        when = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _header(headers: Mapping[str, Any] | None, name: str) -> str | None:
+    if not headers:
+        return None
+    getter = getattr(headers, "get", None)
+    value = getter(name) if getter else None
+    if value is None:
+        lowered = name.lower()
+        for key, item in headers.items():
+            if key.lower() == lowered:
+                value = item
+                break
+    return None if value is None else str(value)
+
+
+def retry_after_from_headers(headers: Mapping[str, Any] | None) -> float | None:
+    """How long the server asked us to wait, from any header it sent."""
+    raw = _header(headers, "retry-after-ms")
+    if raw is not None:
+        parsed = _parse_duration(raw)
+        if parsed is not None:
+            return parsed / 1000
+    raw = _header(headers, "retry-after")
+    if raw is not None:
+        parsed = _parse_duration(raw)
+        return parsed if parsed is not None else _seconds_until(raw)
+    return _exhausted_reset(headers)
+
+
+def _exhausted_reset(headers: Mapping[str, Any] | None) -> float | None:
+    """Longest reset among quotas the provider reports as exhausted."""
+    waits: list[float] = []
+    for kind in ("requests", "tokens", "input-tokens", "output-tokens"):
+        # OpenAI / OpenRouter style: x-ratelimit-remaining-requests + reset "1s".
+        remaining = _header(headers, f"x-ratelimit-remaining-{kind}")
+        reset = _header(headers, f"x-ratelimit-reset-{kind}")
+        if remaining is not None and reset is not None and _is_zero(remaining):
+            seconds = _parse_duration(reset)
+            if seconds is None:
+                seconds = _seconds_until(reset)
+            if seconds is not None:
+                waits.append(seconds)
+        # Anthropic style: anthropic-ratelimit-requests-remaining + RFC 3339 reset.
+        remaining = _header(headers, f"anthropic-ratelimit-{kind}-remaining")
+        reset = _header(headers, f"anthropic-ratelimit-{kind}-reset")
+        if remaining is not None and reset is not None and _is_zero(remaining):
+            seconds = _seconds_until(reset)
+            if seconds is not None:
+                waits.append(seconds)
+    return max(waits) if waits else None
+
+
+def _is_zero(value: str) -> bool:
+    try:
+        return float(value) <= 0
+    except ValueError:
+        return False
+
+
+@dataclass
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``per_minute / 60`` per second.
+
+    A non-positive ``per_minute`` means unlimited.  A single request larger
+    than the bucket's capacity is admitted once the bucket is full, so it
+    waits but cannot deadlock.
+    """
+
+    per_minute: float
+    capacity: float = 0.0
+    _level: float = field(default=0.0, repr=False)
+    _stamp: float = field(default_factory=time.monotonic, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.capacity <= 0:
+            self.capacity = self.per_minute
+        self._level = self.capacity
+
+    def _refill(self, now: float) -> None:
+        self._level = min(self.capacity, self._level + (now - self._stamp) * self.per_minute / 60.0)
+        self._stamp = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until *amount* can be taken (0 if it can be taken now)."""
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill(now)
+        need = min(amount, self.capacity)
+        if self._level >= need:
+            return 0.0
+        return (need - self._level) * 60.0 / self.per_minute
+
+    def take(self, amount: float) -> None:
+        if self.per_minute > 0:
+            self._level -= amount
+
+
+@dataclass
+class ProviderLimiter:
+    """Requests/min and tokens/min budgets for one provider, shared by all threads."""
+
+    requests_per_min: float = 0
+    tokens_per_min: float = 0
+    max_pause: float = 60.0
+    _requests: TokenBucket = field(init=False, repr=False)
+    _tokens: TokenBucket = field(init=False, repr=False)
+    _paused_until: float = field(default=0.0, repr=False)
+    _cond: threading.Condition = field(default_factory=threading.Condition, repr=False)
+    waits: int = 0
+    waited_sec: float = 0.0
+
+    def __post_init__(self) -> None:
+        self._requests = TokenBucket(self.requests_per_min)
+        self._tokens = TokenBucket(self.tokens_per_min)
+
+    def acquire(self, tokens: int = 0, timeout: float | None = None) -> float:
+        """Block until one request of ~*tokens* tokens may be sent; returns seconds waited."""
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = max(
+                    self._paused_until - now,
+                    self._requests.wait_time(1, now),
+                    self._tokens.wait_time(tokens, now),
+                )
+                if wait <= 0:
+                    self._requests.take(1)
+                    self._tokens.take(tokens)
+                    waited = now - start
+                    if waited > 0.001:
+                        self.waits += 1
+                        self.waited_sec += waited
+                    return waited
+                if deadline is not None:
+                    if now >= deadline:
+                        raise TimeoutError("rate limiter wait exceeded timeout")
+                    wait = min(wait, deadline - now)
+                self._cond.wait(wait)
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Charge (or refund) the difference between estimated and reported tokens."""
+        if actual <= 0:
+            return
+        with self._cond:
+            self._tokens.take(actual - estimated)
+            self._cond.notify_all()
+
+    def pause(self, seconds: float, max_seconds: float | None = None) -> None:
+        """Hold every caller for *seconds* (e.g. after a 429 with retry-after).
+
+        The pause is clamped to *max_seconds* (default ``max_pause``), so a
+        far-off quota reset cannot stall every caller indefinitely.
+        """
+        seconds = min(seconds, self.max_pause if max_seconds is None else max_seconds)
+        if seconds <= 0:
+            return
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def observe(self, headers: Mapping[str, Any] | None, max_seconds: float | None = None) -> None:
+        """Pause proactively if the provider reports an exhausted quota."""
+        wait = _exhausted_reset(headers)
+        if wait:
+            self.pause(wait, max_seconds)
+
+    def stats(self) -> dict[str, float]:
+        with self._cond:
+            return {"waits": self.waits, "waited_sec": round(self.waited_sec, 3)}
+
+
+def _percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+@dataclass
+class LatencyTracker:
+    """Rolling latency samples for one provider, shared by all threads."""
+
+    window: int = 200
+    _ttfb: deque[float] = field(init=False, repr=False)
+    _total: deque[float] = field(init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    requests: int = 0
+    timeouts: int = 0
+
+    def __post_init__(self) -> None:
+        self._ttfb = deque(maxlen=self.window)
+        self._total = deque(maxlen=self.window)
+
+    def first_byte(self, seconds: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self._ttfb.append(seconds)
+
+    def finished(self, seconds: float) -> None:
+        with self._lock:
+            self._total.append(seconds)
+
+    def timed_out(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def samples(self) -> int:
+        with self._lock:
+            return len(self._ttfb)
+
+    def percentile(self, p: float, total: bool = False) -> float | None:
+        """The *p* (0-1) percentile of time-to-first-byte (or total duration); None without samples."""
+        with self._lock:
+            samples = list(self._total if total else self._ttfb)
+        return _percentile(samples, p) if samples else None
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            ttfb, total = list(self._ttfb), list(self._total)
+            result: dict[str, float] = {"requests": self.requests, "timeouts": self.timeouts}
+        for name, samples in (("ttfb", ttfb), ("total", total)):
+            if samples:
+                result[f"{name}_p50"] = round(_percentile(samples, 0.5), 3)
+                result[f"{name}_p95"] = round(_percentile(samples, 0.95), 3)
+                result[f"{name}_max"] = round(max(samples), 3)
+        return result
+
+
+_LIMITERS: dict[str, ProviderLimiter] = {}
+_LATENCY: dict[str, LatencyTracker] = {}
+_LIMITS_LOCK = threading.Lock()
+_DEFAULT_LIMITS: dict[str, float] = {"requests_per_min": 0, "tokens_per_min": 0}
+_DEFAULT_POLICY = RetryPolicy()
+
+
+def configure(requests_per_min: float = 0, tokens_per_min: float = 0, max_attempts: int | None = None) -> None:
+    """Set process-wide defaults; limiters are rebuilt on next use."""
+    with _LIMITS_LOCK:
+        _DEFAULT_LIMITS["requests_per_min"] = requests_per_min
+        _DEFAULT_LIMITS["tokens_per_min"] = tokens_per_min
+        _LIMITERS.clear()
+    if max_attempts is not None:
+        _DEFAULT_POLICY.max_attempts = max(1, max_attempts)
+
+
+def default_policy() -> RetryPolicy:
+    return _DEFAULT_POLICY
+
+
+def limiter_for(url: str) -> ProviderLimiter:
+    """The shared limiter for *url*'s provider (keyed by host)."""
+    key = urllib.parse.urlsplit(url).netloc or url
+    with _LIMITS_LOCK:
+        limiter = _LIMITERS.get(key)
+        if limiter is None:
+            limiter = ProviderLimiter(**_DEFAULT_LIMITS)
+            _LIMITERS[key] = limiter
+        return limiter
+
+
+def latency_for(url: str) -> LatencyTracker:
+    """The shared latency tracker for *url*'s provider (keyed by host)."""
+    key = urllib.parse.urlsplit(url).netloc or url
+    with _LIMITS_LOCK:
+        tracker = _LATENCY.get(key)
+        if tracker is None:
+            tracker = _LATENCY[key] = LatencyTracker()
+        return tracker
+
+
+def latency_stats() -> dict[str, dict[str, float]]:
+    """Latency statistics for every provider host called so far."""
+    with _LIMITS_LOCK:
+        trackers = dict(_LATENCY)
+    return {host: tracker.stats() for host, tracker in sorted(trackers.items())}
@@ -67,6 +67,7 @@ class ReplayLogger:
         input_tokens: int = 0,
         output_tokens: int = 0,
         elapsed_sec: float = 0.0,
+        turn: dict[str, Any] | None = None,
     ) -> None:
         record: dict[str, Any] = {
             "type": "call",
@@ -81,6 +82,8 @@ class ReplayLogger:
         else:
             record["messages_delta"] = messages[self._last_msg_count:]
         record["response"] = response
+        if turn is not None:
+            record["turn"] = turn
         record["input_tokens"] = input_tokens
         record["output_tokens"] = output_tokens
         record["elapsed_sec"] = round(elapsed_sec, 3)
@@ -0,0 +1,375 @@
+"""Serve model turns recorded in a session's ``replay.jsonl``.
+
+:class:`ReplayModel` implements ``BaseModel`` on top of the log written by
+:class:`~agent.replay_log.ReplayLogger`, so a whole investigation (root and
+every subtask conversation) can be re-run offline with no provider calls:
+useful for profiling engine and tool overhead, reproducing regressions and
+benchmarking without paying for tokens.
+
+Conversations are matched to recorded ones by the ``objective`` and
+``depth`` of their initial message (first come, first served among equal
+keys, so parallel siblings may swap; their recordings are interchangeable
+for replay purposes).  Each ``complete()`` returns the next recorded turn of
+that conversation.
+
+Before serving a turn, the tool results the engine produced are compared
+with the recorded ones (timestamps ignored).  On a mismatch, an unknown
+conversation or an exhausted recording the model either raises
+:class:`ReplayDivergence` (``on_divergence="fail"``), keeps serving the
+recording (``"ignore"``; exhaustion still raises), or hands the conversation
+to a live ``fallback`` model for the rest of its life (``"fallthrough"``).
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+from .model import (
+    BaseModel,
+    CallOptions,
+    Conversation,
+    ModelError,
+    ModelTurn,
+    ToolCall,
+    ToolResult,
+)
+
+_DIVERGENCE_MODES = ("fail", "ignore", "fallthrough")
+_TIMESTAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?")
+
+
+class ReplayDivergence(ModelError):
+    """The live run no longer matches the recording."""
+
+
+@dataclass
+class RecordedCall:
+    turn: ModelTurn
+    # Tool results sent with this call, by tool call id; None if not recoverable.
+    tool_results: dict[str, str] | None
+    elapsed_sec: float = 0.0
+
+
+@dataclass
+class RecordedConversation:
+    conversation_id: str
+    model: str = ""
+    provider: str = ""
+    key: tuple[str, ...] = ()
+    calls: list[RecordedCall] = field(default_factory=list)
+
+
+@dataclass
+class _ReplayConversation(Conversation):
+    recording: RecordedConversation | None = None
+    cursor: int = 0
+    initial_message: str = ""
+    pending_results: list[ToolResult] = field(default_factory=list)
+    history: list[tuple[ModelTurn, list[ToolResult]]] = field(default_factory=list)
+    live: Conversation | None = None
+
+
+def encode_turn(turn: ModelTurn) -> dict[str, Any]:
+    """Provider-neutral form of *turn*, logged as the ``turn`` field of a call record."""
+    record: dict[str, Any] = {
+        "text": turn.text,
+        "stop_reason": turn.stop_reason,
+        "tool_calls": [{"id": tc.id, "name": tc.name, "arguments": tc.arguments} for tc in turn.tool_calls],
+    }
+    if turn.cache_read_tokens or turn.cache_write_tokens:
+        record["cache_read_tokens"] = turn.cache_read_tokens
+        record["cache_write_tokens"] = turn.cache_write_tokens
+    return record
+
+
+def _decode_turn(record: dict[str, Any]) -> ModelTurn:
+    """Rebuild the turn of a ``call`` record, from ``turn`` or the raw provider response."""
+    response = record.get("response")
+    neutral = record.get("turn")
+    if isinstance(neutral, dict):
+        calls = [
+            ToolCall(id=str(c.get("id", "")), name=str(c.get("name", "")), arguments=c.get("arguments") or {})
+            for c in neutral.get("tool_calls") or []
+        ]
+        text = neutral.get("text")
+        stop_reason = neutral.get("stop_reason") or ""
+    else:
+        text, calls = _parse_response(response)
+        stop_reason = "tool_use" if calls else "end_turn"
+        neutral = {}
+    return ModelTurn(
+        tool_calls=calls,
+        text=text,
+        stop_reason=stop_reason,
+        raw_response=response,
+        input_tokens=int(record.get("input_tokens") or 0),
+        output_tokens=int(record.get("output_tokens") or 0),
+        cache_read_tokens=int(neutral.get("cache_read_tokens") or 0),
+        cache_write_tokens=int(neutral.get("cache_write_tokens") or 0),
+    )
+
+
+def _parse_response(response: Any) -> tuple[str | None, list[ToolCall]]:
+    """(text, tool calls) from an Anthropic content-block list or an OpenAI message."""
+    calls: list[ToolCall] = []
+    texts: list[str] = []
+    if isinstance(response, list):
+        for block in response:
+            if not isinstance(block, dict):
+                continue
+            if block.get("type") == "tool_use":
+                args = block.get("input")
+                calls.append(ToolCall(str(block.get("id", "")), str(block.get("name", "")), args if isinstance(args, dict) else {}))
+            elif block.get("type") == "text" and str(block.get("text", "")).strip():
+                texts.append(str(block["text"]))
+    elif isinstance(response, dict):
+        for tc in response.get("tool_calls") or []:
+            func = tc.get("function") or {}
+            try:
+                args = json.loads(func.get("arguments") or "{}")
+            except json.JSONDecodeError:
+                args = {}
+            calls.append(ToolCall(str(tc.get("id", "")), str(func.get("name", "")), args if isinstance(args, dict) else {}))
+        content = response.get("content")
+        if isinstance(content, str) and content.strip():
+            texts.append(content)
+    return ("\n".join(texts) if texts else None), calls
+
+
+def _block_text(content: Any) -> str:
+    if isinstance(content, list):
+        return "".join(str(b.get("text", "")) for b in content if isinstance(b, dict))
+    return str(content)
+
+
+def _tool_results_in(messages: list[Any]) -> dict[str, str]:
+    """Tool results by call id from OpenAI ``tool`` messages or Anthropic ``tool_result`` blocks."""
+    results: dict[str, str] = {}
+    for msg in messages:
+        if not isinstance(msg, dict):
+            continue
+        if msg.get("role") == "tool" and msg.get("tool_call_id"):
+            results[str(msg["tool_call_id"])] = _block_text(msg.get("content", ""))
+        content = msg.get("content")
+        if msg.get("role") == "user" and isinstance(content, list):
+            for block in content:
+                if isinstance(block, dict) and block.get("type") == "tool_result":
+                    results[str(block.get("tool_use_id", ""))] = _block_text(block.get("content", ""))
+    return results
+
+
+def _initial_user_text(messages: list[Any]) -> str:
+    for msg in messages:
+        if isinstance(msg, dict) and msg.get("role") == "user":
+            return _block_text(msg.get("content", ""))
+    return ""
+
+
+def conversation_key(initial_message: str) -> tuple[str, ...]:
+    """Match key for a conversation: objective and depth of its initial message."""
+    try:
+        data = json.loads(initial_message)
+    except (json.JSONDecodeError, TypeError):
+        return ("text", initial_message)
+    if not isinstance(data, dict) or "objective" not in data:
+        return ("text", initial_message)
+    return ("objective", str(data["objective"]), str(data.get("depth", 0)))
+
+
+def _normalize(text: str) -> str:
+    return _TIMESTAMP_RE.sub("<ts>", text).strip()
+
+
+def load_recordings(path: str | Path) -> list[RecordedConversation]:
+    """Parse *path* into conversations, in order of first appearance.
+
+    Conversation ids restart at ``root`` for every task in a session, so a
+    header for an id that already has calls opens a new recording.
+    """
+    recordings: list[RecordedConversation] = []
+    current: dict[str, RecordedConversation] = {}
+    with Path(path).open(encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            cid = str(record.get("conversation_id", "root"))
+            rec = current.get(cid)
+            if record.get("type") == "header":
+                if rec is None or rec.calls:
+                    rec = RecordedConversation(conversation_id=cid)
+                    current[cid] = rec
+                    recordings.append(rec)
+                rec.model = str(record.get("model", ""))
+                rec.provider = str(record.get("provider", ""))
+                continue
+            if record.get("type") != "call":
+                continue
+            if rec is None:
+                rec = RecordedConversation(conversation_id=cid)
+                current[cid] = rec
+                recordings.append(rec)
+            if "messages_snapshot" in record:
+                messages = record.get("messages_snapshot") or []
+                rec.key = conversation_key(_initial_user_text(messages))
+                results: dict[str, str] | None = None
+            else:
+                results = _tool_results_in(record.get("messages_delta") or [])
+            rec.calls.append(RecordedCall(
+                turn=_decode_turn(record),
+                tool_results=results,
+                elapsed_sec=float(record.get("elapsed_sec") or 0.0),
+            ))
+    return recordings
+
+
+@dataclass
+class ReplayModel:
+    """``BaseModel`` that serves the turns recorded in a ``replay.jsonl``."""
+
+    recordings: list[RecordedConversation]
+    on_divergence: str = "fail"
+    fallback: BaseModel | None = None
+    check_tool_results: bool = True
+    # Sleep this fraction of each recorded call's latency (0 = full speed).
+    latency_scale: float = 0.0
+    model: str = ""
+    divergences: list[str] = field(default_factory=list)
+    _queues: dict[tuple[str, ...], deque[RecordedConversation]] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.on_divergence not in _DIVERGENCE_MODES:
+            raise ValueError(f"on_divergence must be one of {_DIVERGENCE_MODES}")
+        if self.on_divergence == "fallthrough" and self.fallback is None:
+            raise ValueError("on_divergence='fallthrough' requires a fallback model")
+        for rec in self.recordings:
+            self._queues.setdefault(rec.key, deque()).append(rec)
+        if not self.model and self.recordings and self.recordings[0].model != "(unknown)":
+            self.model = self.recordings[0].model
+
+    @classmethod
+    def from_file(cls, path: str | Path, **kwargs: Any) -> "ReplayModel":
+        return cls(recordings=load_recordings(path), **kwargs)
+
+    def factory(self) -> Callable[[str, str | None], "ReplayModel"]:
+        """A ``model_factory`` that routes every delegated model to this replay."""
+        return lambda _name, _effort=None: self
+
+    def remaining(self) -> int:
+        """Recorded conversations not yet claimed by the live run."""
+        with self._lock:
+            return sum(len(q) for q in self._queues.values())
+
+    def create_conversation(self, system_prompt: str, initial_user_message: str) -> Conversation:
+        with self._lock:
+            queue = self._queues.get(conversation_key(initial_user_message))
+            recording = queue.popleft() if queue else None
+        return _ReplayConversation(
+            _provider_messages=[{"role": "user", "content": initial_user_message}],
+            system_prompt=system_prompt,
+            recording=recording,
+            initial_message=initial_user_message,
+        )
+
+    def complete(self, conversation: Conversation, options: CallOptions | None = None) -> ModelTurn:
+        if not isinstance(conversation, _ReplayConversation):
+            raise ModelError("ReplayModel can only complete conversations it created")
+        if conversation.live is not None:
+            return self._complete_live(conversation, options)
+        problem = self._check(conversation)
+        if problem is not None:
+            with self._lock:
+                self.divergences.append(problem)
+            exhausted = conversation.recording is None or conversation.cursor >= len(conversation.recording.calls)
+            if self.on_divergence == "fallthrough":
+                return self._fall_through(conversation, options)
+            if self.on_divergence == "fail" or exhausted:
+                raise ReplayDivergence(problem)
+        assert conversation.recording is not None
+        call = conversation.recording.calls[conversation.cursor]
+        conversation.cursor += 1
+        if self.latency_scale > 0 and call.elapsed_sec > 0:
+            time.sleep(call.elapsed_sec * self.latency_scale)
+        if options is not None and options.on_tool_call is not None:
+            for tc in call.turn.tool_calls:
+                options.on_tool_call(tc)
+        return call.turn
+
+    def _check(self, conversation: _ReplayConversation) -> str | None:
+        recording = conversation.recording
+        if recording is None:
+            return f"no recorded conversation for {conversation.initial_message[:120]!r}"
+        if conversation.cursor >= len(recording.calls):
+            return f"recording {recording.conversation_id} exhausted after {len(recording.calls)} calls"
+        expected = recording.calls[conversation.cursor].tool_results
+        if not self.check_tool_results or expected is None:
+            return None
+        for result in conversation.pending_results:
+            recorded = expected.get(result.tool_call_id)
+            if recorded is not None and _normalize(recorded) != _normalize(result.content):
+                return (
+                    f"{recording.conversation_id} call {conversation.cursor}: "
+                    f"{result.name} result for {result.tool_call_id} differs from the recording"
+                )
+        return None
+
+    def _fall_through(self, conversation: _ReplayConversation, options: CallOptions | None) -> ModelTurn:
+        """Rebuild the conversation in the fallback model and continue live."""
+        assert self.fallback is not None
+        live = self.fallback.create_conversation(conversation.system_prompt, conversation.initial_message)
+        for turn, results in conversation.history:
+            self.fallback.append_assistant_turn(live, turn)
+            if results:
+                self.fallback.append_tool_results(live, results)
+        if conversation.pending_results:
+            self.fallback.append_tool_results(live, conversation.pending_results)
+        conversation.live = live
+        return self._complete_live(conversation, options)
+
+    def _complete_live(self, conversation: _ReplayConversation, options: CallOptions | None) -> ModelTurn:
+        assert self.fallback is not None and conversation.live is not None
+        if options is None:
+            return self.fallback.complete(conversation.live)
+        return self.fallback.complete(conversation.live, options)
+
+    def append_assistant_turn(self, conversation: Conversation, turn: ModelTurn) -> None:
+        assert isinstance(conversation, _ReplayConversation)
+        if conversation.live is not None:
+            assert self.fallback is not None
+            self.fallback.append_assistant_turn(conversation.live, turn)
+            return
+        conversation.history.append((turn, []))
+        conversation.pending_results = []
+        conversation._provider_messages.append({"role": "assistant", "content": turn.text or ""})
+        conversation.turn_count += 1
+
+    def append_tool_results(self, conversation: Conversation, results: list[ToolResult]) -> None:
+        assert isinstance(conversation, _ReplayConversation)
+        if conversation.live is not None:
+            assert self.fallback is not None
+            self.fallback.append_tool_results(conversation.live, results)
+            return
+        conversation.pending_results.extend(results)
+        if conversation.history:
+            conversation.history[-1][1].extend(results)
+        for r in results:
+            conversation._provider_messages.append({"role": "tool", "tool_call_id": r.tool_call_id, "content": r.content})
+
+    def condense_conversation(self, conversation: Conversation, keep_recent_turns: int = 4) -> int:
+        if isinstance(conversation, _ReplayConversation) and conversation.live is not None:
+            condense = getattr(self.fallback, "condense_conversation", None)
+            if condense is not None:
+                return condense(conversation.live, keep_recent_turns)
+        return 0
@@ -0,0 +1,89 @@
+"""In-memory BM25 index over short text documents.
+
+Used by :class:`~agent.engine.ExternalContext` to pick the observations most
+relevant to a sub-agent's objective.  Documents are addressed by integer ids
+and can be removed, so a bounded store can evict old entries without a full
+rebuild.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+_TOKEN_RE = re.compile(r"[a-z0-9_]{2,}")
+_STOPWORDS = frozenset(
+    "the and for are but not you all any can had her was one our out has have "
+    "this that with from they will would there their what which when where who "
+    "into than then them these those its it's been being were does did done "
+    "per via use using file files".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+@dataclass
+class BM25Index:
+    """Okapi BM25 over an inverted index of ``term -> {doc_id: term_frequency}``."""
+
+    k1: float = 1.5
+    b: float = 0.75
+    _postings: dict[str, dict[int, int]] = field(default_factory=dict, repr=False)
+    _doc_terms: dict[int, Counter[str]] = field(default_factory=dict, repr=False)
+    _doc_lengths: dict[int, int] = field(default_factory=dict, repr=False)
+    _total_length: int = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(self, doc_id: int, text: str) -> None:
+        if doc_id in self._doc_lengths:
+            self.remove(doc_id)
+        terms = Counter(tokenize(text))
+        length = sum(terms.values())
+        self._doc_terms[doc_id] = terms
+        self._doc_lengths[doc_id] = length
+        self._total_length += length
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id: int) -> None:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc_id, 0)
+        for term in terms:
+            docs = self._postings.get(term)
+            if docs is None:
+                continue
+            docs.pop(doc_id, None)
+            if not docs:
+                del self._postings[term]
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._doc_terms.clear()
+        self._doc_lengths.clear()
+        self._total_length = 0
+
+    def search(self, query: str, limit: int = 10) -> list[tuple[int, float]]:
+        """Return up to *limit* ``(doc_id, score)`` pairs with a positive score, best first."""
+        n_docs = len(self._doc_lengths)
+        if n_docs == 0 or limit <= 0:
+            return []
+        avg_len = (self._total_length / n_docs) or 1.0
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            docs = self._postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return ranked[:limit]
@@ -0,0 +1,182 @@
+"""Tree-wide admission control for model calls.
+
+Every ``_solve_recursive`` frame used to fan out with its own thread pool, so
+concurrency compounded with depth and nothing bounded the number of model
+calls in flight.  :class:`FanoutScheduler` is owned by the engine and gates
+each model call behind a global limit plus optional per-provider and
+per-depth limits.  Waiting calls are admitted by priority: deeper nodes first
+(they are closest to finishing and releasing their conversation memory), then
+the sibling branch with the fewest calls in flight, then arrival order.
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+
+@dataclass
+class _Waiter:
+    provider: str
+    depth: int
+    branch: str
+    seq: int
+    enqueued_at: float
+
+
+@dataclass
+class _WaitStats:
+    count: int = 0
+    total_sec: float = 0.0
+    max_sec: float = 0.0
+
+    def add(self, waited: float) -> None:
+        self.count += 1
+        self.total_sec += waited
+        if waited > self.max_sec:
+            self.max_sec = waited
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_sec": round(self.total_sec, 4),
+            "mean_sec": round(self.total_sec / self.count, 4) if self.count else 0.0,
+            "max_sec": round(self.max_sec, 4),
+        }
+
+
+def _branch_prefixes(branch: str) -> list[str]:
+    """``"root/s1.0/s2.1"`` -> ``["root/s1.0", "root/s1.0/s2.1"]``."""
+    parts = branch.split("/")
+    return ["/".join(parts[: i + 1]) for i in range(1, len(parts))]
+
+
+@dataclass
+class FanoutScheduler:
+    """Bound concurrent model calls across an entire recursion tree.
+
+    A limit of ``0`` means unbounded.  ``per_depth_overrides`` maps a depth to
+    its own limit and takes precedence over ``max_per_depth``.
+    """
+
+    max_in_flight: int = 0
+    max_per_provider: int = 0
+    max_per_depth: int = 0
+    per_depth_overrides: dict[int, int] = field(default_factory=dict)
+    prefer_deeper: bool = True
+
+    def __post_init__(self) -> None:
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiters: list[_Waiter] = []
+        self._in_flight = 0
+        self._by_provider: dict[str, int] = {}
+        self._by_depth: dict[int, int] = {}
+        self._by_branch: dict[str, int] = {}
+        self._granted = 0
+        self._peak_in_flight = 0
+        self._peak_queue_depth = 0
+        self._wait = _WaitStats()
+        self._wait_by_provider: dict[str, _WaitStats] = {}
+
+    @contextmanager
+    def slot(self, provider: str, depth: int, branch: str = "root") -> Iterator[float]:
+        """Hold one model-call slot for the duration of the block.
+
+        Yields the number of seconds spent queued.
+        """
+        waited = self.acquire(provider, depth, branch)
+        try:
+            yield waited
+        finally:
+            self.release(provider, depth, branch)
+
+    def acquire(self, provider: str, depth: int, branch: str = "root") -> float:
+        waiter = _Waiter(provider, depth, branch, next(self._seq), time.monotonic())
+        with self._cond:
+            self._waiters.append(waiter)
+            self._peak_queue_depth = max(self._peak_queue_depth, len(self._waiters))
+            while self._next_admissible() is not waiter:
+                self._cond.wait()
+            self._waiters.remove(waiter)
+            self._grant(waiter)
+            waited = time.monotonic() - waiter.enqueued_at
+            self._wait.add(waited)
+            self._wait_by_provider.setdefault(provider, _WaitStats()).add(waited)
+            # Admission of this waiter may unblock a lower-priority one that
+            # fits under different limits.
+            self._cond.notify_all()
+        return waited
+
+    def release(self, provider: str, depth: int, branch: str = "root") -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._decrement(self._by_provider, provider)
+            self._decrement(self._by_depth, depth)
+            for prefix in _branch_prefixes(branch):
+                self._decrement(self._by_branch, prefix)
+            self._cond.notify_all()
+
+    def metrics(self) -> dict[str, Any]:
+        """Snapshot of queue depth, in-flight counts and wait-time statistics."""
+        with self._cond:
+            return {
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._waiters),
+                "peak_in_flight": self._peak_in_flight,
+                "peak_queue_depth": self._peak_queue_depth,
+                "granted": self._granted,
+                "in_flight_by_provider": dict(self._by_provider),
+                "in_flight_by_depth": dict(self._by_depth),
+                "wait": self._wait.to_dict(),
+                "wait_by_provider": {k: v.to_dict() for k, v in self._wait_by_provider.items()},
+            }
+
+    # ------------------------------------------------------------------
+    # Internals (call with self._cond held)
+    # ------------------------------------------------------------------
+
+    def _depth_limit(self, depth: int) -> int:
+        return self.per_depth_overrides.get(depth, self.max_per_depth)
+
+    def _fits(self, waiter: _Waiter) -> bool:
+        if self.max_in_flight > 0 and self._in_flight >= self.max_in_flight:
+            return False
+        if self.max_per_provider > 0 and self._by_provider.get(waiter.provider, 0) >= self.max_per_provider:
+            return False
+        depth_limit = self._depth_limit(waiter.depth)
+        if depth_limit > 0 and self._by_depth.get(waiter.depth, 0) >= depth_limit:
+            return False
+        return True
+
+    def _priority(self, waiter: _Waiter) -> tuple[Any, ...]:
+        depth_key = -waiter.depth if self.prefer_deeper else waiter.depth
+        fairness = tuple(self._by_branch.get(p, 0) for p in _branch_prefixes(waiter.branch))
+        return (depth_key, fairness, waiter.seq)
+
+    def _next_admissible(self) -> _Waiter | None:
+        candidates = [w for w in self._waiters if self._fits(w)]
+        if not candidates:
+            return None
+        return min(candidates, key=self._priority)
+
+    def _grant(self, waiter: _Waiter) -> None:
+        self._in_flight += 1
+        self._granted += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        self._by_provider[waiter.provider] = self._by_provider.get(waiter.provider, 0) + 1
+        self._by_depth[waiter.depth] = self._by_depth.get(waiter.depth, 0) + 1
+        for prefix in _branch_prefixes(waiter.branch):
+            self._by_branch[prefix] = self._by_branch.get(prefix, 0) + 1
+
+    @staticmethod
+    def _decrement(counts: dict[Any, int], key: Any) -> None:
+        remaining = counts.get(key, 0) - 1
+        if remaining > 0:
+            counts[key] = remaining
+        else:
+            counts.pop(key, None)
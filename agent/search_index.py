@@ -0,0 +1,435 @@
+"""On-disk trigram index that narrows ``search_files`` to candidate byte ranges.
+
+In the style of codesearch/zoekt: every indexed file is cut into at most
+``_MAX_BLOCKS`` blocks, and for each (case-folded) byte trigram the index
+stores a bitmap of the blocks it starts in.  A literal query can only match
+where all of its trigrams occur, so intersecting the bitmaps yields the few
+files -- and, within large files, the few blocks -- worth verifying exactly.
+
+The index lives in one SQLite database next to the file index.
+``sync_entries()`` takes each file's size, mtime and inode from the file
+index's rows (``sync()`` stats the given paths itself) and re-indexes only
+the files whose values changed; :meth:`TrigramIndex.diff` and
+:meth:`TrigramIndex.apply` split that so a large rebuild can run in the
+background.  Indexing stops once the estimated on-disk size reaches
+``budget_bytes``; files left out are still searched, just without narrowing,
+so the index never changes results -- only how much has to be read.
+
+Text is case-folded with ``str.casefold`` (files are decoded as UTF-8, with
+undecodable bytes kept as they are), so non-ASCII characters that fold to
+ASCII -- the Kelvin sign, long s, dotted capital I -- index under the letters
+they match.  Only the ASCII runs of a folded query contribute trigrams, so
+narrowing stays a superset of what ``str.lower()`` or rg's case-insensitive
+matching finds.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator
+
+_MIN_BLOCK = 64 * 1024
+_MAX_BLOCKS = 512
+# Query trigrams looked up per search; a handful already narrows well.
+_MAX_QUERY_TRIGRAMS = 24
+# Rough on-disk cost of one posting row (key, doc and the doc-index entry).
+_ROW_COST = 20
+_READ_CHUNK = 1 << 24
+# Files modified this recently may change again within the same mtime tick;
+# they are indexed but re-checked on the next sync.
+_RACY_WINDOW_SEC = 2.0
+_REGEX_META = set(".^$*+?{}[]()|\\")
+# Raw bytes past a block's end folded with it: enough for the two characters
+# (up to four bytes each) a trigram starting on the block's last byte needs.
+_LOOKAHEAD = 8
+# Bumped whenever trigram extraction changes; older databases are rebuilt.
+_FORMAT_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    block_size INTEGER NOT NULL,
+    indexed INTEGER NOT NULL,
+    cost INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    trigram INTEGER NOT NULL,
+    doc INTEGER NOT NULL,
+    blocks BLOB NOT NULL,
+    PRIMARY KEY (trigram, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings(doc);
+"""
+
+
+# (workspace-relative path, size, mtime_ns, inode)
+FileStat = tuple[str, int, int, int]
+
+
+@dataclass
+class _Doc:
+    id: int
+    size: int
+    mtime_ns: int
+    inode: int
+    block_size: int
+    indexed: bool
+    cost: int
+
+
+def _block_size(size: int) -> int:
+    return max(_MIN_BLOCK, -(-size // _MAX_BLOCKS))
+
+
+def _trigrams(data: bytes) -> set[int]:
+    """Every distinct 3-byte substring of *data*, as integer keys.
+
+    Each of the three strided passes packs non-overlapping trigrams into
+    zero-padded 4-byte words with C-level slice assignment and reads them
+    back as native ints, avoiding one Python object per byte offset.
+    """
+    found: set[int] = set()
+    for offset in range(3):
+        count = (len(data) - offset) // 3
+        if count <= 0:
+            continue
+        end = offset + 3 * count
+        words = bytearray(4 * count)
+        words[0::4] = data[offset:end:3]
+        words[1::4] = data[offset + 1:end:3]
+        words[2::4] = data[offset + 2:end:3]
+        found.update(memoryview(words).cast("I"))
+    return found
+
+
+def _fold(data: bytes) -> bytes:
+    if data.isascii():
+        return data.lower()
+    return data.decode("utf-8", "surrogateescape").casefold().encode("utf-8", "surrogateescape")
+
+
+def query_trigrams(literal: str) -> set[int]:
+    """Trigram keys any case-insensitive match of *literal* must contain."""
+    keys: set[int] = set()
+    for run in re.split(r"[^\x00-\x7f]+", literal.casefold()):
+        keys |= _trigrams(run.encode("ascii"))
+    return keys
+
+
+def required_literals(pattern: str) -> list[str]:
+    """Literal substrings every match of the regex *pattern* must contain.
+
+    Deliberately conservative: alternation yields nothing, group contents
+    and character classes are skipped, and a quantifier that allows zero
+    repetitions drops the character before it.
+    """
+    if "|" in pattern:
+        return []
+    literals: list[str] = []
+    run: list[str] = []
+
+    def flush() -> None:
+        if run:
+            literals.append("".join(run))
+            run.clear()
+
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\" and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            if nxt.isalnum():
+                flush()
+            else:
+                run.append(nxt)
+            i += 2
+            continue
+        if ch in "?*{":
+            if run:
+                run.pop()
+            flush()
+            if ch == "{":
+                close = pattern.find("}", i)
+                i = len(pattern) if close < 0 else close
+        elif ch == "[":
+            flush()
+            close = pattern.find("]", i + 2)
+            i = len(pattern) if close < 0 else close
+        elif ch == "(":
+            flush()
+            depth = 0
+            while i < len(pattern):
+                if pattern[i] == "\\":
+                    i += 1
+                elif pattern[i] == "(":
+                    depth += 1
+                elif pattern[i] == ")":
+                    depth -= 1
+                    if depth == 0:
+                        break
+                i += 1
+        elif ch in _REGEX_META:
+            flush()
+        else:
+            run.append(ch)
+        i += 1
+    flush()
+    return literals
+
+
+def is_literal(pattern: str) -> bool:
+    return not any(ch in _REGEX_META for ch in pattern)
+
+
+class TrigramIndex:
+    """Block-level trigram index for one workspace; safe to share between threads."""
+
+    def __init__(self, root: Path, db_path: Path, budget_bytes: int) -> None:
+        self.root = Path(root).resolve()
+        self.db_path = Path(db_path)
+        self.budget_bytes = budget_bytes
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        # Bumped whenever a sync changes anything; a cheap stamp for content-derived results.
+        self.generation = 0
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != _FORMAT_VERSION:
+            self._conn.executescript("DROP TABLE IF EXISTS postings; DROP TABLE IF EXISTS docs;")
+            self._conn.execute(f"PRAGMA user_version = {_FORMAT_VERSION}")
+        self._conn.executescript(_SCHEMA)
+        self._docs: dict[str, _Doc] = {
+            row[0]: _Doc(row[1], row[2], row[3], row[4], row[5], bool(row[6]), row[7])
+            for row in self._conn.execute(
+                "SELECT path, id, size, mtime_ns, inode, block_size, indexed, cost FROM docs"
+            )
+        }
+        self._cost = sum(doc.cost for doc in self._docs.values())
+        self.last_sync: dict[str, int] = {}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            indexed = sum(1 for doc in self._docs.values() if doc.indexed)
+            return {
+                "docs": len(self._docs),
+                "indexed": indexed,
+                "skipped": len(self._docs) - indexed,
+                "bytes": self._cost,
+                "budget_bytes": self.budget_bytes,
+            }
+
+    # -- maintenance ---------------------------------------------------------
+
+    def sync(self, paths: Iterable[str]) -> dict[str, int]:
+        """Re-index changed files among *paths* (workspace-relative) and drop the rest."""
+        entries = []
+        for rel in paths:
+            try:
+                st = os.stat(self.root / rel)
+            except OSError:
+                continue
+            entries.append((rel, st.st_size, st.st_mtime_ns, st.st_ino))
+        return self.sync_entries(entries)
+
+    def sync_entries(self, entries: Iterable[FileStat]) -> dict[str, int]:
+        """:meth:`sync` from ``(path, size, mtime_ns, inode)`` rows, e.g. the file index's; no stat calls."""
+        entries = list(entries)
+        changed, gone = self.diff(entries)
+        stats = self.apply(changed, gone)
+        stats["checked"] = len(entries)
+        return stats
+
+    def diff(self, entries: Iterable[FileStat]) -> tuple[list[FileStat], list[str]]:
+        """(entries to (re)index, indexed paths no longer present) for *entries*."""
+        with self._lock:
+            live: set[str] = set()
+            changed: list[FileStat] = []
+            for entry in entries:
+                rel = entry[0]
+                live.add(rel)
+                doc = self._docs.get(rel)
+                if doc is None or (doc.size, doc.mtime_ns, doc.inode) != tuple(entry[1:]):
+                    changed.append(entry)
+            return changed, [rel for rel in self._docs if rel not in live]
+
+    def apply(self, changed: list[FileStat], gone: list[str]) -> dict[str, int]:
+        """Apply a :meth:`diff`; takes the lock per file, so queries can interleave."""
+        stats = {"checked": 0, "indexed": 0, "skipped": 0, "removed": len(gone)}
+        for rel in gone:
+            with self._lock:
+                self._remove(rel)
+        for rel, size, mtime_ns, inode in changed:
+            with self._lock:
+                self._remove(rel)
+                if self._add(rel, size, mtime_ns, inode):
+                    stats["indexed"] += 1
+                else:
+                    stats["skipped"] += 1
+        if gone or changed:
+            with self._lock:
+                self.generation += 1
+        self.last_sync = stats
+        return stats
+
+    def _remove(self, rel: str) -> None:
+        doc = self._docs.pop(rel, None)
+        if doc is None:
+            return
+        self._conn.execute("BEGIN")
+        self._conn.execute("DELETE FROM postings WHERE doc = ?", (doc.id,))
+        self._conn.execute("DELETE FROM docs WHERE id = ?", (doc.id,))
+        self._conn.execute("COMMIT")
+        self._cost -= doc.cost
+
+    def _add(self, rel: str, size: int, mtime_ns: int, inode: int) -> bool:
+        """Index one file if it fits the budget; records it as unindexed otherwise."""
+        block_size = _block_size(size)
+        bitmaps: dict[int, int] = {}
+        # Cheap pre-check: text indexes to very roughly a quarter of its size.
+        fits = self._cost + size // 4 <= self.budget_bytes
+        if fits:
+            try:
+                with open(self.root / rel, "rb") as fh:
+                    block = 0
+                    current = fh.read(block_size)
+                    while current:
+                        following = fh.read(block_size)
+                        # Lookahead attributes boundary-spanning trigrams
+                        # to the block they start in.
+                        bit = 1 << block
+                        for tri in _trigrams(_fold(current + following[:_LOOKAHEAD])):
+                            bitmaps[tri] = bitmaps.get(tri, 0) | bit
+                        current = following
+                        block += 1
+            except OSError:
+                fits = False
+        rows = [
+            (tri, bm.to_bytes((bm.bit_length() + 7) // 8, "little"))
+            for tri, bm in bitmaps.items()
+        ] if fits else []
+        cost = sum(_ROW_COST + len(blob) for _, blob in rows)
+        if fits and self._cost + cost > self.budget_bytes:
+            fits, rows, cost = False, [], 0
+        if time.time() - mtime_ns / 1e9 < _RACY_WINDOW_SEC:
+            mtime_ns = -1
+        self._conn.execute("BEGIN")
+        cur = self._conn.execute(
+            "INSERT INTO docs(path, size, mtime_ns, inode, block_size, indexed, cost) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (rel, size, mtime_ns, inode, block_size, int(fits), cost),
+        )
+        doc_id = int(cur.lastrowid)
+        self._conn.executemany(
+            "INSERT INTO postings(trigram, doc, blocks) VALUES (?, ?, ?)",
+            ((tri, doc_id, blob) for tri, blob in rows),
+        )
+        self._conn.execute("COMMIT")
+        self._docs[rel] = _Doc(doc_id, size, mtime_ns, inode, block_size, fits, cost)
+        self._cost += cost
+        return fits
+
+    # -- queries -------------------------------------------------------------
+
+    def candidates(
+        self, paths: Iterable[str], literals: list[str], ranges: bool = True,
+    ) -> dict[str, list[tuple[int, int]] | None] | None:
+        """Narrow *paths* to those that can contain every literal.
+
+        Returns ``None`` when the literals are too short to narrow anything.
+        Otherwise maps each candidate path to the byte ranges worth reading,
+        or ``None`` for "the whole file" (small or unindexed files, or when
+        *ranges* is false).  Paths absent from the result cannot match.
+        """
+        keys: set[int] = set()
+        for literal in literals:
+            keys |= query_trigrams(literal)
+        if not keys:
+            return None
+        # Byte ranges are only sound for a single literal that fits in two blocks;
+        # a case-insensitive match may use up to four bytes per query character.
+        longest = max(4 * len(literal) for literal in literals)
+        ranges = ranges and len(literals) == 1
+        with self._lock:
+            acc: dict[int, int] | None = None
+            for key in sorted(keys)[:_MAX_QUERY_TRIGRAMS]:
+                found: dict[int, int] = {}
+                for doc_id, blob in self._conn.execute("SELECT doc, blocks FROM postings WHERE trigram = ?", (key,)):
+                    if acc is not None and doc_id not in acc:
+                        continue
+                    bm = int.from_bytes(blob, "little")
+                    # A match starting in block i has each trigram in block i or i+1.
+                    bm |= bm >> 1
+                    found[doc_id] = bm if acc is None else acc[doc_id] & bm
+                acc = {doc_id: bm for doc_id, bm in found.items() if bm}
+                if not acc:
+                    break
+            acc = acc or {}
+            result: dict[str, list[tuple[int, int]] | None] = {}
+            for rel in paths:
+                doc = self._docs.get(rel)
+                if doc is None or not doc.indexed:
+                    result[rel] = None
+                    continue
+                bm = acc.get(doc.id)
+                if bm is None:
+                    continue
+                if not ranges or doc.size <= doc.block_size or longest > doc.block_size:
+                    result[rel] = None
+                    continue
+                spans: list[tuple[int, int]] = []
+                while bm:
+                    low = bm & -bm
+                    block = low.bit_length() - 1
+                    bm ^= low
+                    start = block * doc.block_size
+                    end = min(doc.size, (block + 2) * doc.block_size + longest)
+                    if spans and start <= spans[-1][1]:
+                        spans[-1] = (spans[-1][0], end)
+                    else:
+                        spans.append((start, end))
+                result[rel] = spans
+            return result
+
+
+def iter_range_lines(path: Path, spans: list[tuple[int, int]]) -> Iterator[tuple[int, str]]:
+    """(1-based line number, line) for every line overlapping *spans*, in order.
+
+    Spans are widened to whole lines; line numbers count ``\\n`` bytes.
+    """
+    with open(path, "rb") as fh:
+        size = os.fstat(fh.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            line_no = 1
+            counted = 0
+            emitted = 0
+            for start, end in spans:
+                start = max(mm.rfind(b"\n", 0, start) + 1, emitted)
+                stop = mm.find(b"\n", min(end, size))
+                stop = size if stop < 0 else stop
+                if start >= stop:
+                    continue
+                while counted < start:
+                    step = min(start, counted + _READ_CHUNK)
+                    line_no += mm[counted:step].count(b"\n")
+                    counted = step
+                text = mm[start:stop].decode("utf-8", errors="replace")
+                for offset, line in enumerate(text.split("\n")):
+                    yield line_no + offset, line.rstrip("\r")
+                emitted = stop + 1
@@ -0,0 +1,98 @@
+"""Bounded LRU cache for workspace tool results.
+
+Entries carry a *stamp* (a snapshot of whatever the result depends on: a
+file's mtime and size, or a signature of the workspace tree) and optionally
+the workspace write *generation* at the time they were computed.  A lookup
+only hits when both still match, so stale results are never served; the
+owner bumps the generation on its own writes and shell commands.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable
+
+# Results computed from files modified this recently are not cached: on
+# filesystems with coarse timestamps a second write within the same tick
+# would leave the stamp unchanged.
+RACY_WINDOW_SEC = 1.0
+
+
+@dataclass
+class _Entry:
+    value: str
+    stamp: Any
+    generation: int | None
+
+
+class ToolResultCache:
+    """LRU of tool outputs bounded by entry count and total characters."""
+
+    def __init__(self, max_entries: int = 256, max_chars: int = 4_000_000) -> None:
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, stamp: Any, generation: int | None = None) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.stamp != stamp or entry.generation != generation:
+                self._drop(key)
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def put(self, key: Hashable, value: str, stamp: Any, generation: int | None = None) -> None:
+        if len(value) > self.max_chars:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = _Entry(value, stamp, generation)
+            self._chars += len(value)
+            while self._entries and (len(self._entries) > self.max_entries or self._chars > self.max_chars):
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def discard_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        with self._lock:
+            doomed = [key for key in self._entries if predicate(key)]
+            for key in doomed:
+                self._drop(key)
+            self.invalidations += len(doomed)
+            return len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "chars": self._chars,
+            }
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._chars -= len(entry.value)
@@ -5,7 +5,10 @@ provider-specific shapes expected by OpenAI and Anthropic APIs.
 """
 from __future__ import annotations
 
-from typing import Any
+import functools
+import json
+from dataclasses import dataclass
+from typing import Any, NamedTuple
 
 TOOL_DEFINITIONS: list[dict[str, Any]] = [
     {
@@ -61,6 +64,45 @@ TOOL_DEFINITIONS: list[dict[str, Any]] = [
             "additionalProperties": False,
         },
     },
+    {
+        "name": "profile_dataset",
+        "description": "Profile CSV/TSV/JSONL files in one streaming pass: row count, columns, inferred types, null rates, approximate distinct counts, top values, min/max and sample rows. Use this instead of loading a new dataset to inspect it.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "paths": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Dataset files or glob patterns (at most 20 files per call).",
+                },
+                "max_rows": {
+                    "type": "integer",
+                    "description": "Stop after this many rows per file. Default: read the whole file.",
+                },
+            },
+            "required": ["paths"],
+            "additionalProperties": False,
+        },
+    },
+    {
+        "name": "query_dataset",
+        "description": "Run a read-only SQLite query over workspace CSV/TSV/JSONL files. Each file is a table named after its file name (data/contracts.csv -> contracts; shared names use the path, e.g. 2023_contracts); column names are lowercased with non-word characters replaced by _. Files are loaded on first use and cached until they change; join and filter columns are indexed automatically. Use this for joins, filters and aggregations instead of ad-hoc scripts.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "sql": {
+                    "type": "string",
+                    "description": "A single SELECT (or WITH ... SELECT) statement.",
+                },
+                "max_rows": {
+                    "type": "integer",
+                    "description": "Maximum rows to return (1-1000, default 200).",
+                },
+            },
+            "required": ["sql"],
+            "additionalProperties": False,
+        },
+    },
     {
         "name": "web_search",
         "description": "Search the web using the Exa API. Returns URLs, titles, and optional page text.",
@@ -102,7 +144,7 @@ TOOL_DEFINITIONS: list[dict[str, Any]] = [
     },
     {
         "name": "read_file",
-        "description": "Read the contents of a file in the workspace. Lines are numbered LINE:HASH|content by default for use with hashline_edit. Set hashline=false for plain N|content.",
+        "description": "Read the contents of a file in the workspace. Lines are numbered LINE:HASH|content by default for use with hashline_edit. Set hashline=false for plain N|content. Large files are returned as a window; page with offset/limit (lines) or byte_offset/byte_limit.",
         "parameters": {
             "type": "object",
             "properties": {
@@ -114,6 +156,22 @@ TOOL_DEFINITIONS: list[dict[str, Any]] = [
                     "type": "boolean",
                     "description": "Prefix each line with LINE:HASH| format for content verification. Default true.",
                 },
+                "offset": {
+                    "type": "integer",
+                    "description": "First line to return (1-indexed). Default 1.",
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Max lines to return. Default: as many as fit the output limit.",
+                },
+                "byte_offset": {
+                    "type": "integer",
+                    "description": "Start at the line containing this byte offset (0-indexed). Alternative to offset.",
+                },
+                "byte_limit": {
+                    "type": "integer",
+                    "description": "Return the lines covering this many bytes from byte_offset.",
+                },
             },
             "required": ["path"],
             "additionalProperties": False,
@@ -406,6 +464,49 @@ TOOL_DEFINITIONS: list[dict[str, Any]] = [
 _ARTIFACT_TOOLS = {"list_artifacts", "read_artifact"}
 _DELEGATION_TOOLS = {"subtask", "execute", "list_artifacts", "read_artifact"}
 
+# Side-effect classes.  The engine may overlap READ_ONLY and NETWORK calls
+# issued in the same turn; WORKSPACE_WRITE and PROCESS calls run one at a
+# time, in the order the model issued them.
+READ_ONLY = "read_only"
+NETWORK = "network"
+WORKSPACE_WRITE = "workspace_write"
+PROCESS = "process"
+DELEGATION = "delegation"
+
+TOOL_SIDE_EFFECTS: dict[str, str] = {
+    "list_files": READ_ONLY,
+    "search_files": READ_ONLY,
+    "repo_map": READ_ONLY,
+    "profile_dataset": READ_ONLY,
+    "query_dataset": READ_ONLY,
+    "read_file": READ_ONLY,
+    "think": READ_ONLY,
+    "list_artifacts": READ_ONLY,
+    "read_artifact": READ_ONLY,
+    "web_search": NETWORK,
+    "fetch_url": NETWORK,
+    "write_file": WORKSPACE_WRITE,
+    "apply_patch": WORKSPACE_WRITE,
+    "edit_file": WORKSPACE_WRITE,
+    "hashline_edit": WORKSPACE_WRITE,
+    "run_shell": PROCESS,
+    "run_shell_bg": PROCESS,
+    "check_shell_bg": PROCESS,
+    "kill_shell_bg": PROCESS,
+    "subtask": DELEGATION,
+    "execute": DELEGATION,
+}
+
+
+def tool_side_effect(name: str) -> str:
+    """Side-effect class of tool *name*; unknown tools are treated as PROCESS."""
+    return TOOL_SIDE_EFFECTS.get(name, PROCESS)
+
+
+def is_concurrency_safe(name: str) -> bool:
+    """Whether calls to *name* may overlap with other safe calls in a turn."""
+    return tool_side_effect(name) in (READ_ONLY, NETWORK)
+
 
 def _strip_acceptance_criteria(defs: list[dict[str, Any]]) -> list[dict[str, Any]]:
     """Remove acceptance_criteria property from subtask/execute schemas."""
@@ -535,3 +636,60 @@ def to_anthropic_tools(
             }
         )
     return tools
+
+
+class ToolSet(NamedTuple):
+    """Which tools a model is offered; the arguments of :func:`get_tool_definitions`."""
+    include_subtask: bool = True
+    include_artifacts: bool = False
+    include_acceptance_criteria: bool = False
+
+    def definitions(self) -> tuple[dict[str, Any], ...]:
+        """Provider-neutral definitions for this set (shared; do not mutate)."""
+        return _cached_definitions(self)
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_definitions(tool_set: ToolSet) -> tuple[dict[str, Any], ...]:
+    return tuple(get_tool_definitions(*tool_set))
+
+
+@dataclass(frozen=True)
+class ToolSchemas:
+    """Provider-format tool schemas built once per tool set and shared read-only.
+
+    ``json`` is ``tools`` pre-serialized, so request bodies can splice it in
+    instead of re-encoding the schema tree on every call.
+    """
+    names: tuple[str, ...]
+    tools: tuple[dict[str, Any], ...]
+    json: str
+
+
+@functools.lru_cache(maxsize=None)
+def tool_schemas(
+    provider: str,
+    tool_set: ToolSet | None = None,
+    strict: bool = True,
+    cache_breakpoint: bool = False,
+) -> ToolSchemas:
+    """Schemas for *provider* (``"openai"`` or ``"anthropic"``).
+
+    ``tool_set=None`` means every tool in :data:`TOOL_DEFINITIONS`.
+    ``strict`` applies to OpenAI only; ``cache_breakpoint`` (Anthropic only)
+    marks the last tool with ``cache_control`` so the list is prompt-cached.
+    """
+    defs = list(tool_set.definitions()) if tool_set is not None else TOOL_DEFINITIONS
+    if provider == "openai":
+        tools = to_openai_tools(defs=defs, strict=strict)
+    elif provider == "anthropic":
+        tools = to_anthropic_tools(defs=defs)
+        if cache_breakpoint and tools:
+            tools[-1] = {**tools[-1], "cache_control": {"type": "ephemeral"}}
+    else:
+        raise ValueError(f"unknown tool schema provider: {provider}")
+    return ToolSchemas(
+        names=tuple(d["name"] for d in defs),
+        tools=tuple(tools),
+        json=json.dumps(tools),
+    )
@@ -1,16 +1,21 @@
 from __future__ import annotations
 
 import ast
+import concurrent.futures
+import csv
 import fnmatch
+import hashlib
+import http.client
 import json
+import mmap
 import os
 import signal
 import shutil
+import sqlite3
 import subprocess
 import tempfile
 import threading
-import urllib.error
-import urllib.request
+import time
 import re as _re
 import zlib
 from contextlib import contextmanager
@@ -19,7 +24,24 @@ from pathlib import Path
 from typing import Any
 
 _MAX_WALK_ENTRIES = 50_000
+# Above this many candidate files, rg is pointed at the whole tree instead.
+_MAX_RG_PATH_ARGS = 2_000
+# rg honours these; explicit path arguments would bypass them.
+_IGNORE_FILES = (".gitignore", ".ignore", ".rgignore")
+# profile_dataset works on at most this many files per call.
+_MAX_PROFILE_FILES = 20
+_PROFILE_MEMO_ENTRIES = 128
+# Trigram index changes up to this many bytes are indexed inline; larger ones
+# (the first build, say) run in the background while searches go unnarrowed.
+_INLINE_SYNC_BYTES = 32 << 20
 
+from . import http_pool
+from .dataset_profile import DATASET_SUFFIXES, profile_file, render_profile
+from .dataset_store import DatasetQueryTimeout, DatasetStore, render_result, table_names
+from .file_index import FileIndex, glob_matches
+from .line_index import LineIndexCache
+from .search_index import TrigramIndex, iter_range_lines, required_literals
+from .tool_cache import RACY_WINDOW_SEC, ToolResultCache
 from .patching import (
     AddFileOp,
     DeleteFileOp,
@@ -55,6 +77,17 @@ class WorkspaceTools:
     max_search_hits: int = 200
     exa_api_key: str | None = None
     exa_base_url: str = "https://api.exa.ai"
+    cache_max_entries: int = 256
+    cache_max_chars: int = 4_000_000
+    # Persistent file index under ``<root>/<index_root>/index``; see agent.file_index.
+    file_index: bool = True
+    index_root: str = ".openplanter"
+    # On-disk budget of the trigram search index (needs the file index); 0 disables it.
+    search_index_mb: int = 256
+    # Worker processes used when profile_dataset is given several files.
+    profile_workers: int = 4
+    # query_dataset deadline; tables persist in <index dir>/datasets.db when file_index is on.
+    query_timeout_sec: int = 30
 
     def __post_init__(self) -> None:
         self.root = self.root.expanduser().resolve()
@@ -69,6 +102,29 @@ class WorkspaceTools:
         self._parallel_write_claims: dict[str, dict[Path, str]] = {}
         self._parallel_lock = threading.Lock()
         self._scope_local = threading.local()
+        # Result cache for read-only tools; see _cached().
+        self._cache: ToolResultCache | None = (
+            ToolResultCache(self.cache_max_entries, self.cache_max_chars)
+            if self.cache_max_entries > 0 else None
+        )
+        self._generation = 0
+        self._generation_lock = threading.Lock()
+        self._index: FileIndex | None = None
+        self._index_failed = not self.file_index
+        self._index_lock = threading.Lock()
+        self._search_index: TrigramIndex | None = None
+        self._search_sync: threading.Thread | None = None
+        # File index generation the trigram index last caught up with.
+        self._search_synced: str | None = None
+        # Shell commands may edit files in place, which directory mtimes do not show.
+        self._files_dirty = True
+        self._line_indexes = LineIndexCache(self._index_dir() / "lines" if self.file_index else None)
+        self._search_index_failed = self.search_index_mb <= 0
+        # Dataset profiles by (content hash, max_rows); also persisted when file_index is on.
+        self._profiles: dict[tuple[str, int | None], dict[str, Any]] = {}
+        self._profiles_lock = threading.Lock()
+        self._datasets: DatasetStore | None = None
+        self._datasets_failed = False
 
     def _clip(self, text: str, max_chars: int) -> str:
         if len(text) <= max_chars:
@@ -88,6 +144,215 @@ class WorkspaceTools:
             raise ToolError(f"Path escapes workspace: {raw_path}")
         return resolved
 
+    # ------------------------------------------------------------------
+    # Result cache
+    # ------------------------------------------------------------------
+
+    def cache_stats(self) -> dict[str, int]:
+        """Hit/miss/eviction counters for the read-only tool cache."""
+        if self._cache is None:
+            return {}
+        return self._cache.stats()
+
+    def _bump_generation(self) -> None:
+        """Invalidate every workspace-wide cached result (list/search/repo_map)."""
+        with self._generation_lock:
+            self._generation += 1
+
+    def _invalidate_paths(self, paths: list[Path]) -> None:
+        self._bump_generation()
+        if self._index is not None and paths:
+            try:
+                self._index.update_paths(paths)
+            except sqlite3.Error:
+                pass
+        if self._cache is not None and paths:
+            targets = {str(p) for p in paths}
+            self._cache.discard_where(lambda key: key[0] == "read_file" and key[1] in targets)
+
+    def _index_dir(self) -> Path:
+        return self.root / self.index_root / "index"
+
+    def _file_index(self) -> FileIndex | None:
+        """The workspace file index, brought up to date; ``None`` if unavailable.
+
+        A refresh only stats directories (rescanning the ones that changed),
+        so it is cheaper than the tree walk it replaces and can run per call.
+        Every file is re-stat'ed only on first use and after shell commands.
+        """
+        if self._index_failed:
+            return None
+        with self._index_lock:
+            try:
+                if self._index is None:
+                    # Session state (logs, memo entries) lives under index_root too; it is not workspace content.
+                    self._index = FileIndex(
+                        self.root, self._index_dir() / "files.db", exclude=(".git", self.index_root),
+                    )
+                dirty, self._files_dirty = self._files_dirty, False
+                self._index.refresh(restat_files=dirty or bool(self._bg_jobs))
+            except (OSError, sqlite3.Error):
+                self._index_failed = True
+                return None
+            return self._index
+
+    def _trigram_index(self) -> TrigramIndex | None:
+        """The trigram search index if it is caught up with the (refreshed) file index.
+
+        Small changes are indexed inline.  Larger ones run on a background
+        thread, and until it finishes this returns ``None`` so searches run
+        unnarrowed rather than waiting for the build.
+        """
+        if self._search_index_failed or self._index is None:
+            return None
+        with self._index_lock:
+            if self._search_sync is not None:
+                if self._search_sync.is_alive():
+                    return None
+                self._search_sync = None
+            if self._search_index_failed:
+                return None
+            try:
+                if self._search_index is None:
+                    self._search_index = TrigramIndex(
+                        self.root, self._index_dir() / "trigrams.db", self.search_index_mb << 20,
+                    )
+                generation = self._index.generation()
+                if generation == self._search_synced:
+                    return self._search_index
+                entries = [(e.path, e.size, e.mtime_ns, e.inode) for e in self._index.entries()]
+                changed, gone = self._search_index.diff(entries)
+                if sum(size for _, size, _, _ in changed) <= _INLINE_SYNC_BYTES:
+                    self._search_index.apply(changed, gone)
+                    self._search_synced = generation
+                    return self._search_index
+            except (OSError, sqlite3.Error):
+                self._search_index_failed = True
+                return None
+            self._search_sync = threading.Thread(
+                target=self._sync_search_index, args=(self._search_index, changed, gone, generation),
+                name="openplanter-trigram-sync", daemon=True,
+            )
+            self._search_sync.start()
+            return None
+
+    def _sync_search_index(self, index: TrigramIndex, changed: list, gone: list[str], generation: str) -> None:
+        try:
+            index.apply(changed, gone)
+        except (OSError, sqlite3.Error):
+            self._search_index_failed = True
+            return
+        self._search_synced = generation
+
+    def _search_plan(
+        self, paths: list[str], literals: list[str], ranges: bool,
+    ) -> dict[str, list[tuple[int, int]] | None] | None:
+        """Candidate files (and byte ranges) for *literals*; ``None`` means search everything."""
+        if not literals:
+            return None
+        index = self._trigram_index()
+        if index is None:
+            return None
+        try:
+            return index.candidates(paths, literals, ranges=ranges)
+        except sqlite3.Error:
+            return None
+
+    def indexed_paths(self, glob: str | None = None) -> list[str] | None:
+        """All workspace files (sorted, relative) from the index; ``None`` if it is unavailable."""
+        index = self._file_index()
+        if index is None:
+            return None
+        try:
+            return index.paths(glob)
+        except sqlite3.Error:
+            return None
+
+    def file_info(self, path: str) -> dict[str, Any] | None:
+        """Size, mtime and inode of a workspace file, from the index when available."""
+        resolved = self._resolve_path(path)
+        index = self._file_index()
+        if index is not None:
+            try:
+                entry = index.stat(resolved)
+            except sqlite3.Error:
+                entry = None
+            if entry is not None:
+                return {"path": entry.path, "size": entry.size, "mtime_ns": entry.mtime_ns, "inode": entry.inode}
+        try:
+            st = resolved.stat()
+        except OSError:
+            return None
+        return {
+            "path": resolved.relative_to(self.root).as_posix(),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "inode": st.st_ino,
+        }
+
+    def _tree_stamp(self, content: bool) -> str | None:
+        """Signature of the workspace tree, or ``None`` if it changed too recently to trust.
+
+        With ``content=False`` only directory mtimes are hashed (enough for
+        file listings); with ``content=True`` every file's size and mtime is.
+        """
+        records: list[str] = []
+        newest = 0
+        # The file index's database changes on every refresh; it is not workspace content.
+        skip = {".git", str(self._index_dir())}
+        stack = [self.root]
+        while stack:
+            current = stack.pop()
+            try:
+                it = os.scandir(current)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name in skip or entry.path in skip:
+                                continue
+                            stack.append(Path(entry.path))
+                            if content:
+                                continue
+                        elif not content:
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    newest = max(newest, st.st_mtime_ns)
+                    records.append(f"{entry.path}\0{st.st_size}\0{st.st_mtime_ns}")
+        if not content:
+            try:
+                st = self.root.stat()
+            except OSError:
+                return None
+            newest = max(newest, st.st_mtime_ns)
+            records.append(f".\0{st.st_mtime_ns}")
+        if time.time() - newest / 1e9 < RACY_WINDOW_SEC:
+            return None
+        records.sort()
+        return hashlib.blake2b("\n".join(records).encode("utf-8", "surrogateescape"), digest_size=16).hexdigest()
+
+    def _cached(
+        self,
+        key: tuple[Any, ...],
+        stamp: Any,
+        compute: Any,
+        workspace_wide: bool = True,
+    ) -> str:
+        """Return ``compute()`` through the cache; a ``None`` stamp bypasses it."""
+        if self._cache is None or stamp is None:
+            return compute()
+        generation = self._generation if workspace_wide else None
+        hit = self._cache.get(key, stamp, generation)
+        if hit is not None:
+            return hit
+        value = compute()
+        self._cache.put(key, value, stamp, generation)
+        return value
+
     def _check_shell_policy(self, command: str) -> str | None:
         if _HEREDOC_RE.search(command):
             return (
@@ -142,6 +407,8 @@ class WorkspaceTools:
         policy_error = self._check_shell_policy(command)
         if policy_error:
             return policy_error
+        # Shell commands can change anything; cached listings must be re-validated.
+        self._bump_generation()
         effective_timeout = max(1, min(timeout or self.command_timeout_sec, 600))
         try:
             proc = subprocess.Popen(
@@ -164,7 +431,10 @@ class WorkspaceTools:
             except (ProcessLookupError, PermissionError):
                 proc.kill()
             proc.wait()
+            self._files_dirty = True
             return f"$ {command}\n[timeout after {effective_timeout}s — processes killed]"
+        # The command may have edited files in place; re-stat them on the next index refresh.
+        self._files_dirty = True
         merged = (
             f"$ {command}\n"
             f"[exit_code={proc.returncode}]\n"
@@ -177,6 +447,7 @@ class WorkspaceTools:
         policy_error = self._check_shell_policy(command)
         if policy_error:
             return policy_error
+        self._bump_generation()
         out_path = os.path.join(tempfile.gettempdir(), f".rlm_bg_{self._bg_next_id}.out")
         fh = open(out_path, "w+")
         try:
@@ -218,6 +489,7 @@ class WorkspaceTools:
             except OSError:
                 pass
             del self._bg_jobs[job_id]
+            self._files_dirty = True
             return f"[job {job_id} finished, exit_code={returncode}]\n{output}"
         return f"[job {job_id} still running, pid={proc.pid}]\n{output}"
 
@@ -237,6 +509,7 @@ class WorkspaceTools:
         except OSError:
             pass
         del self._bg_jobs[job_id]
+        self._files_dirty = True
         return f"Background job {job_id} killed."
 
     def cleanup_bg_jobs(self) -> None:
@@ -261,6 +534,38 @@ class WorkspaceTools:
         self._bg_jobs.clear()
 
     def list_files(self, glob: str | None = None) -> str:
+        indexed = self.indexed_paths(glob)
+        if indexed is not None:
+            return self._format_listing(indexed)
+        return self._cached(
+            ("list_files", glob), self._workspace_stamp(content=False),
+            lambda: self._list_files(glob),
+        )
+
+    def _workspace_stamp(self, content: bool) -> str | None:
+        # Background jobs may be writing right now; don't trust any snapshot.
+        if self._cache is None or self._bg_jobs:
+            return None
+        return self._tree_stamp(content)
+
+    def _content_stamp(self) -> Any:
+        """Stamp for content-derived results (search_files, repo_map).
+
+        The file index generation changes whenever a refresh sees an added,
+        removed or re-stat'ed file, so it stands in for a content tree walk;
+        the walk is only the fallback when the index is unavailable.
+        """
+        if self._cache is None or self._bg_jobs:
+            return None
+        index = self._file_index()
+        if index is not None:
+            try:
+                return ("files", index.generation())
+            except sqlite3.Error:
+                pass
+        return self._tree_stamp(content=True)
+
+    def _list_files(self, glob: str | None) -> str:
         lines: list[str]
         if shutil.which("rg"):
             cmd = ["rg", "--files", "--hidden", "-g", "!.git"]
@@ -289,9 +594,13 @@ class WorkspaceTools:
                 for fn in filenames:
                     full = Path(dirpath) / fn
                     rel = full.relative_to(self.root).as_posix()
+                    if glob and not glob_matches(rel, glob):
+                        continue
                     all_paths.append(rel)
             lines = sorted(all_paths)
+        return self._format_listing(lines)
 
+    def _format_listing(self, lines: list[str]) -> str:
         if not lines:
             return "(no files)"
         clipped = lines[: self.max_files_listed]
@@ -303,10 +612,23 @@ class WorkspaceTools:
     def search_files(self, query: str, glob: str | None = None) -> str:
         if not query.strip():
             return "query cannot be empty"
+        return self._cached(
+            ("search_files", query, glob), self._content_stamp(),
+            lambda: self._search_files(query, glob),
+        )
+
+    def _search_files(self, query: str, glob: str | None) -> str:
         if shutil.which("rg"):
-            cmd = ["rg", "-n", "--hidden", "-S", query, "."]
-            if glob:
-                cmd.extend(["-g", glob])
+            cmd = ["rg", "-n", "--hidden", "-S", query]
+            narrowed = self._rg_candidates(query, glob)
+            if narrowed is not None and not narrowed:
+                return "(no matches)"
+            if narrowed is not None:
+                cmd.extend(f"./{rel}" for rel in narrowed)
+            else:
+                cmd.append(".")
+                if glob:
+                    cmd.extend(["-g", glob])
             try:
                 proc = subprocess.run(
                     cmd,
@@ -330,6 +652,57 @@ class WorkspaceTools:
         # Fallback path if ripgrep is unavailable.
         matches: list[str] = []
         lower_query = query.lower()
+        files = self._candidate_files(glob)
+        plan = self._search_plan(files, [query], ranges=True)
+        for rel in files:
+            if plan is not None and rel not in plan:
+                continue
+            try:
+                numbered = self._numbered_lines(self.root / rel, plan[rel] if plan is not None else None)
+            except OSError:
+                continue
+            for idx, line in numbered:
+                if lower_query in line.lower():
+                    matches.append(f"{rel}:{idx}:{line}")
+                    if len(matches) >= self.max_search_hits:
+                        return "\n".join(matches) + "\n...[match limit reached]..."
+        return "\n".join(matches) if matches else "(no matches)"
+
+    @staticmethod
+    def _numbered_lines(path: Path, spans: list[tuple[int, int]] | None) -> list[tuple[int, str]]:
+        if spans is None:
+            # Lines end at "\n" only, exactly as iter_range_lines counts them.
+            text = path.read_bytes().decode("utf-8", errors="replace")
+            lines = text.split("\n")
+            if lines[-1] == "":
+                lines.pop()
+            return [(no, line.rstrip("\r")) for no, line in enumerate(lines, start=1)]
+        return list(iter_range_lines(path, spans))
+
+    def _rg_candidates(self, query: str, glob: str | None) -> list[str] | None:
+        """Files rg needs to look at for *query*, or ``None`` to let it walk the tree."""
+        # Explicit path arguments bypass rg's ignore handling, so only narrow
+        # where there is nothing to ignore.
+        index = self._file_index()
+        if index is None or (self.root / ".git").exists():
+            return None
+        try:
+            if any(index.paths(name) for name in _IGNORE_FILES):
+                return None
+            indexed = index.paths(glob)
+        except sqlite3.Error:
+            return None
+        plan = self._search_plan(indexed, required_literals(query), ranges=False)
+        if plan is None or len(plan) > _MAX_RG_PATH_ARGS:
+            return None
+        return [rel for rel in indexed if rel in plan]
+
+    def _candidate_files(self, glob: str | None) -> list[str]:
+        """Files to scan without ripgrep: the whole index, or a capped walk."""
+        indexed = self.indexed_paths(glob)
+        if indexed is not None:
+            return indexed
+        found: list[str] = []
         count = 0
         for dirpath, dirnames, filenames in os.walk(self.root):
             dirnames[:] = [d for d in dirnames if d != ".git"]
@@ -337,21 +710,16 @@ class WorkspaceTools:
             if count > _MAX_WALK_ENTRIES:
                 break
             for fn in filenames:
-                full = Path(dirpath) / fn
-                try:
-                    text = full.read_text(encoding="utf-8", errors="replace")
-                except OSError:
-                    continue
-                for idx, line in enumerate(text.splitlines(), start=1):
-                    if lower_query in line.lower():
-                        rel = full.relative_to(self.root).as_posix()
-                        matches.append(f"{rel}:{idx}:{line}")
-                        if len(matches) >= self.max_search_hits:
-                            return "\n".join(matches) + "\n...[match limit reached]..."
-        return "\n".join(matches) if matches else "(no matches)"
+                rel = (Path(dirpath) / fn).relative_to(self.root).as_posix()
+                if not glob or glob_matches(rel, glob):
+                    found.append(rel)
+        return found
 
     def _repo_files(self, glob: str | None, max_files: int) -> list[str]:
         lines: list[str]
+        indexed = self.indexed_paths(glob)
+        if indexed is not None:
+            return indexed[:max_files]
         if shutil.which("rg"):
             cmd = ["rg", "--files", "--hidden", "-g", "!.git"]
             if glob:
@@ -378,7 +746,7 @@ class WorkspaceTools:
                     break
                 for fn in filenames:
                     rel = (Path(dirpath) / fn).relative_to(self.root).as_posix()
-                    if glob and not fnmatch.fnmatch(rel, glob):
+                    if glob and not glob_matches(rel, glob):
                         continue
                     lines.append(rel)
         return lines[:max_files]
@@ -421,6 +789,12 @@ class WorkspaceTools:
 
     def repo_map(self, glob: str | None = None, max_files: int = 200) -> str:
         clamped = max(1, min(int(max_files), 500))
+        return self._cached(
+            ("repo_map", glob, clamped), self._content_stamp(),
+            lambda: self._repo_map(glob, clamped),
+        )
+
+    def _repo_map(self, glob: str | None, clamped: int) -> str:
         candidates = self._repo_files(glob=glob, max_files=clamped)
         if not candidates:
             return "(no files)"
@@ -481,17 +855,120 @@ class WorkspaceTools:
         }
         return self._clip(json.dumps(output, indent=2, ensure_ascii=True), self.max_file_chars)
 
-    def read_file(self, path: str, hashline: bool = True) -> str:
+    def read_file(
+        self,
+        path: str,
+        hashline: bool = True,
+        offset: int | None = None,
+        limit: int | None = None,
+        byte_offset: int | None = None,
+        byte_limit: int | None = None,
+    ) -> str:
+        """Read a file, or a window of it.
+
+        ``offset``/``limit`` select lines (1-based); ``byte_offset``/``byte_limit``
+        select bytes, widened to whole lines.  Files larger than
+        ``max_file_chars`` are always served as a window so that only the
+        returned part is read; the footer says how to continue.
+        """
         resolved = self._resolve_path(path)
         if not resolved.exists():
             return f"File not found: {path}"
         if resolved.is_dir():
             return f"Path is a directory, not a file: {path}"
         try:
-            text = resolved.read_text(encoding="utf-8", errors="replace")
+            st = resolved.stat()
+        except OSError as exc:
+            return f"Failed to read file {path}: {exc}"
+        window = (offset, limit, byte_offset, byte_limit)
+        for name, value in zip(("offset", "limit", "byte_offset", "byte_limit"), window):
+            if value is not None and value < (1 if name in ("offset", "limit") else 0):
+                return f"{name} must be {'positive' if name in ('offset', 'limit') else 'non-negative'}"
+        if offset is not None and byte_offset is not None:
+            return "Pass either offset or byte_offset, not both"
+        windowed = any(value is not None for value in window) or st.st_size > self.max_file_chars
+        stamp: tuple[int, int] | None = None
+        if self._cache is not None and time.time() - st.st_mtime_ns / 1e9 >= RACY_WINDOW_SEC:
+            stamp = (st.st_mtime_ns, st.st_size)
+        key = ("read_file", str(resolved), hashline, *window) if windowed else ("read_file", str(resolved), hashline)
+        if stamp is not None:
+            hit = self._cache.get(key, stamp)
+            if hit is not None:
+                self._files_read.add(resolved)
+                return hit
+        try:
+            if windowed:
+                rendered = self._read_window(resolved, hashline, offset, limit, byte_offset, byte_limit)
+            else:
+                rendered = self._render_file(resolved, resolved.read_text(encoding="utf-8", errors="replace"), hashline)
         except OSError as exc:
             return f"Failed to read file {path}: {exc}"
         self._files_read.add(resolved)
+        if stamp is not None:
+            self._cache.put(key, rendered, stamp)
+        return rendered
+
+    def _read_window(
+        self,
+        resolved: Path,
+        hashline: bool,
+        offset: int | None,
+        limit: int | None,
+        byte_offset: int | None,
+        byte_limit: int | None,
+    ) -> str:
+        """Render lines of *resolved* via mmap and its line index, within ``max_file_chars``."""
+        rel = resolved.relative_to(self.root).as_posix()
+        index = self._line_indexes.get(resolved)
+        if index.size == 0:
+            return f"# {rel}\n...[empty file]..."
+        with open(resolved, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = min(index.size, len(mm))
+            if byte_offset is not None or byte_limit is not None:
+                start_byte = min(byte_offset or 0, size)
+                first = index.line_at(mm, start_byte)
+                if byte_limit is not None:
+                    end_byte = min(size, start_byte + byte_limit)
+                    limit = max(1, index.line_at(mm, max(end_byte - 1, start_byte)) - first + 1)
+            else:
+                first = offset or 1
+            if first > index.total_lines:
+                return f"# {rel}\n...[offset {first} is past the end: file has {index.total_lines} lines]..."
+            pos = index.line_start(mm, first)
+            wanted = index.total_lines - first + 1 if limit is None else min(limit, index.total_lines - first + 1)
+            budget = self.max_file_chars
+            out: list[str] = []
+            line_no = first
+            clipped_line = False
+            while line_no < first + wanted and pos < size:
+                end = mm.find(b"\n", pos, size)
+                end = size if end < 0 else end
+                # Read at most ~4 bytes per remaining char of the budget.
+                raw = mm[pos:min(end, pos + 4 * budget + 4)]
+                line = raw.decode("utf-8", errors="replace").removesuffix("\r")
+                if len(line) > budget:
+                    if out:
+                        break
+                    line = line[:budget]
+                    clipped_line = True
+                prefix = f"{line_no}:{_line_hash(line)}|" if hashline else f"{line_no}|"
+                out.append(prefix + line)
+                budget -= len(line) + 1
+                line_no += 1
+                pos = end + 1
+                if clipped_line or budget <= 0:
+                    break
+        last = line_no - 1
+        footer = f"...[lines {first}-{last} of {index.total_lines}; {index.size} bytes"
+        if clipped_line:
+            footer += f"; line {first} truncated to {self.max_file_chars} chars"
+        if last < index.total_lines and (limit is None or last < first + limit - 1):
+            footer += f"; truncated at max_file_chars, continue with offset={last + 1}"
+        elif last < index.total_lines:
+            footer += f"; next offset={last + 1}"
+        return f"# {rel}\n" + "\n".join(out) + "\n" + footer + "]..."
+
+    def _render_file(self, resolved: Path, text: str, hashline: bool) -> str:
         clipped = self._clip(text, self.max_file_chars)
         rel = resolved.relative_to(self.root).as_posix()
         if hashline:
@@ -505,6 +982,190 @@ class WorkspaceTools:
             )
         return f"# {rel}\n{numbered}"
 
+    def profile_dataset(self, paths: list[str], max_rows: int | None = None) -> str:
+        """Profile CSV/TSV/JSONL files (globs allowed); see agent.dataset_profile.
+
+        Profiles are cached by content hash, so an unchanged file is never
+        re-read; uncached files are profiled in parallel worker processes.
+        """
+        if not isinstance(paths, list):
+            return "profile_dataset requires a list of paths"
+        if max_rows is not None and max_rows < 1:
+            return "max_rows must be positive"
+        targets: list[Path] = []
+        for raw in paths:
+            if not isinstance(raw, str) or not raw.strip():
+                continue
+            raw = raw.strip()
+            if any(ch in raw for ch in "*?["):
+                targets.extend(
+                    self._resolve_path(rel) for rel in self._candidate_files(raw)
+                    if Path(rel).suffix.lower() in DATASET_SUFFIXES
+                )
+            else:
+                targets.append(self._resolve_path(raw))
+        targets = list(dict.fromkeys(targets))
+        if not targets:
+            return "profile_dataset requires at least one existing path or matching glob"
+        omitted = len(targets) - _MAX_PROFILE_FILES
+        targets = targets[:_MAX_PROFILE_FILES]
+
+        sections: dict[Path, str] = {}
+        pending: dict[Path, tuple[str, int | None]] = {}
+        for resolved in targets:
+            rel = resolved.relative_to(self.root).as_posix()
+            if not resolved.is_file():
+                sections[resolved] = f"# {rel}\nFile not found"
+                continue
+            try:
+                key = (self._content_hash(resolved), max_rows)
+            except OSError as exc:
+                sections[resolved] = f"# {rel}\nFailed to read file: {exc}"
+                continue
+            profile = self._load_profile(key)
+            if profile is not None:
+                sections[resolved] = render_profile(profile, rel)
+            else:
+                pending[resolved] = key
+        for resolved, result in self._run_profiles(list(pending), max_rows).items():
+            rel = resolved.relative_to(self.root).as_posix()
+            if isinstance(result, BaseException):
+                sections[resolved] = f"# {rel}\nFailed to profile: {result}"
+                continue
+            self._store_profile(pending[resolved], result)
+            sections[resolved] = render_profile(result, rel)
+        out = "\n\n".join(sections[resolved] for resolved in targets)
+        if omitted > 0:
+            out += f"\n\n...[{omitted} more files not profiled; pass at most {_MAX_PROFILE_FILES} per call]..."
+        return self._clip(out, self.max_file_chars)
+
+    def _content_hash(self, resolved: Path) -> str:
+        index = self._file_index()
+        if index is not None:
+            try:
+                digest = index.content_hash(resolved)
+            except sqlite3.Error:
+                digest = None
+            if digest:
+                return digest
+        hasher = hashlib.blake2b(digest_size=16)
+        with open(resolved, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def _profile_path(self, key: tuple[str, int | None]) -> Path | None:
+        if not self.file_index:
+            return None
+        digest, max_rows = key
+        return self._index_dir() / "profiles" / f"{digest}-{max_rows or 'all'}.json"
+
+    def _load_profile(self, key: tuple[str, int | None]) -> dict[str, Any] | None:
+        with self._profiles_lock:
+            profile = self._profiles.get(key)
+        if profile is not None:
+            return profile
+        path = self._profile_path(key)
+        if path is None:
+            return None
+        try:
+            profile = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        self._remember_profile(key, profile)
+        return profile
+
+    def _remember_profile(self, key: tuple[str, int | None], profile: dict[str, Any]) -> None:
+        with self._profiles_lock:
+            self._profiles[key] = profile
+            while len(self._profiles) > _PROFILE_MEMO_ENTRIES:
+                self._profiles.pop(next(iter(self._profiles)))
+
+    def _store_profile(self, key: tuple[str, int | None], profile: dict[str, Any]) -> None:
+        self._remember_profile(key, profile)
+        path = self._profile_path(key)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps(profile, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def _run_profiles(self, files: list[Path], max_rows: int | None) -> dict[Path, Any]:
+        """Profile *files*, in worker processes when there are several; errors are returned, not raised."""
+        results: dict[Path, Any] = {}
+        workers = min(len(files), os.cpu_count() or 1, self.profile_workers)
+        if workers > 1:
+            try:
+                with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = {pool.submit(profile_file, path, max_rows=max_rows): path for path in files}
+                    for future in concurrent.futures.as_completed(futures):
+                        try:
+                            results[futures[future]] = future.result()
+                        except concurrent.futures.BrokenExecutor:
+                            raise
+                        except Exception as exc:
+                            results[futures[future]] = exc
+            except (OSError, concurrent.futures.BrokenExecutor):
+                # No usable worker processes here; finish in-process.
+                pass
+        for path in files:
+            if path not in results:
+                try:
+                    results[path] = profile_file(path, max_rows=max_rows)
+                except Exception as exc:
+                    results[path] = exc
+        return results
+
+    def query_dataset(self, sql: str, max_rows: int = 200) -> str:
+        """Run read-only SQL over workspace CSV/TSV/JSONL files; see agent.dataset_store."""
+        if not sql.strip():
+            return "query_dataset requires non-empty sql"
+        clamped = max(1, min(int(max_rows), 1000))
+        store = self._dataset_store()
+        if store is None:
+            return "query_dataset is unavailable: the dataset cache could not be opened"
+        datasets = self._dataset_tables()
+        try:
+            result = store.query(sql, datasets, clamped, self.query_timeout_sec)
+        except DatasetQueryTimeout as exc:
+            return f"Query failed: {exc}; filter, aggregate or LIMIT it"
+        except sqlite3.Error as exc:
+            tables = store.describe(datasets)
+            if not tables:
+                return f"Query failed: {exc}\n(no CSV/TSV/JSONL files in the workspace)"
+            listing = "\n".join(tables[:50])
+            if len(tables) > 50:
+                listing += f"\n...[{len(tables) - 50} more]..."
+            return self._clip(f"Query failed: {exc}\nTables:\n{listing}", self.max_file_chars)
+        except (OSError, UnicodeError, csv.Error) as exc:
+            return f"Failed to load dataset: {exc}"
+        return self._clip(render_result(result), self.max_file_chars)
+
+    def _dataset_store(self) -> DatasetStore | None:
+        if self._datasets_failed:
+            return None
+        with self._index_lock:
+            if self._datasets is None:
+                try:
+                    self._datasets = DatasetStore(
+                        self.root, self._index_dir() / "datasets.db" if self.file_index else None,
+                    )
+                except (OSError, sqlite3.Error):
+                    self._datasets_failed = True
+            return self._datasets
+
+    def _dataset_tables(self) -> dict[str, str]:
+        """Table name -> path for every dataset file outside the agent's own state directory."""
+        state_dir = self.index_root.strip("/") + "/"
+        return table_names([
+            rel for rel in self._candidate_files(None)
+            if Path(rel).suffix.lower() in DATASET_SUFFIXES and not rel.startswith(state_dir)
+        ])
+
     def write_file(self, path: str, content: str) -> str:
         resolved = self._resolve_path(path)
         if resolved.exists() and resolved.is_file() and resolved not in self._files_read:
@@ -521,6 +1182,8 @@ class WorkspaceTools:
             resolved.write_text(content, encoding="utf-8")
         except OSError as exc:
             return f"Failed to write {path}: {exc}"
+        finally:
+            self._invalidate_paths([resolved])
         self._files_read.add(resolved)
         rel = resolved.relative_to(self.root).as_posix()
         return f"Wrote {len(content)} chars to {rel}"
@@ -565,6 +1228,8 @@ class WorkspaceTools:
             resolved.write_text(content, encoding="utf-8")
         except OSError as exc:
             return f"Failed to write {path}: {exc}"
+        finally:
+            self._invalidate_paths([resolved])
         self._files_read.add(resolved)
         rel = resolved.relative_to(self.root).as_posix()
         return f"Edited {rel}"
@@ -691,6 +1356,8 @@ class WorkspaceTools:
             resolved.write_text(new_content, encoding="utf-8")
         except OSError as exc:
             return f"Failed to write {path}: {exc}"
+        finally:
+            self._invalidate_paths([resolved])
         self._files_read.add(resolved)
         rel = resolved.relative_to(self.root).as_posix()
         return f"Edited {rel} ({changed} edit(s) applied)"
@@ -702,16 +1369,19 @@ class WorkspaceTools:
             ops = parse_agent_patch(patch_text)
         except PatchApplyError as exc:
             return f"Patch failed: {exc}"
+        touched: list[Path] = []
         try:
             for op in ops:
                 if isinstance(op, AddFileOp):
-                    self._register_write_target(self._resolve_path(op.path))
+                    touched.append(self._resolve_path(op.path))
                 elif isinstance(op, DeleteFileOp):
-                    self._register_write_target(self._resolve_path(op.path))
+                    touched.append(self._resolve_path(op.path))
                 elif isinstance(op, UpdateFileOp):
-                    self._register_write_target(self._resolve_path(op.path))
+                    touched.append(self._resolve_path(op.path))
                     if op.move_to:
-                        self._register_write_target(self._resolve_path(op.move_to))
+                        touched.append(self._resolve_path(op.move_to))
+            for target in touched:
+                self._register_write_target(target)
         except (ToolError, OSError) as exc:
             return f"Blocked by policy: {exc}"
         try:
@@ -721,6 +1391,8 @@ class WorkspaceTools:
             )
         except (PatchApplyError, OSError) as exc:
             return f"Patch failed: {exc}"
+        finally:
+            self._invalidate_paths(touched)
         for rel_path in report.added + report.updated:
             try:
                 self._files_read.add(self._resolve_path(rel_path))
@@ -732,25 +1404,22 @@ class WorkspaceTools:
         if not (self.exa_api_key and self.exa_api_key.strip()):
             raise ToolError("EXA_API_KEY not configured")
         url = self.exa_base_url.rstrip("/") + endpoint
-        req = urllib.request.Request(
-            url=url,
-            data=json.dumps(payload).encode("utf-8"),
-            headers={
-                "x-api-key": self.exa_api_key,
-                "Content-Type": "application/json",
-                "User-Agent": "exa-py 1.0.18",
-            },
-            method="POST",
-        )
+        headers = {
+            "x-api-key": self.exa_api_key,
+            "Content-Type": "application/json",
+            "User-Agent": "exa-py 1.0.18",
+        }
         try:
-            with urllib.request.urlopen(req, timeout=self.command_timeout_sec) as resp:
+            with http_pool.request(
+                "POST", url, body=json.dumps(payload).encode("utf-8"),
+                headers=headers, timeout=self.command_timeout_sec,
+            ) as resp:
                 raw = resp.read().decode("utf-8", errors="replace")
-        except urllib.error.HTTPError as exc:
-            body = exc.read().decode("utf-8", errors="replace")
-            raise ToolError(f"Exa API HTTP {exc.code}: {body}") from exc
-        except urllib.error.URLError as exc:
+        except http_pool.HTTPStatusError as exc:
+            raise ToolError(f"Exa API HTTP {exc.status}: {exc.text()}") from exc
+        except ValueError as exc:
             raise ToolError(f"Exa API connection error: {exc}") from exc
-        except OSError as exc:
+        except (OSError, http.client.HTTPException) as exc:
             raise ToolError(f"Exa API network error: {exc}") from exc
 
         try:
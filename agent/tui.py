@@ -147,7 +147,11 @@ def _format_session_tokens(session_tokens: dict[str, dict[str, int]]) -> str:
     total_out = sum(v["output"] for v in session_tokens.values())
     if total_in == 0 and total_out == 0:
         return ""
-    return f"{_format_token_count(total_in)} in / {_format_token_count(total_out)} out"
+    summary = f"{_format_token_count(total_in)} in / {_format_token_count(total_out)} out"
+    cached = sum(v.get("cache_read", 0) for v in session_tokens.values())
+    if cached:
+        summary += f" ({_format_token_count(cached)} cached)"
+    return summary
 
 
 def _get_model_display_name(engine: RLMEngine) -> str:
@@ -355,11 +359,19 @@ def dispatch_slash_command(
         tokens = ctx.runtime.engine.session_tokens
         if tokens:
             for mname, counts in tokens.items():
-                emit(
+                line = (
                     f"  {mname}: "
                     f"{_format_token_count(counts['input'])} in / "
                     f"{_format_token_count(counts['output'])} out"
                 )
+                if counts.get("cache_read") or counts.get("cache_write"):
+                    line += (
+                        f" | cache {_format_token_count(counts.get('cache_read', 0))} read / "
+                        f"{_format_token_count(counts.get('cache_write', 0))} written"
+                    )
+                if "calls" in counts:
+                    line += f" | {counts['calls']} calls, {counts.get('latency_ms', 0) / 1000:.1f}s"
+                emit(line)
         else:
             emit("  Tokens: (none yet)")
         return "handled"
@@ -418,6 +430,8 @@ _KEY_ARGS: dict[str, str] = {
     "search_files": "query",
     "list_files": "glob",
     "repo_map": "glob",
+    "profile_dataset": "paths",
+    "query_dataset": "sql",
     "subtask": "objective",
     "execute": "objective",
     "think": "note",
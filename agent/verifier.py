@@ -0,0 +1,267 @@
+"""Deterministic local verification of command-based acceptance criteria.
+
+The system prompt asks for acceptance criteria written as observable checks,
+e.g. ``out.json exists; jq length out.json outputs >= 10``.  Those clauses
+don't need a judge model: :func:`verify_criteria` runs each command through
+:meth:`WorkspaceTools.run_shell` and evaluates the predicate locally.
+Clauses it cannot parse or decide, or whose commands fall outside the
+read-only program policy, are returned as ``unhandled`` for the LLM judge.
+Interpreters (``python -c ...``) are never run here: whether arbitrary code
+is side-effect free cannot be decided from its text.
+"""
+
+from __future__ import annotations
+
+import re
+import shlex
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .tools import WorkspaceTools
+
+# Programs a verification command may run.  Each pipeline segment must start
+# with one of these; anything else is left to the LLM judge.
+_READ_ONLY_PROGRAMS = frozenset({
+    "cat", "cut", "du", "file", "find", "grep", "head", "jq", "ls", "sort",
+    "stat", "tail", "test", "tr", "uniq", "wc",
+})
+# Shell operators that could chain in a side effect or write a file.
+_FORBIDDEN_OPERATORS = frozenset({";", "&", "&&", "||", ">", ">>", ">|", "<>", "&>"})
+_FIND_WRITE_FLAGS = frozenset({
+    "-delete", "-exec", "-execdir", "-ok", "-okdir", "-fls", "-fprint", "-fprint0", "-fprintf",
+})
+# sort options that write a file or run a program (long options may be abbreviated).
+_SORT_UNSAFE_LONG = ("--output", "--compress-program")
+# sort short options whose argument follows in the same cluster.
+_SORT_SHORT_WITH_ARG = frozenset("kStT")
+
+_VERB = r"(?:outputs?|prints?|shows?|returns?|reports?|yields?|gives?|counts?)"
+_VERB_RE = re.compile(rf"\s{_VERB}\s", re.IGNORECASE)
+_OP_WORDS = {
+    ">=": "ge", "≥": "ge", "at least": "ge", "no fewer than": "ge", "no less than": "ge",
+    "<=": "le", "≤": "le", "at most": "le", "no more than": "le",
+    ">": "gt", "more than": "gt", "greater than": "gt", "over": "gt",
+    "<": "lt", "less than": "lt", "fewer than": "lt", "under": "lt",
+    "==": "eq", "=": "eq", "exactly": "eq",
+}
+_PREDICATE_RE = re.compile(
+    r"^(?P<op>" + "|".join(re.escape(k) for k in sorted(_OP_WORDS, key=len, reverse=True)) + r")?"
+    r"\s*(?P<num>-?\d+(?:\.\d+)?)\b",
+    re.IGNORECASE,
+)
+_EXIT_RE = re.compile(
+    r"\s(?:exits?\s+(?:with\s+)?(?:code\s+|status\s+)?0|succeeds|runs cleanly|passes)\s*$",
+    re.IGNORECASE,
+)
+_EXISTS_RE = re.compile(
+    r"^(?:the\s+)?(?:file\s+)?[`'\"]?(?P<path>[\w][\w./-]*)[`'\"]?\s+"
+    r"(?P<verb>exists|is present|was created|does not exist|doesn't exist|is absent)$",
+    re.IGNORECASE,
+)
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+_SHELL_RESULT_RE = re.compile(r"^\$ .*?\n\[exit_code=(?P<code>-?\d+)\]\n\[stdout\]\n(?P<out>.*)\n\[stderr\]\n", re.DOTALL)
+
+
+@dataclass
+class Check:
+    """One locally checkable clause of an acceptance criterion."""
+
+    clause: str
+    kind: str  # "exists" | "missing" | "output" | "exit"
+    target: str
+    op: str = "eq"
+    expected: float = 0.0
+
+
+@dataclass
+class VerifierReport:
+    """Outcome of :func:`verify_criteria`.
+
+    ``verdict`` is set when the criteria were decided locally (every clause
+    passed, or any clause failed); otherwise the ``unhandled`` clauses still
+    need a judge and ``evidence`` describes the checks that did pass.
+    """
+
+    verdict: str | None = None
+    evidence: list[str] = field(default_factory=list)
+    unhandled: list[str] = field(default_factory=list)
+
+
+def split_clauses(criteria: str) -> list[str]:
+    """Split *criteria* on ``;`` and newlines that are not inside quotes."""
+    clauses: list[str] = []
+    buf: list[str] = []
+    quote = ""
+    for ch in criteria:
+        if quote:
+            if ch == quote:
+                quote = ""
+        elif ch in "'\"`":
+            quote = ch
+        elif ch in ";\n":
+            clauses.append("".join(buf))
+            buf = []
+            continue
+        buf.append(ch)
+    clauses.append("".join(buf))
+    return [c.strip().rstrip(".").strip() for c in clauses if c.strip().rstrip(".").strip()]
+
+
+def _outside_quotes(text: str, pos: int) -> bool:
+    quote = ""
+    for ch in text[:pos]:
+        if quote:
+            if ch == quote:
+                quote = ""
+        elif ch in "'\"`":
+            quote = ch
+    return not quote
+
+
+def _strip_backticks(command: str) -> str:
+    command = command.strip()
+    if len(command) > 1 and command[0] == command[-1] == "`":
+        return command[1:-1].strip()
+    return command
+
+
+def parse_clause(clause: str) -> Check | None:
+    """Recognize *clause* as a file-existence, exit-status or numeric-output check."""
+    m = _EXISTS_RE.match(clause)
+    if m and ("." in m.group("path") or "/" in m.group("path")):
+        negative = m.group("verb").lower() in ("does not exist", "doesn't exist", "is absent")
+        return Check(clause, "missing" if negative else "exists", m.group("path"))
+
+    m = _EXIT_RE.search(clause)
+    if m and _outside_quotes(clause, m.start()):
+        command = _strip_backticks(clause[:m.start()])
+        if command_policy_error(command) is None:
+            return Check(clause, "exit", command)
+        return None
+
+    for verb in _VERB_RE.finditer(clause):
+        if not _outside_quotes(clause, verb.start()):
+            continue
+        command = _strip_backticks(clause[:verb.start()])
+        pred = _PREDICATE_RE.match(clause[verb.end():].strip())
+        if pred is None or command_policy_error(command) is not None:
+            return None
+        op = _OP_WORDS[(pred.group("op") or "==").lower()]
+        return Check(clause, "output", command, op, float(pred.group("num")))
+    return None
+
+
+def _sort_option_unsafe(arg: str) -> bool:
+    if arg.startswith("--"):
+        name = arg.split("=", 1)[0]
+        return len(name) > 2 and any(option.startswith(name) for option in _SORT_UNSAFE_LONG)
+    if not arg.startswith("-"):
+        return False
+    for flag in arg[1:]:
+        if flag == "o":
+            return True
+        if flag in _SORT_SHORT_WITH_ARG:
+            break
+    return False
+
+
+def command_policy_error(command: str) -> str | None:
+    """Return why *command* may not run as a verification check, or ``None``.
+
+    Only pipelines of read-only programs are allowed; redirections, command
+    chaining and substitution are rejected, as are the options of those
+    programs that write files or run other programs (``find -delete``,
+    ``sort -o``, ``sort --compress-program``, ``uniq IN OUT``).
+    """
+    if not command or "`" in command or "$(" in command or "<(" in command:
+        return "command substitution is not allowed"
+    try:
+        lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+        tokens = list(lexer)
+    except ValueError as exc:
+        return f"unparseable command: {exc}"
+    segments: list[list[str]] = [[]]
+    for token in tokens:
+        if token == "|":
+            segments.append([])
+        elif token in _FORBIDDEN_OPERATORS or (token and set(token) <= set("<>&;|()")):
+            return f"shell operator {token!r} is not allowed"
+        else:
+            segments[-1].append(token)
+    for segment in segments:
+        if not segment:
+            return "empty pipeline segment"
+        program = segment[0].rsplit("/", 1)[-1]
+        if program not in _READ_ONLY_PROGRAMS:
+            return f"{program} is not a read-only verification program"
+        if program == "find" and _FIND_WRITE_FLAGS.intersection(segment):
+            return "find actions are not allowed"
+        if program == "sort" and any(_sort_option_unsafe(arg) for arg in segment[1:]):
+            return "sort -o and --compress-program are not allowed"
+        if program == "uniq" and len([arg for arg in segment[1:] if not arg.startswith("-")]) > 1:
+            return "uniq output files are not allowed"
+    return None
+
+
+def _compare(actual: float, op: str, expected: float) -> bool:
+    return {
+        "ge": actual >= expected,
+        "le": actual <= expected,
+        "gt": actual > expected,
+        "lt": actual < expected,
+        "eq": actual == expected,
+    }[op]
+
+
+def _run_check(check: Check, tools: "WorkspaceTools", timeout: int) -> tuple[bool | None, str]:
+    """Run one check; returns (passed, evidence line), passed ``None`` if undecidable here."""
+    if check.kind in ("exists", "missing"):
+        path = tools._resolve_path(check.target)
+        present = path.exists()
+        passed = present if check.kind == "exists" else not present
+        state = "exists" if present else "does not exist"
+        return passed, f"{check.target} {state}"
+
+    raw = tools.run_shell(check.target, timeout=timeout)
+    m = _SHELL_RESULT_RE.match(raw)
+    if m is None:
+        return False, f"`{check.target}` did not complete: {raw.splitlines()[-1] if raw else 'no output'}"
+    code = int(m.group("code"))
+    if check.kind == "exit":
+        return code == 0, f"`{check.target}` exited {code}"
+    if code != 0:
+        return False, f"`{check.target}` exited {code}"
+    lines = [ln for ln in m.group("out").splitlines() if ln.strip()]
+    number = _NUMBER_RE.search(lines[-1]) if lines else None
+    if number is None:
+        # The output may still satisfy the clause in words ("shows 5 columns").
+        return None, f"`{check.target}` printed no number"
+    passed = _compare(float(number.group()), check.op, check.expected)
+    return passed, f"`{check.target}` -> {number.group()} (expected {check.op} {check.expected:g})"
+
+
+def verify_criteria(criteria: str, tools: "WorkspaceTools", timeout: int = 30) -> VerifierReport:
+    """Check every recognizable clause of *criteria* against the workspace."""
+    report = VerifierReport()
+    for clause in split_clauses(criteria):
+        check = parse_clause(clause)
+        if check is None:
+            report.unhandled.append(clause)
+            continue
+        try:
+            passed, evidence = _run_check(check, tools, timeout)
+        except Exception:
+            report.unhandled.append(clause)
+            continue
+        if passed is None:
+            report.unhandled.append(clause)
+            continue
+        if not passed:
+            report.verdict = f"FAIL: local check failed: {evidence}"
+            return report
+        report.evidence.append(evidence)
+    if not report.unhandled and report.evidence:
+        checks = "\n".join(f"- {line}" for line in report.evidence)
+        report.verdict = f"PASS: {len(report.evidence)} check(s) verified locally\n{checks}"
+    return report
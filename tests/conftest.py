@@ -69,7 +69,10 @@ def _anthropic_dict_to_events(
     usage = resp.get("usage", {})
     events.append(("message_start", {
         "type": "message_start",
-        "message": {"usage": {"input_tokens": usage.get("input_tokens", 0)}},
+        "message": {"usage": {
+            "input_tokens": usage.get("input_tokens", 0),
+            **{k: v for k, v in usage.items() if k.startswith("cache_")},
+        }},
     }))
 
     # Content blocks
@@ -161,17 +164,25 @@ def _anthropic_dict_to_events(
     return events
 
 
+def _dispatch_events(events, on_sse_event, keep_events):
+    """Deliver *events* the way ``_http_stream_sse`` does: to the listener, optionally returned."""
+    if on_sse_event:
+        for event_type, data in events:
+            on_sse_event(event_type, data)
+    return events if keep_events else []
+
+
 def mock_openai_stream(fake_http_json_fn):
     """Wrap a _http_json-style mock into a _http_stream_sse-style mock for OpenAI."""
-    def wrapper(url, method, headers, payload, first_byte_timeout=10, stream_timeout=120, max_retries=3, on_sse_event=None):
+    def wrapper(url, method, headers, payload, first_byte_timeout=10, stream_timeout=120, max_retries=3, on_sse_event=None, keep_events=True, **_kwargs):
         result = fake_http_json_fn(url, method, headers, payload=payload, timeout_sec=stream_timeout)
-        return _openai_dict_to_events(result)
+        return _dispatch_events(_openai_dict_to_events(result), on_sse_event, keep_events)
     return wrapper
 
 
 def mock_anthropic_stream(fake_http_json_fn):
     """Wrap a _http_json-style mock into a _http_stream_sse-style mock for Anthropic."""
-    def wrapper(url, method, headers, payload, first_byte_timeout=10, stream_timeout=120, max_retries=3, on_sse_event=None):
+    def wrapper(url, method, headers, payload, first_byte_timeout=10, stream_timeout=120, max_retries=3, on_sse_event=None, keep_events=True, **_kwargs):
         result = fake_http_json_fn(url, method, headers, payload=payload, timeout_sec=stream_timeout)
-        return _anthropic_dict_to_events(result)
+        return _dispatch_events(_anthropic_dict_to_events(result), on_sse_event, keep_events)
     return wrapper
@@ -0,0 +1,175 @@
+"""Tests for the asyncio-native AsyncRLMEngine."""
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from conftest import _tc
+from agent.async_engine import AsyncRLMEngine
+from agent.config import AgentConfig
+from agent.engine import ExternalContext
+from agent.model import Conversation, ModelError, ModelTurn, ScriptedModel, ToolResult
+from agent.tools import WorkspaceTools
+
+
+@dataclass
+class _ObjectiveModel:
+    """Answers by objective so concurrent branches get deterministic turns."""
+    plans: dict[str, list[ModelTurn]] = field(default_factory=dict)
+    delay: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+    in_flight: int = 0
+    peak: int = 0
+
+    def create_conversation(self, system_prompt: str, initial_user_message: str) -> Conversation:
+        import json
+        objective = json.loads(initial_user_message)["objective"]
+        return Conversation(_provider_messages=[objective], system_prompt=system_prompt)
+
+    def complete(self, conversation: Conversation) -> ModelTurn:
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            with self._lock:
+                turns = self.plans.get(conversation._provider_messages[0])
+                if not turns:
+                    raise ModelError("no scripted turn")
+                return turns.pop(0)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def append_assistant_turn(self, conversation: Conversation, turn: ModelTurn) -> None:
+        pass
+
+    def append_tool_results(self, conversation: Conversation, results: list[ToolResult]) -> None:
+        pass
+
+
+def _fanout_plans(n: int) -> dict[str, list[ModelTurn]]:
+    plans = {
+        "root": [
+            ModelTurn(tool_calls=[_tc("subtask", objective=f"child {i}") for i in range(n)]),
+            ModelTurn(text="root done", stop_reason="end_turn"),
+        ],
+    }
+    for i in range(n):
+        plans[f"child {i}"] = [ModelTurn(text=f"child {i} done", stop_reason="end_turn")]
+    return plans
+
+
+class AsyncEngineTests(unittest.TestCase):
+    def test_sync_entry_point_matches_engine_behaviour(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            cfg = AgentConfig(workspace=root, max_depth=2, max_steps_per_call=6)
+            model = ScriptedModel(
+                scripted_turns=[
+                    ModelTurn(tool_calls=[_tc("write_file", path="hello.txt", content="hello")]),
+                    ModelTurn(tool_calls=[_tc("read_file", path="hello.txt")]),
+                    ModelTurn(text="completed", stop_reason="end_turn"),
+                ]
+            )
+            engine = AsyncRLMEngine(model=model, tools=WorkspaceTools(root=root), config=cfg)
+            try:
+                result, ctx = engine.solve_with_context("create and inspect hello")
+            finally:
+                engine.close()
+            self.assertEqual(result, "completed")
+            self.assertEqual((root / "hello.txt").read_text(), "hello")
+            self.assertEqual(len(ctx.observations), 2)
+
+    def test_parallel_subtasks_respect_model_call_limit(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            cfg = AgentConfig(
+                workspace=root, max_depth=2, max_steps_per_call=4,
+                acceptance_criteria=False, max_concurrent_model_calls=2,
+            )
+            model = _ObjectiveModel(plans=_fanout_plans(6), delay=0.02)
+            engine = AsyncRLMEngine(model=model, tools=WorkspaceTools(root=root), config=cfg)
+            try:
+                result, ctx = engine.solve_with_context("root")
+            finally:
+                engine.close()
+            self.assertEqual(result, "root done")
+            self.assertEqual(model.peak, 2)
+            merged = "\n".join(ctx.observations)
+            for i in range(6):
+                self.assertIn(f"child {i} done", merged)
+            # Results keep tool-call order even though branches ran concurrently.
+            self.assertLess(merged.index("child 0 done"), merged.index("child 5 done"))
+
+    def test_concurrent_investigations_share_one_loop(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            cfg = AgentConfig(workspace=root, max_depth=2, max_steps_per_call=4, acceptance_criteria=False)
+            plans = {
+                "alpha": [ModelTurn(text="alpha done", stop_reason="end_turn")],
+                "beta": [ModelTurn(text="beta done", stop_reason="end_turn")],
+            }
+            engine = AsyncRLMEngine(
+                model=_ObjectiveModel(plans=plans), tools=WorkspaceTools(root=root), config=cfg,
+            )
+
+            async def _run() -> list[tuple[str, ExternalContext]]:
+                return await asyncio.gather(engine.solve_async("alpha"), engine.solve_async("beta"))
+
+            try:
+                outcomes = asyncio.run(_run())
+            finally:
+                engine.close()
+            self.assertEqual([r for r, _ in outcomes], ["alpha done", "beta done"])
+
+    def test_parallel_write_conflict_is_blocked(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "shared.txt").write_text("base\n", encoding="utf-8")
+            cfg = AgentConfig(workspace=root, max_depth=3, max_steps_per_call=8, acceptance_criteria=False)
+            plans = {
+                "root": [
+                    ModelTurn(tool_calls=[
+                        _tc("subtask", objective="update A"),
+                        _tc("subtask", objective="update B"),
+                    ]),
+                    ModelTurn(text="parent done", stop_reason="end_turn"),
+                ],
+            }
+            for label in ("A", "B"):
+                plans[f"update {label}"] = [
+                    ModelTurn(tool_calls=[_tc("read_file", path="shared.txt")]),
+                    ModelTurn(tool_calls=[_tc("write_file", path="shared.txt", content=label)]),
+                    ModelTurn(text=f"child {label} done", stop_reason="end_turn"),
+                ]
+            engine = AsyncRLMEngine(
+                model=_ObjectiveModel(plans=plans), tools=WorkspaceTools(root=root), config=cfg,
+            )
+            try:
+                result, ctx = engine.solve_with_context("root")
+            finally:
+                engine.close()
+            self.assertEqual(result, "parent done")
+            self.assertTrue(any("Parallel write conflict" in obs for obs in ctx.observations))
+
+    def test_model_error_is_reported(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            cfg = AgentConfig(workspace=root, max_depth=1, max_steps_per_call=2)
+            engine = AsyncRLMEngine(model=ScriptedModel(), tools=WorkspaceTools(root=root), config=cfg)
+            try:
+                result = engine.solve("anything")
+            finally:
+                engine.close()
+            self.assertIn("Model error at depth 0, step 1", result)
+
+
+if __name__ == "__main__":
+    unittest.main()
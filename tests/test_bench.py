@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from agent.bench import compare, flatten_metrics, main, make_workspace
+
+
+class BenchTests(unittest.TestCase):
+    def test_make_workspace(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            make_workspace(root, files=25, dataset_mb=1)
+            self.assertEqual(len(list((root / "src").rglob("*.txt"))), 25)
+            size = sum(p.stat().st_size for p in (root / "data").iterdir())
+            self.assertGreaterEqual(size, 1024 * 1024)
+            header = (root / "data" / "transactions.csv").read_text().splitlines()[0]
+            self.assertEqual(header, "id,vendor,city,amount,ts")
+
+    def test_cli_writes_results_and_flags_regressions(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            out = Path(tmp) / "bench.json"
+            args = ["--files", "20", "--dataset-mb", "1", "--steps", "5", "--repeat", "2", "--fanout", "1,3",
+                    "--workspace", str(Path(tmp) / "ws"), "-o", str(out)]
+            self.assertEqual(main(args), 0)
+            report = json.loads(out.read_text())
+            results = report["results"]
+            self.assertEqual(set(results), {"engine", "tools", "fanout", "memory", "session"})
+            self.assertEqual(results["engine"]["per_step"]["samples"], 5)
+            self.assertEqual(results["fanout"]["3"]["model_calls"], 8)
+            self.assertGreater(results["session"]["session_bytes"], 0)
+
+            baseline = Path(tmp) / "baseline.json"
+            for stats in report["results"]["tools"].values():
+                stats["p50_ms"] = stats["p50_ms"] / 100
+            baseline.write_text(json.dumps(report))
+            code = main(args[:-2] + ["--only", "tools", "--baseline", str(baseline), "--fail-on-regression", "-o", str(out)])
+            self.assertEqual(code, 1)
+            rows = json.loads(out.read_text())["comparison"]
+            self.assertTrue(any(r["regression"] and r["metric"].endswith("p50_ms") for r in rows))
+
+    def test_compare_only_lower_is_better(self) -> None:
+        current = {"results": {"a": {"wall_sec": 2.0, "model_calls": 10}}}
+        baseline = {"results": {"a": {"wall_sec": 1.0, "model_calls": 5}}}
+        self.assertEqual(flatten_metrics(current["results"]), {"a.wall_sec": 2.0})
+        (row,) = compare(current, baseline, threshold=0.5)
+        self.assertEqual((row["change"], row["regression"]), (1.0, True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,182 @@
+"""Tests for proactive, budget-aware context management."""
+from __future__ import annotations
+
+import tempfile
+import unittest
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from conftest import _tc
+from agent.config import AgentConfig
+from agent.context_budget import (
+    CONDENSED_PLACEHOLDER,
+    DUPLICATE_PLACEHOLDER,
+    ContextBudget,
+    TokenEstimator,
+    excerpt,
+)
+from agent.engine import RLMEngine
+from agent.model import Conversation, ModelTurn, OpenAICompatibleModel, ToolResult
+from agent.tools import WorkspaceTools
+
+
+def _openai_conversation(outputs: list[str]) -> Conversation:
+    msgs: list[Any] = [{"role": "system", "content": "sys"}, {"role": "user", "content": "go"}]
+    for i, out in enumerate(outputs):
+        msgs.append({"role": "assistant", "content": None, "tool_calls": [
+            {"id": f"c{i}", "type": "function", "function": {"name": "read_file", "arguments": "{}"}},
+        ]})
+        msgs.append({"role": "tool", "tool_call_id": f"c{i}", "name": "read_file", "content": out})
+    return Conversation(_provider_messages=msgs, system_prompt="sys")
+
+
+def _anthropic_conversation(outputs: list[str]) -> Conversation:
+    msgs: list[Any] = [{"role": "user", "content": "go"}]
+    for i, out in enumerate(outputs):
+        msgs.append({"role": "assistant", "content": [{"type": "tool_use", "id": f"t{i}", "name": "read_file", "input": {}}]})
+        msgs.append({"role": "user", "content": [{"type": "tool_result", "tool_use_id": f"t{i}", "content": out}]})
+    return Conversation(_provider_messages=msgs, system_prompt="sys")
+
+
+def _tool_outputs(conv: Conversation) -> list[str]:
+    out: list[str] = []
+    for m in conv._provider_messages:
+        if m.get("role") == "tool":
+            out.append(m["content"])
+        elif m.get("role") == "user" and isinstance(m.get("content"), list):
+            out.extend(b["content"] for b in m["content"] if b.get("type") == "tool_result")
+    return out
+
+
+class TokenEstimatorTests(unittest.TestCase):
+    def test_calibration_moves_toward_reported_tokens(self) -> None:
+        est = TokenEstimator(smoothing=0.5)
+        self.assertEqual(est.calibrate("m", 1000, 1500), 1.5)
+        self.assertAlmostEqual(est.calibrate("m", 1000, 1000), 1.25)
+        self.assertEqual(est.factor("other"), 1.0)
+
+    def test_calibration_is_clamped(self) -> None:
+        est = TokenEstimator(min_factor=0.5, max_factor=2.0)
+        self.assertEqual(est.calibrate("m", 100, 10_000), 2.0)
+        self.assertEqual(est.calibrate("n", 10_000, 1), 0.5)
+
+    def test_ignores_empty_observations(self) -> None:
+        est = TokenEstimator()
+        self.assertEqual(est.calibrate("m", 0, 100), 1.0)
+        self.assertEqual(est.calibrate("m", 100, 0), 1.0)
+
+
+class ContextBudgetTests(unittest.TestCase):
+    def test_under_budget_is_untouched(self) -> None:
+        conv = _openai_conversation(["a" * 1000] * 3)
+        plan = ContextBudget(window_override=100_000).fit("gpt-4o", conv)
+        self.assertEqual(plan.changed, 0)
+        self.assertEqual(_tool_outputs(conv), ["a" * 1000] * 3)
+
+    def test_duplicates_are_dropped_before_anything_else(self) -> None:
+        dup = "same output " * 200
+        conv = _openai_conversation([dup, "x" * 100, dup])
+        budget = ContextBudget(window_override=1000, budget_fraction=1.0)
+        plan = budget.fit("gpt-4o", conv)
+        self.assertEqual(plan.deduplicated, 1)
+        self.assertEqual(plan.excerpted + plan.condensed, 0)
+        outputs = _tool_outputs(conv)
+        self.assertEqual(outputs[0], DUPLICATE_PLACEHOLDER)
+        self.assertEqual(outputs[2], dup)
+
+    def test_large_old_outputs_become_excerpts(self) -> None:
+        big = "HEAD" + "m" * 20_000 + "TAIL"
+        conv = _openai_conversation([big] + ["small"] * 5)
+        budget = ContextBudget(window_override=2000, budget_fraction=1.0, excerpt_chars=400)
+        plan = budget.fit("gpt-4o", conv)
+        self.assertEqual(plan.excerpted, 1)
+        first = _tool_outputs(conv)[0]
+        self.assertTrue(first.startswith("HEAD"))
+        self.assertTrue(first.endswith("TAIL"))
+        self.assertIn("elided", first)
+        self.assertLessEqual(plan.estimated_after, plan.budget)
+
+    def test_condenses_oldest_first_and_keeps_newest_turn(self) -> None:
+        conv = _anthropic_conversation([f"{i}" * 3000 for i in range(6)])
+        budget = ContextBudget(window_override=1200, budget_fraction=1.0, excerpt_chars=2000)
+        plan = budget.fit("claude-opus-4-6", conv)
+        outputs = _tool_outputs(conv)
+        self.assertEqual(outputs[0], CONDENSED_PLACEHOLDER)
+        self.assertEqual(outputs[-1], "5" * 3000)
+        self.assertGreater(plan.condensed, 0)
+        # tool_use_id survives condensation.
+        self.assertTrue(all("tool_use_id" in b for m in conv._provider_messages
+                            if isinstance(m.get("content"), list) for b in m["content"]
+                            if b.get("type") == "tool_result"))
+
+    def test_calibration_changes_estimate(self) -> None:
+        conv = _openai_conversation(["z" * 4000])
+        budget = ContextBudget(window_override=100_000)
+        before, raw = budget.measure("gpt-4o", conv)
+        budget.calibrate("gpt-4o", raw, int(raw * 2))
+        after, _ = budget.measure("gpt-4o", conv)
+        self.assertAlmostEqual(after / before, 2.0, places=2)
+
+    def test_excerpt_short_text_is_unchanged(self) -> None:
+        self.assertEqual(excerpt("short", 100), "short")
+
+
+@dataclass
+class _RecordingModel:
+    """OpenAI-format model that records the request size it was handed."""
+    turns: list[ModelTurn] = field(default_factory=list)
+    model: str = "gpt-4o"
+    sent_chars: list[int] = field(default_factory=list)
+    delegate: OpenAICompatibleModel = field(default_factory=lambda: OpenAICompatibleModel(model="gpt-4o", api_key="k"))
+
+    def create_conversation(self, system_prompt: str, initial_user_message: str) -> Conversation:
+        return self.delegate.create_conversation(system_prompt, initial_user_message)
+
+    def complete(self, conversation: Conversation) -> ModelTurn:
+        self.sent_chars.append(sum(len(str(m.get("content") or "")) for m in conversation._provider_messages))
+        return self.turns.pop(0)
+
+    def append_assistant_turn(self, conversation: Conversation, turn: ModelTurn) -> None:
+        conversation._provider_messages.append({
+            "role": "assistant",
+            "content": turn.text,
+            "tool_calls": [
+                {"id": tc.id, "type": "function", "function": {"name": tc.name, "arguments": "{}"}}
+                for tc in turn.tool_calls
+            ],
+        })
+
+    def append_tool_results(self, conversation: Conversation, results: list[ToolResult]) -> None:
+        self.delegate.append_tool_results(conversation, results)
+
+
+class EngineContextBudgetTests(unittest.TestCase):
+    def test_engine_condenses_before_sending(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            for i in range(4):
+                (root / f"f{i}.txt").write_text(f"{i}" * 6000, encoding="utf-8")
+            cfg = AgentConfig(
+                workspace=root, max_depth=1, max_steps_per_call=8, acceptance_criteria=False,
+                context_window_tokens=12_000, context_budget_fraction=0.5,
+            )
+            turns = [ModelTurn(tool_calls=[_tc("read_file", path=f"f{i}.txt")], input_tokens=1000) for i in range(4)]
+            turns.append(ModelTurn(text="done", stop_reason="end_turn"))
+            model = _RecordingModel(turns=turns)
+            engine = RLMEngine(model=model, tools=WorkspaceTools(root=root), config=cfg)
+            engine.system_prompt = "sys"
+            self.assertEqual(engine.solve("read everything"), "done")
+            # Without proactive condensation the last request would carry ~24k chars of tool output.
+            self.assertLess(model.sent_chars[-1], 24_000)
+            self.assertNotEqual(engine.context_budget.estimator.factor("gpt-4o"), 1.0)
+
+    def test_disabled_with_zero_fraction(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cfg = AgentConfig(workspace=Path(tmpdir), context_budget_fraction=0)
+            engine = RLMEngine(model=_RecordingModel(), tools=WorkspaceTools(root=Path(tmpdir)), config=cfg)
+            self.assertIsNone(engine.context_budget)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import json
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from agent.dataset_profile import HyperLogLog, SpaceSaving, profile_file, render_profile, sniff_encoding
+from agent.tools import WorkspaceTools
+
+
+class SketchTests(unittest.TestCase):
+    def test_hyperloglog_within_a_few_percent(self) -> None:
+        for n in (10, 1_000, 50_000):
+            hll = HyperLogLog()
+            for i in range(n):
+                hll.add(f"value-{i}")
+                hll.add(f"value-{i}")
+            self.assertLess(abs(hll.estimate() - n) / n, 0.05, n)
+
+    def test_space_saving_finds_heavy_hitters(self) -> None:
+        sketch = SpaceSaving(capacity=8)
+        for i in range(5_000):
+            sketch.add("hot" if i % 3 == 0 else "warm" if i % 5 == 0 else f"cold-{i}")
+        self.assertEqual([value for value, _ in sketch.top(2)], ["hot", "warm"])
+
+    def test_space_saving_reports_nothing_for_unique_values(self) -> None:
+        sketch = SpaceSaving(capacity=8)
+        for i in range(1_000):
+            sketch.add(str(i))
+        self.assertEqual(sketch.top(5), [])
+
+
+class ProfileFileTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_csv_columns(self) -> None:
+        path = self.root / "people.csv"
+        rows = ["id,name,amount,joined"] + [
+            f"{i},{'Ann' if i % 2 else 'Bob'},{i * 1.5},2024-01-{i % 28 + 1:02d}" for i in range(1, 101)
+        ]
+        rows[10] = "10,,NA,2024-01-11"
+        path.write_text("\n".join(rows) + "\n", encoding="utf-8")
+        profile = profile_file(path)
+        self.assertEqual((profile["format"], profile["delimiter"], profile["rows"]), ("csv", ",", 100))
+        columns = {col["name"]: col for col in profile["columns"]}
+        self.assertEqual(
+            [columns[name]["type"] for name in ("id", "name", "amount", "joined")], ["int", "string", "float", "date"],
+        )
+        self.assertEqual(columns["name"]["null_rate"], 0.01)
+        self.assertEqual((columns["id"]["min"], columns["id"]["max"]), (1, 100))
+        self.assertEqual(columns["name"]["top"], [["Ann", 50], ["Bob", 49]])
+        self.assertEqual(len(profile["sample_rows"]), 5)
+
+    def test_semicolon_latin1(self) -> None:
+        path = self.root / "cities.csv"
+        path.write_bytes("city;population\nZürich;421878\nMünchen;1488202\n".encode("latin-1"))
+        profile = profile_file(path)
+        self.assertEqual((profile["encoding"], profile["delimiter"]), ("latin-1", ";"))
+        self.assertEqual(profile["sample_rows"][1], ["München", "1488202"])
+
+    def test_bom_and_truncated_multibyte(self) -> None:
+        self.assertEqual(sniff_encoding(b"\xef\xbb\xbfa,b"), "utf-8-sig")
+        self.assertEqual(sniff_encoding("a,é".encode("utf-8")[:-1]), "utf-8")
+
+    def test_jsonl_missing_keys_are_nulls(self) -> None:
+        path = self.root / "events.jsonl"
+        records = [{"kind": "a"}, {"kind": "b", "score": 3}, "not json", {"kind": "a", "score": 5}]
+        path.write_text("\n".join(r if isinstance(r, str) else json.dumps(r) for r in records) + "\n", encoding="utf-8")
+        profile = profile_file(path)
+        self.assertEqual((profile["rows"], profile["malformed_rows"]), (3, 1))
+        score = next(col for col in profile["columns"] if col["name"] == "score")
+        self.assertAlmostEqual(score["null_rate"], 1 / 3, places=3)
+        self.assertIn("- score: int", render_profile(profile))
+
+    def test_max_rows(self) -> None:
+        path = self.root / "n.tsv"
+        path.write_text("n\n" + "".join(f"{i}\n" for i in range(1_000)), encoding="utf-8")
+        profile = profile_file(path, max_rows=10)
+        self.assertEqual((profile["rows"], profile["truncated_at"], profile["delimiter"]), (10, 10, "\t"))
+
+
+class ProfileDatasetToolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        (self.root / "data").mkdir()
+        for name in ("a", "b"):
+            (self.root / "data" / f"{name}.csv").write_text(
+                "id,label\n" + "".join(f"{i},{name}{i % 3}\n" for i in range(200)), encoding="utf-8",
+            )
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_glob_profiles_each_file_and_caches(self) -> None:
+        tools = WorkspaceTools(root=self.root)
+        out = tools.profile_dataset(["data/*.csv"])
+        self.assertIn("# data/a.csv", out)
+        self.assertIn("# data/b.csv", out)
+        self.assertIn("200 rows", out)
+        self.assertEqual(len(list((self.root / ".openplanter" / "index" / "profiles").iterdir())), 2)
+        fresh = WorkspaceTools(root=self.root)
+        with patch("agent.tools.profile_file", side_effect=AssertionError("should be cached")):
+            self.assertEqual(fresh.profile_dataset(["data/*.csv"]), out)
+
+    def test_changed_file_is_reprofiled(self) -> None:
+        tools = WorkspaceTools(root=self.root, file_index=False)
+        tools.profile_dataset(["data/a.csv"])
+        with (self.root / "data" / "a.csv").open("a", encoding="utf-8") as fh:
+            fh.write("200,new\n")
+        self.assertIn("201 rows", tools.profile_dataset(["data/a.csv"]))
+
+    def test_profile_memo_is_thread_safe(self) -> None:
+        tools = WorkspaceTools(root=self.root, file_index=False)
+        errors: list[BaseException] = []
+
+        def churn(worker: int) -> None:
+            try:
+                for i in range(2_000):
+                    key = (f"{worker}-{i}", None)
+                    tools._store_profile(key, {"rows": i})
+                    tools._load_profile(key)
+            except BaseException as exc:  # noqa: BLE001 - surfaced below
+                errors.append(exc)
+
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+        with patch("agent.tools._PROFILE_MEMO_ENTRIES", 4):
+            threads = [threading.Thread(target=churn, args=(n,)) for n in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(tools._profiles), 4)
+
+    def test_missing_file(self) -> None:
+        tools = WorkspaceTools(root=self.root)
+        self.assertIn("File not found", tools.profile_dataset(["nope.csv"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
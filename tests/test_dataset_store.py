@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from agent.dataset_store import DatasetStore, table_names
+from agent.tools import WorkspaceTools
+
+
+class TableNamesTests(unittest.TestCase):
+    def test_stems_and_collisions(self) -> None:
+        names = table_names(["data/Contracts 2023.csv", "a/vendors.csv", "b/vendors.jsonl", "2020.tsv"])
+        self.assertEqual(
+            names,
+            {
+                "contracts_2023": "data/Contracts 2023.csv",
+                "a_vendors": "a/vendors.csv",
+                "b_vendors": "b/vendors.jsonl",
+                "t_2020": "2020.tsv",
+            },
+        )
+
+
+class DatasetStoreTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        (self.root / "contracts.csv").write_text(
+            "Contract ID,Vendor Name,Amount,Zip\n"
+            + "".join(f"{i},vendor{i % 50},{i * 10},0{i % 9:04d}\n" for i in range(500)),
+            encoding="utf-8",
+        )
+        (self.root / "lobbying.jsonl").write_text(
+            "".join(json.dumps({"client": f"vendor{i}", "spend": i, "tags": ["x"]}) + "\n" for i in range(40, 60)),
+            encoding="utf-8",
+        )
+        past = time.time() - 10
+        for name in ("contracts.csv", "lobbying.jsonl"):
+            os.utime(self.root / name, (past, past))
+        self.datasets = table_names(["contracts.csv", "lobbying.jsonl"])
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _store(self) -> DatasetStore:
+        store = DatasetStore(self.root, self.root / "idx" / "datasets.db")
+        self.addCleanup(store.close)
+        return store
+
+    def test_join_loads_and_indexes_once(self) -> None:
+        sql = (
+            "SELECT DISTINCT c.vendor_name FROM contracts c JOIN lobbying AS l ON c.vendor_name = l.client "
+            "ORDER BY 1"
+        )
+        first = self._store().query(sql, self.datasets)
+        self.assertEqual([row[0] for row in first.rows], [f"vendor{i}" for i in range(40, 50)])
+        self.assertIn("loaded contracts <- contracts.csv: 500 rows", " ".join(first.notes))
+        self.assertIn("indexed contracts.vendor_name", first.notes)
+        self.assertIn("indexed lobbying.client", first.notes)
+        again = self._store().query(sql, self.datasets)
+        self.assertEqual((again.rows, again.notes), (first.rows, []))
+
+    def test_only_referenced_files_are_loaded(self) -> None:
+        result = self._store().query("SELECT count(*) FROM lobbying WHERE spend >= 50", self.datasets)
+        self.assertEqual(result.rows, [(10,)])
+        self.assertEqual(len(result.notes), 2)
+        self.assertTrue(result.notes[0].startswith("loaded lobbying"))
+
+    def test_types(self) -> None:
+        result = self._store().query(
+            "SELECT typeof(amount), typeof(zip), zip, tags FROM contracts, lobbying LIMIT 1", self.datasets,
+        )
+        self.assertEqual(result.rows, [("integer", "text", "00000", '["x"]')])
+
+    def test_reload_after_change(self) -> None:
+        store = self._store()
+        store.query("SELECT 1 FROM lobbying", self.datasets)
+        with (self.root / "lobbying.jsonl").open("a", encoding="utf-8") as fh:
+            fh.write(json.dumps({"client": "new", "spend": 1, "extra": True}) + "\n")
+        result = store.query("SELECT count(*), count(extra) FROM lobbying", self.datasets)
+        self.assertEqual(result.rows, [(21, 1)])
+
+    def test_row_limit(self) -> None:
+        result = self._store().query("SELECT * FROM contracts", self.datasets, max_rows=3)
+        self.assertEqual((len(result.rows), result.truncated), (3, True))
+        self.assertEqual(result.columns, ["contract_id", "vendor_name", "amount", "zip"])
+
+
+class QueryDatasetToolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        (self.root / "people.csv").write_text("name,age\nann,31\nbob,\n", encoding="utf-8")
+        self.tools = WorkspaceTools(root=self.root)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_tabular_output(self) -> None:
+        out = self.tools.query_dataset("SELECT name, age FROM people ORDER BY name")
+        self.assertEqual(out.splitlines()[1:], ["name | age", "ann | 31", "bob | NULL", "(2 rows; 0.00s)"])
+        self.assertTrue((self.root / ".openplanter" / "index" / "datasets.db").exists())
+
+    def test_writes_and_pragmas_are_refused(self) -> None:
+        self.tools.query_dataset("SELECT 1 FROM people")
+        for sql in ("DELETE FROM people", "PRAGMA query_only=OFF", "ATTACH DATABASE 'x.db' AS x"):
+            self.assertTrue(self.tools.query_dataset(sql).startswith("Query failed"), sql)
+        self.assertIn("(1 rows", self.tools.query_dataset("SELECT count(*) FROM people"))
+        self.assertFalse((self.root / "x.db").exists())
+
+    def test_unknown_table_lists_tables(self) -> None:
+        out = self.tools.query_dataset("SELECT * FROM nope")
+        self.assertIn("no such table: nope", out)
+        self.assertIn("people <- people.csv", out)
+
+    def test_timeout(self) -> None:
+        self.tools.query_timeout_sec = 0
+        sql = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT max(i) FROM n"
+        self.assertIn("exceeded", self.tools.query_dataset(sql))
+
+
+if __name__ == "__main__":
+    unittest.main()
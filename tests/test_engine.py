@@ -3,6 +3,7 @@ from __future__ import annotations
 import json
 import tempfile
 import threading
+import time
 import unittest
 from dataclasses import dataclass, field
 from pathlib import Path
@@ -12,7 +13,8 @@ from conftest import _tc
 from agent.config import AgentConfig
 from agent.engine import RLMEngine
 from agent.prompts import build_system_prompt as _build_system_prompt
-from agent.model import Conversation, ModelError, ModelTurn, ScriptedModel, ToolResult
+from agent.model import AnthropicModel, Conversation, ModelError, ModelTurn, ScriptedModel, ToolCall, ToolResult
+from agent.tool_defs import ToolSet
 from agent.tools import WorkspaceTools
 
 
@@ -350,5 +352,340 @@ class ParallelExecutionTests(unittest.TestCase):
             self.assertEqual(result, "parent done")
 
 
+
+class _SlowReadTools(WorkspaceTools):
+    """WorkspaceTools whose read_file sleeps and records peak concurrency."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._probe_lock = threading.Lock()
+        self.active_reads = 0
+        self.peak_reads = 0
+
+    def read_file(self, *args, **kwargs) -> str:
+        with self._probe_lock:
+            self.active_reads += 1
+            self.peak_reads = max(self.peak_reads, self.active_reads)
+        try:
+            time.sleep(0.05)
+            return super().read_file(*args, **kwargs)
+        finally:
+            with self._probe_lock:
+                self.active_reads -= 1
+
+
+class ReadOnlyBatchingTests(unittest.TestCase):
+    def test_independent_reads_overlap_and_keep_order(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            for name in ("a", "b", "c"):
+                (root / f"{name}.txt").write_text(f"content {name}\n", encoding="utf-8")
+            cfg = AgentConfig(workspace=root, max_depth=1, max_steps_per_call=4, acceptance_criteria=False)
+            tools = _SlowReadTools(root=root)
+            model = ScriptedModel(
+                scripted_turns=[
+                    ModelTurn(tool_calls=[_tc("read_file", path=f"{n}.txt") for n in ("a", "b", "c")]),
+                    ModelTurn(text="done", stop_reason="end_turn"),
+                ]
+            )
+            engine = RLMEngine(model=model, tools=tools, config=cfg)
+            result, ctx = engine.solve_with_context("read three files")
+            self.assertEqual(result, "done")
+            self.assertEqual(tools.peak_reads, 3)
+            self.assertEqual(len(ctx.observations), 3)
+            for obs, name in zip(ctx.observations, ("a", "b", "c")):
+                self.assertIn(f"content {name}", obs)
+
+    def test_write_is_a_barrier_between_reads(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "f.txt").write_text("before\n", encoding="utf-8")
+            cfg = AgentConfig(workspace=root, max_depth=1, max_steps_per_call=4, acceptance_criteria=False)
+            tools = _SlowReadTools(root=root)
+            model = ScriptedModel(
+                scripted_turns=[
+                    ModelTurn(tool_calls=[
+                        _tc("read_file", path="f.txt"),
+                        _tc("write_file", path="f.txt", content="after\n"),
+                        _tc("read_file", path="f.txt"),
+                    ]),
+                    ModelTurn(text="done", stop_reason="end_turn"),
+                ]
+            )
+            engine = RLMEngine(model=model, tools=tools, config=cfg)
+            _, ctx = engine.solve_with_context("read write read")
+            self.assertEqual(tools.peak_reads, 1)
+            self.assertIn("before", ctx.observations[0])
+            self.assertIn("after", ctx.observations[2])
+
+    def test_tool_limit_caps_read_pool(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "x.txt").write_text("x\n", encoding="utf-8")
+            cfg = AgentConfig(
+                workspace=root, max_depth=1, max_steps_per_call=4,
+                acceptance_criteria=False, max_concurrent_tool_calls=2,
+            )
+            tools = _SlowReadTools(root=root)
+            model = ScriptedModel(
+                scripted_turns=[
+                    ModelTurn(tool_calls=[_tc("read_file", path="x.txt") for _ in range(5)]),
+                    ModelTurn(text="done", stop_reason="end_turn"),
+                ]
+            )
+            engine = RLMEngine(model=model, tools=tools, config=cfg)
+            self.assertEqual(engine.solve("read many"), "done")
+            self.assertEqual(tools.peak_reads, 2)
+
+
+
+@dataclass
+class _StreamingModel:
+    """Reports tool calls through on_tool_call before complete() returns, like a streaming provider."""
+    turns: list[tuple[list, ModelTurn]] = field(default_factory=list)
+    on_tool_call: object = None
+    reads_seen_while_streaming: list[int] = field(default_factory=list)
+    tools: "_CountingReadTools | None" = None
+
+    def create_conversation(self, system_prompt: str, initial_user_message: str) -> Conversation:
+        return Conversation(_provider_messages=[], system_prompt=system_prompt)
+
+    def complete(self, conversation: Conversation) -> ModelTurn:
+        streamed, turn = self.turns.pop(0)
+        for tc in streamed:
+            if self.on_tool_call is not None:
+                self.on_tool_call(tc)
+        if streamed and self.tools is not None:
+            # Give speculative reads time to land before the "stream" closes.
+            deadline = time.monotonic() + 1.0
+            while self.tools.reads < len(streamed) and time.monotonic() < deadline:
+                time.sleep(0.005)
+            self.reads_seen_while_streaming.append(self.tools.reads)
+        return turn
+
+    def append_assistant_turn(self, conversation: Conversation, turn: ModelTurn) -> None:
+        pass
+
+    def append_tool_results(self, conversation: Conversation, results: list[ToolResult]) -> None:
+        pass
+
+
+class _CountingReadTools(WorkspaceTools):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._count_lock = threading.Lock()
+        self.reads = 0
+
+    def read_file(self, *args, **kwargs) -> str:
+        with self._count_lock:
+            self.reads += 1
+        return super().read_file(*args, **kwargs)
+
+
+class SpeculativeToolTests(unittest.TestCase):
+    def _engine(self, root: Path, model: _StreamingModel, tools: WorkspaceTools, enabled: bool = True) -> RLMEngine:
+        cfg = AgentConfig(
+            workspace=root, max_depth=1, max_steps_per_call=4,
+            acceptance_criteria=False, speculative_tools=enabled,
+        )
+        return RLMEngine(model=model, tools=tools, config=cfg)
+
+    def test_streamed_reads_run_before_turn_closes_and_are_reused(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "a.txt").write_text("alpha\n", encoding="utf-8")
+            (root / "b.txt").write_text("beta\n", encoding="utf-8")
+            tools = _CountingReadTools(root=root)
+            calls = [ToolCall("c1", "read_file", {"path": "a.txt"}), ToolCall("c2", "read_file", {"path": "b.txt"})]
+            model = _StreamingModel(
+                turns=[(calls, ModelTurn(tool_calls=calls)), ([], ModelTurn(text="done", stop_reason="end_turn"))],
+                tools=tools,
+            )
+            result, ctx = self._engine(root, model, tools).solve_with_context("read")
+            self.assertEqual(result, "done")
+            self.assertEqual(model.reads_seen_while_streaming, [2])
+            self.assertEqual(tools.reads, 2)
+            self.assertIn("alpha", ctx.observations[0])
+            self.assertIn("beta", ctx.observations[1])
+
+    def test_reads_after_a_write_are_not_speculated(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "f.txt").write_text("old\n", encoding="utf-8")
+            tools = _CountingReadTools(root=root)
+            calls = [
+                ToolCall("c1", "read_file", {"path": "f.txt"}),
+                ToolCall("c2", "write_file", {"path": "f.txt", "content": "new\n"}),
+                ToolCall("c3", "read_file", {"path": "f.txt"}),
+            ]
+            model = _StreamingModel(
+                turns=[(calls, ModelTurn(tool_calls=calls)), ([], ModelTurn(text="done", stop_reason="end_turn"))],
+            )
+            _, ctx = self._engine(root, model, tools).solve_with_context("rw")
+            self.assertEqual(tools.reads, 2)
+            self.assertIn("old", ctx.observations[0])
+            self.assertIn("new", ctx.observations[2])
+
+    def test_changed_arguments_fall_back_to_normal_execution(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "a.txt").write_text("alpha\n", encoding="utf-8")
+            (root / "b.txt").write_text("beta\n", encoding="utf-8")
+            tools = _CountingReadTools(root=root)
+            streamed = [ToolCall("c1", "read_file", {"path": "a.txt"})]
+            final = [ToolCall("c1", "read_file", {"path": "b.txt"})]
+            model = _StreamingModel(
+                turns=[(streamed, ModelTurn(tool_calls=final)), ([], ModelTurn(text="done", stop_reason="end_turn"))],
+                tools=tools,
+            )
+            engine = self._engine(root, model, tools)
+            _, ctx = engine.solve_with_context("read")
+            self.assertIn("beta", ctx.observations[0])
+            self.assertEqual(engine._speculated, {})
+
+    def test_disabled_by_default(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "a.txt").write_text("alpha\n", encoding="utf-8")
+            tools = _CountingReadTools(root=root)
+            calls = [ToolCall("c1", "read_file", {"path": "a.txt"})]
+            model = _StreamingModel(
+                turns=[(calls, ModelTurn(tool_calls=calls)), ([], ModelTurn(text="done", stop_reason="end_turn"))],
+            )
+            self._engine(root, model, tools, enabled=False).solve("read")
+            self.assertIsNone(model.on_tool_call)
+            self.assertEqual(tools.reads, 1)
+
+
+class _JudgeModel(ThreadSafeScriptedModel):
+    """Scripted judge that records the prompts it was sent."""
+
+    model: str = "judge-model"
+
+    def __init__(self, replies: list[str]) -> None:
+        super().__init__(scripted_turns=[
+            ModelTurn(text=r, stop_reason="end_turn", input_tokens=100, output_tokens=10) for r in replies
+        ])
+        self.prompts: list[str] = []
+
+    def create_conversation(self, system_prompt: str, initial_user_message: str) -> Conversation:
+        self.prompts.append(initial_user_message)
+        return super().create_conversation(system_prompt, initial_user_message)
+
+
+class BatchedJudgeTests(unittest.TestCase):
+    def _run(self, judge: _JudgeModel) -> tuple[RLMEngine, list[str]]:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            cfg = AgentConfig(
+                workspace=root, max_depth=3, max_steps_per_call=4,
+                recursive=True, acceptance_criteria=True,
+            )
+            parent = ThreadSafeScriptedModel(scripted_turns=[
+                ModelTurn(tool_calls=[
+                    ToolCall(id="c0", name="execute", arguments={"objective": "task A", "acceptance_criteria": "says A"}),
+                    ToolCall(id="c1", name="execute", arguments={"objective": "task B", "acceptance_criteria": "says B"}),
+                ]),
+                ModelTurn(text="parent done", stop_reason="end_turn"),
+            ])
+            executor = ThreadSafeScriptedModel(scripted_turns=[
+                ModelTurn(text="child done", stop_reason="end_turn"),
+                ModelTurn(text="child done", stop_reason="end_turn"),
+            ])
+            models = [executor, judge]
+            engine = RLMEngine(
+                model=parent, tools=WorkspaceTools(root=root), config=cfg,
+                model_factory=lambda _name, _effort: models.pop(0),
+            )
+            result, ctx = engine.solve_with_context("judge test")
+            self.assertEqual(result, "parent done")
+            return engine, ctx.observations
+
+    def test_parallel_results_judged_in_one_request(self) -> None:
+        judge = _JudgeModel([
+            'Verdicts:\n[{"item": 1, "verdict": "PASS", "reason": "ok"}, '
+            '{"item": 2, "verdict": "FAIL", "reason": "missing B"}]',
+        ])
+        engine, observations = self._run(judge)
+        self.assertEqual(len(judge.prompts), 1)
+        self.assertIn("task A", judge.prompts[0])
+        self.assertIn("task B", judge.prompts[0])
+        text = "\n".join(observations)
+        self.assertIn("[ACCEPTANCE CRITERIA: PASS]\nPASS: ok", text)
+        self.assertIn("[ACCEPTANCE CRITERIA: FAIL]\nFAIL: missing B", text)
+        usage = engine.session_tokens["judge-model (judge)"]
+        self.assertEqual((usage["input"], usage["output"], usage["calls"]), (100, 10, 1))
+
+    def test_unparseable_batch_falls_back_to_single_judging(self) -> None:
+        judge = _JudgeModel(["no idea", "PASS: fine", "FAIL: wrong"])
+        engine, observations = self._run(judge)
+        self.assertEqual(len(judge.prompts), 3)
+        text = "\n".join(observations)
+        self.assertIn("[ACCEPTANCE CRITERIA: PASS]", text)
+        self.assertIn("[ACCEPTANCE CRITERIA: FAIL]", text)
+        self.assertEqual(engine.session_tokens["judge-model (judge)"]["calls"], 3)
+
+
+class ToolSetTests(unittest.TestCase):
+    def test_execute_passes_tool_set_per_call(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            cfg = AgentConfig(workspace=root, recursive=True, acceptance_criteria=False)
+            parent = AnthropicModel(model="claude-opus-4-6", api_key="k")
+            engine = RLMEngine(
+                model=parent, tools=WorkspaceTools(root=root), config=cfg,
+                model_factory=lambda name, _effort: AnthropicModel(model=name, api_key="k"),
+            )
+            self.assertEqual(parent.tool_set, ToolSet(include_subtask=True))
+            plan = engine._plan_delegation("execute", {"objective": "leaf"}, 0, parent)
+            assert not isinstance(plan, str)
+            self.assertEqual(plan.tool_set, ToolSet(include_subtask=False))
+            self.assertIs(plan.model, engine._cached_model(plan.model.model, plan.model.reasoning_effort))
+            self.assertIsNone(plan.model.tool_set)
+            self.assertEqual(parent.tool_set, ToolSet(include_subtask=True))
+
+    def test_execute_without_factory_reuses_current_model(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            parent = AnthropicModel(model="claude-opus-4-6", api_key="k")
+            engine = RLMEngine(model=parent, tools=WorkspaceTools(root=root), config=AgentConfig(workspace=root, acceptance_criteria=False))
+            plan = engine._plan_delegation("execute", {"objective": "leaf"}, 0, parent)
+            assert not isinstance(plan, str)
+            self.assertIs(plan.model, parent)
+            self.assertNotIn("subtask", {d["name"] for d in plan.tool_set.definitions()})
+            self.assertTrue(parent.tool_set.include_subtask)
+
+    def test_concurrent_branches_get_their_own_options(self) -> None:
+        seen: list[bool] = []
+        lock = threading.Lock()
+
+        @dataclass
+        class _OptionsModel(ThreadSafeScriptedModel):
+            def complete(self, conversation: Conversation, options=None) -> ModelTurn:  # type: ignore[override]
+                tools = options.tool_set if options is not None else None
+                with lock:
+                    seen.append(tools is not None and not tools.include_subtask)
+                return super().complete(conversation)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            cfg = AgentConfig(workspace=root, max_depth=2, max_steps_per_call=3, recursive=True, acceptance_criteria=False)
+            model = _OptionsModel(scripted_turns=[
+                ModelTurn(tool_calls=[
+                    ToolCall(id="a", name="execute", arguments={"objective": "leaf A"}),
+                    ToolCall(id="b", name="execute", arguments={"objective": "leaf B"}),
+                ]),
+                ModelTurn(text="leaf done", stop_reason="end_turn"),
+                ModelTurn(text="leaf done", stop_reason="end_turn"),
+                ModelTurn(text="root done", stop_reason="end_turn"),
+            ])
+            engine = RLMEngine(model=model, tools=WorkspaceTools(root=root), config=cfg)
+            self.assertEqual(engine.solve("fan out"), "root done")
+        # Root calls use the model's own tools; both leaves get the executor set.
+        self.assertEqual(seen.count(True), 2)
+        self.assertFalse(seen[0])
+        self.assertFalse(seen[-1])
+
+
 if __name__ == "__main__":
     unittest.main()
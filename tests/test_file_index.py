@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from pathlib import Path
+
+from agent.file_index import FileIndex, glob_matches
+from agent.tools import WorkspaceTools
+
+
+def _age(path: Path, seconds: float = 10.0) -> None:
+    """Push *path*'s mtime outside the racy window so the index trusts it."""
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+class FileIndexTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        (self.root / "src" / "pkg").mkdir(parents=True)
+        (self.root / "src" / "pkg" / "a.py").write_text("a", encoding="utf-8")
+        (self.root / "src" / "b.txt").write_text("b", encoding="utf-8")
+        (self.root / "top.py").write_text("t", encoding="utf-8")
+        (self.root / ".git").mkdir()
+        (self.root / ".git" / "HEAD").write_text("ref", encoding="utf-8")
+        self.db = self.root / ".openplanter" / "index" / "files.db"
+        self.index = FileIndex(self.root, self.db)
+        self.index.refresh()
+
+    def tearDown(self) -> None:
+        self.index.close()
+        self._tmp.cleanup()
+
+    def _age_tree(self) -> None:
+        for dirpath, _, _ in os.walk(self.root):
+            _age(Path(dirpath))
+
+    def test_initial_scan_excludes_git_and_index(self) -> None:
+        self.assertEqual(self.index.paths(), ["src/b.txt", "src/pkg/a.py", "top.py"])
+
+    def test_refresh_skips_unchanged_directories(self) -> None:
+        self._age_tree()
+        self.index.refresh()
+        stats = self.index.refresh()
+        self.assertEqual(stats["dirs_scanned"], 0)
+        self.assertGreaterEqual(stats["dirs_checked"], 3)
+
+    def test_add_remove_rename(self) -> None:
+        (self.root / "src" / "new.md").write_text("n", encoding="utf-8")
+        (self.root / "top.py").unlink()
+        (self.root / "src" / "b.txt").rename(self.root / "src" / "pkg" / "c.txt")
+        stats = self.index.refresh()
+        self.assertEqual(self.index.paths(), ["src/new.md", "src/pkg/a.py", "src/pkg/c.txt"])
+        self.assertEqual((stats["added"], stats["removed"]), (2, 2))
+
+    def test_deleted_directory_dropped(self) -> None:
+        (self.root / "src" / "pkg" / "a.py").unlink()
+        (self.root / "src" / "pkg").rmdir()
+        self.index.refresh()
+        self.assertEqual(self.index.paths(), ["src/b.txt", "top.py"])
+
+    def test_glob_semantics(self) -> None:
+        self.assertEqual(self.index.paths("*.py"), ["src/pkg/a.py", "top.py"])
+        self.assertEqual(self.index.paths("src/*.txt"), ["src/b.txt"])
+        self.assertEqual(self.index.paths("**/pkg/*"), ["src/pkg/a.py"])
+        self.assertEqual(self.index.paths("[!t]*"), ["src/b.txt", "src/pkg/a.py"])
+        for path in ("src/pkg/a.py", "top.py", "src/b.txt"):
+            for glob in ("*.py", "src/*.txt", "**/pkg/*", "[!t]*"):
+                self.assertEqual(glob_matches(path, glob), path in self.index.paths(glob), (path, glob))
+
+    def test_content_hash_follows_edits(self) -> None:
+        target = self.root / "top.py"
+        first = self.index.content_hash("top.py")
+        self.assertEqual(self.index.content_hash(target), first)
+        target.write_text("changed", encoding="utf-8")
+        self.assertNotEqual(self.index.content_hash("top.py"), first)
+        self.assertIsNone(self.index.content_hash("missing.py"))
+
+    def test_update_paths_without_refresh(self) -> None:
+        (self.root / "written.txt").write_text("w", encoding="utf-8")
+        self.index.update_paths([self.root / "written.txt", self.root / ".git" / "HEAD"])
+        self.assertIn("written.txt", self.index.paths())
+        self.assertNotIn(".git/HEAD", self.index.paths())
+
+    def test_persists_across_instances(self) -> None:
+        self._age_tree()
+        self.index.refresh()
+        self.index.close()
+        self.index = FileIndex(self.root, self.db)
+        self.assertEqual(self.index.count(), 3)
+        self.assertEqual(self.index.refresh()["dirs_scanned"], 0)
+
+
+class IgnoreRulesTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        for rel in ("node_modules/lib/x.js", "src/app.py", "src/build/out.o", "build/keep.txt", "logs/a.log", "logs/keep.log"):
+            (self.root / rel).parent.mkdir(parents=True, exist_ok=True)
+            (self.root / rel).write_text("", encoding="utf-8")
+        (self.root / ".git").mkdir()
+        (self.root / ".gitignore").write_text("node_modules/\n*.log\n!keep.log\n/build/\n", encoding="utf-8")
+        (self.root / "src" / ".ignore").write_text("build\n", encoding="utf-8")
+        self.index = FileIndex(self.root, self.root / ".openplanter" / "index" / "files.db")
+        self.index.refresh()
+
+    def tearDown(self) -> None:
+        self.index.close()
+        self._tmp.cleanup()
+
+    def test_ignored_paths_are_not_indexed(self) -> None:
+        self.assertEqual(self.index.paths(), [".gitignore", "logs/keep.log", "src/.ignore", "src/app.py"])
+
+    def test_dir_only_pattern_spares_files(self) -> None:
+        (self.root / "src" / "node_modules").write_text("", encoding="utf-8")
+        self.index.refresh()
+        self.assertIn("src/node_modules", self.index.paths())
+
+    def test_ignore_file_edits_take_effect(self) -> None:
+        ignore = self.root / ".gitignore"
+        ignore.write_text("*.log\n", encoding="utf-8")
+        _age(ignore, 60.0)
+        self.index.refresh()
+        self.assertIn("node_modules/lib/x.js", self.index.paths())
+        self.assertIn("build/keep.txt", self.index.paths())
+        self.assertNotIn("logs/keep.log", self.index.paths())
+
+    def test_update_paths_respects_rules(self) -> None:
+        self.index.update_paths([self.root / "node_modules" / "lib" / "x.js", self.root / "logs" / "a.log"])
+        self.assertEqual(self.index.paths("*.js") + self.index.paths("a.log"), [])
+
+    def test_gitignore_needs_a_git_repository(self) -> None:
+        (self.root / ".git").rmdir()
+        self.index.refresh()
+        paths = self.index.paths()
+        self.assertIn("node_modules/lib/x.js", paths)
+        self.assertIn("logs/a.log", paths)
+        self.assertNotIn("src/build/out.o", paths, ".ignore applies without git, as in rg")
+
+    def test_nested_repository_reads_its_gitignore(self) -> None:
+        (self.root / ".git").rmdir()
+        (self.root / "src" / ".git").mkdir()
+        (self.root / "src" / ".gitignore").write_text("app.py\n", encoding="utf-8")
+        self.index.refresh()
+        paths = self.index.paths()
+        self.assertNotIn("src/app.py", paths)
+        self.assertIn("logs/a.log", paths)
+
+    def test_git_info_exclude(self) -> None:
+        (self.root / ".git" / "info").mkdir(parents=True)
+        (self.root / ".git" / "info" / "exclude").write_text("src/\n", encoding="utf-8")
+        self.index.refresh()
+        self.assertEqual(self.index.paths(), [".gitignore", "logs/keep.log"])
+
+    def test_list_files_skips_ignored(self) -> None:
+        tools = WorkspaceTools(root=self.root)
+        listing = tools.list_files().splitlines()
+        self.assertNotIn("node_modules/lib/x.js", listing)
+        self.assertIn("src/app.py", listing)
+
+
+class WorkspaceToolsIndexTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_list_files_is_uncapped_and_honours_glob(self) -> None:
+        data = self.root / "data"
+        data.mkdir()
+        for i in range(300):
+            (data / f"f{i:03d}.csv").write_text("", encoding="utf-8")
+        (self.root / "readme.md").write_text("", encoding="utf-8")
+        tools = WorkspaceTools(root=self.root, max_files_listed=1000)
+        with patch("agent.tools._MAX_WALK_ENTRIES", 10):
+            listing = tools.list_files("*.csv")
+        self.assertEqual(len(listing.splitlines()), 300)
+        self.assertNotIn("readme.md", listing)
+        self.assertNotIn(".openplanter", tools.list_files())
+
+    def test_sees_writes_and_external_changes(self) -> None:
+        tools = WorkspaceTools(root=self.root)
+        self.assertEqual(tools.list_files(), "(no files)")
+        tools.write_file("a.txt", "alpha\n")
+        (self.root / "b.txt").write_text("beta\n", encoding="utf-8")
+        self.assertEqual(tools.list_files(), "a.txt\nb.txt")
+        self.assertIn("b.txt:1:beta", tools.search_files("beta"))
+
+    def test_disabled_index_falls_back(self) -> None:
+        (self.root / "a.txt").write_text("", encoding="utf-8")
+        tools = WorkspaceTools(root=self.root, file_index=False)
+        self.assertEqual(tools.list_files("*.txt"), "a.txt")
+        self.assertFalse((self.root / ".openplanter").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
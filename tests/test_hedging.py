@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import tempfile
+import threading
+import time
+import unittest
+from dataclasses import dataclass
+from pathlib import Path
+from unittest.mock import patch
+
+from conftest import _tc
+from agent import http_pool
+from agent.config import AgentConfig
+from agent.engine import RLMEngine
+from agent.context_budget import ContextBudget
+from agent.hedging import HedgedModel, _reencode
+from agent.mock_server import MockProviderConfig, MockProviderServer, MockReply
+from agent.model import (
+    AnthropicModel,
+    CallOptions,
+    Conversation,
+    ModelCancelled,
+    ModelError,
+    ModelTurn,
+    OpenAICompatibleModel,
+    ScriptedModel,
+    ToolCall,
+    ToolResult,
+    _http_stream_sse,
+)
+from agent.ratelimit import LatencyTracker, latency_for
+from agent.tools import WorkspaceTools
+
+
+@dataclass
+class _SlowModel(ScriptedModel):
+    delay: float = 0.0
+    error: str = ""
+
+    def complete(self, conversation: Conversation, options: CallOptions | None = None) -> ModelTurn:
+        if options is not None and options.cancel is not None:
+            if options.cancel.wait(self.delay):
+                raise ModelCancelled("cancelled")
+        else:
+            time.sleep(self.delay)
+        if self.error:
+            raise ModelError(self.error)
+        if options is not None and options.on_first_byte is not None:
+            options.on_first_byte()
+        return super().complete(conversation, options)
+
+
+def _hedged(primary: ScriptedModel, secondary: ScriptedModel) -> HedgedModel:
+    return HedgedModel(primary=primary, secondary=secondary, initial_delay=0.05, min_samples=1000)
+
+
+class HedgedModelTests(unittest.TestCase):
+    def test_fast_primary_is_not_hedged(self) -> None:
+        secondary = _SlowModel(scripted_turns=[ModelTurn(text="secondary")])
+        model = _hedged(_SlowModel(scripted_turns=[ModelTurn(text="primary")]), secondary)
+        turn = model.complete(model.create_conversation("sys", "hi"))
+        self.assertEqual(turn.text, "primary")
+        self.assertEqual(model.stats()["hedged"], 0)
+        self.assertEqual(len(secondary.scripted_turns), 1)
+
+    def test_stalled_primary_is_hedged_and_cancelled(self) -> None:
+        primary = _SlowModel(scripted_turns=[ModelTurn(text="primary")], delay=5.0)
+        model = _hedged(primary, _SlowModel(scripted_turns=[ModelTurn(tool_calls=[_tc("think", note="x")])]))
+        start = time.monotonic()
+        turn = model.complete(model.create_conversation("sys", "hi"))
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(turn.tool_calls[0].name, "think")
+        stats = model.stats()
+        self.assertEqual((stats["hedged"], stats["secondary_wins"]), (1, 1))
+
+    def test_primary_error_fails_over(self) -> None:
+        model = _hedged(_SlowModel(error="HTTP 500"), _SlowModel(scripted_turns=[ModelTurn(text="backup")]))
+        self.assertEqual(model.complete(model.create_conversation("s", "u")).text, "backup")
+        self.assertEqual(model.stats()["failovers"], 1)
+
+    def test_both_failing_raises(self) -> None:
+        model = _hedged(_SlowModel(error="primary down"), _SlowModel(error="secondary down"))
+        with self.assertRaises(ModelError) as ctx:
+            model.complete(model.create_conversation("s", "u"))
+        self.assertIn("primary down", str(ctx.exception))
+
+    def test_streaming_callbacks_from_one_leg_only(self) -> None:
+        seen: list[str] = []
+
+        @dataclass
+        class _Streaming(_SlowModel):
+            label: str = ""
+
+            def complete(self, conversation: Conversation, options: CallOptions | None = None) -> ModelTurn:
+                assert options is not None and options.on_content_delta is not None
+                time.sleep(self.delay)
+                options.on_content_delta("text", self.label)
+                return ModelTurn(text=self.label)
+
+        model = _hedged(_Streaming(delay=0.3, label="p"), _Streaming(delay=0.0, label="s"))
+        turn = model.complete(model.create_conversation("s", "u"), CallOptions(on_content_delta=lambda _k, t: seen.append(t)))
+        time.sleep(0.4)
+        self.assertEqual(turn.text, "s")
+        self.assertEqual(seen, ["s"])
+
+    def test_hedge_delay_follows_latency_percentile(self) -> None:
+        model = HedgedModel(
+            primary=OpenAICompatibleModel(model="m", api_key="k", base_url="https://hedge-delay.example/v1"),
+            secondary=ScriptedModel(), min_samples=5, min_delay=0.5, max_delay=3.0,
+        )
+        self.assertEqual(model.hedge_delay(), model.initial_delay)
+        tracker = latency_for("https://hedge-delay.example/v1/chat/completions")
+        for seconds in (0.1, 0.2, 1.5, 1.6, 1.7, 9.0):
+            tracker.first_byte(seconds)
+        self.assertEqual(model.hedge_delay(), 3.0)
+        self.assertEqual(model.model, "m")
+
+    def test_engine_tool_set_reaches_both_legs(self) -> None:
+        legs = [
+            OpenAICompatibleModel(model=name, api_key="k", base_url=f"https://{name}.example/v1")
+            for name in ("primary", "secondary")
+        ]
+        model = HedgedModel(primary=legs[0], secondary=legs[1])
+        with tempfile.TemporaryDirectory() as tmp:
+            cfg = AgentConfig(workspace=Path(tmp), recursive=False, acceptance_criteria=False)
+            RLMEngine(model=model, tools=WorkspaceTools(root=Path(tmp)), config=cfg)
+        for leg in legs:
+            names = set(leg._tool_schemas(CallOptions()).names)
+            self.assertNotIn("subtask", names)
+            self.assertNotIn("execute", names)
+        self.assertIs(model.tool_set, legs[0].tool_set)
+
+    def test_empty_turn_reencodes_to_nonempty_anthropic_message(self) -> None:
+        target = AnthropicModel(model="claude-sonnet-4-5", api_key="k")
+        blocks = _reencode(ModelTurn(text="", raw_response={"role": "assistant", "content": ""}), target).raw_response
+        self.assertEqual(blocks, [{"type": "text", "text": "(no content)"}])
+
+    def test_context_budget_fits_both_legs(self) -> None:
+        legs = [
+            AnthropicModel(model="claude-sonnet-4-5", api_key="k"),
+            OpenAICompatibleModel(model="gpt-4o", api_key="k"),
+        ]
+        model = HedgedModel(primary=legs[0], secondary=legs[1])
+        conv = model.create_conversation("sys", "go")
+        for i in range(8):
+            call = ToolCall(id=f"c{i}", name="read_file", arguments={"path": f"f{i}.txt"})
+            model.append_assistant_turn(conv, _reencode(ModelTurn(tool_calls=[call]), legs[0]))
+            model.append_tool_results(conv, [ToolResult(f"c{i}", "read_file", str(i) * 5000)])
+        with tempfile.TemporaryDirectory() as tmp:
+            cfg = AgentConfig(workspace=Path(tmp), acceptance_criteria=False,
+                              context_window_tokens=8000, context_budget_fraction=1.0)
+            engine = RLMEngine(model=model, tools=WorkspaceTools(root=Path(tmp)), config=cfg)
+            engine._fit_context(model, conv)
+        budget = ContextBudget(window_override=8000, budget_fraction=1.0)
+        for leg_model, leg_conv in model.conversation_legs(conv):
+            self.assertLessEqual(budget.measure(leg_model.model, leg_conv)[0], 8000)
+
+
+class LatencyTrackerTests(unittest.TestCase):
+    def test_percentiles_and_stats(self) -> None:
+        tracker = LatencyTracker(window=4)
+        self.assertIsNone(tracker.percentile(0.5))
+        for seconds in (9.0, 1.0, 2.0, 3.0, 4.0):
+            tracker.first_byte(seconds)
+        self.assertEqual(tracker.samples(), 4)
+        self.assertEqual(tracker.percentile(0.5), 3.0)
+        self.assertEqual(tracker.stats()["ttfb_max"], 4.0)
+        self.assertEqual(tracker.stats()["requests"], 5)
+
+
+class MockProviderHedgingTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.env = patch.dict("os.environ", {"no_proxy": "*", "NO_PROXY": "*"})
+        self.env.start()
+
+    def tearDown(self) -> None:
+        self.env.stop()
+
+    def _server(self, **kwargs) -> MockProviderServer:
+        server = MockProviderServer(MockProviderConfig(**kwargs)).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def test_stream_records_latency_and_honours_cancel(self) -> None:
+        server = self._server(tokens_per_sec=20, default_reply=MockReply(text="x" * 400))
+        url = server.base_url + "/chat/completions"
+        cancel = threading.Event()
+        first: list[bool] = []
+
+        def on_first_byte() -> None:
+            first.append(True)
+            threading.Timer(0.1, cancel.set).start()
+
+        with self.assertRaises(ModelCancelled):
+            _http_stream_sse(url, "POST", {}, {"model": "m"}, on_first_byte=on_first_byte, cancel=cancel)
+        self.assertEqual(first, [True])
+        self.assertEqual(latency_for(url).stats()["requests"], 1)
+
+    def test_pool_wait_is_not_a_provider_timeout(self) -> None:
+        server = self._server(tokens_per_sec=40, default_reply=MockReply(text="x" * 160))
+        url = server.base_url + "/chat/completions"
+        errors: list[Exception] = []
+
+        def stream() -> None:
+            try:
+                _http_stream_sse(url, "POST", {}, {"model": "m"}, first_byte_timeout=0.5, max_retries=1)
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+
+        with patch.object(http_pool, "MAX_CONNECTIONS_PER_HOST", 1):
+            threads = [threading.Thread(target=stream) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+        stats = latency_for(url).stats()
+        self.assertEqual((stats["requests"], stats["timeouts"]), (2, 0))
+        self.assertLess(stats["ttfb_max"], 0.5)
+
+    def test_cross_provider_hedge_keeps_both_conversations(self) -> None:
+        slow = self._server(first_byte_latency=2.0, default_reply=MockReply(text="late"))
+        fast = self._server(script=[MockReply(tool_calls=[("think", {"note": "n"})])])
+        primary = AnthropicModel(model="claude-sonnet-4-5", api_key="k", base_url=slow.base_url)
+        secondary = OpenAICompatibleModel(model="gpt-5", api_key="k", base_url=fast.base_url)
+        model = HedgedModel(primary=primary, secondary=secondary, initial_delay=0.1, min_samples=1000)
+        conv = model.create_conversation("sys", "hi")
+        turn = model.complete(conv)
+        self.assertEqual(turn.tool_calls[0].name, "think")
+        model.append_assistant_turn(conv, turn)
+        model.append_tool_results(conv, [ToolResult(turn.tool_calls[0].id, "think", "ok")])
+        anthropic_msgs, openai_msgs = (leg.get_messages() for leg in conv.legs)  # type: ignore[attr-defined]
+        self.assertEqual(anthropic_msgs[1]["content"][0]["type"], "tool_use")
+        self.assertEqual(anthropic_msgs[1]["content"][0]["id"], turn.tool_calls[0].id)
+        self.assertEqual(openai_msgs[-1]["role"], "tool")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+
+from agent import http_pool
+from agent.config import AgentConfig
+from agent.engine import RLMEngine
+from agent.http_pool import ConnectionPool, HTTPStatusError, PoolTimeout, pool_for
+from agent.model import ScriptedModel
+from agent.tools import WorkspaceTools
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections: set[int] = set()
+    drop_after_response = False
+
+    redirects = {
+        "/moved": (301, "/"),
+        "/loop": (302, "/loop"),
+        "/insecure": (302, "https://127.0.0.1:1/"),
+        "/post-307": (307, "/echo"),
+        "/post-303": (303, "/echo"),
+    }
+
+    def _redirect(self) -> bool:
+        if self.path not in self.redirects:
+            return False
+        status, location = self.redirects[self.path]
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.send_response(status)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        return True
+
+    def do_POST(self) -> None:  # noqa: N802
+        if self._redirect():
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # noqa: N802
+        type(self).connections.add(id(self.connection))
+        if self._redirect():
+            return
+        if self.path == "/echo":
+            body = b"GET"
+            self.send_response(200)
+        elif self.path == "/missing":
+            body = b'{"error": "nope"}'
+            self.send_response(404)
+        else:
+            body = b"hello"
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        # Simulate a server that silently closes idle keep-alive sockets.
+        if type(self).drop_after_response:
+            self.close_connection = True
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+class ConnectionPoolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        _Handler.connections = set()
+        _Handler.drop_after_response = False
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.port = self.server.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = patch.dict("os.environ", {"no_proxy": "*", "NO_PROXY": "*"})
+        self.env.start()
+
+    def tearDown(self) -> None:
+        self.env.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _get(self, pool: ConnectionPool, path: str = "/") -> bytes:
+        with pool.request("GET", self.url + path, timeout=5) as resp:
+            return resp.read()
+
+    def test_reuses_keep_alive_connection(self) -> None:
+        pool = ConnectionPool("http", "127.0.0.1", self.port)
+        for _ in range(3):
+            self.assertEqual(self._get(pool), b"hello")
+        self.assertEqual(pool.stats()["created"], 1)
+        self.assertEqual(pool.stats()["reused"], 2)
+        self.assertEqual(len(_Handler.connections), 1)
+
+    def test_http_error_raises_and_keeps_connection(self) -> None:
+        pool = ConnectionPool("http", "127.0.0.1", self.port)
+        with self.assertRaises(HTTPStatusError) as ctx:
+            self._get(pool, "/missing")
+        self.assertEqual(ctx.exception.status, 404)
+        self.assertIn("nope", ctx.exception.text())
+        self._get(pool)
+        self.assertEqual(pool.stats()["created"], 1)
+
+    def test_follows_same_scheme_redirects(self) -> None:
+        pool = ConnectionPool("http", "127.0.0.1", self.port)
+        self.assertEqual(self._get(pool, "/moved"), b"hello")
+        self.assertEqual(pool.stats()["created"], 1)
+        with pool.request("POST", self.url + "/post-307", body=b"payload", timeout=5) as resp:
+            self.assertEqual(resp.read(), b"payload")
+        with pool.request("POST", self.url + "/post-303", body=b"payload", timeout=5) as resp:
+            self.assertEqual(resp.read(), b"GET")
+
+    def test_redirect_loops_and_scheme_changes_raise(self) -> None:
+        pool = ConnectionPool("http", "127.0.0.1", self.port)
+        with self.assertRaises(HTTPStatusError) as ctx:
+            self._get(pool, "/loop")
+        self.assertEqual(ctx.exception.status, 302)
+        with self.assertRaises(HTTPStatusError) as ctx:
+            self._get(pool, "/insecure")
+        self.assertEqual(ctx.exception.status, 302)
+        self.assertEqual(self._get(pool), b"hello")
+
+    def test_recovers_from_dropped_idle_connection(self) -> None:
+        _Handler.drop_after_response = True
+        pool = ConnectionPool("http", "127.0.0.1", self.port)
+        self.assertEqual(self._get(pool), b"hello")
+        self.assertEqual(self._get(pool), b"hello")
+        self.assertEqual(pool.stats()["created"], 2)
+
+    def test_caps_connections_per_host(self) -> None:
+        pool = ConnectionPool("http", "127.0.0.1", self.port, max_per_host=1)
+        first = pool.request("GET", self.url + "/", timeout=5)
+        with self.assertRaises(PoolTimeout):
+            pool.request("GET", self.url + "/", timeout=5, pool_timeout=0.2)
+        first.read()
+        first.close()
+        self.assertEqual(self._get(pool), b"hello")
+        self.assertEqual(pool.stats()["open"], 1)
+
+    def test_pool_wait_is_not_bounded_by_request_timeout(self) -> None:
+        pool = ConnectionPool("http", "127.0.0.1", self.port, max_per_host=1)
+        first = pool.request("GET", self.url + "/", timeout=5)
+        timer = threading.Timer(0.5, lambda: (first.read(), first.close()))
+        timer.start()
+        started = time.monotonic()
+        with pool.request("GET", self.url + "/", timeout=0.2) as second:
+            self.assertEqual(second.read(), b"hello")
+        timer.join()
+        self.assertGreaterEqual(second.sent_at - started, 0.4)
+
+    def test_ensure_capacity_raises_existing_pools(self) -> None:
+        with patch.object(http_pool, "MAX_CONNECTIONS_PER_HOST", 1), patch.dict(http_pool._POOLS, clear=True):
+            pool = pool_for(self.url)
+            first = pool.request("GET", self.url + "/", timeout=5)
+            http_pool.ensure_capacity(4)
+            http_pool.ensure_capacity(2)
+            self.assertEqual((pool.max_per_host, http_pool.MAX_CONNECTIONS_PER_HOST), (4, 4))
+            self.assertEqual(self._get(pool), b"hello")
+            first.read()
+            first.close()
+
+    def test_engine_sizes_pools_for_model_concurrency(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp, patch.object(http_pool, "MAX_CONNECTIONS_PER_HOST", 8):
+            cfg = AgentConfig(workspace=Path(tmp), max_concurrent_model_calls=16, hedge_model="gpt-5")
+            RLMEngine(model=ScriptedModel(), tools=WorkspaceTools(root=Path(tmp)), config=cfg)
+            self.assertEqual(http_pool.MAX_CONNECTIONS_PER_HOST, 32)
+
+    def test_pool_for_is_shared_per_origin(self) -> None:
+        self.assertIs(pool_for(self.url + "/a"), pool_for(self.url + "/b?x=1"))
+        self.assertIsNot(pool_for(self.url), pool_for("https://example.com/"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from agent.line_index import LineIndex, LineIndexCache
+from agent.tools import WorkspaceTools
+
+
+class LineIndexTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_offsets_match_brute_force(self) -> None:
+        samples = [b"", b"a", b"a\n", b"a\nb", b"\n\n\n", b"".join(b"x" * (i % 13) + b"\n" for i in range(500)) + b"end"]
+        path = self.root / "f.txt"
+        for content in samples:
+            path.write_bytes(content)
+            starts = [0] + [i + 1 for i, byte in enumerate(content) if byte == 0x0A]
+            for stride in (1, 3, 64):
+                index = LineIndex.build(path, stride)
+                self.assertEqual(index.total_lines, len(content.splitlines()))
+                for line in range(1, index.total_lines + 1):
+                    self.assertEqual(index.line_start(content, line), starts[line - 1], (content[:10], stride, line))
+                    self.assertEqual(index.line_at(content, starts[line - 1]), line)
+
+    def test_sidecar_reused_until_file_changes(self) -> None:
+        path = self.root / "big.csv"
+        path.write_bytes(b"".join(b"%d,value\n" % i for i in range(5000)))
+        past = time.time() - 10
+        os.utime(path, (past, past))
+        sidecars = self.root / "lines"
+        first = LineIndexCache(sidecars, min_sidecar_bytes=1).get(path)
+        self.assertEqual(len(list(sidecars.iterdir())), 1)
+        loaded = LineIndexCache(sidecars, min_sidecar_bytes=1).get(path)
+        self.assertEqual((loaded.total_lines, list(loaded.offsets)), (first.total_lines, list(first.offsets)))
+        with path.open("ab") as fh:
+            fh.write(b"5000,value\n")
+        self.assertEqual(LineIndexCache(sidecars, min_sidecar_bytes=1).get(path).total_lines, 5001)
+
+
+class ReadFileWindowTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.path = self.root / "data.csv"
+        self.path.write_text("".join(f"{i},row{i}\n" for i in range(1, 20_001)), encoding="utf-8")
+        self.tools = WorkspaceTools(root=self.root, max_file_chars=2_000)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_line_window(self) -> None:
+        out = self.tools.read_file("data.csv", hashline=False, offset=15_000, limit=3)
+        self.assertEqual(
+            out.splitlines()[1:4], ["15000|15000,row15000", "15001|15001,row15001", "15002|15002,row15002"],
+        )
+        self.assertIn("lines 15000-15002 of 20000", out)
+        self.assertIn("next offset=15003", out)
+
+    def test_large_file_defaults_to_clipped_window(self) -> None:
+        out = self.tools.read_file("data.csv", hashline=False)
+        self.assertTrue(out.splitlines()[1].startswith("1|1,row1"))
+        self.assertIn("truncated at max_file_chars, continue with offset=", out)
+        self.assertLess(len(out), 3_000)
+
+    def test_byte_window_snaps_to_lines(self) -> None:
+        content = self.path.read_bytes()
+        start = content.index(b"\n500,row500\n") + 3
+        out = self.tools.read_file("data.csv", hashline=False, byte_offset=start, byte_limit=12)
+        self.assertEqual(out.splitlines()[1:3], ["500|500,row500", "501|501,row501"])
+
+    def test_hashline_anchors_from_window_are_editable(self) -> None:
+        out = self.tools.read_file("data.csv", offset=12_345, limit=1)
+        anchor = out.splitlines()[1].split("|", 1)[0]
+        result = self.tools.hashline_edit("data.csv", [{"set_line": anchor, "content": "12345,edited"}])
+        self.assertNotIn("mismatch", result.lower())
+        self.assertIn("12345|12345,edited", self.tools.read_file("data.csv", hashline=False, offset=12_345, limit=1))
+
+    def test_past_end_and_bad_arguments(self) -> None:
+        self.assertIn("past the end", self.tools.read_file("data.csv", offset=30_000))
+        self.assertIn("positive", self.tools.read_file("data.csv", offset=0))
+        self.assertIn("either offset or byte_offset", self.tools.read_file("data.csv", offset=1, byte_offset=0))
+
+    def test_small_file_output_unchanged(self) -> None:
+        (self.root / "small.txt").write_text("a\nb\n", encoding="utf-8")
+        self.assertEqual(self.tools.read_file("small.txt", hashline=False), "# small.txt\n1|a\n2|b")
+
+
+if __name__ == "__main__":
+    unittest.main()
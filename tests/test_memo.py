@@ -0,0 +1,165 @@
+"""Tests for workspace-aware subtask memoization."""
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from conftest import _tc
+from agent.config import AgentConfig
+from agent.engine import RLMEngine
+from agent.file_index import FileIndex
+from agent.memo import MemoDeps, SubtaskMemo, normalize_objective
+from agent.model import ModelTurn, ScriptedModel
+from agent.tools import WorkspaceTools
+
+
+class SubtaskMemoTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.memo = SubtaskMemo(workspace=self.root, directory=self.root / ".openplanter" / "memo")
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_key_normalizes_objective(self) -> None:
+        a = SubtaskMemo.key("Subtask", "Find  the owners.", "", 2, 1)
+        b = SubtaskMemo.key("Subtask", "find the owners", "", 2, 1)
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, SubtaskMemo.key("Subtask", "find the owners", "", 3, 1))
+        self.assertEqual(normalize_objective("  A\n b! "), "a b")
+
+    def test_hit_until_read_file_changes(self) -> None:
+        target = self.root / "data.csv"
+        target.write_text("a,b\n", encoding="utf-8")
+        self.assertTrue(self.memo.store("k", "obs", MemoDeps(files={target})))
+        hit = self.memo.lookup("k")
+        self.assertIsNotNone(hit)
+        self.assertEqual(hit[0], "obs")
+        self.assertEqual(hit[1].files, {target})
+        target.write_text("a,b\n1,2\n", encoding="utf-8")
+        self.assertIsNone(self.memo.lookup("k"))
+        self.assertEqual(self.memo.metrics(), {"hits": 1, "misses": 1, "invalidations": 1})
+        self.assertFalse((self.memo.directory / "k.json").exists())
+
+    def test_workspace_listing_invalidated_by_new_file(self) -> None:
+        (self.root / "one.txt").write_text("1", encoding="utf-8")
+        self.memo.store("k", "obs", MemoDeps(workspace=True))
+        self.assertIsNotNone(self.memo.lookup("k"))
+        (self.root / "two.txt").write_text("2", encoding="utf-8")
+        self.assertIsNone(self.memo.lookup("k"))
+
+    def test_uncacheable_runs_are_not_stored(self) -> None:
+        self.assertFalse(self.memo.store("k", "obs", MemoDeps(cacheable=False)))
+        self.assertIsNone(self.memo.lookup("k"))
+
+    def test_expired_entries_are_dropped(self) -> None:
+        self.memo.ttl_sec = 10
+        self.memo.store("k", "obs", MemoDeps())
+        path = self.memo.directory / "k.json"
+        entry = json.loads(path.read_text(encoding="utf-8"))
+        entry["created_at"] = time.time() - 60
+        path.write_text(json.dumps(entry), encoding="utf-8")
+        self.assertIsNone(self.memo.lookup("k"))
+
+    def test_index_backed_memo_does_not_walk_or_slurp(self) -> None:
+        index = FileIndex(self.root, self.root / ".openplanter" / "index" / "files.db", exclude=(".git", ".openplanter"))
+        self.addCleanup(index.close)
+
+        def refreshed() -> FileIndex:
+            index.refresh()
+            return index
+
+        memo = SubtaskMemo(workspace=self.root, directory=self.memo.directory, file_index=refreshed)
+        target = self.root / "data.csv"
+        target.write_text("a,b\n", encoding="utf-8")
+        with patch("agent.memo.os.walk", side_effect=AssertionError("walk")), \
+                patch.object(Path, "read_bytes", side_effect=AssertionError("read_bytes")):
+            self.assertTrue(memo.store("k", "obs", MemoDeps(files={target}, workspace=True)))
+            self.assertIsNotNone(memo.lookup("k"))
+            (self.root / "new.txt").write_text("n", encoding="utf-8")
+            self.assertIsNone(memo.lookup("k"))
+            memo.store("k", "obs", MemoDeps(files={target}))
+            target.write_text("a,b\n1,2\n", encoding="utf-8")
+            self.assertIsNone(memo.lookup("k"))
+
+
+class EngineMemoTests(unittest.TestCase):
+    def _engine(self, root: Path, turns: list[ModelTurn]) -> tuple[RLMEngine, ScriptedModel]:
+        cfg = AgentConfig(workspace=root, max_depth=2, max_steps_per_call=6, acceptance_criteria=False)
+        model = ScriptedModel(scripted_turns=turns)
+        engine = RLMEngine(model=model, tools=WorkspaceTools(root=root), config=cfg)
+        engine.session_dir = root / ".openplanter" / "sessions" / "s1"
+        engine.session_dir.mkdir(parents=True)
+        return engine, model
+
+    def _investigation(self, answer: str) -> list[ModelTurn]:
+        return [
+            ModelTurn(tool_calls=[_tc("subtask", objective="Summarize ledger.csv")]),
+            ModelTurn(tool_calls=[_tc("read_file", path="ledger.csv")]),
+            ModelTurn(text=answer, stop_reason="end_turn"),
+            ModelTurn(text="parent done", stop_reason="end_turn"),
+        ]
+
+    def test_repeated_subtask_hits_until_input_changes(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            (root / "ledger.csv").write_text("x,1\n", encoding="utf-8")
+            engine, model = self._engine(root, self._investigation("ledger total 1"))
+            engine.solve("first run")
+
+            model.scripted_turns = [
+                ModelTurn(tool_calls=[_tc("subtask", objective="summarize ledger.csv.")]),
+                ModelTurn(text="parent done", stop_reason="end_turn"),
+            ]
+            events: list[str] = []
+            _, ctx = engine.solve_with_context("second run", on_event=events.append)
+            self.assertIn("[memoized", ctx.observations[0])
+            self.assertIn("ledger total 1", ctx.observations[0])
+            self.assertTrue(any("memo hit" in e for e in events))
+            self.assertEqual(model.scripted_turns, [])
+
+            (root / "ledger.csv").write_text("x,2\n", encoding="utf-8")
+            model.scripted_turns = self._investigation("ledger total 2")
+            _, ctx = engine.solve_with_context("third run")
+            merged = "\n".join(ctx.observations)
+            self.assertNotIn("[memoized", merged)
+            self.assertIn("ledger total 2", merged)
+
+    def test_subtask_that_writes_is_not_memoized(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            turns = [
+                ModelTurn(tool_calls=[_tc("subtask", objective="write report")]),
+                ModelTurn(tool_calls=[_tc("write_file", path="report.md", content="r")]),
+                ModelTurn(text="wrote it", stop_reason="end_turn"),
+                ModelTurn(text="parent done", stop_reason="end_turn"),
+            ]
+            engine, _ = self._engine(root, turns)
+            engine.solve("run")
+            memo_dir = engine.session_dir / "memo"
+            self.assertEqual(os.listdir(memo_dir) if memo_dir.exists() else [], [])
+
+    def test_concurrent_solves_get_distinct_frames(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            engine, _ = self._engine(Path(tmpdir), [])
+            first, second = engine._root_branch(), engine._root_branch()
+            self.assertNotEqual(first, second)
+            self.assertFalse(second.startswith(first + "/"))
+
+    def test_disabled_without_session_dir(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            engine = RLMEngine(
+                model=ScriptedModel(), tools=WorkspaceTools(root=root), config=AgentConfig(workspace=root),
+            )
+            self.assertIsNone(engine._memo())
+
+
+if __name__ == "__main__":
+    unittest.main()
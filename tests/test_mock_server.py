@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from agent import http_pool
+from agent.config import AgentConfig
+from agent.engine import RLMEngine
+from agent.mock_server import MockProviderConfig, MockProviderServer, MockReply
+from agent.model import AnthropicModel, ModelError, OpenAICompatibleModel
+from agent.ratelimit import RetryPolicy
+from agent.tools import WorkspaceTools
+
+
+class MockServerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.env = patch.dict("os.environ", {"no_proxy": "*", "NO_PROXY": "*"})
+        self.env.start()
+        self.sleeps: list[float] = []
+
+    def tearDown(self) -> None:
+        self.env.stop()
+
+    def _server(self, **kwargs) -> MockProviderServer:
+        server = MockProviderServer(MockProviderConfig(**kwargs)).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def _openai(self, server: MockProviderServer) -> OpenAICompatibleModel:
+        return OpenAICompatibleModel(
+            model="gpt-5", api_key="k", base_url=server.base_url,
+            retry_policy=RetryPolicy(max_attempts=3, sleep=self.sleeps.append),
+        )
+
+    def test_openai_text_and_tool_calls(self) -> None:
+        server = self._server(script=[
+            MockReply(text="hello from the mock"),
+            MockReply(tool_calls=[("read_file", {"path": "a.txt"}), ("think", {"note": "x" * 50})]),
+        ])
+        model = self._openai(server)
+        conv = model.create_conversation("sys", "hi")
+        turn = model.complete(conv)
+        self.assertEqual(turn.text, "hello from the mock")
+        self.assertGreater(turn.input_tokens, 0)
+        self.assertGreater(turn.output_tokens, 0)
+        turn = model.complete(conv)
+        self.assertEqual([tc.name for tc in turn.tool_calls], ["read_file", "think"])
+        self.assertEqual(turn.tool_calls[1].arguments, {"note": "x" * 50})
+        self.assertEqual(server.stats.paths, {"/v1/chat/completions": 2})
+        self.assertEqual(server.stats.connections, 1)
+
+    def test_anthropic_stream(self) -> None:
+        server = self._server(script=[MockReply(text="thinking aloud", tool_calls=[("list_files", {})])])
+        model = AnthropicModel(model="claude-sonnet-4-5", api_key="k", base_url=server.base_url)
+        turn = model.complete(model.create_conversation("sys", "hi"))
+        self.assertEqual(turn.text, "thinking aloud")
+        self.assertEqual(turn.tool_calls[0].name, "list_files")
+        self.assertEqual(turn.stop_reason, "tool_use")
+        self.assertGreater(turn.input_tokens, 0)
+
+    def test_injected_errors_are_retried(self) -> None:
+        server = self._server(script=[MockReply(status=503, retry_after=0.5), MockReply(text="recovered")])
+        model = self._openai(server)
+        turn = model.complete(model.create_conversation("s", "u"))
+        self.assertEqual(turn.text, "recovered")
+        self.assertEqual(self.sleeps, [0.5])
+        self.assertEqual(server.stats.errors, 1)
+
+    def test_persistent_errors_surface(self) -> None:
+        server = self._server(error_rate=1.0, error_status=500, retry_after=None)
+        model = self._openai(server)
+        with self.assertRaises(ModelError):
+            model.complete(model.create_conversation("s", "u"))
+        self.assertEqual(server.stats.requests, 3)
+
+    def test_concurrent_streams_are_paced(self) -> None:
+        server = self._server(tokens_per_sec=200, first_byte_latency=0.05, default_reply=MockReply(text="z" * 40))
+        model = self._openai(server)
+        texts: list[str | None] = []
+
+        def call() -> None:
+            texts.append(model.complete(model.create_conversation("s", "u")).text)
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(texts, ["z" * 40] * 4)
+        self.assertGreater(server.stats.max_active, 1)
+
+    def test_engine_end_to_end(self) -> None:
+        server = self._server(script=[
+            MockReply(tool_calls=[("write_file", {"path": "out.txt", "content": "mocked"})]),
+            MockReply(text="wrote it"),
+        ])
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            engine = RLMEngine(
+                model=self._openai(server), tools=WorkspaceTools(root=root),
+                config=AgentConfig(workspace=root, max_steps_per_call=4, acceptance_criteria=False),
+            )
+            self.assertEqual(engine.solve("write a file"), "wrote it")
+            self.assertEqual((root / "out.txt").read_text(), "mocked")
+
+    def test_unknown_route(self) -> None:
+        server = self._server()
+        with self.assertRaises(http_pool.HTTPStatusError) as ctx:
+            http_pool.request("POST", server.base_url + "/embeddings", body=json.dumps({}).encode(), timeout=5)
+        self.assertEqual(ctx.exception.status, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
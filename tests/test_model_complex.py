@@ -1,16 +1,19 @@
 from __future__ import annotations
 
+import json
 import unittest
 from unittest.mock import patch
 
 from conftest import mock_anthropic_stream, mock_openai_stream
 from agent.model import (
+    CallOptions,
     AnthropicModel,
     EchoFallbackModel,
     ModelError,
     ModelTurn,
     OpenAICompatibleModel,
     ScriptedModel,
+    _encode_payload,
     _extract_content,
     _parse_timestamp,
     _sorted_models,
@@ -116,9 +119,10 @@ class ModelComplexTests(unittest.TestCase):
     # 17-19. OpenAICompatibleModel error paths
     # ------------------------------------------------------------------ #
     def test_openai_missing_content_raises(self) -> None:
-        def fake_stream_sse(url, method, headers, payload, first_byte_timeout=10, stream_timeout=120, max_retries=3, on_sse_event=None):
-            # Return events that accumulate to empty choices
-            return [("", {"choices": [{"delta": {}, "finish_reason": "stop"}]})]
+        def fake_stream_sse(url, method, headers, payload, first_byte_timeout=10, stream_timeout=120, max_retries=3, on_sse_event=None, keep_events=True, **_kwargs):
+            # Deliver events that accumulate to empty choices
+            on_sse_event("", {"choices": [{"delta": {}, "finish_reason": "stop"}]})
+            return []
 
         with patch("agent.model._http_stream_sse", fake_stream_sse):
             model = OpenAICompatibleModel(model="m", api_key="k")
@@ -142,7 +146,7 @@ class ModelComplexTests(unittest.TestCase):
             }
 
         with patch("agent.model._http_stream_sse", mock_anthropic_stream(fake_http_json)):
-            model = AnthropicModel(model="m", api_key="k")
+            model = AnthropicModel(model="m", api_key="k", prompt_caching=False)
             conv = model.create_conversation("You are helpful.", "Hi")
             model.complete(conv)
         # System text should be in the "system" field of the payload.
@@ -515,7 +519,7 @@ class OpenAIEdgeCaseTests(unittest.TestCase):
     # 37. OpenAI non-retryable ModelError re-raised
     # ------------------------------------------------------------------ #
     def test_openai_non_retryable_error_raised(self) -> None:
-        def fake_stream_sse(url, method, headers, payload, first_byte_timeout=10, stream_timeout=120, max_retries=3, on_sse_event=None):
+        def fake_stream_sse(url, method, headers, payload, first_byte_timeout=10, stream_timeout=120, max_retries=3, on_sse_event=None, keep_events=True, **_kwargs):
             raise ModelError("HTTP 500 server error")
 
         with patch("agent.model._http_stream_sse", fake_stream_sse):
@@ -747,7 +751,7 @@ class AnthropicEdgeCaseTests(unittest.TestCase):
     # 49. Anthropic non-retryable ModelError re-raised
     # ------------------------------------------------------------------ #
     def test_anthropic_non_retryable_error_raised(self) -> None:
-        def fake_stream_sse(url, method, headers, payload, first_byte_timeout=10, stream_timeout=120, max_retries=3, on_sse_event=None):
+        def fake_stream_sse(url, method, headers, payload, first_byte_timeout=10, stream_timeout=120, max_retries=3, on_sse_event=None, keep_events=True, **_kwargs):
             raise ModelError("HTTP 500 server error")
 
         with patch("agent.model._http_stream_sse", fake_stream_sse):
@@ -832,5 +836,57 @@ class ScriptedAndFallbackTests(unittest.TestCase):
         self.assertEqual(conv.turn_count, 0)
 
 
+class EncodePayloadTests(unittest.TestCase):
+    def test_splices_preserialized_fields(self) -> None:
+        body = _encode_payload({"model": "m", "tools": ["ignored"]}, {"tools": '[{"name": "x"}]'})
+        self.assertEqual(json.loads(body), {"model": "m", "tools": [{"name": "x"}]})
+
+    def test_only_raw_fields(self) -> None:
+        self.assertEqual(json.loads(_encode_payload({}, {"tools": "[]"})), {"tools": []})
+
+    def test_without_raw_fields(self) -> None:
+        self.assertEqual(_encode_payload({"a": 1}), b'{"a": 1}')
+
+
+class CallOptionsTests(unittest.TestCase):
+    def _capture(self, model, options):  # type: ignore[no-untyped-def]
+        captured: dict = {}
+
+        def fake_http_json(url, method, headers, payload=None, timeout_sec=90):  # type: ignore[no-untyped-def]
+            captured["payload"] = payload
+            return {"content": [{"type": "text", "text": "hello"}], "stop_reason": "end_turn"}
+
+        conv = model.create_conversation("sys", "usr")
+        conv.stop_sequences = ["STOP"]
+        with patch("agent.model._http_stream_sse", mock_anthropic_stream(fake_http_json)):
+            model.complete(conv, options)
+        return captured["payload"]
+
+    def test_options_override_model_attributes_for_one_call(self) -> None:
+        from agent.tool_defs import ToolSet
+
+        model = AnthropicModel(model="m", api_key="k", tool_set=ToolSet(include_subtask=True))
+        deltas: list[str] = []
+        payload = self._capture(model, CallOptions(
+            on_content_delta=lambda _kind, text: deltas.append(text),
+            tool_set=ToolSet(include_subtask=False),
+            stop_sequences=["END"],
+        ))
+        names = {t["name"] for t in payload["tools"]}
+        self.assertNotIn("subtask", names)
+        self.assertEqual(payload["stop_sequences"], ["END"])
+        self.assertEqual(deltas, ["hello"])
+        self.assertIsNone(model.on_content_delta)
+
+        payload = self._capture(model, None)
+        self.assertIn("subtask", {t["name"] for t in payload["tools"]})
+        self.assertEqual(payload["stop_sequences"], ["STOP"])
+
+    def test_explicit_tool_defs(self) -> None:
+        model = AnthropicModel(model="m", api_key="k")
+        payload = self._capture(model, CallOptions(tool_defs=[]))
+        self.assertEqual(payload["tools"], [])
+
+
 if __name__ == "__main__":
     unittest.main()
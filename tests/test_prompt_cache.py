@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import json
+import unittest
+from unittest.mock import patch
+
+from conftest import _tc, mock_anthropic_stream, mock_openai_stream
+
+from agent.engine import _add_usage
+from agent.model import AnthropicModel, ModelTurn, OpenAICompatibleModel, ToolResult
+
+
+def _cache_marks(value: object) -> int:
+    return json.dumps(value).count('"cache_control"')
+
+
+class AnthropicPromptCacheTests(unittest.TestCase):
+    def _complete(self, model: AnthropicModel, conv, usage: dict | None = None) -> tuple[dict, ModelTurn]:
+        captured: dict = {}
+
+        def fake(url, method, headers, payload=None, timeout_sec=90):  # type: ignore[no-untyped-def]
+            captured["payload"] = payload
+            return {
+                "content": [{"type": "tool_use", "id": "t2", "name": "think", "input": {"note": "x"}}],
+                "stop_reason": "tool_use",
+                "usage": usage or {},
+            }
+
+        with patch("agent.model._http_stream_sse", mock_anthropic_stream(fake)):
+            turn = model.complete(conv)
+        return captured["payload"], turn
+
+    def test_breakpoints_on_system_tools_and_recent_turns(self) -> None:
+        model = AnthropicModel(model="claude-sonnet-4-5", api_key="k")
+        conv = model.create_conversation("You are helpful.", "Start")
+        model.append_assistant_turn(conv, ModelTurn(raw_response=[{"type": "tool_use", "id": "t1", "name": "think", "input": {}}]))
+        model.append_tool_results(conv, [ToolResult("t1", "think", "ok")])
+        before = json.dumps(conv.get_messages())
+
+        payload, _ = self._complete(model, conv)
+
+        self.assertEqual(payload["system"][0]["cache_control"], {"type": "ephemeral"})
+        self.assertIn("cache_control", payload["tools"][-1])
+        self.assertEqual(_cache_marks(payload["tools"]), 1)
+        messages = payload["messages"]
+        self.assertIn("cache_control", messages[0]["content"][-1])
+        self.assertIn("cache_control", messages[2]["content"][-1])
+        self.assertNotIn("cache_control", json.dumps(messages[1]))
+        # Anthropic allows at most four breakpoints per request.
+        self.assertEqual(_cache_marks(payload), 4)
+        # The stored conversation is never mutated.
+        self.assertEqual(json.dumps(conv.get_messages()), before)
+
+    def test_usage_reports_cache_and_full_prompt(self) -> None:
+        model = AnthropicModel(model="claude-sonnet-4-5", api_key="k")
+        conv = model.create_conversation("sys", "hi")
+        usage = {"input_tokens": 50, "cache_read_input_tokens": 9000, "cache_creation_input_tokens": 400}
+        _, turn = self._complete(model, conv, usage)
+        self.assertEqual(turn.cache_read_tokens, 9000)
+        self.assertEqual(turn.cache_write_tokens, 400)
+        self.assertEqual(turn.input_tokens, 9450)
+
+    def test_disabled(self) -> None:
+        model = AnthropicModel(model="claude-sonnet-4-5", api_key="k", prompt_caching=False)
+        conv = model.create_conversation("sys", "hi")
+        payload, _ = self._complete(model, conv)
+        self.assertEqual(_cache_marks(payload), 0)
+        self.assertEqual(payload["system"], "sys")
+
+
+class OpenAIPromptCacheTests(unittest.TestCase):
+    def _payload(self, model: OpenAICompatibleModel, usage: dict | None = None) -> tuple[dict, ModelTurn]:
+        captured: dict = {}
+
+        def fake(url, method, headers, payload=None, timeout_sec=90):  # type: ignore[no-untyped-def]
+            captured["payload"] = payload
+            return {
+                "choices": [{"message": {"content": "done"}, "finish_reason": "stop"}],
+                "usage": usage or {},
+            }
+
+        conv = model.create_conversation("You are helpful.", "hi")
+        with patch("agent.model._http_stream_sse", mock_openai_stream(fake)):
+            turn = model.complete(conv)
+        return captured["payload"], turn
+
+    def test_openai_gets_stable_cache_key(self) -> None:
+        model = OpenAICompatibleModel(model="gpt-5", api_key="k")
+        first, _ = self._payload(model)
+        second, _ = self._payload(model)
+        self.assertTrue(first["prompt_cache_key"].startswith("openplanter-"))
+        self.assertEqual(first["prompt_cache_key"], second["prompt_cache_key"])
+        self.assertEqual(_cache_marks(first), 0)
+
+    def test_claude_via_openrouter_gets_breakpoints(self) -> None:
+        model = OpenAICompatibleModel(
+            model="anthropic/claude-sonnet-4.6", api_key="k", base_url="https://openrouter.ai/api/v1",
+        )
+        payload, _ = self._payload(model)
+        self.assertNotIn("prompt_cache_key", payload)
+        self.assertIn("cache_control", payload["messages"][0]["content"][-1])
+        self.assertIn("cache_control", payload["messages"][-1]["content"][-1])
+
+    def test_other_providers_get_no_hints(self) -> None:
+        model = OpenAICompatibleModel(model="llama-4", api_key="k", base_url="https://api.cerebras.ai/v1")
+        payload, _ = self._payload(model)
+        self.assertNotIn("prompt_cache_key", payload)
+        self.assertEqual(_cache_marks(payload), 0)
+
+    def test_cached_tokens_reported(self) -> None:
+        model = OpenAICompatibleModel(model="gpt-5", api_key="k")
+        usage = {"prompt_tokens": 5000, "completion_tokens": 20, "prompt_tokens_details": {"cached_tokens": 4096}}
+        _, turn = self._payload(model, usage)
+        self.assertEqual((turn.input_tokens, turn.cache_read_tokens, turn.cache_write_tokens), (5000, 4096, 0))
+
+
+class SessionUsageTests(unittest.TestCase):
+    def test_cache_keys_added_only_when_reported(self) -> None:
+        bucket = {"input": 0, "output": 0}
+        _add_usage(bucket, ModelTurn(tool_calls=[_tc("think", note="x")], input_tokens=10, output_tokens=2))
+        self.assertEqual(bucket, {"input": 10, "output": 2})
+        _add_usage(bucket, ModelTurn(input_tokens=100, cache_read_tokens=80, cache_write_tokens=5))
+        self.assertEqual(bucket, {"input": 110, "output": 2, "cache_read": 80, "cache_write": 5})
+
+
+if __name__ == "__main__":
+    unittest.main()
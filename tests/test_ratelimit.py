@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest.mock import patch
+
+from agent.http_pool import HTTPStatusError
+from agent.model import ModelError, _http_stream_sse
+from agent.ratelimit import (
+    ProviderLimiter,
+    RetryPolicy,
+    TokenBucket,
+    limiter_for,
+    retry_after_from_headers,
+)
+
+
+class _FakeResponse:
+    headers: dict[str, str] = {}
+
+    def __init__(self, lines: list[bytes]) -> None:
+        self._lines = lines
+
+    def __iter__(self):
+        return iter(self._lines)
+
+    def set_timeout(self, timeout: float) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+_OK_LINES = [b'data: {"choices": [{"delta": {"content": "hi"}}]}\n', b"\n", b"data: [DONE]\n", b"\n"]
+
+
+class RetryAfterTests(unittest.TestCase):
+    def test_seconds_and_milliseconds(self) -> None:
+        self.assertEqual(retry_after_from_headers({"Retry-After": "7"}), 7.0)
+        self.assertEqual(retry_after_from_headers({"retry-after-ms": "250", "retry-after": "9"}), 0.25)
+
+    def test_http_date(self) -> None:
+        when = datetime.now(timezone.utc) + timedelta(seconds=30)
+        wait = retry_after_from_headers({"retry-after": format_datetime(when, usegmt=True)})
+        assert wait is not None
+        self.assertTrue(25 <= wait <= 30, wait)
+
+    def test_exhausted_quota_reset(self) -> None:
+        headers = {"x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "6m0s"}
+        self.assertEqual(retry_after_from_headers(headers), 360.0)
+        reset = (datetime.now(timezone.utc) + timedelta(seconds=12)).isoformat()
+        headers = {"anthropic-ratelimit-requests-remaining": "0", "anthropic-ratelimit-requests-reset": reset}
+        wait = retry_after_from_headers(headers)
+        assert wait is not None
+        self.assertTrue(8 <= wait <= 12, wait)
+
+    def test_quota_with_headroom_is_ignored(self) -> None:
+        headers = {"x-ratelimit-remaining-requests": "12", "x-ratelimit-reset-requests": "1s"}
+        self.assertIsNone(retry_after_from_headers(headers))
+        self.assertIsNone(retry_after_from_headers({}))
+
+
+class RetryPolicyTests(unittest.TestCase):
+    def test_retryable_statuses(self) -> None:
+        policy = RetryPolicy(max_attempts=3)
+        self.assertTrue(policy.should_retry(429, 1))
+        self.assertTrue(policy.should_retry(503, 2))
+        self.assertFalse(policy.should_retry(503, 3))
+        self.assertFalse(policy.should_retry(400, 1))
+
+    def test_delay_bounds(self) -> None:
+        policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+        for attempt in range(1, 8):
+            self.assertLessEqual(policy.delay(attempt), min(5.0, 2 ** (attempt - 1)))
+        self.assertEqual(policy.delay(1, retry_after=3.0), 3.0)
+        self.assertEqual(policy.delay(1, retry_after=99.0), 5.0)
+
+
+class LimiterTests(unittest.TestCase):
+    def test_token_bucket_refills(self) -> None:
+        bucket = TokenBucket(per_minute=60)
+        now = time.monotonic()
+        self.assertEqual(bucket.wait_time(60, now), 0.0)
+        bucket.take(60)
+        self.assertAlmostEqual(bucket.wait_time(1, now), 1.0, places=2)
+        self.assertEqual(bucket.wait_time(1, now + 1.0), 0.0)
+
+    def test_oversized_request_does_not_deadlock(self) -> None:
+        bucket = TokenBucket(per_minute=10)
+        self.assertEqual(bucket.wait_time(1000, time.monotonic()), 0.0)
+
+    def test_requests_per_minute_throttles(self) -> None:
+        limiter = ProviderLimiter(requests_per_min=600, tokens_per_min=0)
+        limiter._requests.capacity = 1
+        limiter._requests._level = 1
+        self.assertLess(limiter.acquire(), 0.01)
+        waited = limiter.acquire()
+        self.assertGreater(waited, 0.05)
+        self.assertEqual(limiter.stats()["waits"], 1)
+
+    def test_pause_blocks_all_callers(self) -> None:
+        limiter = ProviderLimiter()
+        limiter.pause(0.2)
+        waits: list[float] = []
+        threads = [threading.Thread(target=lambda: waits.append(limiter.acquire())) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(waits), 3)
+        self.assertTrue(all(w >= 0.15 for w in waits), waits)
+
+    def test_acquire_timeout(self) -> None:
+        limiter = ProviderLimiter()
+        limiter.pause(5)
+        with self.assertRaises(TimeoutError):
+            limiter.acquire(timeout=0.05)
+
+    def test_pause_is_clamped(self) -> None:
+        limiter = ProviderLimiter(max_pause=0.1)
+        limiter.pause(3600)
+        self.assertLess(limiter.acquire(timeout=1), 0.5)
+        limiter.pause(3600, max_seconds=0)
+        self.assertLess(limiter.acquire(timeout=1), 0.01)
+
+    def test_limiter_shared_per_host(self) -> None:
+        self.assertIs(limiter_for("https://api.example.com/v1/a"), limiter_for("https://api.example.com/v1/b"))
+        self.assertIsNot(limiter_for("https://api.example.com/"), limiter_for("https://other.example.com/"))
+
+
+class StreamRetryTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.sleeps: list[float] = []
+        self.policy = RetryPolicy(max_attempts=3, sleep=self.sleeps.append)
+
+    def _stream(self, side_effect: list[object], limiter: ProviderLimiter | None = None):
+        with patch("agent.model.http_pool.request", side_effect=side_effect) as req:
+            events = _http_stream_sse(
+                "https://api.example.com/v1/chat", "POST", {}, {"x": 1},
+                retry_policy=self.policy, limiter=limiter,
+            )
+        return events, req
+
+    def test_retries_overloaded_then_succeeds(self) -> None:
+        err = HTTPStatusError("u", 503, "Unavailable", b"busy", {"retry-after": "2"})
+        events, req = self._stream([err, _FakeResponse(_OK_LINES)])
+        self.assertEqual(req.call_count, 2)
+        self.assertEqual(self.sleeps, [2.0])
+        self.assertEqual(events[0][1]["choices"][0]["delta"]["content"], "hi")
+
+    def test_429_pauses_shared_limiter(self) -> None:
+        limiter = ProviderLimiter()
+        err = HTTPStatusError("u", 429, "Too Many Requests", b"", {"retry-after": "0.1"})
+        start = time.monotonic()
+        self._stream([err, _FakeResponse(_OK_LINES)], limiter=limiter)
+        self.assertGreaterEqual(time.monotonic() - start, 0.08)
+        self.assertEqual(self.sleeps, [])
+        self.assertEqual(limiter.stats()["waits"], 1)
+
+    def test_long_retry_after_is_not_retried(self) -> None:
+        limiter = ProviderLimiter()
+        err = HTTPStatusError("u", 429, "Too Many Requests", b"daily quota", {"retry-after": "3600"})
+        with self.assertRaises(ModelError) as ctx:
+            self._stream([err, _FakeResponse(_OK_LINES)], limiter=limiter)
+        self.assertIn("HTTP 429", str(ctx.exception))
+        self.assertLess(limiter.acquire(timeout=1), 0.01)
+
+    def test_exhausted_quota_pause_is_clamped_to_policy(self) -> None:
+        limiter = ProviderLimiter()
+        self.policy.max_delay = 0.05
+        resp = _FakeResponse(_OK_LINES)
+        resp.headers = {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "6m0s"}
+        self._stream([resp], limiter=limiter)
+        self.assertLess(limiter.acquire(timeout=1), 0.5)
+
+    def test_tokens_charged_once_across_retries(self) -> None:
+        limiter = ProviderLimiter(tokens_per_min=600)
+        errors = [HTTPStatusError("u", 503, "Unavailable", b"busy") for _ in range(2)]
+        with patch("agent.model.http_pool.request", side_effect=[*errors, _FakeResponse(_OK_LINES)]):
+            _http_stream_sse(
+                "https://api.example.com/v1/chat", "POST", {}, {"x": "y" * 400},
+                retry_policy=self.policy, limiter=limiter,
+            )
+        charged = limiter._tokens.capacity - limiter._tokens._level
+        self.assertLess(charged, 150)
+        self.assertGreater(charged, 90)
+
+    def test_gives_up_after_max_attempts(self) -> None:
+        errors = [HTTPStatusError("u", 500, "Error", b"boom") for _ in range(3)]
+        with self.assertRaises(ModelError) as ctx:
+            self._stream(errors)
+        self.assertIn("HTTP 500", str(ctx.exception))
+        self.assertEqual(len(self.sleeps), 2)
+
+    def test_client_error_not_retried(self) -> None:
+        with self.assertRaises(ModelError):
+            self._stream([HTTPStatusError("u", 400, "Bad Request", b"bad")])
+        self.assertEqual(self.sleeps, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
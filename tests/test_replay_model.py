@@ -0,0 +1,128 @@
+"""Tests for offline replay of recorded sessions."""
+
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from dataclasses import dataclass
+from pathlib import Path
+
+from conftest import _tc
+from agent.config import AgentConfig
+from agent.engine import RLMEngine
+from agent.model import Conversation, ModelError, ModelTurn, ScriptedModel, ToolResult
+from agent.replay_log import ReplayLogger
+from agent.replay_model import ReplayDivergence, ReplayModel, load_recordings
+from agent.tools import WorkspaceTools
+
+
+@dataclass
+class _RecordingScriptedModel(ScriptedModel):
+    """ScriptedModel that keeps OpenAI-style history so tool results are logged."""
+
+    def append_assistant_turn(self, conversation: Conversation, turn: ModelTurn) -> None:
+        conversation._provider_messages.append({"role": "assistant", "content": turn.text or ""})
+
+    def append_tool_results(self, conversation: Conversation, results: list[ToolResult]) -> None:
+        for r in results:
+            conversation._provider_messages.append({"role": "tool", "tool_call_id": r.tool_call_id, "content": r.content})
+
+
+def _config(root: Path, **kwargs) -> AgentConfig:
+    return AgentConfig(
+        workspace=root, max_depth=2, max_steps_per_call=6, acceptance_criteria=False,
+        memoize_subtasks=False, **kwargs,
+    )
+
+
+def _record(root: Path, turns: list[ModelTurn], objective: str, **cfg) -> tuple[str, Path]:
+    path = root / "replay.jsonl"
+    engine = RLMEngine(model=_RecordingScriptedModel(scripted_turns=turns), tools=WorkspaceTools(root=root), config=_config(root, **cfg))
+    result, _ = engine.solve_with_context(objective=objective, replay_logger=ReplayLogger(path=path))
+    return result, path
+
+
+class ReplayModelTests(unittest.TestCase):
+    def test_replays_recorded_run_with_subtasks(self) -> None:
+        turns = [
+            ModelTurn(tool_calls=[_tc("write_file", path="notes.txt", content="alpha")]),
+            ModelTurn(tool_calls=[_tc("subtask", objective="read the notes")]),
+            ModelTurn(tool_calls=[_tc("read_file", path="notes.txt")]),
+            ModelTurn(text="notes say alpha", stop_reason="end_turn"),
+            ModelTurn(text="root done", stop_reason="end_turn"),
+        ]
+        with tempfile.TemporaryDirectory() as rec_dir, tempfile.TemporaryDirectory() as play_dir:
+            recorded, path = _record(Path(rec_dir), turns, "investigate", recursive=True)
+            replay = ReplayModel.from_file(path)
+            root = Path(play_dir)
+            engine = RLMEngine(model=replay, tools=WorkspaceTools(root=root), config=_config(root, recursive=True), model_factory=replay.factory())
+            result, _ = engine.solve_with_context(objective="investigate")
+            self.assertEqual(result, recorded)
+            self.assertEqual(replay.divergences, [])
+            self.assertEqual(replay.remaining(), 0)
+            self.assertEqual((root / "notes.txt").read_text(), "alpha")
+
+    def test_recording_logs_provider_neutral_turn(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            _, path = _record(Path(tmp), [ModelTurn(tool_calls=[_tc("think", note="x")]), ModelTurn(text="ok")], "go")
+            calls = [json.loads(line) for line in path.read_text().splitlines() if '"call"' in line]
+            self.assertEqual(calls[0]["turn"]["tool_calls"][0]["name"], "think")
+            recs = load_recordings(path)
+            self.assertEqual(len(recs), 1)
+            self.assertEqual([c.turn.text for c in recs[0].calls], [None, "ok"])
+
+    def test_divergent_tool_result_raises(self) -> None:
+        turns = [ModelTurn(tool_calls=[_tc("read_file", path="data.txt")]), ModelTurn(text="found v1")]
+        with tempfile.TemporaryDirectory() as rec_dir, tempfile.TemporaryDirectory() as play_dir:
+            (Path(rec_dir) / "data.txt").write_text("v1")
+            _, path = _record(Path(rec_dir), turns, "read data")
+            root = Path(play_dir)
+            (root / "data.txt").write_text("v2")
+            replay = ReplayModel.from_file(path)
+            engine = RLMEngine(model=replay, tools=WorkspaceTools(root=root), config=_config(root))
+            result, _ = engine.solve_with_context(objective="read data")
+            self.assertIn("differs from the recording", result)
+            self.assertEqual(len(replay.divergences), 1)
+
+    def test_divergence_falls_through_to_live_model(self) -> None:
+        turns = [ModelTurn(tool_calls=[_tc("read_file", path="data.txt")]), ModelTurn(text="found v1")]
+        with tempfile.TemporaryDirectory() as rec_dir, tempfile.TemporaryDirectory() as play_dir:
+            (Path(rec_dir) / "data.txt").write_text("v1")
+            _, path = _record(Path(rec_dir), turns, "read data")
+            root = Path(play_dir)
+            (root / "data.txt").write_text("v2")
+            live = ScriptedModel(scripted_turns=[ModelTurn(text="found v2")])
+            replay = ReplayModel.from_file(path, on_divergence="fallthrough", fallback=live)
+            engine = RLMEngine(model=replay, tools=WorkspaceTools(root=root), config=_config(root))
+            result, _ = engine.solve_with_context(objective="read data")
+            self.assertEqual(result, "found v2")
+            self.assertEqual(live.scripted_turns, [])
+
+    def test_unknown_objective_and_modes(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            _, path = _record(Path(tmp), [ModelTurn(text="hi")], "say hi")
+            replay = ReplayModel.from_file(path)
+            conv = replay.create_conversation("sys", json.dumps({"objective": "something else", "depth": 0}))
+            with self.assertRaises(ReplayDivergence):
+                replay.complete(conv)
+            self.assertIsInstance(ReplayDivergence("x"), ModelError)
+            with self.assertRaises(ValueError):
+                ReplayModel.from_file(path, on_divergence="fallthrough")
+
+    def test_repeated_root_ids_are_separate_recordings(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            path = root / "replay.jsonl"
+            for objective, answer in (("first", "one"), ("second", "two")):
+                engine = RLMEngine(model=ScriptedModel(scripted_turns=[ModelTurn(text=answer)]), tools=WorkspaceTools(root=root), config=_config(root))
+                engine.solve_with_context(objective=objective, replay_logger=ReplayLogger(path=path))
+            replay = ReplayModel.from_file(path)
+            self.assertEqual(len(replay.recordings), 2)
+            engine = RLMEngine(model=replay, tools=WorkspaceTools(root=root), config=_config(root))
+            self.assertEqual(engine.solve_with_context(objective="second")[0], "two")
+            self.assertEqual(engine.solve_with_context(objective="first")[0], "one")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+"""Tests for the BM25 index and relevance-ranked ExternalContext."""
+from __future__ import annotations
+
+import json
+import unittest
+
+from agent.engine import ExternalContext
+from agent.retrieval import BM25Index, tokenize
+
+
+class BM25IndexTests(unittest.TestCase):
+    def test_ranks_matching_documents_first(self) -> None:
+        idx = BM25Index()
+        idx.add(0, "quarterly revenue table for acme corp")
+        idx.add(1, "shell output: ls -la")
+        idx.add(2, "acme corp board members and revenue by region")
+        hits = idx.search("acme revenue", limit=5)
+        self.assertEqual({doc for doc, _ in hits}, {0, 2})
+        self.assertTrue(all(score > 0 for _, score in hits))
+
+    def test_rare_terms_outweigh_common_terms(self) -> None:
+        idx = BM25Index()
+        for i in range(5):
+            idx.add(i, f"contract record {i}")
+        idx.add(9, "contract record lobbying disclosure")
+        self.assertEqual(idx.search("contract lobbying", limit=1)[0][0], 9)
+
+    def test_remove_drops_postings(self) -> None:
+        idx = BM25Index()
+        idx.add(0, "alpha beta")
+        idx.add(1, "beta gamma")
+        idx.remove(0)
+        self.assertEqual(len(idx), 1)
+        self.assertEqual(idx.search("alpha"), [])
+        self.assertEqual(idx.search("beta")[0][0], 1)
+
+    def test_tokenize_drops_stopwords_and_short_tokens(self) -> None:
+        self.assertEqual(tokenize("The CEO of a Firm_X"), ["ceo", "of", "firm_x"])
+
+
+class ExternalContextRelevanceTests(unittest.TestCase):
+    def test_summary_with_objective_prefers_relevant_observations(self) -> None:
+        ctx = ExternalContext()
+        ctx.add("Found campaign donations from Smith Holdings to the mayor")
+        for i in range(20):
+            ctx.add(f"listing directory batch {i}")
+        summary = ctx.summary(max_items=3, objective="trace Smith Holdings donations")
+        self.assertIn("Smith Holdings", summary)
+        # Recent, irrelevant observations only fill the spare slots.
+        self.assertIn("batch 19", summary)
+        self.assertNotIn("batch 5", summary)
+
+    def test_summary_without_objective_keeps_recency_behaviour(self) -> None:
+        ctx = ExternalContext()
+        ctx.add("Smith Holdings")
+        for i in range(3):
+            ctx.add(f"noise {i}")
+        self.assertEqual(ctx.summary(max_items=2), "noise 1\n\nnoise 2")
+
+    def test_relevant_items_are_presented_chronologically(self) -> None:
+        ctx = ExternalContext()
+        ctx.add("vendor payments ledger first pass")
+        ctx.add("unrelated")
+        ctx.add("vendor payments vendor payments second pass")
+        summary = ctx.summary(max_items=2, objective="vendor payments")
+        self.assertLess(summary.index("first pass"), summary.index("second pass"))
+
+    def test_store_is_bounded_by_count_and_tokens(self) -> None:
+        ctx = ExternalContext(max_observations=5)
+        for i in range(12):
+            ctx.add(f"observation {i}")
+        self.assertEqual(ctx.observations, [f"observation {i}" for i in range(7, 12)])
+        self.assertEqual(len(ctx._index), 5)
+
+        ctx = ExternalContext(max_tokens=100)
+        for i in range(10):
+            ctx.add(f"{i}" * 100)
+        self.assertLessEqual(sum(len(o) for o in ctx.observations) // 4, 100)
+        self.assertEqual(ctx.observations[-1], "9" * 100)
+
+    def test_reassigned_observations_are_reindexed(self) -> None:
+        ctx = ExternalContext()
+        ctx.add("old evidence about pipelines")
+        ctx.observations = ["fresh evidence about shipping manifests"]
+        self.assertIn("shipping", ctx.summary(objective="shipping manifests"))
+        self.assertNotIn("pipelines", ctx.summary(objective="pipelines"))
+
+    def test_summary_truncates_oversized_observation(self) -> None:
+        ctx = ExternalContext()
+        ctx.add("keyword " + "x" * 10_000)
+        summary = ctx.summary(max_chars=500, objective="keyword")
+        self.assertIn("truncated external context", summary)
+        self.assertLess(len(summary), 600)
+
+    def test_child_prompt_uses_objective_ranked_context(self) -> None:
+        import tempfile
+        from pathlib import Path
+        from agent.config import AgentConfig
+        from agent.engine import RLMEngine
+        from agent.model import ScriptedModel
+        from agent.tools import WorkspaceTools
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            engine = RLMEngine(model=ScriptedModel(), tools=WorkspaceTools(root=root), config=AgentConfig(workspace=root))
+            ctx = ExternalContext()
+            ctx.add("permit filings for the harbor expansion")
+            for i in range(15):
+                ctx.add(f"generic note {i}")
+            child = json.loads(engine._initial_message("review harbor permit filings", 1, ctx))
+            root_msg = json.loads(engine._initial_message("review harbor permit filings", 0, ctx))
+            self.assertIn("harbor expansion", child["external_context_summary"])
+            self.assertNotIn("harbor expansion", root_msg["external_context_summary"])
+
+
+if __name__ == "__main__":
+    unittest.main()
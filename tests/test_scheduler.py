@@ -0,0 +1,148 @@
+"""Tests for the tree-wide FanoutScheduler."""
+from __future__ import annotations
+
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from conftest import _tc
+from agent.config import AgentConfig
+from agent.engine import RLMEngine
+from agent.model import ModelTurn
+from agent.scheduler import FanoutScheduler
+from agent.tools import WorkspaceTools
+
+
+def _queue_behind(sched: FanoutScheduler, order: list[str], label: str, provider: str, depth: int, branch: str) -> threading.Thread:
+    def _run() -> None:
+        with sched.slot(provider, depth, branch):
+            order.append(label)
+
+    t = threading.Thread(target=_run)
+    t.start()
+    return t
+
+
+def _wait_for_queue(sched: FanoutScheduler, n: int) -> None:
+    deadline = time.monotonic() + 2
+    while sched.metrics()["queue_depth"] < n:
+        if time.monotonic() > deadline:
+            raise AssertionError("waiters never queued")
+        time.sleep(0.005)
+
+
+class FanoutSchedulerTests(unittest.TestCase):
+    def test_global_limit_bounds_in_flight(self) -> None:
+        sched = FanoutScheduler(max_in_flight=2)
+        lock = threading.Lock()
+        active = 0
+        peak = 0
+
+        def _work() -> None:
+            nonlocal active, peak
+            with sched.slot("p", 1, "root/s1.0"):
+                with lock:
+                    active += 1
+                    peak = max(peak, active)
+                time.sleep(0.01)
+                with lock:
+                    active -= 1
+
+        threads = [threading.Thread(target=_work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(peak, 2)
+        m = sched.metrics()
+        self.assertEqual(m["granted"], 8)
+        self.assertEqual(m["in_flight"], 0)
+        self.assertEqual(m["peak_in_flight"], 2)
+        self.assertGreater(m["peak_queue_depth"], 0)
+        self.assertEqual(m["wait"]["count"], 8)
+
+    def test_deeper_nodes_admitted_first(self) -> None:
+        sched = FanoutScheduler(max_in_flight=1)
+        order: list[str] = []
+        sched.acquire("p", 0, "root")
+        shallow = _queue_behind(sched, order, "shallow", "p", 1, "root/s1.0")
+        _wait_for_queue(sched, 1)
+        deep = _queue_behind(sched, order, "deep", "p", 3, "root/s1.1/s1.0/s1.0")
+        _wait_for_queue(sched, 2)
+        sched.release("p", 0, "root")
+        shallow.join()
+        deep.join()
+        self.assertEqual(order, ["deep", "shallow"])
+
+    def test_fair_share_between_sibling_branches(self) -> None:
+        sched = FanoutScheduler(max_in_flight=2)
+        order: list[str] = []
+        # Branch A already holds a slot; one more slot is held elsewhere.
+        sched.acquire("p", 1, "root/s1.0")
+        sched.acquire("p", 1, "root/s1.2")
+        a = _queue_behind(sched, order, "A", "p", 1, "root/s1.0")
+        _wait_for_queue(sched, 1)
+        b = _queue_behind(sched, order, "B", "p", 1, "root/s1.1")
+        _wait_for_queue(sched, 2)
+        sched.release("p", 1, "root/s1.2")
+        b.join()
+        sched.release("p", 1, "root/s1.0")
+        a.join()
+        self.assertEqual(order, ["B", "A"])
+
+    def test_per_provider_limit_lets_other_providers_through(self) -> None:
+        sched = FanoutScheduler(max_per_provider=1)
+        order: list[str] = []
+        sched.acquire("api.anthropic.com", 1)
+        blocked = _queue_behind(sched, order, "anthropic", "api.anthropic.com", 1, "root/s1.0")
+        _wait_for_queue(sched, 1)
+        other = _queue_behind(sched, order, "openrouter", "openrouter.ai", 1, "root/s1.1")
+        other.join()
+        self.assertEqual(order, ["openrouter"])
+        sched.release("api.anthropic.com", 1)
+        blocked.join()
+        self.assertEqual(order, ["openrouter", "anthropic"])
+        self.assertEqual(sched.metrics()["wait_by_provider"]["openrouter.ai"]["count"], 1)
+
+    def test_per_depth_override(self) -> None:
+        sched = FanoutScheduler(max_per_depth=5, per_depth_overrides={2: 1})
+        sched.acquire("p", 2)
+        order: list[str] = []
+        waiter = _queue_behind(sched, order, "d2", "p", 2, "root/s1.0/s1.0")
+        _wait_for_queue(sched, 1)
+        self.assertEqual(order, [])
+        self.assertEqual(sched.metrics()["in_flight_by_depth"], {2: 1})
+        sched.release("p", 2)
+        waiter.join()
+        self.assertEqual(order, ["d2"])
+
+
+class EngineSchedulerTests(unittest.TestCase):
+    def test_engine_routes_model_calls_through_scheduler(self) -> None:
+        from test_engine import ThreadSafeScriptedModel
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            cfg = AgentConfig(
+                workspace=root, max_depth=2, max_steps_per_call=4,
+                acceptance_criteria=False, max_concurrent_model_calls=1,
+            )
+            model = ThreadSafeScriptedModel(
+                scripted_turns=[
+                    ModelTurn(tool_calls=[_tc("subtask", objective="A"), _tc("subtask", objective="B")]),
+                    ModelTurn(text="a", stop_reason="end_turn"),
+                    ModelTurn(text="b", stop_reason="end_turn"),
+                    ModelTurn(text="done", stop_reason="end_turn"),
+                ]
+            )
+            engine = RLMEngine(model=model, tools=WorkspaceTools(root=root), config=cfg)
+            self.assertEqual(engine.solve("fan out"), "done")
+            metrics = engine.scheduler.metrics()
+            self.assertEqual(metrics["granted"], 4)
+            self.assertEqual(metrics["peak_in_flight"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from agent.search_index import TrigramIndex, iter_range_lines, query_trigrams, required_literals
+from agent.tools import WorkspaceTools
+
+
+def _age_tree(root: Path, seconds: float = 10.0) -> None:
+    """Push every mtime outside the racy windows, as for files edited long ago."""
+    past = time.time() - seconds
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            os.utime(Path(dirpath) / name, (past, past))
+        os.utime(dirpath, (past, past))
+
+
+class RequiredLiteralsTests(unittest.TestCase):
+    def test_plain_and_escaped(self) -> None:
+        self.assertEqual(required_literals("needle"), ["needle"])
+        self.assertEqual(required_literals(r"foo\.bar\d+baz"), ["foo.bar", "baz"])
+
+    def test_optional_parts_dropped(self) -> None:
+        self.assertEqual(required_literals(r"colou?r(s)?[abc]x{2}end"), ["colo", "r", "end"])
+        self.assertEqual(required_literals("a|b"), [])
+
+    def test_non_ascii_contributes_no_trigrams(self) -> None:
+        self.assertEqual(query_trigrams("é"), set())
+        self.assertEqual(query_trigrams("ABCé"), query_trigrams("abc"))
+
+
+class TrigramIndexTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.db = self.root / "idx" / "trigrams.db"
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _index(self, budget: int = 1 << 30) -> TrigramIndex:
+        index = TrigramIndex(self.root, self.db, budget)
+        self.addCleanup(index.close)
+        return index
+
+    def test_files_without_all_trigrams_are_excluded(self) -> None:
+        (self.root / "a.txt").write_text("the Needle is here\n", encoding="utf-8")
+        (self.root / "b.txt").write_text("needs le, not the word\n", encoding="utf-8")
+        index = self._index()
+        index.sync(["a.txt", "b.txt"])
+        self.assertEqual(index.candidates(["a.txt", "b.txt"], ["needle"]), {"a.txt": None})
+        self.assertIsNone(index.candidates(["a.txt", "b.txt"], ["ne"]))
+
+    def test_byte_ranges_in_large_file(self) -> None:
+        lines = [f"row {i:06d} plain filler text" for i in range(40_000)]
+        lines[25_000] = "row special NEEDLE"
+        path = self.root / "big.txt"
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        index = self._index()
+        index.sync(["big.txt"])
+        spans = index.candidates(["big.txt"], ["needle"])["big.txt"]
+        self.assertIsNotNone(spans)
+        self.assertLess(sum(end - start for start, end in spans), path.stat().st_size // 4)
+        hits = [(n, line) for n, line in iter_range_lines(path, spans) if "needle" in line.lower()]
+        self.assertEqual(hits, [(25_001, "row special NEEDLE")])
+
+    def test_match_across_block_boundary(self) -> None:
+        with patch("agent.search_index._MIN_BLOCK", 64), patch("agent.search_index._MAX_BLOCKS", 64):
+            (self.root / "f.txt").write_text("x" * 62 + "boundary" + "y" * 400, encoding="utf-8")
+            index = self._index()
+            index.sync(["f.txt"])
+            spans = index.candidates(["f.txt"], ["boundary"])["f.txt"]
+        self.assertTrue(any(start <= 62 and end >= 70 for start, end in spans))
+
+    def test_incremental_sync(self) -> None:
+        (self.root / "a.txt").write_text("alpha\n", encoding="utf-8")
+        (self.root / "b.txt").write_text("beta\n", encoding="utf-8")
+        index = self._index()
+        index.sync(["a.txt", "b.txt"])
+        stats = index.sync(["a.txt"])
+        self.assertEqual(stats["removed"], 1)
+        (self.root / "a.txt").write_text("gamma ray\n", encoding="utf-8")
+        index.sync(["a.txt"])
+        self.assertEqual(index.candidates(["a.txt"], ["gamma"]), {"a.txt": None})
+        self.assertEqual(index.candidates(["a.txt"], ["alpha"]), {})
+
+    def test_non_ascii_case_folding_is_a_superset(self) -> None:
+        (self.root / "a.txt").write_text("the \u212aELVIN scale\n", encoding="utf-8")
+        (self.root / "b.txt").write_text("une école\n", encoding="utf-8")
+        index = self._index()
+        index.sync(["a.txt", "b.txt"])
+        self.assertIn("a.txt", index.candidates(["a.txt", "b.txt"], ["kelvin"]))
+        self.assertIn("b.txt", index.candidates(["a.txt", "b.txt"], ["ÉCOLE"]))
+
+    def test_older_format_is_rebuilt(self) -> None:
+        (self.root / "a.txt").write_text("kelvin\n", encoding="utf-8")
+        self._index().sync(["a.txt"])
+        with sqlite3.connect(self.db) as conn:
+            conn.execute("PRAGMA user_version = 1")
+        self.assertEqual(self._index().stats()["docs"], 0)
+
+    def test_over_budget_files_are_always_candidates(self) -> None:
+        (self.root / "a.txt").write_text("some text that will not fit\n", encoding="utf-8")
+        index = self._index(budget=10)
+        self.assertEqual(index.sync(["a.txt"])["skipped"], 1)
+        self.assertEqual(index.candidates(["a.txt"], ["zzzz"]), {"a.txt": None})
+        self.assertLessEqual(index.stats()["bytes"], 10)
+
+
+class WorkspaceToolsSearchIndexTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        rows = [f"{i},name{i % 97},{i * 3}" for i in range(30_000)]
+        rows[12_345] = "12345,Zebulon Quux,7"
+        (self.root / "data.csv").write_text("\n".join(rows) + "\n", encoding="utf-8")
+        (self.root / "notes.md").write_text("zebulon was mentioned\n", encoding="utf-8")
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _search(self, tools: WorkspaceTools, query: str, glob: str | None = None) -> str:
+        with patch("agent.tools.shutil.which", return_value=None):
+            return tools.search_files(query, glob)
+
+    def test_results_match_unindexed_search(self) -> None:
+        indexed = WorkspaceTools(root=self.root, cache_max_entries=0)
+        plain = WorkspaceTools(root=self.root, cache_max_entries=0, search_index_mb=0)
+        for query, glob in (("zebulon", None), ("Zebulon Quux", "*.csv"), ("name42,", None), ("absent text", None)):
+            self.assertEqual(self._search(indexed, query, glob), self._search(plain, query, glob), query)
+        self.assertIn("data.csv:12346:12345,Zebulon Quux,7", self._search(indexed, "zebulon"))
+        self.assertTrue((self.root / ".openplanter" / "index" / "trigrams.db").exists())
+
+    def test_line_numbers_count_newlines_only(self) -> None:
+        rows = [f"{i},filler" for i in range(30_000)]
+        rows[10] = "10,page\x0cbreak\u2028and\rcarriage"
+        rows[20_000] = "20000,Quillon"
+        (self.root / "big.csv").write_text("\n".join(rows) + "\r\n", encoding="utf-8")
+        (self.root / "small.txt").write_text("a\x0cb\x0bc\u2028d\r\nQuillon\r\n", encoding="utf-8")
+        indexed = WorkspaceTools(root=self.root, cache_max_entries=0)
+        plain = WorkspaceTools(root=self.root, cache_max_entries=0, search_index_mb=0)
+        expected = "big.csv:20001:20000,Quillon\nsmall.txt:2:Quillon"
+        self.assertEqual(self._search(indexed, "quillon"), expected)
+        self.assertEqual(self._search(plain, "quillon"), expected)
+
+    def test_non_ascii_case_matches_survive_narrowing(self) -> None:
+        (self.root / "units.txt").write_text("temperature in \u212aelvin\n", encoding="utf-8")
+        indexed = WorkspaceTools(root=self.root, cache_max_entries=0)
+        plain = WorkspaceTools(root=self.root, cache_max_entries=0, search_index_mb=0)
+        self.assertEqual(self._search(indexed, "kelvin"), self._search(plain, "kelvin"))
+        self.assertIn("units.txt:1:", self._search(indexed, "kelvin"))
+
+    def test_large_build_runs_in_background(self) -> None:
+        tools = WorkspaceTools(root=self.root, cache_max_entries=0)
+        plain = WorkspaceTools(root=self.root, cache_max_entries=0, search_index_mb=0)
+        with patch("agent.tools._INLINE_SYNC_BYTES", 0):
+            self.assertEqual(self._search(tools, "zebulon"), self._search(plain, "zebulon"))
+            builder = tools._search_sync
+            self.assertIsNotNone(builder)
+            builder.join()
+        self.assertIsNotNone(tools._trigram_index())
+        self.assertEqual(tools._search_index.stats()["docs"], 2)
+        self.assertEqual(self._search(tools, "zebulon"), self._search(plain, "zebulon"))
+
+    def test_sync_reuses_file_index_stats(self) -> None:
+        for i in range(200):
+            (self.root / f"n{i}.txt").write_text(f"note {i}\n", encoding="utf-8")
+        _age_tree(self.root)
+        tools = WorkspaceTools(root=self.root, cache_max_entries=0)
+        self._search(tools, "zebulon")
+        with patch("os.stat", wraps=os.stat) as stat:
+            self.assertIn("notes.md", self._search(tools, "zebulon"))
+        self.assertLess(stat.call_count, 20)
+
+    def test_in_place_edit_seen_after_shell_command(self) -> None:
+        tools = WorkspaceTools(root=self.root, cache_max_entries=0)
+        self._search(tools, "zebulon")
+        _age_tree(self.root)
+        self.assertEqual(self._search(tools, "fresh marker"), "(no matches)")
+        tools.run_shell("printf 'a fresh marker\\n' >> notes.md")
+        self.assertEqual(self._search(tools, "fresh marker"), "notes.md:2:a fresh marker")
+
+    def test_sees_external_edits(self) -> None:
+        tools = WorkspaceTools(root=self.root, cache_max_entries=0)
+        self.assertEqual(self._search(tools, "fresh marker"), "(no matches)")
+        with (self.root / "notes.md").open("a", encoding="utf-8") as fh:
+            fh.write("a fresh marker\n")
+        self.assertEqual(self._search(tools, "fresh marker"), "notes.md:2:a fresh marker")
+
+
+if __name__ == "__main__":
+    unittest.main()
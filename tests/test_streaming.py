@@ -7,10 +7,18 @@ import socket
 import unittest
 from unittest.mock import MagicMock, patch
 
+from agent.http_pool import HTTPStatusError
+from conftest import mock_anthropic_stream
 from agent.model import (
+    AnthropicModel,
     ModelError,
+    _AnthropicStreamAccumulator,
+    _OpenAIStreamAccumulator,
+    _AnthropicToolCallWatcher,
+    _OpenAIToolCallWatcher,
     _accumulate_anthropic_stream,
     _accumulate_openai_stream,
+    _chain_sse_listeners,
     _http_stream_sse,
     _read_sse_events,
 )
@@ -192,13 +200,132 @@ class AccumulateAnthropicStreamTests(unittest.TestCase):
         self.assertEqual(result["content"][1]["text"], "Answer")
 
 
+class IncrementalAccumulatorTests(unittest.TestCase):
+    """Accumulators consume events as they stream; raw events are not retained."""
+
+    def test_read_sse_events_can_drop_events(self) -> None:
+        resp = io.BytesIO(
+            b'data: {"choices":[{"delta":{"content":"a"}}]}\n\n'
+            b'data: {"choices":[{"delta":{"content":"b"},"finish_reason":"stop"}]}\n\n'
+        )
+        acc = _OpenAIStreamAccumulator()
+        events = _read_sse_events(resp, on_sse_event=acc, keep_events=False)
+        self.assertEqual(events, [])
+        self.assertEqual(acc.events_seen, 2)
+        self.assertEqual(acc.result()["choices"][0]["message"]["content"], "ab")
+
+    def test_accumulator_error_fails_the_stream(self) -> None:
+        resp = io.BytesIO(
+            b'data: {"choices":[{"delta":{"content":"a"}}]}\n\n'
+            b'data: {"choices":[{"delta":{"content":"b"},"finish_reason":"stop"}]}\n\n'
+        )
+
+        def broken(_event_type, data):
+            if data["choices"][0].get("finish_reason"):
+                raise KeyError("index")
+
+        with self.assertRaises(ModelError):
+            _read_sse_events(resp, on_sse_event=_chain_sse_listeners(broken), keep_events=False)
+
+    def test_observer_error_is_isolated(self) -> None:
+        resp = io.BytesIO(
+            b'data: {"choices":[{"delta":{"content":"a"}}]}\n\n'
+            b'data: {"choices":[{"delta":{"content":"b"},"finish_reason":"stop"}]}\n\n'
+        )
+        acc = _OpenAIStreamAccumulator()
+
+        def noisy(_event_type, _data):
+            raise RuntimeError("ui closed")
+
+        _read_sse_events(resp, on_sse_event=_chain_sse_listeners(acc, noisy), keep_events=False)
+        self.assertEqual(acc.result()["choices"][0]["message"]["content"], "ab")
+
+    def test_anthropic_many_deltas(self) -> None:
+        acc = _AnthropicStreamAccumulator()
+        acc("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "thinking", "thinking": ""}})
+        for _ in range(1000):
+            acc("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "thinking_delta", "thinking": "x"}})
+        acc("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "signature_delta", "signature": "sig"}})
+        acc("content_block_stop", {"type": "content_block_stop", "index": 0})
+        acc("content_block_start", {"type": "content_block_start", "index": 1, "content_block": {"type": "tool_use", "id": "t", "name": "run_shell"}})
+        for part in ('{"comm', 'and": "l', 's"}'):
+            acc("content_block_delta", {"type": "content_block_delta", "index": 1, "delta": {"type": "input_json_delta", "partial_json": part}})
+        result = acc.result()
+        thinking, tool = result["content"]
+        self.assertEqual(thinking, {"type": "thinking", "thinking": "x" * 1000, "signature": "sig"})
+        # A tool block still open when the stream ends is finalized by result().
+        self.assertEqual(tool["input"], {"command": "ls"})
+        self.assertNotIn("_input_json", tool)
+
+    def test_model_keeps_events_only_when_asked(self) -> None:
+        def fake_http_json(url, method, headers, payload=None, timeout_sec=90):
+            return {
+                "content": [{"type": "text", "text": "hi"}],
+                "stop_reason": "end_turn",
+                "usage": {"input_tokens": 3, "output_tokens": 1},
+            }
+
+        with patch("agent.model._http_stream_sse", mock_anthropic_stream(fake_http_json)):
+            model = AnthropicModel(model="m", api_key="k")
+            turn = model.complete(model.create_conversation("sys", "usr"))
+            self.assertEqual(turn.text, "hi")
+            self.assertEqual(model.last_stream_events, [])
+            model.keep_stream_events = True
+            model.complete(model.create_conversation("sys", "usr"))
+            self.assertTrue(model.last_stream_events)
+
+
+class ToolCallWatcherTests(unittest.TestCase):
+    """Test early tool-call reporting used for speculative execution."""
+
+    def test_anthropic_reports_at_block_stop(self) -> None:
+        seen = []
+        watcher = _AnthropicToolCallWatcher(seen.append)
+        watcher("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "tool_use", "id": "toolu_1", "name": "read_file"}})
+        watcher("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "input_json_delta", "partial_json": '{"path":'}})
+        watcher("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "input_json_delta", "partial_json": ' "a.py"}'}})
+        self.assertEqual(seen, [])
+        watcher("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self.assertEqual(len(seen), 1)
+        self.assertEqual((seen[0].id, seen[0].name, seen[0].arguments), ("toolu_1", "read_file", {"path": "a.py"}))
+
+    def test_anthropic_ignores_text_blocks(self) -> None:
+        seen = []
+        watcher = _AnthropicToolCallWatcher(seen.append)
+        watcher("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+        watcher("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self.assertEqual(seen, [])
+
+    def test_openai_reports_when_arguments_complete(self) -> None:
+        seen = []
+        watcher = _OpenAIToolCallWatcher(seen.append)
+
+        def _delta(idx: int, **fields) -> dict:
+            return {"choices": [{"delta": {"tool_calls": [{"index": idx, **fields}]}, "finish_reason": None}]}
+
+        watcher("", _delta(0, id="call_1", function={"name": "read_file", "arguments": '{"path": '}))
+        self.assertEqual(seen, [])
+        watcher("", _delta(0, function={"arguments": '"a.py"}'}))
+        self.assertEqual([tc.id for tc in seen], ["call_1"])
+        watcher("", _delta(1, id="call_2", function={"name": "list_files", "arguments": ""}))
+        watcher("", {"choices": [{"delta": {}, "finish_reason": "tool_calls"}]})
+        self.assertEqual([(tc.id, tc.arguments) for tc in seen], [("call_1", {"path": "a.py"}), ("call_2", {})])
+
+    def test_openai_skips_malformed_arguments(self) -> None:
+        seen = []
+        watcher = _OpenAIToolCallWatcher(seen.append)
+        watcher("", {"choices": [{"delta": {"tool_calls": [{"index": 0, "id": "c", "function": {"name": "read_file", "arguments": '{"path": }'}}]}}]})
+        watcher("", {"choices": [{"delta": {}, "finish_reason": "tool_calls"}]})
+        self.assertEqual(seen, [])
+
+
 class HttpStreamSSETests(unittest.TestCase):
     """Test _http_stream_sse retry and error handling."""
 
     def test_retries_on_timeout(self) -> None:
         call_count = 0
 
-        def fake_urlopen(req, timeout=None):
+        def fake_request(method, url, body=None, headers=None, timeout=90):
             nonlocal call_count
             call_count += 1
             if call_count < 3:
@@ -207,13 +334,10 @@ class HttpStreamSSETests(unittest.TestCase):
             data = 'data: {"choices":[{"delta":{"content":"ok"},"finish_reason":"stop"}]}\n\ndata: [DONE]\n'
             resp = MagicMock()
             resp.__iter__ = lambda self: iter(data.encode().split(b"\n"))
-            resp.__enter__ = lambda self: self
-            resp.__exit__ = lambda self, *a: None
-            resp.fp = MagicMock()
             resp.close = MagicMock()
             return resp
 
-        with patch("agent.model.urllib.request.urlopen", fake_urlopen):
+        with patch("agent.model.http_pool.request", fake_request):
             events = _http_stream_sse(
                 url="http://test/v1/chat/completions",
                 method="POST",
@@ -226,10 +350,10 @@ class HttpStreamSSETests(unittest.TestCase):
         self.assertTrue(len(events) > 0)
 
     def test_gives_up_after_max_retries(self) -> None:
-        def fake_urlopen(req, timeout=None):
+        def fake_request(method, url, body=None, headers=None, timeout=90):
             raise socket.timeout("timed out")
 
-        with patch("agent.model.urllib.request.urlopen", fake_urlopen):
+        with patch("agent.model.http_pool.request", fake_request):
             with self.assertRaises(ModelError) as ctx:
                 _http_stream_sse(
                     url="http://test/v1/chat/completions",
@@ -245,19 +369,12 @@ class HttpStreamSSETests(unittest.TestCase):
         """HTTP 400 errors should raise immediately without retrying."""
         call_count = 0
 
-        def fake_urlopen(req, timeout=None):
+        def fake_request(method, url, body=None, headers=None, timeout=90):
             nonlocal call_count
             call_count += 1
-            import urllib.error
-            raise urllib.error.HTTPError(
-                url="http://test",
-                code=400,
-                msg="Bad Request",
-                hdrs={},
-                fp=io.BytesIO(b'{"error": "bad request"}'),
-            )
+            raise HTTPStatusError(url, 400, "Bad Request", b'{"error": "bad request"}')
 
-        with patch("agent.model.urllib.request.urlopen", fake_urlopen):
+        with patch("agent.model.http_pool.request", fake_request):
             with self.assertRaises(ModelError) as ctx:
                 _http_stream_sse(
                     url="http://test/v1/chat/completions",
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from agent.tool_cache import ToolResultCache
+from agent.tools import WorkspaceTools
+
+
+def _age(path: Path, seconds: float = 10.0) -> None:
+    """Push *path*'s mtime outside the racy window so results are cacheable."""
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+class ToolResultCacheTests(unittest.TestCase):
+    def test_hit_and_stamp_mismatch(self) -> None:
+        cache = ToolResultCache()
+        cache.put("k", "v", stamp=1)
+        self.assertEqual(cache.get("k", 1), "v")
+        self.assertIsNone(cache.get("k", 2))
+        self.assertIsNone(cache.get("k", 1))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["invalidations"]), (1, 2, 1))
+
+    def test_generation_mismatch_invalidates(self) -> None:
+        cache = ToolResultCache()
+        cache.put("k", "v", stamp=1, generation=3)
+        self.assertIsNone(cache.get("k", 1, generation=4))
+
+    def test_lru_eviction_by_count_and_chars(self) -> None:
+        cache = ToolResultCache(max_entries=2, max_chars=100)
+        cache.put("a", "1", 0)
+        cache.put("b", "2", 0)
+        cache.get("a", 0)
+        cache.put("c", "3", 0)
+        self.assertIsNone(cache.get("b", 0))
+        self.assertEqual(cache.get("a", 0), "1")
+        cache.put("big", "x" * 99, 0)
+        self.assertIsNone(cache.get("c", 0))
+        self.assertEqual(cache.stats()["evictions"], 2)
+        self.assertEqual(cache.stats()["chars"], 100)
+
+
+class WorkspaceToolsCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.file = self.root / "notes.txt"
+        self.file.write_text("alpha\n", encoding="utf-8")
+        _age(self.file)
+        _age(self.root)
+        self.tools = WorkspaceTools(root=self.root)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_read_file_hit_still_marks_file_read(self) -> None:
+        first = self.tools.read_file("notes.txt")
+        fresh = WorkspaceTools(root=self.root)
+        fresh._cache = self.tools._cache
+        second = fresh.read_file("notes.txt")
+        self.assertEqual(first, second)
+        self.assertEqual(self.tools.cache_stats()["hits"], 1)
+        self.assertIn("Wrote", fresh.write_file("notes.txt", "beta\n"))
+
+    def test_write_file_invalidates_read(self) -> None:
+        self.tools.read_file("notes.txt")
+        self.tools.write_file("notes.txt", "beta\n")
+        _age(self.file)
+        self.assertIn("beta", self.tools.read_file("notes.txt"))
+        self.assertEqual(self.tools.cache_stats()["hits"], 0)
+
+    def test_external_modification_detected_by_stamp(self) -> None:
+        self.tools.read_file("notes.txt")
+        self.file.write_text("gamma, longer\n", encoding="utf-8")
+        _age(self.file, 5.0)
+        self.assertIn("gamma", self.tools.read_file("notes.txt"))
+        self.assertEqual(self.tools.cache_stats()["invalidations"], 1)
+
+    def test_recently_modified_file_not_cached(self) -> None:
+        self.file.write_text("fresh\n", encoding="utf-8")
+        self.tools.read_file("notes.txt")
+        self.tools.read_file("notes.txt")
+        self.assertEqual(self.tools.cache_stats()["entries"], 0)
+
+    def test_search_cached_until_shell_runs(self) -> None:
+        first = self.tools.search_files("alpha")
+        self.assertEqual(self.tools.search_files("alpha"), first)
+        self.assertEqual(self.tools.cache_stats()["hits"], 1)
+        self.tools.run_shell("true")
+        self.tools.search_files("alpha")
+        self.assertEqual(self.tools.cache_stats()["hits"], 1)
+
+    def test_search_stamp_comes_from_index_sync(self) -> None:
+        with patch.object(WorkspaceTools, "_tree_stamp", side_effect=AssertionError("tree walk")):
+            self.tools.search_files("alpha")
+            self.tools.search_files("alpha")
+            self.assertEqual(self.tools.cache_stats()["hits"], 1)
+            self.file.write_text("alpha, edited in place\n", encoding="utf-8")
+            _age(self.file, 5.0)
+            self.assertIn("edited in place", self.tools.search_files("alpha"))
+
+    def test_list_files_sees_new_file(self) -> None:
+        self.tools.list_files()
+        (self.root / "other.txt").write_text("x", encoding="utf-8")
+        self.assertIn("other.txt", self.tools.list_files())
+
+    def test_disabled_cache(self) -> None:
+        tools = WorkspaceTools(root=self.root, cache_max_entries=0)
+        tools.read_file("notes.txt")
+        self.assertEqual(tools.cache_stats(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
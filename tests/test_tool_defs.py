@@ -1,14 +1,21 @@
 """Tests for tool_defs.py: schema definitions and provider conversions."""
 from __future__ import annotations
 
+import json
 import unittest
 
 from agent.tool_defs import (
+    PROCESS,
     TOOL_DEFINITIONS,
+    TOOL_SIDE_EFFECTS,
+    ToolSet,
     _make_strict_parameters,
     get_tool_definitions,
+    is_concurrency_safe,
+    tool_side_effect,
     to_anthropic_tools,
     to_openai_tools,
+    tool_schemas,
 )
 
 
@@ -29,7 +36,7 @@ class ToolDefinitionsTests(unittest.TestCase):
         names = [d["name"] for d in TOOL_DEFINITIONS]
         self.assertEqual(len(names), len(TOOL_DEFINITIONS))
         expected = {
-            "list_files", "search_files", "repo_map", "web_search", "fetch_url",
+            "list_files", "search_files", "repo_map", "profile_dataset", "query_dataset", "web_search", "fetch_url",
             "read_file", "write_file", "apply_patch", "edit_file",
             "hashline_edit",
             "run_shell", "run_shell_bg", "check_shell_bg", "kill_shell_bg",
@@ -260,5 +267,54 @@ class ToAnthropicToolsTests(unittest.TestCase):
         self.assertEqual(tools, [])
 
 
+class ToolSideEffectTests(unittest.TestCase):
+    """Tests for the side-effect classification used to schedule tool calls."""
+
+    def test_every_tool_is_classified(self) -> None:
+        names = {d["name"] for d in TOOL_DEFINITIONS}
+        self.assertEqual(names - set(TOOL_SIDE_EFFECTS), set())
+
+    def test_reads_and_network_are_concurrency_safe(self) -> None:
+        for name in ("read_file", "search_files", "list_files", "think", "web_search", "fetch_url"):
+            self.assertTrue(is_concurrency_safe(name), name)
+
+    def test_writes_and_processes_are_barriers(self) -> None:
+        for name in ("write_file", "apply_patch", "edit_file", "run_shell", "run_shell_bg", "subtask"):
+            self.assertFalse(is_concurrency_safe(name), name)
+
+    def test_unknown_tool_defaults_to_process(self) -> None:
+        self.assertEqual(tool_side_effect("mystery_tool"), PROCESS)
+        self.assertFalse(is_concurrency_safe("mystery_tool"))
+
+
+class ToolSchemasTests(unittest.TestCase):
+    """Tests for the precomputed tool_schemas() bundles."""
+
+    def test_bundles_are_shared(self) -> None:
+        executor = ToolSet(include_subtask=False)
+        self.assertIs(tool_schemas("openai", executor), tool_schemas("openai", ToolSet(include_subtask=False)))
+        self.assertIs(executor.definitions(), ToolSet(False).definitions())
+        self.assertIsNot(tool_schemas("openai", executor), tool_schemas("openai", executor, strict=False))
+
+    def test_matches_converters(self) -> None:
+        tool_set = ToolSet(include_subtask=True, include_acceptance_criteria=True)
+        defs = get_tool_definitions(include_subtask=True, include_acceptance_criteria=True)
+        schemas = tool_schemas("openai", tool_set)
+        self.assertEqual(list(schemas.tools), to_openai_tools(defs=defs))
+        self.assertEqual(json.loads(schemas.json), to_openai_tools(defs=defs))
+        self.assertEqual(schemas.names, tuple(d["name"] for d in defs))
+        self.assertEqual(list(tool_schemas("anthropic").tools), to_anthropic_tools())
+
+    def test_anthropic_cache_breakpoint_on_last_tool_only(self) -> None:
+        schemas = tool_schemas("anthropic", ToolSet(), cache_breakpoint=True)
+        self.assertEqual(schemas.tools[-1]["cache_control"], {"type": "ephemeral"})
+        self.assertEqual(schemas.json.count("cache_control"), 1)
+        self.assertNotIn("cache_control", tool_schemas("anthropic", ToolSet()).json)
+
+    def test_unknown_provider(self) -> None:
+        with self.assertRaises(ValueError):
+            tool_schemas("gemini")
+
+
 if __name__ == "__main__":
     unittest.main()
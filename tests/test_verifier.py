@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from agent.config import AgentConfig
+from agent.engine import RLMEngine
+from agent.model import ScriptedModel
+from agent.tools import WorkspaceTools
+from agent.verifier import command_policy_error, parse_clause, split_clauses, verify_criteria
+
+
+class ParseTests(unittest.TestCase):
+    def test_split_respects_quotes(self) -> None:
+        criteria = "out.json exists; python3 -c 'import json; print(1)' outputs 1\nno errors"
+        self.assertEqual(
+            split_clauses(criteria),
+            ["out.json exists", "python3 -c 'import json; print(1)' outputs 1", "no errors"],
+        )
+
+    def test_parse_numeric_predicate(self) -> None:
+        check = parse_clause("`jq 'map(.id) | length' e.json` shows >= 1 entity")
+        assert check is not None
+        self.assertEqual((check.kind, check.op, check.expected), ("output", "ge", 1.0))
+        self.assertEqual(check.target, "jq 'map(.id) | length' e.json")
+
+    def test_parse_word_operators_and_exit(self) -> None:
+        check = parse_clause("`wc -l < data.csv` outputs at least 10")
+        self.assertIsNone(check, "input redirection is outside the sandbox policy")
+        check = parse_clause("`cat data.csv | wc -l` prints at least 10")
+        assert check is not None
+        self.assertEqual((check.target, check.op), ("cat data.csv | wc -l", "ge"))
+        check = parse_clause("test -s out.json exits 0")
+        assert check is not None
+        self.assertEqual(check.kind, "exit")
+
+    def test_interpreters_go_to_judge(self) -> None:
+        self.assertIsNone(parse_clause("python3 -c \"__import__('os').remove('results.csv')\" succeeds"))
+        self.assertIsNone(parse_clause("python3 -c 'import json; print(1)' outputs 1"))
+
+    def test_unrecognized_clauses(self) -> None:
+        self.assertIsNone(parse_clause("Analysis should be thorough"))
+        self.assertIsNone(parse_clause("Report exists"))
+
+    def test_sandbox_policy(self) -> None:
+        self.assertIsNone(command_policy_error("grep -c ERROR log.txt"))
+        self.assertIsNotNone(command_policy_error("rm -rf out"))
+        self.assertIsNotNone(command_policy_error("cat a > b"))
+        self.assertIsNotNone(command_policy_error("ls && rm x"))
+        self.assertIsNotNone(command_policy_error("find . -delete"))
+        self.assertIsNotNone(command_policy_error("python3 -c 'print(1)'"))
+        self.assertIsNotNone(command_policy_error("find . -fls out.txt"))
+        self.assertIsNotNone(command_policy_error("find . -fprint0 x"))
+        self.assertIsNotNone(command_policy_error("sort -o out.txt in.txt"))
+        self.assertIsNotNone(command_policy_error("sort -ro out.txt in.txt"))
+        self.assertIsNotNone(command_policy_error("sort --compress-program=sh in.txt"))
+        self.assertIsNotNone(command_policy_error("sort --compress sh in.txt"))
+        self.assertIsNotNone(command_policy_error("sort --out=x in.txt"))
+        self.assertIsNone(command_policy_error("sort -t, -k2 -rn in.txt"))
+        self.assertIsNotNone(command_policy_error("uniq in.txt out.txt"))
+        self.assertIsNone(command_policy_error("sort in.txt | uniq -c"))
+
+
+class VerifyTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        (self.root / "out.json").write_text(json.dumps(list(range(12))), encoding="utf-8")
+        self.tools = WorkspaceTools(root=self.root)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def test_all_clauses_pass(self) -> None:
+        report = verify_criteria(
+            "out.json exists; `grep -o , out.json | wc -l` outputs >= 10",
+            self.tools,
+        )
+        assert report.verdict is not None
+        self.assertTrue(report.verdict.startswith("PASS"))
+        self.assertIn("-> 11", report.verdict)
+
+    def test_failing_clause_decides(self) -> None:
+        report = verify_criteria("missing.json exists; the summary is insightful", self.tools)
+        assert report.verdict is not None
+        self.assertTrue(report.verdict.startswith("FAIL"))
+
+    def test_output_without_number_goes_to_judge(self) -> None:
+        (self.root / "results.csv").write_text("a,b,c,d,e\n", encoding="utf-8")
+        report = verify_criteria("out.json exists; head -1 results.csv shows 5 columns", self.tools)
+        self.assertIsNone(report.verdict)
+        self.assertEqual(report.unhandled, ["head -1 results.csv shows 5 columns"])
+
+    def test_partial_leaves_unhandled(self) -> None:
+        report = verify_criteria("out.json exists; each entry has an id field", self.tools)
+        self.assertIsNone(report.verdict)
+        self.assertEqual(report.unhandled, ["each entry has an id field"])
+        self.assertEqual(report.evidence, ["out.json exists"])
+
+    def test_engine_skips_judge_model(self) -> None:
+        calls: list[str] = []
+
+        def factory(name: str, effort: str | None) -> ScriptedModel:
+            calls.append(name)
+            return ScriptedModel()
+
+        cfg = AgentConfig(workspace=self.root, acceptance_criteria=True)
+        engine = RLMEngine(model=ScriptedModel(), tools=self.tools, config=cfg, model_factory=factory)
+        verdict = engine._judge_result("count", "cat out.json | wc -c outputs > 5", "done")
+        self.assertTrue(verdict.startswith("PASS"))
+        self.assertEqual(calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()